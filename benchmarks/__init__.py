@@ -0,0 +1,7 @@
+"""
+Benchmark harnesses for the Supermarket Management System
+
+Run from the project root, e.g. ``python -m benchmarks.checkout_load --tills 8``.
+Each harness works against the configured backend (DB_BACKEND) and writes its
+results as JSON under benchmarks/results so runs can be compared over time.
+"""
@@ -0,0 +1,302 @@
+"""
+Multi-till checkout load generator
+
+Simulates N tills ringing up sales concurrently through Transaction.create_transaction
+(which also runs the stock path) and reports throughput, latency percentiles,
+deadlock/lock-timeout retries and a lost-update check on stock levels.
+
+    python -m benchmarks.checkout_load --tills 8 --sales 250
+    python -m benchmarks.checkout_load --compare benchmarks/results/checkout_load_20240101_120000.json
+
+Each till is a separate process with its own database connection (the app's
+connection is a per-process singleton). Bench products are created with a
+large stock level so no sale is refused, which makes stock drift exact:
+for every product, opening stock - closing stock must equal the quantity sold.
+"""
+import argparse
+import contextlib
+import io
+import logging
+import multiprocessing
+import random
+import time
+import uuid
+
+from benchmarks.common import latency_summary, load_results, percent_change, run_metadata, save_results
+
+BENCH_PRODUCT_PREFIX = 'BENCH-'
+BENCH_EMPLOYEE_CODE = 'BENCH-TILL'
+OPENING_STOCK = 1_000_000
+RETRYABLE_ERRNOS = {1213: 'deadlocks', 1205: 'lock_timeouts'}
+MAX_RETRIES = 5
+
+
+def _db_errno(error):
+    """errno of the mysql.connector error behind a (possibly wrapped) exception"""
+    while error is not None:
+        errno = getattr(error, 'errno', None)
+        if errno:
+            return errno
+        error = error.__cause__
+    return None
+
+
+def prepare_catalog(products=500, customers=200):
+    """Create (or reset) bench products, customers and a till employee; returns the catalog"""
+    from database import get_db
+
+    conn, cursor = get_db()
+    try:
+        conn.start_transaction()
+        cursor.execute("SELECT id FROM employees WHERE employee_code = %s", (BENCH_EMPLOYEE_CODE,))
+        row = cursor.fetchone()
+        if row:
+            employee_id = row[0]
+        else:
+            cursor.execute("""
+                INSERT INTO employees (employee_code, name, role, department, status, hire_date)
+                VALUES (%s, %s, 'cashier', 'Sales', 'active', CURDATE())
+            """, (BENCH_EMPLOYEE_CODE, 'Benchmark Till'))
+            employee_id = cursor.lastrowid
+
+        rng = random.Random(products)
+        cursor.executemany("""
+            INSERT IGNORE INTO products (product_code, name, unit_price, cost_price, tax_rate,
+                                         discount_percentage, quantity_in_stock, is_active)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, TRUE)
+        """, [(f"{BENCH_PRODUCT_PREFIX}{n:05d}", f"Bench Product {n}", price, round(price * 0.7, 2),
+               rng.choice([0, 5, 12, 18]), rng.choice([0, 0, 0, 5, 10]), OPENING_STOCK)
+              for n, price in ((n, round(rng.uniform(5, 900), 2)) for n in range(products))])
+        cursor.execute("UPDATE products SET quantity_in_stock = %s WHERE product_code LIKE %s",
+                       (OPENING_STOCK, BENCH_PRODUCT_PREFIX + '%'))
+
+        cursor.executemany("""
+            INSERT IGNORE INTO customers (customer_code, name, phone)
+            VALUES (%s, %s, %s)
+        """, [(f"BENCHC-{n:05d}", f"Bench Customer {n}", f"90{n:08d}") for n in range(customers)])
+        conn.commit()
+
+        cursor.execute("""
+            SELECT id, unit_price, tax_rate, discount_percentage FROM products
+            WHERE product_code LIKE %s ORDER BY id LIMIT %s
+        """, (BENCH_PRODUCT_PREFIX + '%', products))
+        catalog = [(pid, float(price), float(tax or 0), float(disc or 0)) for pid, price, tax, disc in cursor.fetchall()]
+        cursor.execute("SELECT id FROM customers WHERE customer_code LIKE %s ORDER BY id LIMIT %s",
+                       ('BENCHC-%', customers))
+        customer_ids = [row[0] for row in cursor.fetchall()]
+        return {'employee_id': employee_id, 'products': catalog, 'customer_ids': customer_ids}
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def make_basket(rng, catalog, max_lines=12, hot_products=20, hot_share=0.3):
+    """A realistic basket: mostly distinct products, a share drawn from a small hot set (contention)"""
+    products = catalog['products']
+    lines = rng.randint(1, max_lines)
+    chosen = {}
+    while len(chosen) < lines:
+        pool = products[:hot_products] if rng.random() < hot_share else products
+        product_id, price, tax, disc = rng.choice(pool)
+        chosen[product_id] = {
+            'product_id': product_id,
+            'quantity': rng.choice([1, 1, 1, 2, 2, 3, 5]),
+            'unit_price': price,
+            'discount_rate': disc,
+            'tax_rate': tax
+        }
+    return list(chosen.values())
+
+
+def till_worker(till_id, sales, catalog, run_tag, seed, start_event, results, quiet=True):
+    """One till: ring up `sales` baskets, retrying deadlocks and lock timeouts"""
+    from models.transaction import Transaction
+
+    rng = random.Random(seed + till_id)
+    latencies = []
+    counters = {'committed': 0, 'failed': 0, 'retries': 0, 'deadlocks': 0, 'lock_timeouts': 0, 'lines': 0}
+    sold = {}
+    errors = {}
+    sink = io.StringIO()
+
+    start_event.wait()
+    for _ in range(sales):
+        basket = make_basket(rng, catalog)
+        customer_id = rng.choice(catalog['customer_ids']) if catalog['customer_ids'] and rng.random() < 0.4 else None
+        start = time.perf_counter()
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                with contextlib.redirect_stdout(sink) if quiet else contextlib.nullcontext():
+                    Transaction.create_transaction(customer_id, catalog['employee_id'], basket,
+                                                   payment_method='cash', notes=run_tag)
+                latencies.append(time.perf_counter() - start)
+                counters['committed'] += 1
+                counters['lines'] += len(basket)
+                for line in basket:
+                    sold[line['product_id']] = sold.get(line['product_id'], 0) + line['quantity']
+                break
+            except Exception as e:
+                errno = _db_errno(e)
+                if errno in RETRYABLE_ERRNOS and attempt < MAX_RETRIES:
+                    counters['retries'] += 1
+                    counters[RETRYABLE_ERRNOS[errno]] += 1
+                    time.sleep(0.005 * (2 ** attempt) * rng.random())
+                    continue
+                counters['failed'] += 1
+                errors[str(errno or type(e).__name__)] = errors.get(str(errno or type(e).__name__), 0) + 1
+                break
+        sink.seek(0)
+        sink.truncate()
+
+    results.put({'till_id': till_id, 'latencies': latencies, 'counters': counters, 'sold': sold, 'errors': errors})
+
+
+def check_consistency(catalog, run_tag, sold_by_tills):
+    """Lost-update check: stock drift vs items sold, and committed sales vs rows written"""
+    from database import get_db
+
+    conn, cursor = get_db()
+    try:
+        product_ids = [product[0] for product in catalog['products']]
+        placeholders = ', '.join(['%s'] * len(product_ids))
+        cursor.execute(f"SELECT id, quantity_in_stock FROM products WHERE id IN ({placeholders})", product_ids)
+        closing = dict(cursor.fetchall())
+
+        cursor.execute("""
+            SELECT ti.product_id, SUM(ti.quantity)
+            FROM transactions t
+            JOIN transaction_items ti ON ti.transaction_id = t.id
+            WHERE t.notes = %s
+            GROUP BY ti.product_id
+        """, (run_tag,))
+        sold_in_db = {product_id: int(quantity) for product_id, quantity in cursor.fetchall()}
+        cursor.execute("SELECT COUNT(*) FROM transactions WHERE notes = %s", (run_tag,))
+        transactions_in_db = cursor.fetchone()[0]
+    finally:
+        cursor.close()
+
+    lost_updates = []
+    for product_id in product_ids:
+        drift = OPENING_STOCK - int(closing.get(product_id, OPENING_STOCK))
+        expected = sold_in_db.get(product_id, 0)
+        if drift != expected or expected != sold_by_tills.get(product_id, 0):
+            lost_updates.append({'product_id': product_id, 'stock_drift': drift,
+                                 'sold_in_db': expected, 'sold_by_tills': sold_by_tills.get(product_id, 0)})
+
+    return {
+        'products_checked': len(product_ids),
+        'lost_updates': len(lost_updates),
+        'lost_update_samples': lost_updates[:10],
+        'transactions_in_db': transactions_in_db
+    }
+
+
+def run_checkout_load(tills=4, sales_per_till=200, products=500, customers=200, seed=42, quiet=True):
+    """Run the load, check consistency and return the results dict"""
+    catalog = prepare_catalog(products, customers)
+    run_tag = f"checkout-load {uuid.uuid4().hex[:12]}"
+
+    ctx = multiprocessing.get_context('spawn')
+    start_event = ctx.Event()
+    results = ctx.Queue()
+    workers = [ctx.Process(target=till_worker,
+                           args=(till_id, sales_per_till, catalog, run_tag, seed, start_event, results, quiet))
+               for till_id in range(tills)]
+    for worker in workers:
+        worker.start()
+
+    time.sleep(1.0)  # let every till import the app and connect before the clock starts
+    started = time.perf_counter()
+    start_event.set()
+    reports = [results.get() for _ in workers]
+    elapsed = time.perf_counter() - started
+    for worker in workers:
+        worker.join()
+
+    latencies = []
+    totals = {'committed': 0, 'failed': 0, 'retries': 0, 'deadlocks': 0, 'lock_timeouts': 0, 'lines': 0}
+    sold = {}
+    errors = {}
+    for report in reports:
+        latencies.extend(report['latencies'])
+        for key, value in report['counters'].items():
+            totals[key] += value
+        for product_id, quantity in report['sold'].items():
+            sold[product_id] = sold.get(product_id, 0) + quantity
+        for key, value in report['errors'].items():
+            errors[key] = errors.get(key, 0) + value
+
+    consistency = check_consistency(catalog, run_tag, sold)
+    consistency['missing_sales'] = totals['committed'] - consistency['transactions_in_db']
+
+    results = run_metadata()
+    results.update({
+        'benchmark': 'checkout_load',
+        'run_tag': run_tag,
+        'tills': tills,
+        'sales_per_till': sales_per_till,
+        'products': len(catalog['products']),
+        'seed': seed,
+        'elapsed_seconds': elapsed,
+        'tps': totals['committed'] / elapsed if elapsed else 0.0,
+        'lines_per_second': totals['lines'] / elapsed if elapsed else 0.0,
+        'latency': latency_summary(latencies),
+        'errors': errors,
+        'consistency': consistency
+    })
+    results.update(totals)
+    return results
+
+
+def print_results(results, baseline=None):
+    latency = results['latency']
+    consistency = results['consistency']
+    print(f"🛒 Checkout load ({results['backend']}): {results['tills']} tills x {results['sales_per_till']} sales")
+    print(f"   - committed {results['committed']}, failed {results['failed']} in {results['elapsed_seconds']:.2f}s")
+    print(f"   - throughput: {results['tps']:.1f} sales/s ({results['lines_per_second']:.0f} lines/s)")
+    print(f"   - latency: p50 {latency['p50_ms']:.1f} ms, p95 {latency['p95_ms']:.1f} ms, "
+          f"p99 {latency['p99_ms']:.1f} ms, max {latency['max_ms']:.1f} ms")
+    print(f"   - retries: {results['retries']} (deadlocks {results['deadlocks']}, "
+          f"lock timeouts {results['lock_timeouts']})")
+    status = "✅" if not consistency['lost_updates'] and not consistency['missing_sales'] else "❌"
+    print(f"   - {status} lost updates: {consistency['lost_updates']} of {consistency['products_checked']} products, "
+          f"missing sales: {consistency['missing_sales']}")
+    if results['errors']:
+        print(f"   - errors: {results['errors']}")
+
+    if baseline:
+        print(f"📊 Compared with {baseline.get('git_revision') or baseline.get('timestamp')}:")
+        for label, new, old in (('tps', results['tps'], baseline.get('tps')),
+                                ('p95 ms', latency['p95_ms'], baseline.get('latency', {}).get('p95_ms')),
+                                ('p99 ms', latency['p99_ms'], baseline.get('latency', {}).get('p99_ms'))):
+            change = percent_change(new, old)
+            if change is not None:
+                print(f"   - {label}: {old:.1f} -> {new:.1f} ({change:+.1f}%)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Multi-till checkout throughput benchmark")
+    parser.add_argument('--tills', type=int, default=4)
+    parser.add_argument('--sales', type=int, default=200, help="sales per till")
+    parser.add_argument('--products', type=int, default=500)
+    parser.add_argument('--customers', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="results file (default: benchmarks/results/checkout_load_<time>.json)")
+    parser.add_argument('--compare', help="earlier results file to compare against")
+    parser.add_argument('--verbose', action='store_true', help="keep the transaction DEBUG output")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    results = run_checkout_load(args.tills, args.sales, args.products, args.customers, args.seed,
+                                quiet=not args.verbose)
+    baseline = load_results(args.compare) if args.compare else None
+    print_results(results, baseline)
+    path = save_results('checkout_load', results, args.output)
+    print(f"💾 Results saved to {path}")
+    return 0 if not results['consistency']['lost_updates'] and not results['consistency']['missing_sales'] else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,72 @@
+"""
+Shared helpers for the benchmark harnesses - percentiles and JSON result files
+"""
+import json
+import os
+import subprocess
+from datetime import datetime
+from config import DB_BACKEND, VERSION
+
+RESULTS_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def latency_summary(seconds):
+    """p50/p95/p99/max/mean in milliseconds for a list of durations in seconds"""
+    values = sorted(seconds)
+    if not values:
+        return {'count': 0, 'mean_ms': 0.0, 'p50_ms': 0.0, 'p95_ms': 0.0, 'p99_ms': 0.0, 'max_ms': 0.0}
+    return {
+        'count': len(values),
+        'mean_ms': sum(values) / len(values) * 1000,
+        'p50_ms': percentile(values, 50) * 1000,
+        'p95_ms': percentile(values, 95) * 1000,
+        'p99_ms': percentile(values, 99) * 1000,
+        'max_ms': values[-1] * 1000
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+
+def run_metadata():
+    """Context stored with every result so runs from different versions compare fairly"""
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'version': VERSION,
+        'git_revision': git_revision(),
+        'backend': DB_BACKEND
+    }
+
+
+def save_results(name, results, path=None):
+    """Write results to benchmarks/results/<name>_<timestamp>.json (or path); returns the path"""
+    if path is None:
+        os.makedirs(RESULTS_DIRECTORY, exist_ok=True)
+        path = os.path.join(RESULTS_DIRECTORY, f"{name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2, default=str)
+    return path
+
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def percent_change(new, old):
+    if not old:
+        return None
+    return (new - old) / old * 100.0
@@ -0,0 +1,218 @@
+"""
+Local mock SMS gateway and outbox dispatch benchmark
+
+Serves the JSON API that services.messaging.SMSGateway speaks, with
+configurable latency, transient failures (503), rejected numbers and an
+enforced rate limit (429), then pushes a synthetic campaign through
+message_outbox and reports throughput, retries and duplicate deliveries.
+
+    python -m benchmarks.mock_gateway --messages 20000 --concurrency 16 --rate 2000
+    python -m benchmarks.mock_gateway --batch-size 100 --rate 5000      # bulk-send gateway
+    python -m benchmarks.mock_gateway --serve --port 8765               # gateway only (set SMS_API_URL)
+"""
+import argparse
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.common import run_metadata, save_results
+
+
+class MockGateway:
+    """Threaded HTTP server on localhost; use as a context manager"""
+
+    def __init__(self, latency=0.02, failure_rate=0.0, reject_rate=0.0, rate_limit=None, port=0, seed=42):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.reject_rate = reject_rate
+        self.rate_limit = rate_limit
+        self.random = random.Random(seed)
+        self.counts = Counter()
+        self.delivered = Counter()       # ref -> times accepted
+        self._allowance = float(rate_limit or 0)
+        self._checked = time.monotonic()
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), self._handler())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}/send"
+
+    def _within_rate(self, messages):
+        if not self.rate_limit:
+            return True
+        now = time.monotonic()
+        # One second of burst, like a provider's per-second quota
+        self._allowance = min(self.rate_limit, self._allowance + (now - self._checked) * self.rate_limit)
+        self._checked = now
+        if self._allowance < messages:
+            return False
+        self._allowance -= messages
+        return True
+
+    def handle(self, payload):
+        """(HTTP status, response body) for one request"""
+        messages = payload.get('messages', [])
+        with self._lock:
+            self.counts['requests'] += 1
+            if not self._within_rate(len(messages)):
+                self.counts['rate_limited'] += 1
+                return 429, {'error': 'rate limit exceeded'}
+            if self.random.random() < self.failure_rate:
+                self.counts['server_errors'] += 1
+                return 503, {'error': 'temporarily unavailable'}
+            rejected = {message['ref'] for message in messages if self.random.random() < self.reject_rate}
+        time.sleep(self.latency)
+
+        results = []
+        with self._lock:
+            for message in messages:
+                if message['ref'] in rejected:
+                    self.counts['rejected'] += 1
+                    results.append({'ref': message['ref'], 'status': 'rejected', 'error': 'invalid number'})
+                else:
+                    self.counts['accepted'] += 1
+                    self.delivered[message['ref']] += 1
+                    results.append({'ref': message['ref'], 'status': 'accepted',
+                                    'message_id': uuid.uuid4().hex[:16]})
+        return 200, {'results': results}
+
+    def _handler(self):
+        gateway = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'   # keep-alive, as a provider's API would
+            disable_nagle_algorithm = True  # headers and body go out as separate writes
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                status, response = gateway.handle(json.loads(body or b'{}'))
+                data = json.dumps(response).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def run_dispatch_benchmark(messages=5000, concurrency=16, rate=2000.0, batch_size=1, latency=0.02,
+                           failure_rate=0.01, reject_rate=0.001, gateway_rate_limit=None):
+    """Queue a synthetic campaign, drain it through the mock gateway and clean up"""
+    from database import get_db
+    from services.messaging import OutboxDispatcher, SMSGateway, enqueue_messages
+
+    campaign = f"BENCH-{uuid.uuid4().hex[:8]}"
+    rows = [(None, f"+9170{n:08d}", f"Bench offer {n}: 10% off this weekend") for n in range(messages)]
+    started = time.perf_counter()
+    enqueue_messages(rows, campaign=campaign)
+    enqueue_seconds = time.perf_counter() - started
+
+    # The gateway enforces the quota the dispatcher was told about (plus 5% headroom)
+    limit = gateway_rate_limit if gateway_rate_limit is not None else rate * 1.05
+    with MockGateway(latency, failure_rate, reject_rate, rate_limit=limit) as gateway:
+        client = SMSGateway(url=gateway.url, api_key='bench', pool_size=concurrency)
+        dispatcher = OutboxDispatcher(client, concurrency=concurrency, rate=rate, batch_size=batch_size,
+                                      max_attempts=5, backoff_base=0.2)
+
+        def progress(summary):
+            print(f"   ... {summary['sent']:,} sent, {summary['retrying']:,} retries, "
+                  f"{summary['per_second']:,.0f} msg/s", end='\r')
+
+        summary = dispatcher.run(campaign=campaign, progress=progress, wait_for_retries=True)
+        print()
+        counts = dict(gateway.counts)
+        duplicates = sum(times - 1 for times in gateway.delivered.values() if times > 1)
+
+    conn, cursor = get_db()
+    cursor.execute("SELECT status, COUNT(*) FROM message_outbox WHERE campaign = %s GROUP BY status", (campaign,))
+    outbox = dict(cursor.fetchall())
+    cursor.execute("DELETE FROM message_outbox WHERE campaign = %s", (campaign,))
+    conn.commit()
+    cursor.close()
+
+    return {
+        'metadata': run_metadata(),
+        'config': {'messages': messages, 'concurrency': concurrency, 'rate': rate, 'batch_size': batch_size,
+                   'latency_s': latency, 'failure_rate': failure_rate, 'reject_rate': reject_rate,
+                   'gateway_rate_limit': limit},
+        'enqueue_seconds': enqueue_seconds,
+        'dispatch': summary,
+        'gateway': counts,
+        'outbox': outbox,
+        'duplicate_deliveries': duplicates
+    }
+
+
+def print_results(results):
+    dispatch, gateway = results['dispatch'], results['gateway']
+    print(f"📨 {results['config']['messages']:,} messages queued in {results['enqueue_seconds']:.2f}s")
+    print(f"🚀 Dispatched in {dispatch['seconds']:.1f}s - {dispatch['per_second']:,.0f} msg/s "
+          f"over {dispatch['requests']:,} requests (limit {results['config']['rate']:,.0f}/s)")
+    print(f"   sent {dispatch['sent']:,}, failed {dispatch['failed']:,}, retries {dispatch['retrying']:,}; "
+          f"gateway 503s {gateway.get('server_errors', 0):,}, 429s {gateway.get('rate_limited', 0):,}, "
+          f"duplicates {results['duplicate_deliveries']:,}")
+    print(f"   outbox: {results['outbox']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mock SMS gateway and outbox dispatch benchmark")
+    parser.add_argument('--messages', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--rate', type=float, default=2000.0, help="dispatcher rate limit, messages per second")
+    parser.add_argument('--batch-size', type=int, default=1)
+    parser.add_argument('--latency', type=float, default=0.02, help="gateway response time in seconds")
+    parser.add_argument('--failure-rate', type=float, default=0.01, help="share of requests answered 503")
+    parser.add_argument('--reject-rate', type=float, default=0.001, help="share of numbers rejected")
+    parser.add_argument('--serve', action='store_true', help="only run the gateway until interrupted")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--output', help="results file (default: benchmarks/results/sms_dispatch_<time>.json)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    if args.serve:
+        gateway = MockGateway(args.latency, args.failure_rate, args.reject_rate, port=args.port).start()
+        print(f"📡 Mock SMS gateway listening on {gateway.url} (Ctrl+C to stop)")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            gateway.stop()
+        return 0
+
+    results = run_dispatch_benchmark(args.messages, args.concurrency, args.rate, args.batch_size,
+                                     args.latency, args.failure_rate, args.reject_rate)
+    print_results(results)
+    path = save_results('sms_dispatch', results, args.output)
+    print(f"💾 Results saved to {path}")
+    return 0 if results['dispatch']['sent'] + results['dispatch']['failed'] == args.messages else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,238 @@
+"""
+Local stub voice API and call campaign benchmark
+
+Serves the JSON API that services.call_service.VoiceAPI speaks. Each call
+holds its request open for the ring (and talk) time and ends completed,
+busy, unanswered or failed at configurable rates. The stub enforces a
+calls-per-second quota and per-caller-line concurrency (429 on either), and
+records the peak number of calls on each line. The benchmark streams a
+customer segment into a call campaign, dials it through the stub and
+reports throughput, outcomes and line usage.
+
+    python -m benchmarks.mock_voice_api --customers 2000 --lines L1:16,L2:16 --rate 200
+    python -m benchmarks.mock_voice_api --serve --port 8766          # API only (set CALL_API_URL)
+"""
+import argparse
+import logging
+import json
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.common import run_metadata, save_results
+
+
+class MockVoiceAPI:
+    """Threaded HTTP server on localhost; use as a context manager"""
+
+    def __init__(self, ring=0.05, talk=0.1, busy_rate=0.05, no_answer_rate=0.1, fail_rate=0.01,
+                 line_limits=None, rate_limit=None, port=0, seed=42):
+        self.ring = ring
+        self.talk = talk
+        self.busy_rate = busy_rate
+        self.no_answer_rate = no_answer_rate
+        self.fail_rate = fail_rate
+        self.line_limits = dict(line_limits or {})
+        self.rate_limit = rate_limit
+        self.random = random.Random(seed)
+        self.counts = Counter()
+        self.active = Counter()          # caller_id -> calls in progress
+        self.peak = Counter()            # caller_id -> most calls at once
+        self.calls = Counter()           # number -> calls placed
+        self._allowance = float(rate_limit or 0)
+        self._checked = time.monotonic()
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), self._handler())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}/call"
+
+    def _within_rate(self):
+        if not self.rate_limit:
+            return True
+        now = time.monotonic()
+        self._allowance = min(self.rate_limit, self._allowance + (now - self._checked) * self.rate_limit)
+        self._checked = now
+        if self._allowance < 1:
+            return False
+        self._allowance -= 1
+        return True
+
+    def handle(self, payload):
+        """(HTTP status, response body) for one call; blocks for the call's duration"""
+        line, number = payload.get('caller_id'), payload.get('to')
+        with self._lock:
+            self.counts['requests'] += 1
+            if not self._within_rate():
+                self.counts['rate_limited'] += 1
+                return 429, {'error': 'calls per second exceeded'}
+            limit = self.line_limits.get(line)
+            if limit is not None and self.active[line] >= limit:
+                self.counts['line_overflows'] += 1
+                return 429, {'error': f'line {line} at capacity'}
+            self.active[line] += 1
+            self.peak[line] = max(self.peak[line], self.active[line])
+            self.calls[number] += 1
+            roll = self.random.random()
+        try:
+            if roll < self.fail_rate:
+                status = 'failed'
+            elif roll < self.fail_rate + self.busy_rate:
+                status = 'busy'
+            else:
+                time.sleep(self.ring)
+                status = 'no_answer' if roll < self.fail_rate + self.busy_rate + self.no_answer_rate else 'completed'
+                if status == 'completed':
+                    time.sleep(self.talk)
+        finally:
+            with self._lock:
+                self.active[line] -= 1
+                self.counts[status] += 1
+        return 200, {'call_id': uuid.uuid4().hex[:16], 'status': status,
+                     'error': 'invalid number' if status == 'failed' else None}
+
+    def _handler(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                status, response = api.handle(json.loads(body or b'{}'))
+                data = json.dumps(response).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def run_campaign_benchmark(customers=2000, lines='L1:16,L2:16', rate=200.0, ring=0.05, talk=0.1,
+                           busy_rate=0.05, no_answer_rate=0.1, fail_rate=0.01):
+    """Call the first `customers` active customers through the stub, then clean up"""
+    from database import get_db
+    from services.call_campaigns import ALL_CUSTOMERS, CallCampaign, call_dispatcher, get_call_campaign_summary
+    from services.call_service import VoiceAPI, VoiceGateway, parse_lines
+
+    line_limits = parse_lines(lines)
+    campaign = f"BENCH-CALL-{uuid.uuid4().hex[:8]}"
+    segment = ALL_CUSTOMERS + " ORDER BY c.id LIMIT %s"
+    started = time.perf_counter()
+    queued, skipped = CallCampaign(campaign, "Hello {name}, your weekend offer is ready.",
+                                   segment, (customers,)).queue()
+    queue_seconds = time.perf_counter() - started
+
+    # The stub enforces the same line limits and quota the runner was given
+    with MockVoiceAPI(ring, talk, busy_rate, no_answer_rate, fail_rate, line_limits, rate * 1.05) as api:
+        gateway = VoiceGateway(VoiceAPI(url=api.url, api_key='bench', pool_size=sum(line_limits.values())),
+                               line_limits)
+        dispatcher = call_dispatcher(gateway, rate=rate, window='', backoff_base=0.2)
+
+        def progress(summary):
+            print(f"   ... {summary['sent']:,} completed, {summary['retrying']:,} to call again, "
+                  f"{summary['per_second']:,.0f} calls/s", end='\r')
+
+        summary = CallCampaign(campaign, '').run(dispatcher, progress=progress, wait=True)
+        print()
+        counts, peak = dict(api.counts), dict(api.peak)
+        repeat_calls = sum(times - 1 for times in api.calls.values() if times > 1)
+
+    outcomes = get_call_campaign_summary(campaign)
+    conn, cursor = get_db()
+    cursor.execute("DELETE FROM message_outbox WHERE campaign = %s", (campaign,))
+    conn.commit()
+    cursor.close()
+
+    return {
+        'metadata': run_metadata(),
+        'config': {'customers': customers, 'lines': line_limits, 'rate': rate, 'ring_s': ring, 'talk_s': talk,
+                   'busy_rate': busy_rate, 'no_answer_rate': no_answer_rate, 'fail_rate': fail_rate},
+        'queued': queued,
+        'skipped': skipped,
+        'queue_seconds': queue_seconds,
+        'dispatch': summary,
+        'api': counts,
+        'peak_per_line': peak,
+        'repeat_calls': repeat_calls,
+        'outcomes': outcomes
+    }
+
+
+def print_results(results):
+    dispatch, api, config = results['dispatch'], results['api'], results['config']
+    print(f"📇 {results['queued']:,} calls queued ({results['skipped']:,} without a phone) "
+          f"in {results['queue_seconds']:.2f}s")
+    print(f"📞 Dialled in {dispatch['seconds']:.1f}s - {dispatch['per_second']:,.1f} completed calls/s "
+          f"over {api.get('requests', 0):,} attempts (limit {config['rate']:,.0f}/s)")
+    print(f"   lines {config['lines']} peaked at {results['peak_per_line']}; "
+          f"line overflows {api.get('line_overflows', 0):,}, 429s {api.get('rate_limited', 0):,}, "
+          f"repeat calls {results['repeat_calls']:,}")
+    print(f"   outcomes: {results['outcomes']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stub voice API and call campaign benchmark")
+    parser.add_argument('--customers', type=int, default=2000)
+    parser.add_argument('--lines', default='L1:16,L2:16', help="caller_id:max concurrent calls, comma separated")
+    parser.add_argument('--rate', type=float, default=200.0, help="calls started per second")
+    parser.add_argument('--ring', type=float, default=0.05, help="seconds before a call is answered or given up")
+    parser.add_argument('--talk', type=float, default=0.1, help="seconds an answered call lasts")
+    parser.add_argument('--busy-rate', type=float, default=0.05)
+    parser.add_argument('--no-answer-rate', type=float, default=0.1)
+    parser.add_argument('--fail-rate', type=float, default=0.01, help="share of numbers that cannot be called")
+    parser.add_argument('--serve', action='store_true', help="only run the API until interrupted")
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--output', help="results file (default: benchmarks/results/call_campaign_<time>.json)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    if args.serve:
+        from services.call_service import parse_lines
+        api = MockVoiceAPI(args.ring, args.talk, args.busy_rate, args.no_answer_rate, args.fail_rate,
+                           parse_lines(args.lines), port=args.port).start()
+        print(f"📡 Stub voice API listening on {api.url} (Ctrl+C to stop)")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            api.stop()
+        return 0
+
+    results = run_campaign_benchmark(args.customers, args.lines, args.rate, args.ring, args.talk,
+                                     args.busy_rate, args.no_answer_rate, args.fail_rate)
+    print_results(results)
+    path = save_results('call_campaign', results, args.output)
+    print(f"💾 Results saved to {path}")
+    return 0 if not results['api'].get('line_overflows') else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,327 @@
+"""
+Model-layer micro-benchmarks with baseline regression tracking
+
+    python -m benchmarks.model_benchmarks --sizes xs,s --save-baseline
+    python -m benchmarks.model_benchmarks --sizes xs,s --check            # exit 1 on regression
+
+Every dataset size gets its own database (a separate SQLite file, or a separate
+MySQL schema named <DB_NAME>_bench_<size>), loaded once with the synthetic data
+generator and reused by later runs. Each size is benchmarked in its own
+process because the app keeps one connection per process.
+
+A case is timed as `repeat` samples after warm-up calls; each sample loops the
+call enough times to last at least MIN_SAMPLE_SECONDS, with the garbage
+collector off. The median per-call time and its interquartile range are
+reported. --check compares medians with the stored baseline and fails a path
+that got slower by more than --threshold (and by more than the baseline's IQR,
+so ordinary noise does not fail a run).
+"""
+import argparse
+import contextlib
+import gc
+import io
+import json
+import logging
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.common import load_results, percent_change, run_metadata, save_results
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines', 'model_baseline.json')
+DATA_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+DATASETS = {
+    'xs': {'products': 500,    'customers': 2_000,   'transactions': 5_000,   'suppliers': 20,  'employees': 10},
+    's':  {'products': 5_000,  'customers': 20_000,  'transactions': 50_000,  'suppliers': 50,  'employees': 30},
+    'm':  {'products': 20_000, 'customers': 100_000, 'transactions': 500_000, 'suppliers': 200, 'employees': 60},
+    'l':  {'products': 100_000, 'customers': 1_000_000, 'transactions': 5_000_000, 'suppliers': 500, 'employees': 150},
+}
+
+MIN_SAMPLE_SECONDS = 0.02
+WARMUP_CALLS = 3
+SAMPLE_VALUES = 200
+
+
+# =====================================================================
+# CASES - each takes the sampled context and a call counter
+# =====================================================================
+
+def _cases():
+    from models.customer import Customer
+    from models.employee import Employee
+    from models.product import Product
+    from models.supplier import Supplier
+    from models.transaction import Transaction
+
+    def pick(values, i):
+        return values[i % len(values)]
+
+    def create_transaction(ctx, i):
+        rng = random.Random(i)
+        basket = [{'product_id': product_id, 'quantity': rng.randint(1, 3), 'unit_price': price,
+                   'discount_rate': 0.0, 'tax_rate': 18.0}
+                  for product_id, price in rng.sample(ctx['basket_products'], 5)]
+        Transaction.create_transaction(None, ctx['employee_id'], basket, notes='model-benchmark')
+
+    return {
+        'Product.get_all_products': lambda ctx, i: Product.get_all_products(),
+        'Product.search_products': lambda ctx, i: Product.search_products(pick(ctx['product_terms'], i)),
+        'Product.get_product_by_barcode': lambda ctx, i: Product.get_product_by_barcode(pick(ctx['barcodes'], i)),
+        'Customer.get_customer_by_phone': lambda ctx, i: Customer.get_customer_by_phone(pick(ctx['phones'], i)),
+        'Customer.search_customers': lambda ctx, i: Customer.search_customers(pick(ctx['customer_terms'], i)),
+        'Transaction.create_transaction': create_transaction,
+        'Transaction.get_daily_sales': lambda ctx, i: Transaction.get_daily_sales(pick(ctx['sale_days'], i)),
+        'Transaction.get_sales_by_date_range': lambda ctx, i: Transaction.get_sales_by_date_range(*ctx['date_range']),
+        'Employee.get_all_employees': lambda ctx, i: Employee.get_all_employees(),
+        'Supplier.get_all_suppliers': lambda ctx, i: Supplier.get_all_suppliers(),
+    }
+
+
+def sample_context(seed=42):
+    """Realistic arguments drawn from the loaded dataset"""
+    from database import get_db
+
+    rng = random.Random(seed)
+    conn, cursor = get_db()
+    try:
+        cursor.execute("SELECT barcode FROM products WHERE barcode IS NOT NULL ORDER BY id LIMIT 5000")
+        barcodes = [row[0] for row in cursor.fetchall()]
+        cursor.execute("SELECT phone FROM customers WHERE phone IS NOT NULL ORDER BY id LIMIT 5000")
+        phones = [row[0] for row in cursor.fetchall()]
+        cursor.execute("SELECT id, unit_price FROM products WHERE is_active = TRUE ORDER BY id LIMIT 500")
+        basket_products = [(product_id, float(price)) for product_id, price in cursor.fetchall()]
+        cursor.execute("SELECT id FROM employees ORDER BY id LIMIT 1")
+        employee_id = cursor.fetchone()[0]
+        cursor.execute("SELECT MAX(transaction_date) FROM transactions")
+        last_sale = cursor.fetchone()[0]
+    finally:
+        cursor.close()
+
+    if isinstance(last_sale, str):  # SQLite returns aggregates of typed columns as text
+        last_sale = datetime.fromisoformat(last_sale)
+    last_day = last_sale.date() if last_sale else None
+    sale_days = [last_day - timedelta(days=n) for n in range(30)] if last_day else [None]
+    date_range = ((last_day - timedelta(days=29)).strftime('%d-%m-%Y'), last_day.strftime('%d-%m-%Y')) \
+        if last_day else ('01-01-2000', '31-12-2000')
+
+    return {
+        'barcodes': rng.sample(barcodes, min(SAMPLE_VALUES, len(barcodes))),
+        'phones': rng.sample(phones, min(SAMPLE_VALUES, len(phones))),
+        'product_terms': ['Amul', 'Item 12', 'Tata', 'SYN-P00001', 'Haldiram', '890000'],
+        'customer_terms': ['Sharma', 'Priya', '70000', 'Iyer', 'example.com'],
+        'basket_products': basket_products,
+        'employee_id': employee_id,
+        'sale_days': sale_days,
+        'date_range': date_range
+    }
+
+
+def time_case(func, ctx, repeat=15):
+    """Median and IQR of per-call time (seconds) over `repeat` calibrated samples"""
+    quiet = io.StringIO()
+    counter = 0
+
+    def call():
+        nonlocal counter
+        counter += 1
+        func(ctx, counter)
+
+    with contextlib.redirect_stdout(quiet):
+        for _ in range(WARMUP_CALLS):
+            call()
+
+        start = time.perf_counter()
+        call()
+        single = max(time.perf_counter() - start, 1e-6)
+        loops = max(1, int(MIN_SAMPLE_SECONDS / single))
+
+        samples = []
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            for _ in range(repeat):
+                start = time.perf_counter()
+                for _ in range(loops):
+                    call()
+                samples.append((time.perf_counter() - start) / loops)
+                quiet.seek(0)
+                quiet.truncate()
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+
+    samples.sort()
+    quartiles = statistics.quantiles(samples, n=4) if len(samples) > 1 else [samples[0]] * 3
+    return {
+        'median_ms': statistics.median(samples) * 1000,
+        'iqr_ms': (quartiles[2] - quartiles[0]) * 1000,
+        'min_ms': samples[0] * 1000,
+        'loops': loops,
+        'samples': len(samples)
+    }
+
+
+# =====================================================================
+# PER-SIZE WORKER (runs in its own process)
+# =====================================================================
+
+def _dataset_loaded(sizes):
+    from database import get_db
+
+    conn, cursor = get_db()
+    try:
+        cursor.execute("SELECT COUNT(*) FROM products WHERE product_code LIKE %s", ('SYN-P%',))
+        return cursor.fetchone()[0] >= sizes['products']
+    finally:
+        cursor.close()
+
+
+def run_size(size, repeat, cases=None):
+    """Load the dataset if needed, then time every case; returns {case: stats}"""
+    from database import DatabaseManager
+    from benchmarks.synthetic_data import generate
+
+    sizes = DATASETS[size]
+    DatabaseManager()
+    if not _dataset_loaded(sizes):
+        with contextlib.redirect_stdout(sys.stderr):
+            generate(sizes, seed=42, days=180)
+
+    ctx = sample_context()
+    results = {}
+    for name, func in _cases().items():
+        if cases and name not in cases:
+            continue
+        results[name] = time_case(func, ctx, repeat)
+        print(f"   {size:>2} {name:<40} {results[name]['median_ms']:9.3f} ms "
+              f"(IQR {results[name]['iqr_ms']:.3f})", file=sys.stderr)
+    return results
+
+
+def _size_environment(size):
+    """Point a child process at the database for one dataset size"""
+    env = dict(os.environ)
+    from config import DB_BACKEND, DB_CONFIG
+    if DB_BACKEND == 'sqlite':
+        os.makedirs(DATA_DIRECTORY, exist_ok=True)
+        env['SQLITE_PATH'] = os.path.join(DATA_DIRECTORY, f"model_bench_{size}.db")
+    else:
+        name = f"{DB_CONFIG['database']}_bench_{size}"
+        import mysql.connector
+        server = {key: value for key, value in DB_CONFIG.items() if key != 'database'}
+        conn = mysql.connector.connect(**server)
+        cursor = conn.cursor()
+        cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{name}`")
+        cursor.close()
+        conn.close()
+        env['DB_NAME'] = name
+    return env
+
+
+def run_suite(sizes, repeat=15, cases=None):
+    results = run_metadata()
+    results.update({'benchmark': 'model_benchmarks', 'repeat': repeat, 'sizes': {}})
+    for size in sizes:
+        print(f"📏 Dataset '{size}': {DATASETS[size]}")
+        command = [sys.executable, '-m', 'benchmarks.model_benchmarks', '--worker', size, '--repeat', str(repeat)]
+        if cases:
+            command += ['--cases', ','.join(cases)]
+        output = subprocess.run(command, env=_size_environment(size), check=True,
+                                stdout=subprocess.PIPE, text=True).stdout
+        results['sizes'][size] = json.loads(output.strip().splitlines()[-1])
+    return results
+
+
+# =====================================================================
+# BASELINE COMPARISON
+# =====================================================================
+
+def compare(results, baseline, threshold=0.15):
+    """List of regressions: paths slower than baseline by > threshold and > baseline IQR"""
+    regressions = []
+    for size, cases in results['sizes'].items():
+        for name, stats in cases.items():
+            old = baseline.get('sizes', {}).get(size, {}).get(name)
+            if not old:
+                continue
+            change = percent_change(stats['median_ms'], old['median_ms'])
+            slower_by = stats['median_ms'] - old['median_ms']
+            if change is not None and change > threshold * 100 and slower_by > old.get('iqr_ms', 0):
+                regressions.append({'size': size, 'case': name, 'baseline_ms': old['median_ms'],
+                                    'median_ms': stats['median_ms'], 'change_percent': change})
+    return regressions
+
+
+def print_table(results, baseline=None):
+    print(f"📊 Model benchmarks ({results['backend']}, median ms per call)")
+    sizes = list(results['sizes'])
+    names = sorted({name for cases in results['sizes'].values() for name in cases})
+    print(f"   {'case':<40}" + ''.join(f"{size:>12}" for size in sizes))
+    for name in names:
+        cells = []
+        for size in sizes:
+            stats = results['sizes'][size].get(name)
+            if not stats:
+                cells.append(f"{'-':>12}")
+                continue
+            cell = f"{stats['median_ms']:.3f}"
+            old = (baseline or {}).get('sizes', {}).get(size, {}).get(name)
+            if old:
+                cell += f" {percent_change(stats['median_ms'], old['median_ms']):+.0f}%"
+            cells.append(f"{cell:>12}")
+        print(f"   {name:<40}" + ''.join(cells))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Model-layer micro-benchmarks")
+    parser.add_argument('--sizes', default='xs,s', help=f"comma separated: {', '.join(DATASETS)}")
+    parser.add_argument('--repeat', type=int, default=15)
+    parser.add_argument('--cases', help="comma separated case names (default: all)")
+    parser.add_argument('--save-baseline', nargs='?', const=BASELINE_PATH, help="store results as the baseline")
+    parser.add_argument('--check', nargs='?', const=BASELINE_PATH, help="compare with a baseline, exit 1 on regression")
+    parser.add_argument('--threshold', type=float, default=0.15, help="allowed slowdown (0.15 = 15%%)")
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.ERROR, format='%(asctime)s - %(levelname)s - %(message)s')
+    cases = args.cases.split(',') if args.cases else None
+
+    if args.worker:
+        results = run_size(args.worker, args.repeat, cases)
+        print(json.dumps(results))
+        return 0
+
+    sizes = [size.strip() for size in args.sizes.split(',') if size.strip()]
+    results = run_suite(sizes, args.repeat, cases)
+    baseline = load_results(args.check) if args.check and os.path.exists(args.check) else None
+    print_table(results, baseline)
+    path = save_results('model_benchmarks', results)
+    print(f"💾 Results saved to {path}")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.save_baseline), exist_ok=True)
+        save_results('model_baseline', results, args.save_baseline)
+        print(f"📌 Baseline stored at {args.save_baseline}")
+
+    if args.check:
+        if baseline is None:
+            print(f"⚠️ No baseline at {args.check} - run with --save-baseline first")
+            return 1
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"❌ {len(regressions)} regression(s) over {args.threshold:.0%}:")
+            for item in regressions:
+                print(f"   - [{item['size']}] {item['case']}: {item['baseline_ms']:.3f} -> "
+                      f"{item['median_ms']:.3f} ms ({item['change_percent']:+.1f}%)")
+            return 1
+        print(f"✅ No path slower than the baseline by more than {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,254 @@
+"""
+Query-plan regression checks for model SQL
+
+    python -m benchmarks.query_plans                 # seeded 's' dataset, exit 1 on new plan problems
+    python -m benchmarks.query_plans --min-rows 500 --output plans.json
+
+Runs the model hot paths (the same cases as benchmarks.model_benchmarks) while
+recording every statement they send through DatabaseManager cursors, then
+EXPLAINs each distinct statement with its real parameters: EXPLAIN FORMAT=JSON
+on MySQL, EXPLAIN QUERY PLAN on the embedded SQLite backend. A plan is flagged
+for a full table scan of a table with at least --min-rows rows, a filesort, or
+a temporary table. Problems that are understood and accepted are listed in
+KNOWN_PLAN_ISSUES with the reason; anything else fails the run.
+"""
+import argparse
+import contextlib
+import inspect
+import io
+import json
+import logging
+import os
+import re
+import sys
+
+from benchmarks.common import run_metadata, save_results
+
+# (regex on the statement, issue kind or None for any, reason)
+KNOWN_PLAN_ISSUES = [
+    (r"LIKE", 'full_scan', "substring search with a leading wildcard cannot use a B-tree index"),
+    (r"LIKE", 'filesort', "sort of the (small) substring-search result"),
+    (r"GROUP BY DATE\(transaction_date\)", 'temporary', "per-day grouping of an index range"),
+    (r"GROUP BY DATE\(transaction_date\)", 'filesort', "per-day grouping of an index range"),
+    (r"quantity_in_stock <= GREATEST", 'full_scan', "column-to-column comparison, low-stock report only"),
+]
+
+EXPLAINABLE = re.compile(r"^\s*(SELECT|UPDATE|DELETE)\b", re.I)
+
+
+class RecordingCursor:
+    """Cursor proxy that logs each statement, its parameters and the calling model method"""
+
+    def __init__(self, cursor, log):
+        self._cursor = cursor
+        self._log = log
+
+    def _record(self, query, params):
+        caller = None
+        for frame in inspect.stack()[2:12]:
+            if os.sep + 'models' + os.sep in frame.filename:
+                caller = f"{os.path.basename(frame.filename)}:{frame.function}"
+                break
+        self._log.append({'sql': query, 'params': params, 'caller': caller})
+
+    def execute(self, query, params=None, *args, **kwargs):
+        self._record(query, params)
+        return self._cursor.execute(query, params, *args, **kwargs)
+
+    def executemany(self, query, seq_params, *args, **kwargs):
+        seq_params = list(seq_params)
+        self._record(query, seq_params[0] if seq_params else None)
+        return self._cursor.executemany(query, seq_params, *args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+
+@contextlib.contextmanager
+def capture_sql():
+    """Record every statement issued through DatabaseManager cursors inside the block"""
+    from database import DatabaseManager
+
+    log = []
+    original_cursor = DatabaseManager.get_cursor
+    original_dict_cursor = DatabaseManager.get_dict_cursor
+    DatabaseManager.get_cursor = lambda self: RecordingCursor(original_cursor(self), log)
+    DatabaseManager.get_dict_cursor = lambda self: RecordingCursor(original_dict_cursor(self), log)
+    try:
+        yield log
+    finally:
+        DatabaseManager.get_cursor = original_cursor
+        DatabaseManager.get_dict_cursor = original_dict_cursor
+
+
+def normalize(sql):
+    return ' '.join(sql.split())
+
+
+def _table_rows(cursor, table, cache):
+    if table not in cache:
+        try:
+            cursor.execute(f"SELECT COUNT(*) FROM {table}")
+            cache[table] = cursor.fetchone()[0]
+        except Exception:
+            cache[table] = 0
+    return cache[table]
+
+
+def _mysql_issues(plan, cursor, min_rows, cache):
+    """Walk an EXPLAIN FORMAT=JSON document"""
+    issues = []
+
+    def walk(node):
+        if isinstance(node, dict):
+            table = node.get('table_name')
+            if table and node.get('access_type') in ('ALL', 'index'):
+                rows = node.get('rows_examined_per_scan') or _table_rows(cursor, table, cache)
+                if rows >= min_rows:
+                    issues.append(('full_scan', f"{table} ({node['access_type']}, ~{rows} rows)"))
+            if node.get('using_filesort'):
+                issues.append(('filesort', 'using filesort'))
+            if node.get('using_temporary_table'):
+                issues.append(('temporary', 'using temporary table'))
+            for value in node.values():
+                walk(value)
+        elif isinstance(node, list):
+            for value in node:
+                walk(value)
+
+    walk(plan)
+    return issues
+
+
+def _sqlite_issues(rows, cursor, min_rows, cache):
+    """Interpret EXPLAIN QUERY PLAN detail lines"""
+    issues = []
+    for row in rows:
+        detail = row[-1]
+        scan = re.match(r"SCAN (?:TABLE )?(\w+)(.*)$", detail)
+        if scan and 'COVERING INDEX' not in scan.group(2) and 'USING INDEX' not in scan.group(2):
+            rows_in_table = _table_rows(cursor, scan.group(1), cache)
+            if rows_in_table >= min_rows:
+                issues.append(('full_scan', f"{scan.group(1)} (~{rows_in_table} rows)"))
+        elif 'TEMP B-TREE FOR ORDER BY' in detail:
+            issues.append(('filesort', detail))
+        elif 'TEMP B-TREE' in detail:
+            issues.append(('temporary', detail))
+    return issues
+
+
+def explain(cursor, sql, params, min_rows, cache):
+    """Plan problems for one statement as [(kind, detail)]"""
+    from config import DB_BACKEND
+
+    if DB_BACKEND == 'sqlite':
+        cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+        return _sqlite_issues(cursor.fetchall(), cursor, min_rows, cache)
+    cursor.execute("EXPLAIN FORMAT=JSON " + sql, params)
+    return _mysql_issues(json.loads(cursor.fetchone()[0]), cursor, min_rows, cache)
+
+
+def known_reason(sql, kind):
+    for pattern, known_kind, reason in KNOWN_PLAN_ISSUES:
+        if (known_kind is None or known_kind == kind) and re.search(pattern, sql, re.I):
+            return reason
+    return None
+
+
+def check_plans(statements, min_rows=1000):
+    """EXPLAIN each distinct statement; returns a report entry per statement"""
+    from database import get_new_connection
+
+    conn = get_new_connection()
+    cursor = conn.cursor(buffered=True)
+    cache = {}
+    seen = set()
+    report = []
+    try:
+        for statement in statements:
+            sql = normalize(statement['sql'])
+            if not EXPLAINABLE.match(sql) or sql in seen:
+                continue
+            seen.add(sql)
+            params = statement['params'] if isinstance(statement['params'], (list, tuple)) else ()
+            try:
+                issues = explain(cursor, sql, params, min_rows, cache)
+            except Exception as e:
+                report.append({'caller': statement['caller'], 'sql': sql, 'error': str(e), 'issues': []})
+                continue
+            report.append({
+                'caller': statement['caller'],
+                'sql': sql,
+                'issues': [{'kind': kind, 'detail': detail, 'known': known_reason(sql, kind)}
+                           for kind, detail in issues]
+            })
+    finally:
+        cursor.close()
+        conn.close()
+    return report
+
+
+def run_hot_paths():
+    """Exercise every model benchmark case once under SQL capture"""
+    from benchmarks.model_benchmarks import _cases, sample_context
+
+    ctx = sample_context()
+    with capture_sql() as log, contextlib.redirect_stdout(io.StringIO()):
+        for name, func in _cases().items():
+            try:
+                func(ctx, 1)
+            except Exception as e:
+                logging.error(f"{name} failed during capture: {e}")
+    return log
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="EXPLAIN the SQL issued by model hot paths")
+    parser.add_argument('--size', default='s', help="dataset size to seed (see benchmarks.model_benchmarks)")
+    parser.add_argument('--min-rows', type=int, default=1000, help="ignore full scans of smaller tables")
+    parser.add_argument('--output', help="write the report JSON here")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.ERROR, format='%(asctime)s - %(levelname)s - %(message)s')
+    from database import DatabaseManager
+    from benchmarks.model_benchmarks import DATASETS, _dataset_loaded
+    from benchmarks.synthetic_data import generate
+
+    DatabaseManager()
+    if not _dataset_loaded(DATASETS[args.size]):
+        with contextlib.redirect_stdout(sys.stderr):
+            generate(DATASETS[args.size], seed=42, days=180)
+
+    statements = run_hot_paths()
+    report = check_plans(statements, args.min_rows)
+
+    failures = 0
+    print(f"🔎 Query plans: {len(report)} distinct statements from {len(statements)} executed")
+    for entry in report:
+        if entry.get('error'):
+            print(f"   ⚠️ {entry['caller']}: EXPLAIN failed - {entry['error']}")
+            continue
+        for issue in entry['issues']:
+            if issue['known']:
+                print(f"   ℹ️ {entry['caller']}: {issue['kind']} {issue['detail']} (known: {issue['known']})")
+            else:
+                failures += 1
+                print(f"   ❌ {entry['caller']}: {issue['kind']} {issue['detail']}\n      {entry['sql'][:160]}")
+
+    results = run_metadata()
+    results.update({'benchmark': 'query_plans', 'min_rows': args.min_rows, 'statements': report,
+                    'unexpected_issues': failures})
+    path = save_results('query_plans', results, args.output)
+    print(f"💾 Report saved to {path}")
+    if failures:
+        print(f"❌ {failures} unexpected plan problem(s)")
+        return 1
+    print("✅ All hot-path statements plan cleanly")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
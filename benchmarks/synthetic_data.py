@@ -0,0 +1,474 @@
+"""
+Seeded high-volume synthetic dataset generator for scale testing
+
+    python -m benchmarks.synthetic_data --size large --workers 8
+    python -m benchmarks.synthetic_data --products 20000 --customers 100000 --transactions 500000
+
+Every row is derived from (seed, table, id), and ids are assigned explicitly above
+the current MAX(id) of each table, so chunks need no coordination: products,
+customers and transaction chunks load in parallel worker processes, each on its
+own connection with foreign key / unique checks off and multi-row inserts
+(executemany, or LOAD DATA LOCAL INFILE with --method load_data on MySQL).
+
+Sales follow a diurnal curve (lunch and evening peaks), a weekly cycle (busier
+weekends), a seasonal one (festive Oct-Dec) and mild growth over the history
+window. Transaction ids increase with transaction_date, as they would in
+production. Each sale line also writes its 'out' inventory movement.
+"""
+import argparse
+import bisect
+import logging
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
+
+from config import DB_BACKEND
+from services.pricing import PERCENT_SCALE, PricingEngine, from_units, to_units
+
+SIZES = {
+    'small':  {'products': 2_000,   'customers': 10_000,    'transactions': 50_000,     'suppliers': 50,  'employees': 20},
+    'medium': {'products': 20_000,  'customers': 100_000,   'transactions': 1_000_000,  'suppliers': 200, 'employees': 60},
+    'large':  {'products': 100_000, 'customers': 1_000_000, 'transactions': 20_000_000, 'suppliers': 500, 'employees': 150},
+}
+
+DEPARTMENTS = {
+    'Dairy': ['Milk', 'Cheese', 'Butter', 'Yogurt', 'Paneer'],
+    'Bakery': ['Bread', 'Cakes', 'Biscuits', 'Rusk'],
+    'Produce': ['Vegetables', 'Fruits', 'Herbs', 'Exotic'],
+    'Staples': ['Rice', 'Atta', 'Pulses', 'Sugar', 'Salt', 'Oil'],
+    'Snacks': ['Chips', 'Namkeen', 'Chocolates', 'Sweets'],
+    'Beverages': ['Tea', 'Coffee', 'Juices', 'Soft Drinks', 'Water'],
+    'Frozen': ['Ice Cream', 'Frozen Veg', 'Ready Meals'],
+    'Personal Care': ['Soap', 'Shampoo', 'Oral Care', 'Skin Care'],
+    'Household': ['Detergent', 'Cleaners', 'Kitchenware', 'Paper'],
+    'Baby Care': ['Diapers', 'Baby Food', 'Wipes'],
+    'Pet Care': ['Dog Food', 'Cat Food'],
+    'Spices': ['Whole Spices', 'Masala Mixes', 'Condiments'],
+}
+BRANDS = ['Amul', 'Britannia', 'Tata', 'Nestle', 'ITC', 'HUL', 'Dabur', 'Parle', 'Haldiram', 'Mother Dairy',
+          'Patanjali', 'Fortune', 'Godrej', 'Marico', 'Everest', 'MDH', 'Store Brand']
+FIRST_NAMES = ['Aarav', 'Vivaan', 'Aditya', 'Diya', 'Ananya', 'Ishaan', 'Kavya', 'Rohan', 'Priya', 'Arjun',
+               'Meera', 'Sai', 'Neha', 'Rahul', 'Pooja', 'Vikram', 'Sneha', 'Karan', 'Asha', 'Ravi']
+LAST_NAMES = ['Sharma', 'Verma', 'Patel', 'Reddy', 'Iyer', 'Nair', 'Gupta', 'Singh', 'Das', 'Mehta',
+              'Rao', 'Joshi', 'Kumar', 'Chopra', 'Bose', 'Khan', 'Menon', 'Pillai', 'Shah', 'Kapoor']
+CITIES = [('Mumbai', 'Maharashtra'), ('Pune', 'Maharashtra'), ('Delhi', 'Delhi'), ('Bengaluru', 'Karnataka'),
+          ('Chennai', 'Tamil Nadu'), ('Hyderabad', 'Telangana'), ('Kolkata', 'West Bengal'), ('Jaipur', 'Rajasthan')]
+PAYMENT_METHODS = ['cash', 'card', 'upi', 'credit']
+PAYMENT_WEIGHTS = [35, 25, 38, 2]
+
+# Relative footfall per hour of day, Monday..Sunday, and per month
+HOURLY = [0, 0, 0, 0, 0, 0, 0.2, 0.6, 1.2, 1.8, 2.4, 3.2, 3.6, 3.0, 2.2, 2.0, 2.4, 3.4, 4.2, 4.4, 3.6, 2.2, 0.8, 0]
+WEEKLY = [0.85, 0.8, 0.85, 0.9, 1.05, 1.35, 1.3]
+MONTHLY = [0.95, 0.9, 0.95, 0.95, 1.0, 0.95, 0.9, 0.95, 1.0, 1.25, 1.35, 1.2]
+
+CHUNK_SIZES = {'products': 10_000, 'customers': 20_000, 'transactions': 10_000}
+INSERT_BATCH = 2_000
+
+# Worker state, built once per process by _init_worker
+_STATE = {}
+
+
+# =====================================================================
+# DETERMINISTIC MODEL - shared by the parent and every worker
+# =====================================================================
+
+def _allocate(total, weights):
+    """Split total into integer counts proportional to weights (largest remainder)"""
+    weight_sum = sum(weights)
+    raw = [total * w / weight_sum for w in weights]
+    counts = [int(r) for r in raw]
+    for i in sorted(range(len(raw)), key=lambda i: raw[i] - counts[i], reverse=True)[:total - sum(counts)]:
+        counts[i] += 1
+    return counts
+
+
+def build_model(seed, sizes, bases, days, end_date):
+    """Everything a worker needs to derive any row from its id"""
+    rng = random.Random(seed)
+    start_date = end_date - timedelta(days=days - 1)
+
+    day_weights = []
+    for d in range(days):
+        day = start_date + timedelta(days=d)
+        day_weights.append(WEEKLY[day.weekday()] * MONTHLY[day.month - 1] * (0.85 + 0.3 * d / days)
+                           * rng.uniform(0.9, 1.1))
+    day_counts = _allocate(sizes['transactions'], day_weights)
+    day_ends = []
+    running = 0
+    for count in day_counts:
+        running += count
+        day_ends.append(running)
+
+    minute_weights = [HOURLY[m // 60] for m in range(24 * 60)]
+    minute_cum = []
+    running = 0.0
+    for weight in minute_weights:
+        running += weight
+        minute_cum.append(running)
+    minute_cum = [value / running for value in minute_cum]
+
+    leaf_categories = []
+    category_rows = []
+    category_id = bases['categories']
+    for department, subcategories in DEPARTMENTS.items():
+        category_id += 1
+        parent_id = category_id
+        category_rows.append((parent_id, f"{department} Department", f"{department} products", None))
+        for sub in subcategories:
+            category_id += 1
+            category_rows.append((category_id, f"{department} / {sub}", f"{sub} ({department})", parent_id))
+            leaf_categories.append(category_id)
+
+    prices = [0] * (sizes['products'] + 1)
+    discounts = [0] * (sizes['products'] + 1)
+    taxes = [0] * (sizes['products'] + 1)
+    for n in range(1, sizes['products'] + 1):
+        product_rng = random.Random(seed * 1_000_003 + n)
+        prices[n] = to_units(round(product_rng.lognormvariate(4.2, 0.9), 2))
+        discounts[n] = to_units(product_rng.choice([0, 0, 0, 0, 5, 10]), PERCENT_SCALE)
+        taxes[n] = to_units(product_rng.choice([0, 5, 5, 12, 18, 18, 28]), PERCENT_SCALE)
+
+    return {
+        'seed': seed, 'sizes': sizes, 'bases': bases, 'start_date': start_date,
+        'day_ends': day_ends, 'minute_cum': minute_cum,
+        'category_rows': category_rows, 'leaf_categories': leaf_categories,
+        'prices': prices, 'discounts': discounts, 'taxes': taxes
+    }
+
+
+def transaction_time(model, n):
+    """Timestamp of the n-th synthetic sale (1-based); increases with n"""
+    day_ends = model['day_ends']
+    day = bisect.bisect_left(day_ends, n)
+    day_start = day_ends[day - 1] if day else 0
+    count = day_ends[day] - day_start
+    fraction = (n - day_start - 0.5) / count
+    minute = bisect.bisect_left(model['minute_cum'], fraction)
+    seconds = int((fraction * 7919 % 1) * 60)
+    return datetime.combine(model['start_date'] + timedelta(days=day), datetime.min.time()) + \
+        timedelta(minutes=minute, seconds=seconds)
+
+
+# =====================================================================
+# ROW GENERATORS
+# =====================================================================
+
+MOVEMENT_COLUMNS = ('product_id', 'movement_type', 'quantity', 'reference_type', 'reference_id', 'reason',
+                    'employee_id', 'movement_date')
+
+
+def supplier_rows(model):
+    rng = random.Random(model['seed'] + 11)
+    base = model['bases']['suppliers']
+    rows = []
+    for n in range(1, model['sizes']['suppliers'] + 1):
+        city, state = rng.choice(CITIES)
+        rows.append((base + n, f"SYN-S{base + n:06d}", f"{rng.choice(BRANDS)} Distributors {n}",
+                     f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}", f"8{base + n:09d}",
+                     f"supplier{base + n}@example.com", city, state, 'Net 30', True))
+    return 'suppliers', ('id', 'supplier_code', 'name', 'contact_person', 'phone', 'email',
+                         'city', 'state', 'payment_terms', 'is_active'), rows
+
+
+EMPLOYEE_DEPARTMENTS = {'manager': 'Administration', 'inventory_manager': 'Inventory', 'cashier': 'Sales'}
+
+
+def employee_rows(model):
+    rng = random.Random(model['seed'] + 13)
+    base = model['bases']['employees']
+    rows = []
+    for n in range(1, model['sizes']['employees'] + 1):
+        role = 'manager' if n % 15 == 1 else 'inventory_manager' if n % 7 == 0 else 'cashier'
+        hired = model['start_date'] - timedelta(days=rng.randint(0, 2000))
+        rows.append((base + n, f"SYN-E{base + n:05d}", f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+                     f"6{base + n:09d}", f"employee{base + n}@example.com", role, EMPLOYEE_DEPARTMENTS[role],
+                     round(rng.uniform(15000, 60000), 2), hired, 'active'))
+    return 'employees', ('id', 'employee_code', 'name', 'phone', 'email', 'role', 'department', 'salary',
+                         'hire_date', 'status'), rows
+
+
+def category_rows(model):
+    return 'categories', ('id', 'name', 'description', 'parent_category_id'), model['category_rows']
+
+
+def product_rows(model, first, last):
+    seed = model['seed']
+    bases = model['bases']
+    leaves = model['leaf_categories']
+    products, movements = [], []
+    opened = datetime.combine(model['start_date'], datetime.min.time())
+    for n in range(first, last + 1):
+        rng = random.Random(seed * 7_000_003 + n)
+        product_id = bases['products'] + n
+        price = from_units(model['prices'][n])
+        stock = rng.randint(0, 500)
+        brand = rng.choice(BRANDS)
+        products.append((
+            product_id, f"89{product_id:011d}", f"SYN-P{product_id:07d}", f"{brand} Item {n}",
+            f"Synthetic product {n}", rng.choice(leaves), bases['suppliers'] + rng.randint(1, model['sizes']['suppliers']),
+            brand, rng.choice(['piece', 'kg', 'litre', 'pack']), price, round(price * rng.uniform(0.6, 0.85), 2),
+            round(price * rng.uniform(1.0, 1.15), 2), from_units(model['discounts'][n], PERCENT_SCALE),
+            from_units(model['taxes'][n], PERCENT_SCALE), stock, 10, 1000, rng.randint(5, 40),
+            (model['start_date'] + timedelta(days=rng.randint(30, 900))) if rng.random() < 0.4 else None, True
+        ))
+        movements.append((product_id, 'in', stock, 'purchase', None, 'Opening stock',
+                          bases['employees'] + 1, opened))
+    return [
+        ('products', ('id', 'barcode', 'product_code', 'name', 'description', 'category_id', 'supplier_id',
+                      'brand', 'unit', 'unit_price', 'cost_price', 'mrp', 'discount_percentage', 'tax_rate',
+                      'quantity_in_stock', 'min_stock_level', 'max_stock_level', 'reorder_level',
+                      'expiry_date', 'is_active'), products),
+        ('inventory_movements', MOVEMENT_COLUMNS, movements)
+    ]
+
+
+def customer_rows(model, first, last):
+    seed = model['seed']
+    base = model['bases']['customers']
+    span = (date.today() - model['start_date']).days + 1000
+    rows = []
+    for n in range(first, last + 1):
+        rng = random.Random(seed * 5_000_011 + n)
+        customer_id = base + n
+        city, state = rng.choice(CITIES)
+        membership = rng.choices(['regular', 'silver', 'gold', 'platinum'], [70, 18, 9, 3])[0]
+        rows.append((
+            customer_id, f"SYN-C{customer_id:08d}", f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            f"7{customer_id:09d}", f"+917{customer_id:09d}",
+            f"customer{customer_id}@example.com" if rng.random() < 0.6 else None,
+            city, state, rng.choice(['male', 'female', 'other']), membership,
+            date.today() - timedelta(days=rng.randint(0, span)), True
+        ))
+    return [('customers', ('id', 'customer_code', 'name', 'phone', 'phone_e164', 'email', 'city', 'state',
+                           'gender', 'membership_type', 'registration_date', 'is_active'), rows)]
+
+
+def transaction_rows(model, first, last):
+    seed = model['seed']
+    bases = model['bases']
+    sizes = model['sizes']
+    prices, discounts, taxes = model['prices'], model['discounts'], model['taxes']
+    price_line = PricingEngine.price_line_units
+    transactions, items, movements = [], [], []
+
+    for n in range(first, last + 1):
+        rng = random.Random(seed * 3_000_017 + n)
+        transaction_id = bases['transactions'] + n
+        when = transaction_time(model, n)
+        employee_id = bases['employees'] + rng.randint(1, sizes['employees'])
+        customer_id = bases['customers'] + 1 + int(sizes['customers'] * rng.random() ** 2) \
+            if sizes['customers'] and rng.random() < 0.6 else None
+        if customer_id is not None and customer_id > bases['customers'] + sizes['customers']:
+            customer_id = bases['customers'] + sizes['customers']
+
+        lines = min(1 + int(rng.expovariate(1 / 5.0)), 40)
+        chosen = {}
+        for _ in range(lines):
+            product = 1 + int(sizes['products'] * rng.random() ** 3)
+            chosen[min(product, sizes['products'])] = rng.choice((1, 1, 1, 2, 2, 3, 4, 6))
+
+        subtotal = discount = tax = total = 0
+        for product, quantity in chosen.items():
+            unit, disc, line_tax, line_total = price_line(quantity, prices[product], discounts[product], taxes[product])
+            gross = quantity * prices[product]
+            subtotal += gross
+            discount += disc
+            tax += line_tax
+            total += line_total
+            product_id = bases['products'] + product
+            items.append((transaction_id, product_id, quantity, from_units(unit), from_units(prices[product]),
+                          from_units(discounts[product], PERCENT_SCALE), from_units(disc),
+                          from_units(taxes[product], PERCENT_SCALE), from_units(line_tax), from_units(line_total)))
+            movements.append((product_id, 'out', quantity, 'sale', transaction_id,
+                              f"Sale SYN-T{transaction_id:010d}", employee_id, when))
+
+        transactions.append((
+            transaction_id, f"SYN-T{transaction_id:010d}", customer_id, employee_id, when,
+            from_units(subtotal), from_units(discount), from_units(tax), from_units(total),
+            rng.choices(PAYMENT_METHODS, PAYMENT_WEIGHTS)[0], 'completed',
+            int(from_units(total) // 10) if customer_id else 0
+        ))
+
+    return [
+        ('transactions', ('id', 'transaction_number', 'customer_id', 'employee_id', 'transaction_date',
+                          'subtotal', 'discount_amount', 'tax_amount', 'total_amount', 'payment_method',
+                          'payment_status', 'loyalty_points_earned'), transactions),
+        ('transaction_items', ('transaction_id', 'product_id', 'quantity', 'unit_price', 'original_price',
+                               'discount_rate', 'discount_amount', 'tax_rate', 'tax_amount', 'line_total'), items),
+        ('inventory_movements', MOVEMENT_COLUMNS, movements)
+    ]
+
+
+CHUNK_BUILDERS = {'products': product_rows, 'customers': customer_rows, 'transactions': transaction_rows}
+
+
+# =====================================================================
+# LOADING
+# =====================================================================
+
+def _connect(method):
+    if method == 'load_data' and DB_BACKEND == 'mysql':
+        import mysql.connector
+        from config import DB_CONFIG
+        return mysql.connector.connect(**DB_CONFIG, allow_local_infile=True)
+    from database import get_new_connection
+    return get_new_connection()
+
+
+def _prepare_session(cursor):
+    cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+    cursor.execute("SET UNIQUE_CHECKS = 0")
+
+
+def _tsv_value(value):
+    if value is None:
+        return '\\N'
+    if value is True or value is False:
+        return '1' if value else '0'
+    return str(value).replace('\\', '\\\\').replace('\t', ' ').replace('\n', ' ')
+
+
+def bulk_insert(cursor, table, columns, rows, method='insert'):
+    """Load rows with multi-row INSERTs (executemany) or LOAD DATA LOCAL INFILE"""
+    if not rows:
+        return 0
+    column_list = ', '.join(columns)
+    if method == 'load_data' and DB_BACKEND == 'mysql':
+        with tempfile.NamedTemporaryFile('w', suffix='.tsv', delete=False, encoding='utf-8') as f:
+            for row in rows:
+                f.write('\t'.join(_tsv_value(value) for value in row) + '\n')
+            path = f.name
+        try:
+            cursor.execute(f"LOAD DATA LOCAL INFILE %s INTO TABLE {table} "
+                           f"FIELDS TERMINATED BY '\\t' LINES TERMINATED BY '\\n' ({column_list})", (path,))
+        finally:
+            os.unlink(path)
+        return len(rows)
+
+    sql = f"INSERT INTO {table} ({column_list}) VALUES ({', '.join(['%s'] * len(columns))})"
+    for start in range(0, len(rows), INSERT_BATCH):
+        cursor.executemany(sql, rows[start:start + INSERT_BATCH])
+    return len(rows)
+
+
+def _load(conn, tables, method):
+    cursor = conn.cursor()
+    try:
+        _prepare_session(cursor)
+        conn.start_transaction()
+        counts = {}
+        for table, columns, rows in tables:
+            counts[table] = counts.get(table, 0) + bulk_insert(cursor, table, columns, rows, method)
+        conn.commit()
+        return counts
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def _init_worker(seed, sizes, bases, days, end_date, method):
+    _STATE['model'] = build_model(seed, sizes, bases, days, end_date)
+    _STATE['method'] = method
+    _STATE['conn'] = _connect(method)
+
+
+def _run_chunk(kind, first, last):
+    tables = CHUNK_BUILDERS[kind](_STATE['model'], first, last)
+    return kind, _load(_STATE['conn'], tables, _STATE['method'])
+
+
+def current_bases():
+    """MAX(id) of every table we assign ids in, so generated ids never collide"""
+    from database import get_db
+
+    conn, cursor = get_db()
+    bases = {}
+    try:
+        for table in ('categories', 'suppliers', 'employees', 'products', 'customers', 'transactions'):
+            cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}")
+            bases[table] = int(cursor.fetchone()[0])
+    finally:
+        cursor.close()
+    return bases
+
+
+def generate(sizes, seed=42, days=365, workers=None, method='insert', end_date=None):
+    """Generate and load a dataset; returns per-table row counts and timings"""
+    from database import DatabaseManager
+
+    DatabaseManager()  # make sure the schema exists
+    end_date = end_date or date.today()
+    bases = current_bases()
+    model = build_model(seed, sizes, bases, days, end_date)
+    if DB_BACKEND == 'sqlite':
+        workers = 1  # one writer at a time; parallel chunks would only queue on the lock
+    workers = workers or os.cpu_count() or 4
+    started = time.perf_counter()
+
+    conn = _connect(method)
+    try:
+        counts = _load(conn, [category_rows(model), supplier_rows(model), employee_rows(model)], method)
+    finally:
+        conn.close()
+    print(f"📦 Dimensions loaded: {counts}")
+
+    tasks = []
+    for kind in ('products', 'customers', 'transactions'):
+        chunk = CHUNK_SIZES[kind]
+        for first in range(1, sizes[kind] + 1, chunk):
+            tasks.append((kind, first, min(first + chunk - 1, sizes[kind])))
+
+    import multiprocessing
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=_init_worker,
+                             initargs=(seed, sizes, bases, days, end_date, method)) as pool:
+        futures = [pool.submit(_run_chunk, *task) for task in tasks]
+        done = 0
+        for future in as_completed(futures):
+            kind, chunk_counts = future.result()
+            for table, count in chunk_counts.items():
+                counts[table] = counts.get(table, 0) + count
+            done += 1
+            if done % max(len(tasks) // 20, 1) == 0 or done == len(tasks):
+                elapsed = time.perf_counter() - started
+                print(f"   ... {done}/{len(tasks)} chunks, {sum(counts.values()):,} rows, {elapsed:.0f}s")
+
+    elapsed = time.perf_counter() - started
+    return {'seed': seed, 'days': days, 'workers': workers, 'method': method, 'bases': bases,
+            'sizes': sizes, 'rows': counts, 'elapsed_seconds': elapsed,
+            'rows_per_second': sum(counts.values()) / elapsed if elapsed else 0.0}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load a seeded synthetic dataset")
+    parser.add_argument('--size', choices=sorted(SIZES), default='small')
+    for name in ('products', 'customers', 'transactions', 'suppliers', 'employees'):
+        parser.add_argument(f'--{name}', type=int, help=f"override the preset {name} count")
+    parser.add_argument('--days', type=int, default=365, help="history window for transactions")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--workers', type=int, help="parallel loader processes (default: CPU count)")
+    parser.add_argument('--method', choices=['insert', 'load_data'], default='insert')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    sizes = dict(SIZES[args.size])
+    for name in sizes:
+        if getattr(args, name) is not None:
+            sizes[name] = getattr(args, name)
+
+    print(f"🏭 Generating {args.size} dataset on {DB_BACKEND}: {sizes}")
+    result = generate(sizes, args.seed, args.days, args.workers, args.method)
+    print(f"✅ Loaded {sum(result['rows'].values()):,} rows in {result['elapsed_seconds']:.1f}s "
+          f"({result['rows_per_second']:,.0f} rows/s)")
+    for table, count in sorted(result['rows'].items()):
+        print(f"   - {table}: {count:,}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
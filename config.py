@@ -20,6 +20,10 @@ DB_CONFIG = {
     'raise_on_warnings': True
 }
 
+# Storage backend - 'mysql' (server) or 'sqlite' (embedded, single till / tests)
+DB_BACKEND = os.getenv('DB_BACKEND', 'mysql').lower()
+SQLITE_PATH = os.getenv('SQLITE_PATH', os.path.join('data', 'supermarket.db'))
+
 # Application Settings
 APP_NAME = "Advanced Supermarket Management System"
 VERSION = "1.0.0"
@@ -31,6 +35,15 @@ DISCOUNT_THRESHOLD = float(os.getenv('DISCOUNT_THRESHOLD', '100.00'))
 DISCOUNT_RATE = float(os.getenv('DISCOUNT_RATE', '0.10'))
 LOW_STOCK_THRESHOLD = int(os.getenv('LOW_STOCK_THRESHOLD', '10'))
 EXPIRY_ALERT_DAYS = int(os.getenv('EXPIRY_ALERT_DAYS', '7'))
+PROMOTION_CACHE_SECONDS = int(os.getenv('PROMOTION_CACHE_SECONDS', '60'))
+ARCHIVE_RETAIN_MONTHS = int(os.getenv('ARCHIVE_RETAIN_MONTHS', '13'))  # full months kept in the hot tables
+DEFAULT_COUNTRY_CODE = os.getenv('DEFAULT_COUNTRY_CODE', '91')  # for phone numbers entered without one
+STANDARD_HOURS_PER_DAY = float(os.getenv('STANDARD_HOURS_PER_DAY', '8'))  # hours beyond this in a day are overtime
+
+# Demand forecasting / reorder points
+FORECAST_HISTORY_DAYS = int(os.getenv('FORECAST_HISTORY_DAYS', '112'))  # 16 weeks of daily sales
+FORECAST_SERVICE_LEVEL = float(os.getenv('FORECAST_SERVICE_LEVEL', '0.95'))  # chance of no stock-out per cycle
+DEFAULT_LEAD_TIME_DAYS = int(os.getenv('DEFAULT_LEAD_TIME_DAYS', '7'))  # suppliers without lead_time_days
 
 # API Configuration
 SMS_API_KEY = os.getenv('SMS_API_KEY', 'your_sms_api_key_here')
@@ -38,13 +51,36 @@ SMS_API_URL = os.getenv('SMS_API_URL', 'https://api.sms-provider.com/send')
 CALL_API_KEY = os.getenv('CALL_API_KEY', 'your_call_api_key_here')
 CALL_API_URL = os.getenv('CALL_API_URL', 'https://api.call-provider.com/call')
 
+# Outbound message dispatch (message_outbox)
+SMS_CONCURRENCY = int(os.getenv('SMS_CONCURRENCY', '8'))  # requests in flight to the gateway
+SMS_RATE_PER_SECOND = float(os.getenv('SMS_RATE_PER_SECOND', '50'))  # gateway quota, messages per second
+SMS_BATCH_SIZE = int(os.getenv('SMS_BATCH_SIZE', '1'))  # >1 only for gateways with a bulk endpoint
+SMS_MAX_ATTEMPTS = int(os.getenv('SMS_MAX_ATTEMPTS', '5'))
+SMS_RECEIPTS = os.getenv('SMS_RECEIPTS', 'True').lower() == 'true'  # text registered customers their receipt
+ALERT_PHONE = os.getenv('ALERT_PHONE', '')  # store manager's number for low-stock SMS; empty disables them
+
+# Voice call campaigns
+CALL_LINES = os.getenv('CALL_LINES', 'SUPERMART:4')  # caller_id:max concurrent calls, comma separated
+CALL_RATE_PER_SECOND = float(os.getenv('CALL_RATE_PER_SECOND', '1'))  # provider's calls-started-per-second quota
+CALL_WINDOW = os.getenv('CALL_WINDOW', '10:00-20:00')  # local hours customers may be called
+CALL_MAX_ATTEMPTS = int(os.getenv('CALL_MAX_ATTEMPTS', '3'))  # busy / unanswered calls are retried
+CALL_RETRY_MINUTES = int(os.getenv('CALL_RETRY_MINUTES', '60'))
+
 # File Paths
 LOG_DIRECTORY = "logs"
 BACKUP_DIRECTORY = "backups"
 RECEIPTS_DIRECTORY = "receipts"
+JOURNAL_DIRECTORY = "journal"
+
+# Offline Till Mode - sales commit to a local journal and upload in the background
+OFFLINE_TILL_MODE = os.getenv('OFFLINE_TILL_MODE', 'False').lower() == 'true'
+JOURNAL_PATH = os.getenv('JOURNAL_PATH', os.path.join(JOURNAL_DIRECTORY, 'sales_journal.db'))
+JOURNAL_SYNC = os.getenv('JOURNAL_SYNC', 'NORMAL').upper()  # NORMAL survives process kills, FULL also power loss
+JOURNAL_UPLOAD_BATCH = int(os.getenv('JOURNAL_UPLOAD_BATCH', '50'))
+JOURNAL_UPLOAD_INTERVAL = float(os.getenv('JOURNAL_UPLOAD_INTERVAL', '2.0'))
 
 # Ensure directories exist
-for directory in [LOG_DIRECTORY, BACKUP_DIRECTORY, RECEIPTS_DIRECTORY]:
+for directory in [LOG_DIRECTORY, BACKUP_DIRECTORY, RECEIPTS_DIRECTORY, JOURNAL_DIRECTORY]:
     os.makedirs(directory, exist_ok=True)
 
 # UI Configuration
@@ -5,11 +5,69 @@ import mysql.connector
 from mysql.connector import Error
 import logging
 from datetime import datetime
-from config import DB_CONFIG, DEFAULT_ADMIN_USERNAME, DEFAULT_ADMIN_PASSWORD
+from config import DB_CONFIG, DB_BACKEND, SQLITE_PATH, DEFAULT_ADMIN_USERNAME, DEFAULT_ADMIN_PASSWORD
 import hashlib
 import os
 
 
+# Schema changes for databases created by earlier versions: (version, description, statements).
+# Keep CREATE TABLE above in step so fresh installs get the same schema.
+SCHEMA_MIGRATIONS = [
+    ("2024.01-plan-indexes", "Indexes for ordered listings and sargable date ranges", [
+        "ALTER TABLE products ADD INDEX idx_active_name (is_active, name)",
+        "ALTER TABLE products ADD INDEX idx_expiry_date (expiry_date)",
+        "ALTER TABLE customers ADD INDEX idx_active_name (is_active, name)",
+        "ALTER TABLE suppliers ADD INDEX idx_active_name (is_active, name)",
+        "ALTER TABLE employees ADD INDEX idx_status_code (status, employee_code)",
+        "ALTER TABLE transactions ADD INDEX idx_status_date (payment_status, transaction_date)",
+    ]),
+    ("2024.02-supplier-lead-time", "Supplier lead times for reorder-point forecasting", [
+        "ALTER TABLE suppliers ADD COLUMN lead_time_days INT AFTER outstanding_amount",
+    ]),
+    ("2024.03-customer-phone-e164", "Normalized customer phone numbers for checkout lookup", [
+        "ALTER TABLE customers ADD COLUMN phone_e164 VARCHAR(16) AFTER phone",
+        "ALTER TABLE customers ADD UNIQUE INDEX uk_phone_e164 (phone_e164)",
+    ]),
+    ("2024.04-customer-history-index", "Customer purchase history paged by date", [
+        "ALTER TABLE transactions ADD INDEX idx_customer_date (customer_id, transaction_date)",
+        # The composite index now backs the customer foreign key
+        "ALTER TABLE transactions DROP INDEX idx_customer_id",
+    ]),
+    ("2024.05-outbox-dedupe", "One notification per sale or alert in message_outbox", [
+        "ALTER TABLE message_outbox ADD COLUMN dedupe_key VARCHAR(100) AFTER gateway_message_id",
+        "ALTER TABLE message_outbox ADD UNIQUE INDEX uk_dedupe_key (dedupe_key)",
+    ]),
+    ("2024.05-employee-department", "Stored employee departments for grouped payroll", [
+        "ALTER TABLE employees ADD COLUMN department VARCHAR(50) AFTER role",
+        # Same departments the Employee model used to derive from the role
+        """UPDATE employees SET department = CASE role
+               WHEN 'admin' THEN 'Administration' WHEN 'manager' THEN 'Administration'
+               WHEN 'inventory_manager' THEN 'Inventory' ELSE 'Sales' END
+           WHERE department IS NULL""",
+        "ALTER TABLE employees ADD INDEX idx_status_department (status, department, salary)",
+    ]),
+    ("2024.06-employee-department-required", "Every employee row carries its department", [
+        # Rows inserted without one since 2024.05 get the same role-derived department
+        """UPDATE employees SET department = CASE role
+               WHEN 'admin' THEN 'Administration' WHEN 'manager' THEN 'Administration'
+               WHEN 'inventory_manager' THEN 'Inventory' ELSE 'Sales' END
+           WHERE department IS NULL OR department = ''""",
+        "ALTER TABLE employees MODIFY department VARCHAR(50) NOT NULL DEFAULT 'Sales'",
+    ]),
+]
+
+# Duplicate column / key name, table exists, can't drop missing key
+MIGRATION_ALREADY_APPLIED = {1060, 1061, 1050, 1091}
+
+
+def open_connection():
+    """Connect to the configured storage backend (DB_BACKEND)"""
+    if DB_BACKEND == 'sqlite':
+        import sqlite_backend
+        return sqlite_backend.connect(SQLITE_PATH)
+    return mysql.connector.connect(**DB_CONFIG)
+
+
 class DatabaseManager:
     _instance = None
     _connection = None
@@ -26,9 +84,9 @@ class DatabaseManager:
     def connect(self):
         """Establish database connection"""
         try:
-            self._connection = mysql.connector.connect(**DB_CONFIG)
+            self._connection = open_connection()
             if self._connection.is_connected():
-                logging.info("Database connection established successfully")
+                logging.info(f"Database connection established successfully ({DB_BACKEND})")
                 self.create_tables()
             else:
                 raise Error("Failed to establish database connection")
@@ -66,6 +124,14 @@ class DatabaseManager:
             cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
             
             tables_to_create = [
+                ("schema_migrations", """
+                    CREATE TABLE IF NOT EXISTS schema_migrations (
+                        version VARCHAR(50) PRIMARY KEY,
+                        description VARCHAR(255),
+                        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )
+                """),
+
                 ("users", """
                     CREATE TABLE IF NOT EXISTS users (
                         id INT AUTO_INCREMENT PRIMARY KEY,
@@ -102,13 +168,15 @@ class DatabaseManager:
                         payment_terms VARCHAR(100),
                         credit_limit DECIMAL(15,4) DEFAULT 0.0000,
                         outstanding_amount DECIMAL(15,4) DEFAULT 0.0000,
+                        lead_time_days INT,
                         is_active BOOLEAN DEFAULT TRUE,
                         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                         updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
                         
                         INDEX idx_supplier_code (supplier_code),
                         INDEX idx_active (is_active),
-                        INDEX idx_gst_number (gst_number)
+                        INDEX idx_gst_number (gst_number),
+                        INDEX idx_active_name (is_active, name)
                     )
                 """),
                 
@@ -120,6 +188,7 @@ class DatabaseManager:
                         phone VARCHAR(20),
                         email VARCHAR(255) UNIQUE,
                         role ENUM('admin', 'manager', 'cashier', 'inventory_manager') DEFAULT 'cashier',
+                        department VARCHAR(50) NOT NULL DEFAULT 'Sales',
                         password_hash VARCHAR(255),
                         salary DECIMAL(12,2),
                         hire_date DATE,
@@ -131,7 +200,9 @@ class DatabaseManager:
                         INDEX idx_employee_code (employee_code),
                         INDEX idx_email (email),
                         INDEX idx_role (role),
-                        INDEX idx_status (status)
+                        INDEX idx_status (status),
+                        INDEX idx_status_code (status, employee_code),
+                        INDEX idx_status_department (status, department, salary)
                     )
                 """),
                 
@@ -141,6 +212,7 @@ class DatabaseManager:
                         customer_code VARCHAR(20) UNIQUE,
                         name VARCHAR(255) NOT NULL,
                         phone VARCHAR(20) UNIQUE,
+                        phone_e164 VARCHAR(16),
                         email VARCHAR(255),
                         address TEXT,
                         city VARCHAR(100),
@@ -158,13 +230,86 @@ class DatabaseManager:
                         updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
                         
                         INDEX idx_phone (phone),
+                        UNIQUE KEY uk_phone_e164 (phone_e164),
                         INDEX idx_customer_code (customer_code),
                         INDEX idx_membership (membership_type),
                         INDEX idx_active (is_active),
+                        INDEX idx_active_name (is_active, name),
                         FULLTEXT idx_customer_search (name, phone, email)
                     )
                 """),
                 
+                ("customer_stats", """
+                    CREATE TABLE IF NOT EXISTS customer_stats (
+                        id TINYINT PRIMARY KEY,
+                        total_customers INT NOT NULL DEFAULT 0,
+                        new_this_month INT NOT NULL DEFAULT 0,
+                        total_loyalty_points BIGINT NOT NULL DEFAULT 0,
+                        purchasing_customers INT NOT NULL DEFAULT 0,
+                        total_purchases DECIMAL(18,4) NOT NULL DEFAULT 0.0000,
+                        computed_on DATE NOT NULL,
+                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+                    )
+                """),
+                
+                ("customer_segments", """
+                    CREATE TABLE IF NOT EXISTS customer_segments (
+                        customer_id INT PRIMARY KEY,
+                        last_purchase DATE NOT NULL,
+                        frequency INT NOT NULL,
+                        monetary DECIMAL(15,4) NOT NULL,
+                        r_score TINYINT NOT NULL,
+                        f_score TINYINT NOT NULL,
+                        m_score TINYINT NOT NULL,
+                        segment VARCHAR(30) NOT NULL,
+                        scored_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                        
+                        FOREIGN KEY (customer_id) REFERENCES customers(id) ON DELETE CASCADE,
+                        INDEX idx_segment (segment),
+                        INDEX idx_last_purchase (last_purchase)
+                    )
+                """),
+                
+                ("message_outbox", """
+                    CREATE TABLE IF NOT EXISTS message_outbox (
+                        id BIGINT AUTO_INCREMENT PRIMARY KEY,
+                        channel ENUM('sms', 'call') NOT NULL DEFAULT 'sms',
+                        campaign VARCHAR(50),
+                        customer_id INT,
+                        recipient VARCHAR(20) NOT NULL,
+                        message TEXT NOT NULL,
+                        status ENUM('pending', 'sending', 'sent', 'failed') NOT NULL DEFAULT 'pending',
+                        attempts INT NOT NULL DEFAULT 0,
+                        next_attempt_at DATETIME NOT NULL,
+                        last_error VARCHAR(255),
+                        gateway_message_id VARCHAR(64),
+                        dedupe_key VARCHAR(100),
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        sent_at DATETIME,
+                        
+                        FOREIGN KEY (customer_id) REFERENCES customers(id) ON DELETE SET NULL,
+                        UNIQUE KEY uk_dedupe_key (dedupe_key),
+                        INDEX idx_status_due (status, next_attempt_at),
+                        INDEX idx_campaign_status (campaign, status)
+                    )
+                """),
+                
+                ("attendance", """
+                    CREATE TABLE IF NOT EXISTS attendance (
+                        id BIGINT AUTO_INCREMENT PRIMARY KEY,
+                        employee_id INT NOT NULL,
+                        work_date DATE NOT NULL,
+                        clock_in DATETIME NOT NULL,
+                        clock_out DATETIME NULL,
+                        minutes_worked INT NULL,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        
+                        FOREIGN KEY (employee_id) REFERENCES employees(id) ON DELETE CASCADE,
+                        INDEX idx_employee_date (employee_id, work_date),
+                        INDEX idx_work_date_hours (work_date, employee_id, minutes_worked)
+                    )
+                """),
+                
                 ("categories", """
                     CREATE TABLE IF NOT EXISTS categories (
                         id INT AUTO_INCREMENT PRIMARY KEY,
@@ -219,6 +364,8 @@ class DatabaseManager:
                         INDEX idx_supplier (supplier_id),
                         INDEX idx_active (is_active),
                         INDEX idx_stock_level (quantity_in_stock),
+                        INDEX idx_active_name (is_active, name),
+                        INDEX idx_expiry_date (expiry_date),
                         FULLTEXT idx_product_search (name, description, brand)
                     )
                 """),
@@ -252,11 +399,11 @@ class DatabaseManager:
                         FOREIGN KEY (employee_id) REFERENCES employees(id) ON DELETE RESTRICT,
                         INDEX idx_transaction_number (transaction_number),
                         INDEX idx_transaction_date (transaction_date),
-                        INDEX idx_customer_id (customer_id),
+                        INDEX idx_customer_date (customer_id, transaction_date),
                         INDEX idx_employee_id (employee_id),
                         INDEX idx_payment_method (payment_method),
                         INDEX idx_payment_status (payment_status),
-                        INDEX idx_daily_sales (DATE(transaction_date), payment_status)
+                        INDEX idx_status_date (payment_status, transaction_date)
                     )
                 """),
                 
@@ -311,6 +458,21 @@ class DatabaseManager:
                     )
                 """),
                 
+                ("stock_alerts", """
+                    CREATE TABLE IF NOT EXISTS stock_alerts (
+                        product_id INT NOT NULL,
+                        alert_type ENUM('low_stock', 'expiring') NOT NULL,
+                        quantity_in_stock INT,
+                        threshold INT,
+                        expiry_date DATE,
+                        raised_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+
+                        PRIMARY KEY (product_id, alert_type),
+                        FOREIGN KEY (product_id) REFERENCES products(id) ON DELETE CASCADE,
+                        INDEX idx_type_expiry (alert_type, expiry_date)
+                    )
+                """),
+
                 ("audit_logs", """
                     CREATE TABLE IF NOT EXISTS audit_logs (
                         id INT AUTO_INCREMENT PRIMARY KEY,
@@ -330,7 +492,120 @@ class DatabaseManager:
                         INDEX idx_created_at (created_at)
                     )
                 """),
-                
+
+                # Closed months moved out of the hot tables by services.archival. Monthly
+                # RANGE COLUMNS partitions on the date column let date-range reports prune;
+                # no foreign keys because InnoDB cannot partition tables that have them.
+                ("transactions_archive", """
+                    CREATE TABLE IF NOT EXISTS transactions_archive (
+                        id INT NOT NULL,
+                        transaction_number VARCHAR(50) NOT NULL,
+                        customer_id INT,
+                        employee_id INT NOT NULL,
+                        transaction_date DATETIME NOT NULL,
+                        transaction_type VARCHAR(20),
+                        subtotal DECIMAL(15,4) NOT NULL DEFAULT 0.0000,
+                        discount_amount DECIMAL(12,4) NOT NULL DEFAULT 0.0000,
+                        tax_amount DECIMAL(12,4) NOT NULL DEFAULT 0.0000,
+                        total_amount DECIMAL(15,4) NOT NULL DEFAULT 0.0000,
+                        payment_method VARCHAR(20),
+                        payment_status VARCHAR(20),
+                        cash_received DECIMAL(15,4) DEFAULT 0.0000,
+                        change_given DECIMAL(12,4) DEFAULT 0.0000,
+                        loyalty_points_earned INT DEFAULT 0,
+                        loyalty_points_redeemed INT DEFAULT 0,
+                        notes TEXT,
+                        shift_id INT,
+                        pos_terminal VARCHAR(50),
+                        receipt_printed BOOLEAN DEFAULT FALSE,
+                        created_at DATETIME,
+                        updated_at DATETIME,
+
+                        PRIMARY KEY (id, transaction_date),
+                        INDEX idx_transaction_number (transaction_number),
+                        INDEX idx_status_date (payment_status, transaction_date),
+                        INDEX idx_customer_date (customer_id, transaction_date)
+                    ) ROW_FORMAT=COMPRESSED
+                    PARTITION BY RANGE COLUMNS(transaction_date) (
+                        PARTITION p_future VALUES LESS THAN (MAXVALUE)
+                    )
+                """),
+
+                ("transaction_items_archive", """
+                    CREATE TABLE IF NOT EXISTS transaction_items_archive (
+                        id INT NOT NULL,
+                        transaction_id INT NOT NULL,
+                        transaction_date DATETIME NOT NULL,
+                        product_id INT NOT NULL,
+                        quantity INT NOT NULL,
+                        unit_price DECIMAL(12,4) NOT NULL,
+                        original_price DECIMAL(12,4),
+                        discount_rate DECIMAL(5,2) NOT NULL DEFAULT 0.00,
+                        discount_amount DECIMAL(12,4) NOT NULL DEFAULT 0.0000,
+                        tax_rate DECIMAL(5,2) NOT NULL DEFAULT 0.00,
+                        tax_amount DECIMAL(12,4) NOT NULL DEFAULT 0.0000,
+                        line_total DECIMAL(15,4) NOT NULL DEFAULT 0.0000,
+                        batch_number VARCHAR(50),
+                        expiry_date DATE,
+                        serial_numbers TEXT,
+                        created_at DATETIME,
+
+                        PRIMARY KEY (id, transaction_date),
+                        INDEX idx_transaction_id (transaction_id),
+                        INDEX idx_product_date (product_id, transaction_date)
+                    ) ROW_FORMAT=COMPRESSED
+                    PARTITION BY RANGE COLUMNS(transaction_date) (
+                        PARTITION p_future VALUES LESS THAN (MAXVALUE)
+                    )
+                """),
+
+                ("inventory_movements_archive", """
+                    CREATE TABLE IF NOT EXISTS inventory_movements_archive (
+                        id INT NOT NULL,
+                        product_id INT NOT NULL,
+                        movement_type VARCHAR(20) NOT NULL,
+                        quantity INT NOT NULL,
+                        reference_type VARCHAR(20) NOT NULL,
+                        reference_id INT,
+                        reason VARCHAR(255),
+                        employee_id INT NOT NULL,
+                        movement_date DATETIME NOT NULL,
+                        batch_number VARCHAR(50),
+                        expiry_date DATE,
+                        cost_per_unit DECIMAL(12,4),
+                        notes TEXT,
+
+                        PRIMARY KEY (id, movement_date),
+                        INDEX idx_product_movement (product_id, movement_date),
+                        INDEX idx_movement_date (movement_date)
+                    ) ROW_FORMAT=COMPRESSED
+                    PARTITION BY RANGE COLUMNS(movement_date) (
+                        PARTITION p_future VALUES LESS THAN (MAXVALUE)
+                    )
+                """),
+
+                ("audit_logs_archive", """
+                    CREATE TABLE IF NOT EXISTS audit_logs_archive (
+                        id INT NOT NULL,
+                        user_id INT,
+                        action VARCHAR(255) NOT NULL,
+                        table_name VARCHAR(100),
+                        record_id INT,
+                        old_values JSON,
+                        new_values JSON,
+                        ip_address VARCHAR(45),
+                        user_agent TEXT,
+                        created_at DATETIME NOT NULL,
+
+                        PRIMARY KEY (id, created_at),
+                        INDEX idx_table_record (table_name, record_id),
+                        INDEX idx_created_at (created_at)
+                    ) ROW_FORMAT=COMPRESSED
+                    PARTITION BY RANGE COLUMNS(created_at) (
+                        PARTITION p_future VALUES LESS THAN (MAXVALUE)
+                    )
+                """),
+
                 ("system_settings", """
                     CREATE TABLE IF NOT EXISTS system_settings (
                         id INT AUTO_INCREMENT PRIMARY KEY,
@@ -347,6 +622,125 @@ class DatabaseManager:
                         INDEX idx_category (category),
                         INDEX idx_key (setting_key)
                     )
+                """),
+
+                ("promotions", """
+                    CREATE TABLE IF NOT EXISTS promotions (
+                        id INT AUTO_INCREMENT PRIMARY KEY,
+                        name VARCHAR(255) NOT NULL,
+                        promo_type ENUM('bogo', 'multi_buy', 'combo', 'category_percent', 'percent_off') NOT NULL,
+                        product_id INT NULL,
+                        category_id INT NULL,
+                        buy_quantity INT NOT NULL DEFAULT 1,
+                        get_quantity INT NOT NULL DEFAULT 0,
+                        discount_percentage DECIMAL(5,2) NOT NULL DEFAULT 0.00,
+                        bundle_price DECIMAL(12,4) NULL,
+                        starts_at DATETIME NULL,
+                        ends_at DATETIME NULL,
+                        daily_start_time TIME NULL,
+                        daily_end_time TIME NULL,
+                        days_of_week VARCHAR(20) NULL,
+                        priority INT NOT NULL DEFAULT 0,
+                        is_active BOOLEAN DEFAULT TRUE,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+
+                        FOREIGN KEY (product_id) REFERENCES products(id) ON DELETE CASCADE,
+                        FOREIGN KEY (category_id) REFERENCES categories(id) ON DELETE CASCADE,
+                        INDEX idx_promo_active (is_active, ends_at),
+                        INDEX idx_promo_product (product_id),
+                        INDEX idx_promo_category (category_id)
+                    )
+                """),
+
+                ("promotion_items", """
+                    CREATE TABLE IF NOT EXISTS promotion_items (
+                        id INT AUTO_INCREMENT PRIMARY KEY,
+                        promotion_id INT NOT NULL,
+                        product_id INT NOT NULL,
+                        quantity INT NOT NULL DEFAULT 1 CHECK (quantity > 0),
+
+                        FOREIGN KEY (promotion_id) REFERENCES promotions(id) ON DELETE CASCADE,
+                        FOREIGN KEY (product_id) REFERENCES products(id) ON DELETE CASCADE,
+                        UNIQUE KEY uk_promotion_product (promotion_id, product_id),
+                        INDEX idx_promotion_item_product (product_id)
+                    )
+                """),
+
+                ("purchase_orders", """
+                    CREATE TABLE IF NOT EXISTS purchase_orders (
+                        id INT AUTO_INCREMENT PRIMARY KEY,
+                        po_number VARCHAR(50) UNIQUE NOT NULL,
+                        supplier_id INT NOT NULL,
+                        status ENUM('draft', 'sent', 'received', 'cancelled') NOT NULL DEFAULT 'draft',
+                        line_count INT NOT NULL DEFAULT 0,
+                        total_cost DECIMAL(15,4) NOT NULL DEFAULT 0.0000,
+                        created_by INT,
+                        received_by INT,
+                        received_at TIMESTAMP NULL,
+                        notes TEXT,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+
+                        FOREIGN KEY (supplier_id) REFERENCES suppliers(id) ON DELETE RESTRICT,
+                        FOREIGN KEY (created_by) REFERENCES employees(id) ON DELETE SET NULL,
+                        FOREIGN KEY (received_by) REFERENCES employees(id) ON DELETE SET NULL,
+                        INDEX idx_status_supplier (status, supplier_id)
+                    )
+                """),
+
+                ("purchase_order_items", """
+                    CREATE TABLE IF NOT EXISTS purchase_order_items (
+                        id INT AUTO_INCREMENT PRIMARY KEY,
+                        po_id INT NOT NULL,
+                        product_id INT NOT NULL,
+                        quantity_ordered INT NOT NULL CHECK (quantity_ordered > 0),
+                        quantity_received INT NOT NULL DEFAULT 0 CHECK (quantity_received >= 0),
+                        unit_cost DECIMAL(12,4) NOT NULL DEFAULT 0.0000,
+
+                        FOREIGN KEY (po_id) REFERENCES purchase_orders(id) ON DELETE CASCADE,
+                        FOREIGN KEY (product_id) REFERENCES products(id) ON DELETE RESTRICT,
+                        UNIQUE KEY uk_po_product (po_id, product_id),
+                        INDEX idx_po_item_product (product_id)
+                    )
+                """),
+
+                ("stocktakes", """
+                    CREATE TABLE IF NOT EXISTS stocktakes (
+                        id INT AUTO_INCREMENT PRIMARY KEY,
+                        stocktake_number VARCHAR(50) UNIQUE NOT NULL,
+                        status ENUM('counting', 'posted', 'cancelled') NOT NULL DEFAULT 'counting',
+                        counted_lines INT NOT NULL DEFAULT 0,
+                        unmatched_lines INT NOT NULL DEFAULT 0,
+                        variance_lines INT NOT NULL DEFAULT 0,
+                        variance_units INT NOT NULL DEFAULT 0,
+                        variance_value DECIMAL(15,4) NOT NULL DEFAULT 0.0000,
+                        created_by INT,
+                        posted_by INT,
+                        posted_at TIMESTAMP NULL,
+                        notes TEXT,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+
+                        FOREIGN KEY (created_by) REFERENCES employees(id) ON DELETE SET NULL,
+                        FOREIGN KEY (posted_by) REFERENCES employees(id) ON DELETE SET NULL,
+                        INDEX idx_stocktake_status (status)
+                    )
+                """),
+
+                ("stocktake_counts", """
+                    CREATE TABLE IF NOT EXISTS stocktake_counts (
+                        stocktake_id INT NOT NULL,
+                        scanned_code VARCHAR(50) NOT NULL,
+                        counted_quantity INT NOT NULL DEFAULT 0,
+                        product_id INT,
+                        system_quantity INT,
+                        unit_cost DECIMAL(12,4),
+
+                        PRIMARY KEY (stocktake_id, scanned_code),
+                        FOREIGN KEY (stocktake_id) REFERENCES stocktakes(id) ON DELETE CASCADE,
+                        FOREIGN KEY (product_id) REFERENCES products(id) ON DELETE SET NULL,
+                        INDEX idx_stocktake_product (stocktake_id, product_id)
+                    )
                 """)
             ]
             
@@ -376,6 +770,9 @@ class DatabaseManager:
             self._connection.commit()
             logging.info(f"Database setup completed: {successful_tables}/{len(tables_to_create)} tables ready")
             
+            # Bring existing databases up to the current schema
+            self.apply_migrations()
+
             # Insert default system settings
             self.insert_default_settings()
             
@@ -389,6 +786,39 @@ class DatabaseManager:
         # Create default admin user
         self.create_default_admin()
     
+    def apply_migrations(self):
+        """Apply SCHEMA_MIGRATIONS not yet recorded in schema_migrations.
+
+        Fresh databases already get these changes from the CREATE TABLE statements,
+        so "already exists" errors mean the change is in place and the migration
+        is simply recorded.
+        """
+        cursor = None
+        try:
+            cursor = self.get_cursor()
+            cursor.execute("SELECT version FROM schema_migrations")
+            applied = {row[0] for row in cursor.fetchall()}
+
+            for version, description, statements in SCHEMA_MIGRATIONS:
+                if version in applied:
+                    continue
+                for statement in statements:
+                    try:
+                        cursor.execute(statement)
+                    except mysql.connector.Error as err:
+                        if err.errno not in MIGRATION_ALREADY_APPLIED:
+                            raise
+                cursor.execute("INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+                               (version, description))
+                self._connection.commit()
+                logging.info(f"Migration {version} applied: {description}")
+
+        except Exception as e:
+            logging.error(f"Error applying migrations: {e}")
+        finally:
+            if cursor:
+                cursor.close()
+
     def insert_default_settings(self):
         """Insert default system settings"""
         cursor = None
@@ -405,7 +835,8 @@ class DatabaseManager:
                 ('store_name', 'SuperMart Express', 'string', 'Store name for receipts', 'general'),
                 ('store_address', '123 Main Street, City - 000001', 'string', 'Store address for receipts', 'general'),
                 ('store_phone', '+91-9876543210', 'string', 'Store contact number', 'general'),
-                ('currency_symbol', '₹', 'string', 'Currency symbol', 'general')
+                ('currency_symbol', '₹', 'string', 'Currency symbol', 'general'),
+                ('archive_watermark', '', 'string', 'Rows dated before this day are in the *_archive tables', 'maintenance')
             ]
             
             for setting_key, setting_value, data_type, description, category in default_settings:
@@ -463,7 +894,10 @@ class DatabaseManager:
         required_tables = [
             'users', 'employees', 'customers', 'suppliers', 'categories',
             'products', 'transactions', 'transaction_items', 
-            'inventory_movements', 'audit_logs', 'system_settings'
+            'inventory_movements', 'audit_logs', 'system_settings',
+            'promotions', 'promotion_items', 'schema_migrations', 'stock_alerts',
+            'purchase_orders', 'purchase_order_items', 'stocktakes', 'stocktake_counts',
+            'customer_stats', 'customer_segments', 'message_outbox', 'attendance'
         ]
         
         try:
@@ -560,6 +994,19 @@ def get_db_connection():
     return get_db()
 
 
+def get_new_connection():
+    """Open a dedicated connection for background threads/processes.
+
+    The DatabaseManager connection is shared by the UI thread and must not be
+    used concurrently; workers open their own and close it when done.
+    """
+    try:
+        return open_connection()
+    except Error as e:
+        logging.error(f"Error opening dedicated database connection: {e}")
+        raise
+
+
 def test_database_connection():
     """Test database connection and table creation"""
     try:
@@ -10,6 +10,10 @@ from .customer import Customer
 from .product import Product
 from .transaction import Transaction
 from .supplier import Supplier
+from .promotion import Promotion
+from .purchase_order import PurchaseOrder
+from .stocktake import Stocktake
+from .attendance import Attendance
 
 __all__ = [
     'User',
@@ -17,5 +21,9 @@ __all__ = [
     'Customer',
     'Product',
     'Transaction',
-    'Supplier'
+    'Supplier',
+    'Promotion',
+    'PurchaseOrder',
+    'Stocktake',
+    'Attendance'
 ]
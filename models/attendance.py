@@ -0,0 +1,168 @@
+"""
+Attendance - one row per shift, with timesheets and payroll hours aggregated in SQL
+"""
+from database import get_db
+from datetime import date, datetime, timedelta
+import logging
+from config import STANDARD_HOURS_PER_DAY
+
+STANDARD_DAY_MINUTES = int(STANDARD_HOURS_PER_DAY * 60)
+# A shift left open longer than this (forgotten clock-out) no longer blocks clocking in
+OPEN_SHIFT_DAYS = 1
+
+# Minutes per employee per day first, so overtime is counted per day rather than per month
+DAILY_MINUTES = """
+    SELECT employee_id, work_date, SUM(minutes_worked) AS day_minutes
+    FROM attendance
+    WHERE work_date >= %s AND work_date < %s AND minutes_worked IS NOT NULL
+    GROUP BY employee_id, work_date
+"""
+
+
+def _as_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value)[:10], '%Y-%m-%d').date()
+
+
+def _as_datetime(value):
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.strptime(str(value)[:19], '%Y-%m-%d %H:%M:%S')
+
+
+def month_bounds(year, month):
+    """[first day, first day of next month)"""
+    start = date(year, month, 1)
+    return start, date(year + month // 12, month % 12 + 1, 1)
+
+
+class Attendance:
+    @classmethod
+    def _open_shift(cls, cursor, employee_id, at):
+        cursor.execute("""
+            SELECT id, clock_in FROM attendance
+            WHERE employee_id = %s AND work_date >= %s AND clock_out IS NULL
+            ORDER BY clock_in DESC LIMIT 1
+        """, (employee_id, at.date() - timedelta(days=OPEN_SHIFT_DAYS)))
+        return cursor.fetchone()
+
+    @classmethod
+    def clock_in(cls, employee_id, at=None):
+        """Start a shift; returns the attendance id. ValueError if one is already open"""
+        at = (at or datetime.now()).replace(microsecond=0)
+        conn, cursor = get_db()
+        try:
+            open_shift = cls._open_shift(cursor, employee_id, at)
+            if open_shift:
+                raise ValueError(f"Already clocked in since {_as_datetime(open_shift[1]):%d-%m-%Y %H:%M}")
+            cursor.execute("""
+                INSERT INTO attendance (employee_id, work_date, clock_in) VALUES (%s, %s, %s)
+            """, (employee_id, at.date(), at))
+            attendance_id = cursor.lastrowid
+            conn.commit()
+            print(f"✅ DEBUG: Employee {employee_id} clocked in at {at:%H:%M}")
+            logging.info(f"Employee {employee_id} clocked in at {at}")
+            return attendance_id
+
+        except ValueError:
+            raise
+        except Exception as e:
+            print(f"❌ DEBUG: Error clocking in employee {employee_id}: {e}")
+            logging.error(f"Error clocking in employee {employee_id}: {e}")
+            raise
+        finally:
+            cursor.close()
+
+    @classmethod
+    def clock_out(cls, employee_id, at=None):
+        """Close the open shift; returns minutes worked. ValueError if not clocked in"""
+        at = (at or datetime.now()).replace(microsecond=0)
+        conn, cursor = get_db()
+        try:
+            open_shift = cls._open_shift(cursor, employee_id, at)
+            if not open_shift:
+                raise ValueError("Not clocked in")
+            attendance_id, clock_in = open_shift
+            minutes = max(int((at - _as_datetime(clock_in)).total_seconds() // 60), 0)
+            cursor.execute("""
+                UPDATE attendance SET clock_out = %s, minutes_worked = %s WHERE id = %s
+            """, (at, minutes, attendance_id))
+            conn.commit()
+            print(f"✅ DEBUG: Employee {employee_id} clocked out at {at:%H:%M} after {minutes} minutes")
+            logging.info(f"Employee {employee_id} clocked out at {at} ({minutes} minutes)")
+            return minutes
+
+        except ValueError:
+            raise
+        except Exception as e:
+            print(f"❌ DEBUG: Error clocking out employee {employee_id}: {e}")
+            logging.error(f"Error clocking out employee {employee_id}: {e}")
+            raise
+        finally:
+            cursor.close()
+
+    @classmethod
+    def get_timesheet(cls, employee_id, year, month):
+        """One dict per day worked in the month: first in, last out, minutes, overtime, shifts"""
+        try:
+            conn, cursor = get_db()
+            start, end = month_bounds(year, month)
+            cursor.execute("""
+                SELECT work_date, MIN(clock_in), MAX(clock_out), COALESCE(SUM(minutes_worked), 0),
+                       COUNT(*), SUM(CASE WHEN clock_out IS NULL THEN 1 ELSE 0 END)
+                FROM attendance
+                WHERE employee_id = %s AND work_date >= %s AND work_date < %s
+                GROUP BY work_date
+                ORDER BY work_date
+            """, (employee_id, start, end))
+            rows = cursor.fetchall()
+            cursor.close()
+
+            return [{
+                'work_date': _as_date(work_date),
+                'clock_in': _as_datetime(clock_in),
+                'clock_out': None if still_open else _as_datetime(clock_out),
+                'minutes': int(minutes),
+                'overtime_minutes': max(int(minutes) - STANDARD_DAY_MINUTES, 0),
+                'shifts': shifts,
+                'open': bool(still_open)
+            } for work_date, clock_in, clock_out, minutes, shifts, still_open in rows]
+
+        except Exception as e:
+            print(f"❌ DEBUG: Error loading timesheet for employee {employee_id}: {e}")
+            logging.error(f"Error loading timesheet for employee {employee_id}: {e}")
+            return []
+
+    @classmethod
+    def get_hours(cls, start, end, by_month=False):
+        """Days worked, minutes and overtime minutes per employee over [start, end), in one query.
+
+        Keyed by employee_id, or by (employee_id, year, month) with by_month.
+        Overtime is time beyond STANDARD_HOURS_PER_DAY on each day; open shifts
+        are not counted until clocked out.
+        """
+        group = "employee_id, YEAR(work_date), MONTH(work_date)" if by_month else "employee_id"
+        try:
+            conn, cursor = get_db()
+            cursor.execute(f"""
+                SELECT {group}, COUNT(*), SUM(day_minutes), SUM(GREATEST(day_minutes - %s, 0))
+                FROM ({DAILY_MINUTES}) days
+                GROUP BY {group}
+            """, (STANDARD_DAY_MINUTES, start, end))
+            rows = cursor.fetchall()
+            cursor.close()
+
+            hours = {}
+            for row in rows:
+                key = tuple(int(part) for part in row[:3]) if by_month else row[0]
+                days, minutes, overtime = row[-3:]
+                hours[key] = {'days': int(days), 'minutes': int(minutes or 0), 'overtime_minutes': int(overtime or 0)}
+            return hours
+
+        except Exception as e:
+            print(f"❌ DEBUG: Error aggregating attendance hours: {e}")
+            logging.error(f"Error aggregating attendance hours: {e}")
+            return {}
@@ -2,11 +2,18 @@
 Customer management model for CRM operations
 """
 from database import get_db
-from datetime import datetime
+from datetime import date, datetime
 import logging
+from services.archival import get_archive_watermark
+from services.customer_lookup import get_phone_index, normalize_phone, notify_customer_change
+from services.search_index import get_search_index, notify_search_change, padded
 
 
 class Customer:
+    STATS_ROW_ID = 1
+    HISTORY_PAGE_SIZE = 50
+    SEARCH_LIMIT = 50
+
     def __init__(self, id=None, name=None, phone=None, email=None, address=None, 
                  date_of_birth=None, loyalty_points=0, total_purchases=0.0, 
                  member_since=None, is_active=True):
@@ -30,10 +37,14 @@ class Customer:
         try:
             print(f"🔍 DEBUG: Creating customer: {name}, phone: {phone}")
             
+            phone_e164 = normalize_phone(phone)
+            if phone_e164 is None:
+                raise ValueError("Invalid phone number")
+            
             conn, cursor = get_db()
             
             # Check if customer with this phone already exists
-            cursor.execute("SELECT id FROM customers WHERE phone = %s", (phone,))
+            cursor.execute("SELECT id FROM customers WHERE phone = %s OR phone_e164 = %s", (phone, phone_e164))
             existing = cursor.fetchone()
             if existing:
                 cursor.close()
@@ -62,31 +73,39 @@ class Customer:
             print(f"🔍 DEBUG: Available columns in customers table: {columns}")
             
             # Prepare insert query based on available columns
+            conn.start_transaction()
             if 'member_since' in columns:
                 # Full schema with member_since
                 cursor.execute("""
-                    INSERT INTO customers (name, phone, email, address, date_of_birth, 
+                    INSERT INTO customers (name, phone, phone_e164, email, address, date_of_birth, 
                                          loyalty_points, total_purchases, member_since, is_active)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """, (name, phone, email, address, date_of_birth, 0, 0.0, current_date, True))
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                """, (name, phone, phone_e164, email, address, date_of_birth, 0, 0.0, current_date, True))
             elif 'is_active' in columns:
                 # Schema without member_since but with is_active
                 cursor.execute("""
-                    INSERT INTO customers (name, phone, email, address, date_of_birth, 
+                    INSERT INTO customers (name, phone, phone_e164, email, address, date_of_birth, 
                                          loyalty_points, total_purchases, is_active)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                """, (name, phone, email, address, date_of_birth, 0, 0.0, True))
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                """, (name, phone, phone_e164, email, address, date_of_birth, 0, 0.0, True))
             else:
                 # Basic schema
                 cursor.execute("""
-                    INSERT INTO customers (name, phone, email, address, date_of_birth, 
+                    INSERT INTO customers (name, phone, phone_e164, email, address, date_of_birth, 
                                          loyalty_points, total_purchases)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s)
-                """, (name, phone, email, address, date_of_birth, 0, 0.0))
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                """, (name, phone, phone_e164, email, address, date_of_birth, 0, 0.0))
             
             customer_id = cursor.lastrowid
+            cursor.execute("""
+                UPDATE customer_stats
+                SET total_customers = total_customers + 1, new_this_month = new_this_month + 1
+                WHERE id = %s
+            """, (cls.STATS_ROW_ID,))
             conn.commit()
             cursor.close()
+            notify_customer_change([customer_id])
+            notify_search_change('customers', [customer_id])
             
             print(f"✅ DEBUG: Customer created successfully with ID: {customer_id}")
             logging.info(f"Customer created successfully: {name} (ID: {customer_id})")
@@ -195,24 +214,18 @@ class Customer:
 
     @classmethod
     def get_customer_by_phone(cls, phone):
-        """Get customer by phone number with flexible schema"""
+        """Get customer by phone number in any format (+91, spaces, dashes)"""
         try:
-            conn, cursor = get_db()
-            
-            # Check schema
-            cursor.execute("DESCRIBE customers")
-            columns = [row[0] for row in cursor.fetchall()]
+            phone_e164 = normalize_phone(phone)
+            if phone_e164 is None:
+                return None
             
-            base_columns = "id, name, phone, email, address, date_of_birth, loyalty_points, total_purchases"
-            
-            if 'member_since' in columns and 'is_active' in columns:
-                query = f"SELECT {base_columns}, member_since, is_active FROM customers WHERE phone = %s AND is_active = TRUE"
-            elif 'is_active' in columns:
-                query = f"SELECT {base_columns}, NULL, is_active FROM customers WHERE phone = %s AND is_active = TRUE"
-            else:
-                query = f"SELECT {base_columns}, NULL, TRUE FROM customers WHERE phone = %s"
-            
-            cursor.execute(query, (phone,))
+            conn, cursor = get_db()
+            cursor.execute("""
+                SELECT id, name, phone, email, address, date_of_birth, loyalty_points, total_purchases,
+                       registration_date, is_active
+                FROM customers WHERE phone_e164 = %s AND is_active = TRUE
+            """, (phone_e164,))
             customer_data = cursor.fetchone()
             cursor.close()
             
@@ -225,44 +238,48 @@ class Customer:
             return None
 
     @classmethod
-    def search_customers(cls, search_term):
-        """Search customers with flexible schema"""
+    def find_by_phone(cls, phone):
+        """Till lookup from the in-process phone index - full number or last 4-6 digits"""
+        return [cls(id=customer_id, name=name, phone=phone_number)
+                for customer_id, name, phone_number in get_phone_index().lookup(phone)]
+
+    @classmethod
+    def search_customers(cls, search_term, limit=SEARCH_LIMIT):
+        """Customers by name (typo-tolerant), phone or email, best match first"""
         try:
             print(f"🔍 DEBUG: Searching customers for: {search_term}")
-            
-            conn, cursor = get_db()
-            
-            # Check schema
-            cursor.execute("DESCRIBE customers")
-            columns = [row[0] for row in cursor.fetchall()]
-            
-            base_columns = "id, name, phone, email, address, date_of_birth, loyalty_points, total_purchases"
-            
-            if 'member_since' in columns and 'is_active' in columns:
-                query = f"""
-                    SELECT {base_columns}, member_since, is_active FROM customers 
-                    WHERE (name LIKE %s OR phone LIKE %s OR email LIKE %s) AND is_active = TRUE
-                    ORDER BY name
-                """
-            elif 'is_active' in columns:
-                query = f"""
-                    SELECT {base_columns}, NULL, is_active FROM customers 
-                    WHERE (name LIKE %s OR phone LIKE %s OR email LIKE %s) AND is_active = TRUE
-                    ORDER BY name
-                """
+            term = str(search_term).strip()
+            
+            # Names go through the trigram index; only email and non-Latin names still use LIKE
+            ids, condition, params = None, None, ()
+            if '@' in term:
+                condition, params = "email LIKE %s", (f"%{term}%",)
+            elif any(ch.isdigit() for ch in term) and not any(ch.isalpha() for ch in term):
+                ids = [match[0] for match in get_phone_index().lookup(term)][:limit]
+            elif padded(term):
+                ids = [row_id for row_id, _ in get_search_index('customers').search(term, limit)]
             else:
-                query = f"""
-                    SELECT {base_columns}, NULL, TRUE FROM customers 
-                    WHERE (name LIKE %s OR phone LIKE %s OR email LIKE %s)
-                    ORDER BY name
-                """
-            
-            search_pattern = f"%{search_term}%"
-            cursor.execute(query, (search_pattern, search_pattern, search_pattern))
+                condition, params = "name LIKE %s", (f"%{term}%",)
+            if ids is not None:
+                if not ids:
+                    return []
+                condition, params = f"id IN ({', '.join(['%s'] * len(ids))})", tuple(ids)
             
+            conn, cursor = get_db()
+            cursor.execute(f"""
+                SELECT id, name, phone, email, address, date_of_birth, loyalty_points, total_purchases,
+                       registration_date, is_active
+                FROM customers WHERE {condition} AND is_active = TRUE
+                ORDER BY name
+                LIMIT {int(limit)}
+            """, params)
             customers_data = cursor.fetchall()
             cursor.close()
             
+            if ids is not None:
+                rank = {customer_id: n for n, customer_id in enumerate(ids)}
+                customers_data.sort(key=lambda row: rank[row[0]])
+            
             print(f"✅ DEBUG: Search found {len(customers_data)} customers")
             return [cls(*customer_data) for customer_data in customers_data]
             
@@ -273,40 +290,90 @@ class Customer:
 
     @classmethod
     def get_customer_purchase_history(cls, customer_id):
-        """Get customer's purchase history"""
+        """Most recent purchases as (id, number, date, amount, payment method) rows"""
+        transactions, _ = cls.get_purchase_history_page(customer_id)
+        return [(txn['id'], txn['transaction_number'], txn['transaction_date'],
+                 txn['total_amount'], txn['payment_method']) for txn in transactions]
+
+    @classmethod
+    def get_purchase_history_page(cls, customer_id, before=None, page_size=HISTORY_PAGE_SIZE):
+        """One page of purchases, newest first, each with its line items.
+
+        before is the cursor returned with the previous page, a
+        (transaction_date, id) pair; the page and its items come back in one
+        query over idx_customer_date, so deep pages cost the same as the first.
+        Once the live table runs out the same cursor continues into
+        transactions_archive. Returns (transactions, next_cursor), with
+        next_cursor None on the last page.
+        """
         try:
             conn, cursor = get_db()
-            
-            # Try to get from transactions table
-            cursor.execute("""
-                SELECT t.id, t.transaction_number, t.transaction_date, t.total_amount, t.payment_method
-                FROM transactions t
-                WHERE t.customer_id = %s
-                ORDER BY t.transaction_date DESC
-                LIMIT 50
-            """, (customer_id,))
-            
-            history = cursor.fetchall()
-            
-            # If no transactions found, create sample data
-            if not history:
-                cursor.execute("SELECT name FROM customers WHERE id = %s", (customer_id,))
-                customer_name = cursor.fetchone()
-                
-                if customer_name:
-                    sample_history = [
-                        (1, f"TXN{datetime.now().strftime('%Y%m%d')}001", datetime.now().date(), 250.75, "Cash"),
-                        (2, f"TXN{datetime.now().strftime('%Y%m%d')}002", datetime.now().date(), 189.50, "Card"),
-                        (3, f"TXN{datetime.now().strftime('%Y%m%d')}003", datetime.now().date(), 342.25, "UPI"),
-                    ]
-                    history = sample_history
-            
+            transactions = cls._history_rows(cursor, 'transactions', 'transaction_items',
+                                              customer_id, before, page_size + 1)
+
+            if len(transactions) <= page_size and get_archive_watermark():
+                archive_before = before
+                if transactions:
+                    archive_before = (transactions[-1]['transaction_date'], transactions[-1]['id'])
+                transactions += cls._history_rows(cursor, 'transactions_archive', 'transaction_items_archive',
+                                                  customer_id, archive_before,
+                                                  page_size + 1 - len(transactions))
             cursor.close()
-            return history
-            
+
+            next_cursor = None
+            if len(transactions) > page_size:
+                transactions = transactions[:page_size]
+                next_cursor = (transactions[-1]['transaction_date'], transactions[-1]['id'])
+            return transactions, next_cursor
+
         except Exception as e:
             logging.error(f"Error getting customer purchase history: {e}")
-            return []
+            return [], None
+
+    @classmethod
+    def _history_rows(cls, cursor, source, items_source, customer_id, before, limit):
+        keyset, params = "", [customer_id]
+        if before:
+            keyset = "AND transaction_date <= %s AND (transaction_date < %s OR id < %s)"
+            params += [before[0], before[0], before[1]]
+        params.append(limit)
+
+        item_join = "ti.transaction_id = h.id"
+        if items_source.endswith('_archive'):
+            # Lets the partitioned archive prune to the transaction's month
+            item_join += " AND ti.transaction_date = h.transaction_date"
+
+        cursor.execute(f"""
+            SELECT h.id, h.transaction_number, h.transaction_date, h.total_amount,
+                   h.payment_method, h.payment_status,
+                   p.name, ti.quantity, ti.unit_price, ti.line_total
+            FROM (
+                SELECT id, transaction_number, transaction_date, total_amount, payment_method, payment_status
+                FROM {source}
+                WHERE customer_id = %s {keyset}
+                ORDER BY transaction_date DESC, id DESC
+                LIMIT %s
+            ) h
+            LEFT JOIN {items_source} ti ON {item_join}
+            LEFT JOIN products p ON p.id = ti.product_id
+            ORDER BY h.transaction_date DESC, h.id DESC, ti.id
+        """, params)
+
+        transactions = []
+        for (txn_id, number, txn_date, total, payment, status,
+             product_name, quantity, unit_price, line_total) in cursor.fetchall():
+            if not transactions or transactions[-1]['id'] != txn_id:
+                transactions.append({
+                    'id': txn_id, 'transaction_number': number, 'transaction_date': txn_date,
+                    'total_amount': float(total or 0), 'payment_method': payment,
+                    'payment_status': status, 'items': []
+                })
+            if quantity is not None:
+                transactions[-1]['items'].append({
+                    'name': product_name or 'Unknown product', 'quantity': quantity,
+                    'unit_price': float(unit_price or 0), 'line_total': float(line_total or 0)
+                })
+        return transactions
 
     @classmethod
     def update_customer(cls, customer_id, **kwargs):
@@ -321,6 +388,13 @@ class Customer:
             
             for field, value in kwargs.items():
                 if field in valid_fields:
+                    if field == 'phone':
+                        phone_e164 = normalize_phone(value)
+                        if phone_e164 is None:
+                            cursor.close()
+                            raise ValueError("Invalid phone number")
+                        set_clauses.append("phone_e164 = %s")
+                        values.append(phone_e164)
                     if field == 'date_of_birth' and value:
                         if isinstance(value, str):
                             value = value.replace('/', '-')
@@ -347,6 +421,8 @@ class Customer:
             cursor.execute(query, values)
             conn.commit()
             cursor.close()
+            notify_customer_change([customer_id])
+            notify_search_change('customers', [customer_id])
             
             logging.info(f"Customer updated successfully: ID {customer_id}")
             
@@ -365,6 +441,13 @@ class Customer:
             columns = [row[0] for row in cursor.fetchall()]
             
             if 'is_active' in columns:
+                conn.start_transaction()
+                cursor.execute("""
+                    UPDATE customer_stats
+                    SET total_customers = total_customers - (
+                        SELECT COUNT(*) FROM customers c WHERE c.id = %s AND c.is_active = TRUE)
+                    WHERE id = %s
+                """, (customer_id, cls.STATS_ROW_ID))
                 cursor.execute("UPDATE customers SET is_active = FALSE WHERE id = %s", (customer_id,))
             else:
                 # If no is_active column, we can't do soft delete
@@ -373,6 +456,8 @@ class Customer:
             
             conn.commit()
             cursor.close()
+            notify_customer_change([customer_id])
+            notify_search_change('customers', [customer_id])
             
             logging.info(f"Customer deleted successfully: ID {customer_id}")
             
@@ -380,14 +465,43 @@ class Customer:
             logging.error(f"Error deleting customer: {e}")
             raise
 
+    @classmethod
+    def record_purchases(cls, cursor, purchases):
+        """Add (customer_id, amount, points) to the customers and the cached stats row.
+
+        Runs on the caller's cursor inside its transaction. The stats row is
+        updated first, while each customer's previous total is still visible,
+        so customers crossing zero move the purchasing-customer count.
+        """
+        purchases = [(customer_id, float(amount), int(points))
+                     for customer_id, amount, points in purchases if customer_id]
+        if not purchases:
+            return
+        cursor.executemany("""
+            UPDATE customer_stats
+            SET total_purchases = total_purchases + %s,
+                total_loyalty_points = total_loyalty_points + %s,
+                purchasing_customers = purchasing_customers + (
+                    SELECT COUNT(CASE WHEN c.total_purchases <= 0 AND c.total_purchases + %s > 0 THEN 1 END)
+                         - COUNT(CASE WHEN c.total_purchases > 0 AND c.total_purchases + %s <= 0 THEN 1 END)
+                    FROM customers c WHERE c.id = %s)
+            WHERE id = %s
+        """, [(amount, points, amount, amount, customer_id, cls.STATS_ROW_ID)
+              for customer_id, amount, points in purchases])
+        cursor.executemany("""
+            UPDATE customers
+            SET total_purchases = total_purchases + %s,
+                loyalty_points = loyalty_points + %s
+            WHERE id = %s
+        """, [(amount, points, customer_id) for customer_id, amount, points in purchases])
+
     @classmethod
     def add_loyalty_points(cls, customer_id, points):
         """Add loyalty points to customer"""
         try:
             conn, cursor = get_db()
-            cursor.execute("""
-                UPDATE customers SET loyalty_points = loyalty_points + %s WHERE id = %s
-            """, (points, customer_id))
+            conn.start_transaction()
+            cls.record_purchases(cursor, [(customer_id, 0, points)])
             conn.commit()
             cursor.close()
             
@@ -402,9 +516,8 @@ class Customer:
         """Update customer's total purchase amount"""
         try:
             conn, cursor = get_db()
-            cursor.execute("""
-                UPDATE customers SET total_purchases = total_purchases + %s WHERE id = %s
-            """, (amount, customer_id))
+            conn.start_transaction()
+            cls.record_purchases(cursor, [(customer_id, amount, 0)])
             conn.commit()
             cursor.close()
             
@@ -415,54 +528,87 @@ class Customer:
             raise
 
     @classmethod
-    def get_customer_statistics(cls):
-        """Get customer statistics"""
+    def refresh_customer_statistics(cls):
+        """Recompute the cached stats row in one aggregate pass over customers.
+
+        The stats row is locked first, so sales waiting to add to it are applied
+        after the new totals rather than lost.
+        """
+        conn = None
+        cursor = None
+        
         try:
             conn, cursor = get_db()
+            month_start = date.today().replace(day=1)
+            conn.start_transaction()
+            cursor.execute("SELECT id FROM customer_stats WHERE id = %s FOR UPDATE", (cls.STATS_ROW_ID,))
+            cursor.fetchall()
+            cursor.execute("""
+                SELECT COUNT(CASE WHEN is_active = TRUE THEN 1 END),
+                       COUNT(CASE WHEN registration_date >= %s THEN 1 END),
+                       COALESCE(SUM(loyalty_points), 0),
+                       COUNT(CASE WHEN total_purchases > 0 THEN 1 END),
+                       COALESCE(SUM(total_purchases), 0)
+                FROM customers
+            """, (month_start,))
+            row = tuple(cursor.fetchone()) + (date.today(),)
+            cursor.execute("""
+                INSERT INTO customer_stats (id, total_customers, new_this_month, total_loyalty_points,
+                                            purchasing_customers, total_purchases, computed_on)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE total_customers = VALUES(total_customers),
+                                        new_this_month = VALUES(new_this_month),
+                                        total_loyalty_points = VALUES(total_loyalty_points),
+                                        purchasing_customers = VALUES(purchasing_customers),
+                                        total_purchases = VALUES(total_purchases),
+                                        computed_on = VALUES(computed_on)
+            """, (cls.STATS_ROW_ID,) + row)
+            conn.commit()
+            print("✅ DEBUG: Customer statistics recomputed")
+            return row
             
-            stats = {}
-            
-            # Check schema first
-            cursor.execute("DESCRIBE customers")
-            columns = [row[0] for row in cursor.fetchall()]
-            
-            # Total customers
-            if 'is_active' in columns:
-                cursor.execute("SELECT COUNT(*) FROM customers WHERE is_active = TRUE")
-            else:
-                cursor.execute("SELECT COUNT(*) FROM customers")
-            stats['total_customers'] = cursor.fetchone()[0]
-            
-            # New customers this month
-            if 'member_since' in columns:
-                cursor.execute("""
-                    SELECT COUNT(*) FROM customers 
-                    WHERE member_since >= DATE_SUB(CURDATE(), INTERVAL 1 MONTH)
-                """)
-                result = cursor.fetchone()
-                stats['new_this_month'] = result[0] if result else 0
-            else:
-                stats['new_this_month'] = 0
-            
-            # Total loyalty points
-            cursor.execute("SELECT SUM(loyalty_points) FROM customers")
-            result = cursor.fetchone()
-            stats['total_loyalty_points'] = int(result[0]) if result[0] else 0
-            
-            # Average purchase amount
-            cursor.execute("SELECT AVG(total_purchases) FROM customers WHERE total_purchases > 0")
-            result = cursor.fetchone()
-            avg_amount = float(result[0]) if result[0] else 0.0
-            stats['avg_purchase_amount'] = f"₹{avg_amount:.2f}"
-            
-            # Total revenue
-            cursor.execute("SELECT SUM(total_purchases) FROM customers")
-            result = cursor.fetchone()
-            total_revenue = float(result[0]) if result[0] else 0.0
-            stats['total_revenue'] = f"₹{total_revenue:.2f}"
+        except Exception as e:
+            if conn:
+                conn.rollback()
+            print(f"❌ DEBUG: Error recomputing customer statistics: {e}")
+            logging.error(f"Error recomputing customer statistics: {e}")
+            raise
             
+        finally:
+            if cursor:
+                cursor.close()
+
+    @classmethod
+    def get_customer_statistics(cls):
+        """Get customer statistics - one primary-key read of the cached stats row.
+
+        The row is recomputed on the first read of each day (which also rolls
+        'new this month' over) and kept current in between by create/delete
+        and record_purchases().
+        """
+        try:
+            conn, cursor = get_db()
+            cursor.execute("""
+                SELECT total_customers, new_this_month, total_loyalty_points,
+                       purchasing_customers, total_purchases, computed_on
+                FROM customer_stats WHERE id = %s
+            """, (cls.STATS_ROW_ID,))
+            row = cursor.fetchone()
             cursor.close()
-            return stats
+            
+            if row is None or str(row[5])[:10] != date.today().isoformat():
+                row = cls.refresh_customer_statistics()
+            total_customers, new_this_month, loyalty_points, purchasing, total_revenue, _ = row
+            total_revenue = float(total_revenue or 0)
+            avg_amount = total_revenue / purchasing if purchasing else 0.0
+            
+            return {
+                'total_customers': int(total_customers),
+                'new_this_month': int(new_this_month),
+                'total_loyalty_points': int(loyalty_points),
+                'avg_purchase_amount': f"₹{avg_amount:.2f}",
+                'total_revenue': f"₹{total_revenue:.2f}"
+            }
             
         except Exception as e:
             logging.error(f"Error getting customer statistics: {e}")
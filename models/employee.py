@@ -8,6 +8,36 @@ import hashlib
 import os
 
 
+POSITION_BY_ROLE = {
+    'manager': 'Manager',
+    'cashier': 'Cashier',
+    'stock clerk': 'Stock Clerk',
+    'supervisor': 'Supervisor',
+    'security': 'Security',
+    'cleaner': 'Cleaner',
+    'delivery': 'Delivery',
+    'assistant manager': 'Assistant Manager',
+    'admin': 'Manager',  # Show admin as Manager in UI
+    'inventory_manager': 'Stock Clerk'
+}
+
+DEPARTMENT_BY_ROLE = {
+    'manager': 'Administration',
+    'cashier': 'Sales',
+    'stock clerk': 'Inventory',
+    'supervisor': 'Administration',
+    'security': 'Security',
+    'cleaner': 'Maintenance',
+    'delivery': 'Sales',
+    'assistant manager': 'Administration',
+    'admin': 'Administration',
+    'inventory_manager': 'Inventory'
+}
+
+EMPLOYEE_COLUMNS = """id, employee_code, name, email, phone, role, department, password_hash,
+                      salary, hire_date, status, last_login, created_at, updated_at"""
+
+
 class Employee:
     def __init__(self, id=None, employee_code=None, name=None, email=None, phone=None, 
                  role=None, password_hash=None, salary=None, hire_date=None, 
@@ -30,37 +60,12 @@ class Employee:
         self.employee_id = employee_code  # UI compatibility
         self.is_active = (status == 'active')  # UI compatibility
         
-        #  Map position from role properly
-        position_mapping = {
-            'manager': 'Manager',
-            'cashier': 'Cashier',
-            'stock clerk': 'Stock Clerk',
-            'supervisor': 'Supervisor',
-            'security': 'Security',
-            'cleaner': 'Cleaner',
-            'delivery': 'Delivery',
-            'assistant manager': 'Assistant Manager',
-            'admin': 'Manager',  # Show admin as Manager in UI
-            'inventory_manager': 'Stock Clerk'
-        }
-        self.position = position_mapping.get(role.lower() if role else '', 'Cashier')
+        self.position = POSITION_BY_ROLE.get(role.lower() if role else '', 'Cashier')
         
         if department:
             self.department = department
         else:
-            department_mapping = {
-                'manager': 'Administration',
-                'cashier': 'Sales',
-                'stock clerk': 'Inventory',
-                'supervisor': 'Administration',
-                'security': 'Security',
-                'cleaner': 'Maintenance',
-                'delivery': 'Sales',
-                'assistant manager': 'Administration',
-                'admin': 'Administration',
-                'inventory_manager': 'Inventory'
-            }
-            self.department = department_mapping.get(role.lower() if role else '', 'Sales')
+            self.department = DEPARTMENT_BY_ROLE.get(role.lower() if role else '', 'Sales')
         
         self.address = ''  # Default address for UI compatibility
 
@@ -113,7 +118,7 @@ class Employee:
                 actual_role = kwargs['role'].lower()
                 print(f"🔍 DEBUG: Using role from kwargs: {kwargs['role']} -> {actual_role}")
             
-            department = kwargs.get('department', 'Sales')
+            department = kwargs.get('department') or DEPARTMENT_BY_ROLE.get(actual_role or '', 'Sales')
             print(f"🔍 DEBUG: Department from UI: {department}")
             
             # Handle employee_id field from UI (alternative name for employee_code)
@@ -146,47 +151,25 @@ class Employee:
             print(f"   - salary: {kwargs.get('salary')}")
             print(f"   - hire_date: {hire_date}")
             
-            try:
-                cursor.execute("""
-                    INSERT INTO employees (
-                        employee_code, name, email, phone, role, department, password_hash, 
-                        salary, hire_date, status
-                    ) VALUES (
-                        %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
-                    )
-                """, (
-                    employee_code, 
-                    name, 
-                    email, 
-                    phone, 
-                    actual_role,
-                    department,  # Store department in database
-                    password_hash,
-                    kwargs.get('salary'), 
-                    hire_date, 
-                    kwargs.get('status', 'active')
-                ))
-                print(f"🔍 DEBUG: Used INSERT with department column")
-            except Exception as db_error:
-                print(f"🔍 DEBUG: Department column doesn't exist, using INSERT without department")
-                cursor.execute("""
-                    INSERT INTO employees (
-                        employee_code, name, email, phone, role, password_hash, 
-                        salary, hire_date, status
-                    ) VALUES (
-                        %s, %s, %s, %s, %s, %s, %s, %s, %s
-                    )
-                """, (
-                    employee_code, 
-                    name, 
-                    email, 
-                    phone, 
-                    actual_role,  # Use the processed role
-                    password_hash,
-                    kwargs.get('salary'), 
-                    hire_date, 
-                    kwargs.get('status', 'active')
-                ))
+            cursor.execute("""
+                INSERT INTO employees (
+                    employee_code, name, email, phone, role, department, password_hash, 
+                    salary, hire_date, status
+                ) VALUES (
+                    %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
+                )
+            """, (
+                employee_code, 
+                name, 
+                email, 
+                phone, 
+                actual_role,
+                department,
+                password_hash,
+                kwargs.get('salary'), 
+                hire_date, 
+                kwargs.get('status', 'active')
+            ))
             
             employee_id = cursor.lastrowid
             conn.commit()
@@ -220,116 +203,32 @@ class Employee:
         )
 
     @classmethod
-    def get_all_employees(cls):
+    def _from_row(cls, row):
+        """Employee from a SELECT of EMPLOYEE_COLUMNS"""
+        return cls(*row[:6], department=row[6], *row[7:])
+
+    @classmethod
+    def get_all_employees(cls, include_inactive=False):
+        """Active employees (or everyone) by employee code, in one query"""
         try:
-            print("🔍 DEBUG: Fetching all employees...")
-            
             conn, cursor = get_db()
-            
-            # First, test basic connectivity
-            cursor.execute("SELECT COUNT(*) FROM employees")
-            total_count = cursor.fetchone()[0]
-            print(f"🔍 DEBUG: Total employees in database: {total_count}")
-            
-            # Test active employees count
-            cursor.execute("SELECT COUNT(*) FROM employees WHERE status = 'active'")
-            active_count = cursor.fetchone()[0]
-            print(f"🔍 DEBUG: Active employees in database: {active_count}")
-            
-            # Try to fetch with department column first
-            try:
-                cursor.execute("""
-                    SELECT id, employee_code, name, email, phone, role, department, password_hash, 
-                           salary, hire_date, status, last_login, created_at, updated_at
-                    FROM employees
-                    WHERE status = 'active'
-                    ORDER BY employee_code
-                """)
-                has_department_column = True
-                print(f"🔍 DEBUG: Using query with department column")
-            except Exception as e:
-                print(f"🔍 DEBUG: Department column doesn't exist, using query without department")
-                # Fetch without department column
-                cursor.execute("""
-                    SELECT id, employee_code, name, email, phone, role, password_hash, 
-                           salary, hire_date, status, last_login, created_at, updated_at
-                    FROM employees
-                    WHERE status = 'active'
-                    ORDER BY employee_code
-                """)
-                has_department_column = False
-            
-            employees_data = cursor.fetchall()
-            print(f"🔍 DEBUG: Raw employee data fetched: {len(employees_data)} records")
-            
-            if employees_data:
-                print(f"🔍 DEBUG: First employee raw data: {employees_data[0]}")
-            
+            where = "" if include_inactive else "WHERE status = 'active'"
+            cursor.execute(f"SELECT {EMPLOYEE_COLUMNS} FROM employees {where} ORDER BY employee_code")
+            employees = [cls._from_row(row) for row in cursor.fetchall()]
             cursor.close()
             
-            employees = []
-            for i, data in enumerate(employees_data):
-                try:
-                    print(f"🔍 DEBUG: Processing employee {i+1}: {data[1]} - {data[2]}")  # code, name
-                    
-                    if has_department_column:
-                        # Create employee object with department field
-                        employee = cls(
-                            id=data[0],
-                            employee_code=data[1], 
-                            name=data[2],
-                            email=data[3], 
-                            phone=data[4],
-                            role=data[5],
-                            department=data[6],  # Department from database
-                            password_hash=data[7],
-                            salary=data[8],
-                            hire_date=data[9],
-                            status=data[10],
-                            last_login=data[11],
-                            created_at=data[12],
-                            updated_at=data[13]
-                        )
-                    else:
-                        # Create employee object without department field (will be mapped from role)
-                        employee = cls(
-                            id=data[0],
-                            employee_code=data[1], 
-                            name=data[2],
-                            email=data[3], 
-                            phone=data[4],
-                            role=data[5],
-                            password_hash=data[6],
-                            salary=data[7],
-                            hire_date=data[8],
-                            status=data[9],
-                            last_login=data[10],
-                            created_at=data[11],
-                            updated_at=data[12]
-                        )
-                    
-                    print(f"🔍 DEBUG: Employee {i+1} - Role: {employee.role}, Department: {employee.department}")
-                    employees.append(employee)
-                    
-                except Exception as e:
-                    print(f"❌ DEBUG: Error processing employee {i+1}: {e}")
-                    print(f"❌ DEBUG: Data causing error: {data}")
-                    continue
-            
-            print(f"✅ DEBUG: Successfully processed {len(employees)} employees")
+            print(f"✅ DEBUG: Loaded {len(employees)} employees")
             return employees
             
         except Exception as e:
             print(f"❌ DEBUG: Error getting employees: {e}")
             logging.error(f"Error getting employees: {e}")
-            import traceback
-            traceback.print_exc()
             return []
 
     @classmethod
-    def get_all(cls):
+    def get_all(cls, include_inactive=False):
         """Alias for compatibility with UI"""
-        return cls.get_all_employees()
+        return cls.get_all_employees(include_inactive)
 
     @classmethod
     def get_all_employees_simple(cls):
@@ -369,46 +268,19 @@ class Employee:
             
             conn, cursor = get_db()
             search_pattern = f"%{search_term}%"
-            
-            # Try with department column first
-            try:
-                cursor.execute("""
-                    SELECT id, employee_code, name, email, phone, role, department, password_hash, 
-                           salary, hire_date, status, last_login, created_at, updated_at
-                    FROM employees
-                    WHERE (name LIKE %s OR employee_code LIKE %s OR email LIKE %s OR 
-                           phone LIKE %s OR role LIKE %s)
-                          AND status = 'active'
-                    ORDER BY name
-                """, (search_pattern, search_pattern, search_pattern, 
-                      search_pattern, search_pattern))
-                has_department = True
-            except:
-                cursor.execute("""
-                    SELECT id, employee_code, name, email, phone, role, password_hash, 
-                           salary, hire_date, status, last_login, created_at, updated_at
-                    FROM employees
-                    WHERE (name LIKE %s OR employee_code LIKE %s OR email LIKE %s OR 
-                           phone LIKE %s OR role LIKE %s)
-                          AND status = 'active'
-                    ORDER BY name
-                """, (search_pattern, search_pattern, search_pattern, 
-                      search_pattern, search_pattern))
-                has_department = False
-            
-            employees_data = cursor.fetchall()
+            cursor.execute(f"""
+                SELECT {EMPLOYEE_COLUMNS}
+                FROM employees
+                WHERE (name LIKE %s OR employee_code LIKE %s OR email LIKE %s OR 
+                       phone LIKE %s OR role LIKE %s)
+                      AND status = 'active'
+                ORDER BY name
+            """, (search_pattern, search_pattern, search_pattern, 
+                  search_pattern, search_pattern))
+            employees = [cls._from_row(row) for row in cursor.fetchall()]
             cursor.close()
             
-            print(f"✅ DEBUG: Search found {len(employees_data)} employees")
-            
-            employees = []
-            for data in employees_data:
-                if has_department:
-                    employee = cls(*data[:6], department=data[6], *data[7:])
-                else:
-                    employee = cls(*data)
-                employees.append(employee)
-            
+            print(f"✅ DEBUG: Search found {len(employees)} employees")
             return employees
             
         except Exception as e:
@@ -423,34 +295,17 @@ class Employee:
             print(f"🔍 DEBUG: Getting employee by code: {employee_code}")
             
             conn, cursor = get_db()
-            
-            # Try with department column first
-            try:
-                cursor.execute("""
-                    SELECT id, employee_code, name, email, phone, role, department, password_hash, 
-                           salary, hire_date, status, last_login, created_at, updated_at
-                    FROM employees
-                    WHERE employee_code = %s AND status = 'active'
-                """, (employee_code,))
-                has_department = True
-            except:
-                cursor.execute("""
-                    SELECT id, employee_code, name, email, phone, role, password_hash, 
-                           salary, hire_date, status, last_login, created_at, updated_at
-                    FROM employees
-                    WHERE employee_code = %s AND status = 'active'
-                """, (employee_code,))
-                has_department = False
-            
+            cursor.execute(f"""
+                SELECT {EMPLOYEE_COLUMNS}
+                FROM employees
+                WHERE employee_code = %s AND status = 'active'
+            """, (employee_code,))
             employee_data = cursor.fetchone()
             cursor.close()
             
             if employee_data:
                 print(f"✅ DEBUG: Found employee: {employee_data[2]}")  # name
-                if has_department:
-                    return cls(*employee_data[:6], department=employee_data[6], *employee_data[7:])
-                else:
-                    return cls(*employee_data)
+                return cls._from_row(employee_data)
             
             print(f"❌ DEBUG: No employee found with code: {employee_code}")
             return None
@@ -470,34 +325,14 @@ class Employee:
         """Get employee by database ID"""
         try:
             conn, cursor = get_db()
-            
-            # Try with department column first
-            try:
-                cursor.execute("""
-                    SELECT id, employee_code, name, email, phone, role, department, password_hash, 
-                           salary, hire_date, status, last_login, created_at, updated_at
-                    FROM employees
-                    WHERE id = %s AND status = 'active'
-                """, (db_id,))
-                has_department = True
-            except:
-                cursor.execute("""
-                    SELECT id, employee_code, name, email, phone, role, password_hash, 
-                           salary, hire_date, status, last_login, created_at, updated_at
-                    FROM employees
-                    WHERE id = %s AND status = 'active'
-                """, (db_id,))
-                has_department = False
-            
+            cursor.execute(f"""
+                SELECT {EMPLOYEE_COLUMNS}
+                FROM employees
+                WHERE id = %s AND status = 'active'
+            """, (db_id,))
             employee_data = cursor.fetchone()
             cursor.close()
-            
-            if employee_data:
-                if has_department:
-                    return cls(*employee_data[:6], department=employee_data[6], *employee_data[7:])
-                else:
-                    return cls(*employee_data)
-            return None
+            return cls._from_row(employee_data) if employee_data else None
             
         except Exception as e:
             logging.error(f"Error getting employee by database ID: {e}")
@@ -517,42 +352,23 @@ class Employee:
             set_clauses = []
             values = []
             
-            # Check if department column exists
-            try:
-                cursor.execute("DESCRIBE employees")
-                columns = [row[0] for row in cursor.fetchall()]
-                has_department_column = 'department' in columns
-                print(f"🔍 DEBUG: Department column exists: {has_department_column}")
-            except:
-                has_department_column = False
-            
             # Valid fields matching database schema
             valid_fields = [
-                'employee_code', 'name', 'email', 'phone', 'role', 
+                'employee_code', 'name', 'email', 'phone', 'role', 'department',
                 'password_hash', 'salary', 'hire_date', 'status'
             ]
             
-            if has_department_column:
-                valid_fields.append('department')
-            
             for field, value in kwargs.items():
                 if field == 'position' and value:
                     set_clauses.append("role = %s")
                     values.append(value.lower())
                     print(f"🔍 DEBUG: Converting position '{value}' to role in database")
                     continue
-                if field == 'department':
-                    if has_department_column:
-                        set_clauses.append("department = %s")
-                        values.append(value)
-                        print(f"🔍 DEBUG: Updating department to '{value}'")
-                    else:
-                        print(f"🔍 DEBUG: Skipping department field '{value}' (column doesn't exist)")
-                    continue
-                
                 if field == 'address':
                     print(f"🔍 DEBUG: Skipping address field (not stored in database)")
                     continue
+                if field == 'department' and not value:
+                    continue  # department is NOT NULL; keep the stored one
                 
                 if field in valid_fields:
                     # Handle hire_date formatting
@@ -640,40 +456,16 @@ class Employee:
             print(f"🔍 DEBUG: Getting employees by role: {role}")
             
             conn, cursor = get_db()
-            
-            # Try with department column first
-            try:
-                cursor.execute("""
-                    SELECT id, employee_code, name, email, phone, role, department, password_hash, 
-                           salary, hire_date, status, last_login, created_at, updated_at
-                    FROM employees
-                    WHERE role = %s AND status = 'active'
-                    ORDER BY name
-                """, (role,))
-                has_department = True
-            except:
-                cursor.execute("""
-                    SELECT id, employee_code, name, email, phone, role, password_hash, 
-                           salary, hire_date, status, last_login, created_at, updated_at
-                    FROM employees
-                    WHERE role = %s AND status = 'active'
-                    ORDER BY name
-                """, (role,))
-                has_department = False
-            
-            employees_data = cursor.fetchall()
+            cursor.execute(f"""
+                SELECT {EMPLOYEE_COLUMNS}
+                FROM employees
+                WHERE role = %s AND status = 'active'
+                ORDER BY name
+            """, (role,))
+            employees = [cls._from_row(row) for row in cursor.fetchall()]
             cursor.close()
             
-            print(f"✅ DEBUG: Found {len(employees_data)} employees with role {role}")
-            
-            employees = []
-            for data in employees_data:
-                if has_department:
-                    employee = cls(*data[:6], department=data[6], *data[7:])
-                else:
-                    employee = cls(*data)
-                employees.append(employee)
-            
+            print(f"✅ DEBUG: Found {len(employees)} employees with role {role}")
             return employees
             
         except Exception as e:
@@ -730,6 +522,54 @@ class Employee:
                 'avg_salary': 0.0
             }
 
+    @classmethod
+    def get_workforce_summary(cls):
+        """Head counts and payroll for the HR screens from one grouped query.
+
+        Returns total/active/inactive counts, the active payroll with the number
+        of salaried staff and their min/max salary, and per-department
+        {'count', 'payroll'} and per-position head counts for active employees.
+        """
+        summary = {'total': 0, 'active': 0, 'inactive': 0, 'payroll': 0.0, 'salaried': 0,
+                   'min_salary': None, 'max_salary': None, 'departments': {}, 'positions': {}}
+        try:
+            conn, cursor = get_db()
+            cursor.execute("""
+                SELECT status, department, role, COUNT(*),
+                       COALESCE(SUM(salary), 0), COUNT(CASE WHEN salary > 0 THEN 1 END),
+                       MIN(CASE WHEN salary > 0 THEN salary END), MAX(salary)
+                FROM employees
+                GROUP BY status, department, role
+            """)
+            rows = cursor.fetchall()
+            cursor.close()
+            
+            for status, department, role, count, payroll, salaried, min_salary, max_salary in rows:
+                summary['total'] += count
+                if status != 'active':
+                    summary['inactive'] += count
+                    continue
+                summary['active'] += count
+                summary['payroll'] += float(payroll)
+                summary['salaried'] += salaried
+                if min_salary is not None:
+                    current = summary['min_salary']
+                    summary['min_salary'] = float(min_salary) if current is None else min(current, float(min_salary))
+                    summary['max_salary'] = max(summary['max_salary'] or 0.0, float(max_salary))
+                dept = summary['departments'].setdefault(department, {'count': 0, 'payroll': 0.0})
+                dept['count'] += count
+                dept['payroll'] += float(payroll)
+                position = POSITION_BY_ROLE.get(role.lower() if role else '', 'Cashier')
+                summary['positions'][position] = summary['positions'].get(position, 0) + count
+            
+            print(f"✅ DEBUG: Workforce summary - {summary['active']} active, payroll {summary['payroll']:.2f}")
+            return summary
+            
+        except Exception as e:
+            print(f"❌ DEBUG: Error getting workforce summary: {e}")
+            logging.error(f"Error getting workforce summary: {e}")
+            return summary
+
     def get_formatted_salary(self):
         """Get formatted salary"""
         if self.salary:
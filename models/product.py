@@ -4,8 +4,13 @@ Product and inventory management model
 from database import get_db
 from datetime import datetime, timedelta
 import logging
+from services.archival import needs_archive
+from services.search_index import get_search_index, notify_search_change, padded
+from services.stock_alerts import notify_stock_change
 
 class Product:
+    SEARCH_LIMIT = 50
+
     def __init__(self, id=None, product_code=None, barcode=None, name=None, description=None, 
                  category=None, category_id=None, supplier_id=None, brand=None, unit=None,
                  unit_price=None, cost_price=None, mrp=None, discount_percentage=None,
@@ -190,6 +195,8 @@ class Product:
             conn.commit()
             
             print(f"✅ DEBUG: Product created with ID: {product_id}")
+            notify_stock_change([product_id])
+            notify_search_change('products', [product_id])
             
             # Log inventory movement for initial stock
             if quantity_in_stock > 0:
@@ -273,13 +280,11 @@ class Product:
         return cls.get_all_products()
 
     @classmethod
-    def search_products(cls, search_term):
-        """Search products by name, barcode, brand, or product_code"""
+    def search_products(cls, search_term, limit=SEARCH_LIMIT):
+        """Search products by barcode or product_code prefix, then name and brand (typo-tolerant)"""
         try:
-            conn, cursor = get_db()
-            search_pattern = f"%{search_term}%"
-            
-            cursor.execute("""
+            term = str(search_term).strip()
+            columns = """
                 SELECT id, product_code, barcode, name, description, category_id,
                        supplier_id, brand, unit, unit_price, cost_price, mrp, 
                        discount_percentage, tax_rate, quantity_in_stock, min_stock_level,
@@ -287,14 +292,42 @@ class Product:
                        batch_number, rack_location, weight_per_unit, dimensions, is_active,
                        created_at, updated_at
                 FROM products
-                WHERE (name LIKE %s OR barcode LIKE %s OR brand LIKE %s OR product_code LIKE %s) 
-                      AND is_active = TRUE
-                ORDER BY name
-            """, (search_pattern, search_pattern, search_pattern, search_pattern))
+            """
             
+            conn, cursor = get_db()
+            # Code prefixes get their own window, exact hits first, so a broad
+            # prefix cannot crowd the index's best name matches out
+            cursor.execute(f"""{columns}
+                WHERE (barcode LIKE %s OR product_code LIKE %s) AND is_active = TRUE
+                ORDER BY (barcode = %s OR product_code = %s) DESC, name
+                LIMIT {int(limit)}
+            """, (f"{term}%", f"{term}%", term, term))
             products_data = cursor.fetchall()
+            
+            ids = []
+            if padded(term):
+                ids = [row_id for row_id, _ in get_search_index('products').search(term, limit)]
+                if ids:
+                    cursor.execute(f"""{columns}
+                        WHERE id IN ({', '.join(['%s'] * len(ids))}) AND is_active = TRUE
+                    """, ids)
+                    products_data.extend(cursor.fetchall())
+            else:
+                # Names the index cannot spell (non-Latin scripts) fall back to a substring match
+                cursor.execute(f"""{columns}
+                    WHERE name LIKE %s AND is_active = TRUE
+                    ORDER BY name
+                    LIMIT {int(limit)}
+                """, (f"%{term}%",))
+                products_data.extend(cursor.fetchall())
             cursor.close()
             
+            # Exact code hits first, then the index's ranking; dict keeps one row per id
+            products_data = list({data[0]: data for data in products_data}.values())
+            rank = {product_id: n for n, product_id in enumerate(ids)}
+            products_data.sort(key=lambda data: (term not in (data[1], data[2]), rank.get(data[0], len(rank))))
+            products_data = products_data[:limit]
+            
             products = []
             for data in products_data:
                 product = cls(
@@ -441,6 +474,8 @@ class Product:
             conn.commit()
             
             print(f"✅ DEBUG: Product {product_id} updated successfully")
+            notify_stock_change([product_id])
+            notify_search_change('products', [product_id])
             logging.info(f"Product updated successfully: ID {product_id}")
             
         except Exception as e:
@@ -531,6 +566,8 @@ class Product:
             conn.commit()
             
             print(f"✅ DEBUG: Product with barcode {barcode} updated successfully")
+            notify_stock_change([product_id])
+            notify_search_change('products', [product_id])
             logging.info(f"Product updated successfully by barcode: {barcode}")
             
             # Log inventory movement if quantity changed
@@ -570,6 +607,8 @@ class Product:
             cursor.close()
             
             print(f"✅ DEBUG: Product {product_id} deleted (soft delete)")
+            notify_stock_change([product_id])
+            notify_search_change('products', [product_id])
             logging.info(f"Product deleted successfully: ID {product_id}")
             
         except Exception as e:
@@ -610,6 +649,8 @@ class Product:
             conn.commit()
             
             print(f"✅ DEBUG: Product with barcode {barcode} deleted successfully")
+            notify_stock_change([product_id])
+            notify_search_change('products', [product_id])
             logging.info(f"Product deleted successfully by barcode: {barcode} (Name: {product_name})")
             
             # Log inventory movement for deletion
@@ -661,6 +702,7 @@ class Product:
             conn.commit()
             
             print(f"✅ DEBUG: Stock updated - {product_name}: {current_stock} → {new_stock}")
+            notify_stock_change([product_id])
             
             # Log inventory movement
             movement_type = 'in' if quantity_change > 0 else 'out'
@@ -763,35 +805,47 @@ class Product:
             return []
 
     @classmethod
-    def get_inventory_movements(cls, product_id=None, days=30):
+    def get_inventory_movements(cls, product_id=None, days=30, include_archived=False):
         """Get inventory movements for a product or all products"""
         try:
             conn, cursor = get_db()
             
+            since = datetime.now() - timedelta(days=days)
+            source = "inventory_movements"
+            source_params = ()
+            if include_archived and needs_archive(since):
+                columns = "id, product_id, movement_type, quantity, reference_type, reason, movement_date, employee_id"
+                source = f"""(
+                    SELECT {columns} FROM inventory_movements WHERE movement_date >= %s
+                    UNION ALL
+                    SELECT {columns} FROM inventory_movements_archive WHERE movement_date >= %s
+                )"""
+                source_params = (since, since)
+            
             if product_id:
-                cursor.execute("""
+                cursor.execute(f"""
                     SELECT im.id, im.product_id, p.name as product_name, p.product_code,
                            im.movement_type, im.quantity, im.reference_type, im.reason,
                            im.movement_date, e.name as employee_name
-                    FROM inventory_movements im
+                    FROM {source} im
                     LEFT JOIN products p ON im.product_id = p.id
                     LEFT JOIN employees e ON im.employee_id = e.id
                     WHERE im.product_id = %s
-                          AND im.movement_date >= DATE_SUB(NOW(), INTERVAL %s DAY)
+                          AND im.movement_date >= %s
                     ORDER BY im.movement_date DESC
-                """, (product_id, days))
+                """, source_params + (product_id, since))
             else:
-                cursor.execute("""
+                cursor.execute(f"""
                     SELECT im.id, im.product_id, p.name as product_name, p.product_code,
                            im.movement_type, im.quantity, im.reference_type, im.reason,
                            im.movement_date, e.name as employee_name
-                    FROM inventory_movements im
+                    FROM {source} im
                     LEFT JOIN products p ON im.product_id = p.id
                     LEFT JOIN employees e ON im.employee_id = e.id
-                    WHERE im.movement_date >= DATE_SUB(NOW(), INTERVAL %s DAY)
+                    WHERE im.movement_date >= %s
                     ORDER BY im.movement_date DESC
                     LIMIT 100
-                """, (days,))
+                """, source_params + (since,))
             
             movements = cursor.fetchall()
             cursor.close()
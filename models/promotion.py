@@ -0,0 +1,218 @@
+"""
+Promotion rules model - BOGO, multi-buy, combos, category and product offers
+"""
+from database import get_db
+import logging
+
+
+class Promotion:
+    PROMO_TYPES = ('bogo', 'multi_buy', 'combo', 'category_percent', 'percent_off')
+
+    RULE_COLUMNS = """
+        p.id, p.name, p.promo_type, p.product_id, p.category_id, p.buy_quantity,
+        p.get_quantity, p.discount_percentage, p.bundle_price, p.starts_at, p.ends_at,
+        p.daily_start_time, p.daily_end_time, p.days_of_week, p.priority
+    """
+
+    def __init__(self, id=None, name=None, promo_type=None, product_id=None, category_id=None,
+                 buy_quantity=1, get_quantity=0, discount_percentage=0.0, bundle_price=None,
+                 starts_at=None, ends_at=None, daily_start_time=None, daily_end_time=None,
+                 days_of_week=None, priority=0, is_active=True, items=None):
+        self.id = id
+        self.name = name
+        self.promo_type = promo_type
+        self.product_id = product_id
+        self.category_id = category_id
+        self.buy_quantity = buy_quantity
+        self.get_quantity = get_quantity
+        self.discount_percentage = discount_percentage
+        self.bundle_price = bundle_price
+        self.starts_at = starts_at
+        self.ends_at = ends_at
+        self.daily_start_time = daily_start_time
+        self.daily_end_time = daily_end_time
+        self.days_of_week = days_of_week
+        self.priority = priority
+        self.is_active = is_active
+        self.items = items or []  # [(product_id, quantity)] for combos
+
+    @classmethod
+    def validate(cls, promo_type, product_id=None, category_id=None, items=None, **kwargs):
+        """Check that a rule has the fields its type needs"""
+        if promo_type not in cls.PROMO_TYPES:
+            raise ValueError(f"Invalid promotion type: {promo_type}")
+        if promo_type in ('bogo', 'multi_buy', 'percent_off') and not product_id:
+            raise ValueError(f"{promo_type} promotions need a product")
+        if promo_type == 'category_percent' and not category_id:
+            raise ValueError("Category promotions need a category")
+        if promo_type == 'combo' and len(items or []) < 2:
+            raise ValueError("Combo promotions need at least two products")
+        if promo_type == 'multi_buy' and kwargs.get('bundle_price') is None:
+            raise ValueError("Multi-buy promotions need a bundle price")
+        if promo_type == 'bogo' and int(kwargs.get('get_quantity') or 0) <= 0:
+            raise ValueError("BOGO promotions need a free quantity")
+
+    @classmethod
+    def create_promotion(cls, name, promo_type, items=None, **kwargs):
+        """Create a promotion rule (items = [(product_id, quantity)] for combos)"""
+        conn = None
+        cursor = None
+
+        try:
+            cls.validate(promo_type, items=items, **kwargs)
+            conn, cursor = get_db()
+            conn.start_transaction()
+
+            discount = kwargs.get('discount_percentage')
+            if discount is None:
+                discount = 100.0 if promo_type == 'bogo' else 0.0
+
+            cursor.execute("""
+                INSERT INTO promotions (
+                    name, promo_type, product_id, category_id, buy_quantity, get_quantity,
+                    discount_percentage, bundle_price, starts_at, ends_at, daily_start_time,
+                    daily_end_time, days_of_week, priority, is_active
+                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            """, (
+                name, promo_type, kwargs.get('product_id'), kwargs.get('category_id'),
+                int(kwargs.get('buy_quantity') or 1), int(kwargs.get('get_quantity') or 0),
+                float(discount), kwargs.get('bundle_price'), kwargs.get('starts_at'),
+                kwargs.get('ends_at'), kwargs.get('daily_start_time'), kwargs.get('daily_end_time'),
+                kwargs.get('days_of_week'), int(kwargs.get('priority') or 0),
+                kwargs.get('is_active', True)
+            ))
+            promotion_id = cursor.lastrowid
+
+            if items:
+                cursor.executemany("""
+                    INSERT INTO promotion_items (promotion_id, product_id, quantity)
+                    VALUES (%s, %s, %s)
+                """, [(promotion_id, int(product_id), int(quantity)) for product_id, quantity in items])
+
+            conn.commit()
+            cls._invalidate_engine()
+
+            logging.info(f"Promotion created successfully: {name} (ID: {promotion_id})")
+            return promotion_id
+
+        except Exception as e:
+            if conn:
+                conn.rollback()
+            logging.error(f"Error creating promotion: {e}")
+            raise
+
+        finally:
+            if cursor:
+                cursor.close()
+
+    @classmethod
+    def update_promotion(cls, promotion_id, **kwargs):
+        """Update promotion fields"""
+        conn = None
+        cursor = None
+
+        try:
+            conn, cursor = get_db()
+
+            valid_fields = [
+                'name', 'buy_quantity', 'get_quantity', 'discount_percentage', 'bundle_price',
+                'starts_at', 'ends_at', 'daily_start_time', 'daily_end_time', 'days_of_week',
+                'priority', 'is_active'
+            ]
+            set_clauses = []
+            values = []
+            for field, value in kwargs.items():
+                if field in valid_fields:
+                    set_clauses.append(f"{field} = %s")
+                    values.append(value)
+
+            if not set_clauses:
+                raise ValueError("No valid fields to update")
+
+            values.append(promotion_id)
+            cursor.execute(f"UPDATE promotions SET {', '.join(set_clauses)} WHERE id = %s", values)
+            conn.commit()
+            cls._invalidate_engine()
+
+            logging.info(f"Promotion updated successfully: ID {promotion_id}")
+
+        except Exception as e:
+            if conn:
+                conn.rollback()
+            logging.error(f"Error updating promotion: {e}")
+            raise
+
+        finally:
+            if cursor:
+                cursor.close()
+
+    @classmethod
+    def deactivate_promotion(cls, promotion_id):
+        """Soft delete a promotion"""
+        cls.update_promotion(promotion_id, is_active=False)
+
+    @classmethod
+    def get_active_rule_rows(cls):
+        """Rows for every active, unexpired rule plus combo components - two queries in total"""
+        try:
+            conn, cursor = get_db()
+
+            cursor.execute(f"""
+                SELECT {cls.RULE_COLUMNS}
+                FROM promotions p
+                WHERE p.is_active = TRUE AND (p.ends_at IS NULL OR p.ends_at > NOW())
+            """)
+            rules = cursor.fetchall()
+
+            cursor.execute("""
+                SELECT pi.promotion_id, pi.product_id, pi.quantity
+                FROM promotion_items pi
+                JOIN promotions p ON p.id = pi.promotion_id
+                WHERE p.is_active = TRUE AND p.promo_type = 'combo'
+                      AND (p.ends_at IS NULL OR p.ends_at > NOW())
+            """)
+            items = cursor.fetchall()
+            cursor.close()
+
+            return rules, items
+
+        except Exception as e:
+            logging.error(f"Error loading promotion rules: {e}")
+            return [], []
+
+    @classmethod
+    def get_rules_signature(cls):
+        """Cheap change marker used to detect edits made from other tills"""
+        try:
+            conn, cursor = get_db()
+            cursor.execute("SELECT COUNT(*), MAX(updated_at) FROM promotions")
+            signature = cursor.fetchone()
+            cursor.close()
+            return tuple(signature) if signature else None
+        except Exception as e:
+            logging.error(f"Error reading promotion signature: {e}")
+            return None
+
+    @classmethod
+    def get_all_promotions(cls):
+        """Get all active promotions for management screens"""
+        try:
+            rules, items = cls.get_active_rule_rows()
+            components = {}
+            for promotion_id, product_id, quantity in items:
+                components.setdefault(promotion_id, []).append((product_id, quantity))
+            return [cls(*row, items=components.get(row[0])) for row in rules]
+        except Exception as e:
+            logging.error(f"Error getting promotions: {e}")
+            return []
+
+    @staticmethod
+    def _invalidate_engine():
+        from services.promotions import PromotionEngine
+        PromotionEngine.invalidate()
+
+    def __str__(self):
+        return f"Promotion(id={self.id}, name='{self.name}', type='{self.promo_type}')"
+
+    def __repr__(self):
+        return self.__str__()
@@ -0,0 +1,262 @@
+"""
+Purchase orders - generated per supplier from low stock, received in one batch
+"""
+from database import get_db
+from datetime import datetime
+import logging
+from services.stock_alerts import notify_stock_change
+
+
+class PurchaseOrder:
+    OPEN_STATUSES = ('draft', 'sent')
+
+    # Below reorder point, has a supplier, and not already on an open PO
+    LOW_STOCK_CONDITION = """
+        p.is_active = TRUE
+        AND p.supplier_id IS NOT NULL
+        AND p.quantity_in_stock <= GREATEST(p.min_stock_level, p.reorder_level)
+        AND NOT EXISTS (
+            SELECT 1 FROM purchase_order_items oi
+            JOIN purchase_orders op ON op.id = oi.po_id
+            WHERE oi.product_id = p.id AND op.status IN ('draft', 'sent')
+        )
+    """
+
+    def __init__(self, id=None, po_number=None, supplier_id=None, supplier_name=None, status='draft',
+                 line_count=0, total_cost=0.0, created_at=None, received_at=None, items=None):
+        self.id = id
+        self.po_number = po_number
+        self.supplier_id = supplier_id
+        self.supplier_name = supplier_name
+        self.status = status
+        self.line_count = line_count
+        self.total_cost = total_cost
+        self.created_at = created_at
+        self.received_at = received_at
+        self.items = items or []
+
+    @classmethod
+    def generate_for_low_stock(cls, created_by=None):
+        """Create one draft PO per supplier covering every low-stock SKU.
+
+        Order quantity tops each SKU up to max_stock_level. The whole run is a
+        handful of set-based statements in one transaction; returns the new POs.
+        """
+        conn = None
+        cursor = None
+
+        try:
+            conn, cursor = get_db()
+            prefix = f"PO-{datetime.now().strftime('%Y%m%d%H%M%S%f')}-"
+            conn.start_transaction()
+
+            cursor.execute(f"""
+                SELECT DISTINCT p.supplier_id FROM products p
+                WHERE {cls.LOW_STOCK_CONDITION}
+                ORDER BY p.supplier_id
+            """)
+            supplier_ids = [row[0] for row in cursor.fetchall()]
+            if not supplier_ids:
+                conn.commit()
+                print("✅ DEBUG: No low-stock products need a purchase order")
+                return []
+
+            cursor.executemany("""
+                INSERT INTO purchase_orders (po_number, supplier_id, created_by, notes)
+                VALUES (%s, %s, %s, 'Generated from low stock')
+            """, [(f"{prefix}{supplier_id}", supplier_id, created_by) for supplier_id in supplier_ids])
+
+            cursor.execute(f"""
+                INSERT INTO purchase_order_items (po_id, product_id, quantity_ordered, unit_cost)
+                SELECT po.id, p.id,
+                       GREATEST(p.max_stock_level - p.quantity_in_stock, 1),
+                       COALESCE(p.cost_price, p.unit_price, 0)
+                FROM products p
+                JOIN purchase_orders po ON po.supplier_id = p.supplier_id AND po.po_number LIKE %s
+                WHERE {cls.LOW_STOCK_CONDITION}
+            """, (prefix + '%',))
+
+            cursor.execute("""
+                UPDATE purchase_orders
+                SET line_count = (SELECT COUNT(*) FROM purchase_order_items i
+                                  WHERE i.po_id = purchase_orders.id),
+                    total_cost = (SELECT COALESCE(SUM(i.quantity_ordered * i.unit_cost), 0)
+                                  FROM purchase_order_items i WHERE i.po_id = purchase_orders.id)
+                WHERE po_number LIKE %s
+            """, (prefix + '%',))
+            cursor.execute("DELETE FROM purchase_orders WHERE po_number LIKE %s AND line_count = 0",
+                           (prefix + '%',))
+            conn.commit()
+
+            orders = cls.get_purchase_orders(po_prefix=prefix)
+            print(f"✅ DEBUG: Generated {len(orders)} purchase orders "
+                  f"({sum(order.line_count for order in orders)} lines)")
+            logging.info(f"Purchase orders generated: {[order.po_number for order in orders]}")
+            return orders
+
+        except Exception as e:
+            if conn:
+                conn.rollback()
+            print(f"❌ DEBUG: Error generating purchase orders: {e}")
+            logging.error(f"Error generating purchase orders: {e}")
+            raise
+
+        finally:
+            if cursor:
+                cursor.close()
+
+    @classmethod
+    def get_purchase_orders(cls, status=None, po_prefix=None):
+        """Purchase orders with supplier names, newest first"""
+        try:
+            conn, cursor = get_db()
+            conditions, params = [], []
+            if status:
+                conditions.append("po.status = %s")
+                params.append(status)
+            if po_prefix:
+                conditions.append("po.po_number LIKE %s")
+                params.append(po_prefix + '%')
+            where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+            cursor.execute(f"""
+                SELECT po.id, po.po_number, po.supplier_id, s.name, po.status, po.line_count,
+                       po.total_cost, po.created_at, po.received_at
+                FROM purchase_orders po
+                JOIN suppliers s ON s.id = po.supplier_id
+                {where}
+                ORDER BY po.id DESC
+            """, params)
+
+            orders = [cls(id=row[0], po_number=row[1], supplier_id=row[2], supplier_name=row[3],
+                          status=row[4], line_count=row[5], total_cost=float(row[6] or 0),
+                          created_at=row[7], received_at=row[8])
+                      for row in cursor.fetchall()]
+            cursor.close()
+            return orders
+
+        except Exception as e:
+            logging.error(f"Error getting purchase orders: {e}")
+            return []
+
+    @classmethod
+    def get_items(cls, po_id):
+        """Lines of one purchase order"""
+        try:
+            conn, cursor = get_db()
+            cursor.execute("""
+                SELECT i.product_id, p.product_code, p.name, i.quantity_ordered,
+                       i.quantity_received, i.unit_cost, p.quantity_in_stock
+                FROM purchase_order_items i
+                JOIN products p ON p.id = i.product_id
+                WHERE i.po_id = %s
+                ORDER BY p.name
+            """, (po_id,))
+            items = cursor.fetchall()
+            cursor.close()
+            return items
+
+        except Exception as e:
+            logging.error(f"Error getting purchase order items: {e}")
+            return []
+
+    @classmethod
+    def set_status(cls, po_id, status):
+        """Move an open PO to 'sent' or 'cancelled'"""
+        if status not in ('sent', 'cancelled'):
+            raise ValueError(f"Invalid purchase order status: {status}")
+        try:
+            conn, cursor = get_db()
+            cursor.execute("""
+                UPDATE purchase_orders SET status = %s
+                WHERE id = %s AND status IN ('draft', 'sent')
+            """, (status, po_id))
+            if cursor.rowcount == 0:
+                cursor.close()
+                raise ValueError("Purchase order is not open")
+            conn.commit()
+            cursor.close()
+            logging.info(f"Purchase order {po_id} marked {status}")
+
+        except Exception as e:
+            logging.error(f"Error updating purchase order status: {e}")
+            raise
+
+    @classmethod
+    def receive(cls, po_id, employee_id, received_quantities=None):
+        """Post a delivery: stock, inventory movements and PO status in one transaction.
+
+        received_quantities maps product_id -> quantity for partial deliveries;
+        by default every line is received in full. Returns the units received.
+        """
+        conn = None
+        cursor = None
+
+        try:
+            conn, cursor = get_db()
+            conn.start_transaction()
+
+            cursor.execute("SELECT po_number, status FROM purchase_orders WHERE id = %s FOR UPDATE", (po_id,))
+            order = cursor.fetchone()
+            if not order:
+                raise ValueError("Purchase order not found")
+            po_number, status = order
+            if status not in cls.OPEN_STATUSES:
+                raise ValueError(f"Purchase order {po_number} is already {status}")
+
+            if received_quantities:
+                cursor.executemany("""
+                    UPDATE purchase_order_items SET quantity_received = %s
+                    WHERE po_id = %s AND product_id = %s
+                """, [(max(int(quantity), 0), po_id, int(product_id))
+                      for product_id, quantity in received_quantities.items()])
+            else:
+                cursor.execute("""
+                    UPDATE purchase_order_items SET quantity_received = quantity_ordered WHERE po_id = %s
+                """, (po_id,))
+
+            cursor.execute("""
+                UPDATE products
+                SET quantity_in_stock = quantity_in_stock + (
+                        SELECT i.quantity_received FROM purchase_order_items i
+                        WHERE i.po_id = %s AND i.product_id = products.id),
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE id IN (SELECT product_id FROM purchase_order_items
+                             WHERE po_id = %s AND quantity_received > 0)
+            """, (po_id, po_id))
+            cursor.execute("""
+                INSERT INTO inventory_movements (product_id, movement_type, quantity, reference_type,
+                                                 reference_id, reason, employee_id, movement_date, cost_per_unit)
+                SELECT product_id, 'in', quantity_received, 'purchase', po_id, %s, %s, NOW(), unit_cost
+                FROM purchase_order_items
+                WHERE po_id = %s AND quantity_received > 0
+            """, (f"Received {po_number}", employee_id, po_id))
+            cursor.execute("""
+                UPDATE purchase_orders
+                SET status = 'received', received_at = NOW(), received_by = %s
+                WHERE id = %s
+            """, (employee_id, po_id))
+
+            cursor.execute("""
+                SELECT product_id, quantity_received FROM purchase_order_items
+                WHERE po_id = %s AND quantity_received > 0
+            """, (po_id,))
+            received = cursor.fetchall()
+            conn.commit()
+            notify_stock_change(product_id for product_id, _ in received)
+
+            units = sum(quantity for _, quantity in received)
+            print(f"✅ DEBUG: Purchase order {po_number} received - {len(received)} lines, {units} units")
+            logging.info(f"Purchase order received: {po_number} ({units} units)")
+            return units
+
+        except Exception as e:
+            if conn:
+                conn.rollback()
+            print(f"❌ DEBUG: Error receiving purchase order: {e}")
+            logging.error(f"Error receiving purchase order {po_id}: {e}")
+            raise
+
+        finally:
+            if cursor:
+                cursor.close()
@@ -0,0 +1,399 @@
+"""
+Stocktakes - physical counts staged in bulk and posted as one set-based adjustment
+"""
+from database import get_db
+from datetime import datetime
+import csv
+import logging
+from collections import Counter
+from itertools import chain
+from services.stock_alerts import get_alert_engine, notify_stock_change
+
+LOAD_BATCH = 5000
+# Above this many changed SKUs a full alert rebuild is cheaper than reconciling each one
+ALERT_REBUILD_THRESHOLD = 1000
+
+CODE_COLUMNS = ('barcode', 'product_code', 'code', 'sku')
+QUANTITY_COLUMNS = ('counted_quantity', 'quantity', 'qty', 'count')
+
+# Staged counts per product; a SKU scanned under both barcode and product code is summed
+COUNTED_PER_PRODUCT = """
+    SELECT product_id, SUM(counted_quantity) AS counted, MAX(system_quantity) AS system_quantity,
+           MAX(unit_cost) AS unit_cost
+    FROM stocktake_counts
+    WHERE stocktake_id = %s AND product_id IS NOT NULL
+    GROUP BY product_id
+"""
+
+
+class Stocktake:
+    def __init__(self, id=None, stocktake_number=None, status='counting', counted_lines=0, unmatched_lines=0,
+                 variance_lines=0, variance_units=0, variance_value=0.0, created_at=None, posted_at=None,
+                 notes=None):
+        self.id = id
+        self.stocktake_number = stocktake_number
+        self.status = status
+        self.counted_lines = counted_lines
+        self.unmatched_lines = unmatched_lines
+        self.variance_lines = variance_lines
+        self.variance_units = variance_units
+        self.variance_value = variance_value
+        self.created_at = created_at
+        self.posted_at = posted_at
+        self.notes = notes
+
+    @classmethod
+    def create(cls, created_by=None, notes=None):
+        """Open a new stocktake and return it"""
+        try:
+            conn, cursor = get_db()
+            number = f"STK-{datetime.now().strftime('%Y%m%d%H%M%S%f')}"
+            cursor.execute("""
+                INSERT INTO stocktakes (stocktake_number, created_by, notes) VALUES (%s, %s, %s)
+            """, (number, created_by, notes))
+            stocktake_id = cursor.lastrowid
+            conn.commit()
+            cursor.close()
+            print(f"✅ DEBUG: Stocktake {number} opened")
+            logging.info(f"Stocktake opened: {number}")
+            return cls.get_stocktake(stocktake_id)
+
+        except Exception as e:
+            print(f"❌ DEBUG: Error creating stocktake: {e}")
+            logging.error(f"Error creating stocktake: {e}")
+            raise
+
+    @classmethod
+    def get_stocktake(cls, stocktake_id):
+        for stocktake in cls.get_stocktakes(stocktake_id=stocktake_id):
+            return stocktake
+        return None
+
+    @classmethod
+    def get_stocktakes(cls, status=None, stocktake_id=None):
+        """Stocktakes, newest first"""
+        try:
+            conn, cursor = get_db()
+            conditions, params = [], []
+            if status:
+                conditions.append("status = %s")
+                params.append(status)
+            if stocktake_id:
+                conditions.append("id = %s")
+                params.append(stocktake_id)
+            where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+            cursor.execute(f"""
+                SELECT id, stocktake_number, status, counted_lines, unmatched_lines, variance_lines,
+                       variance_units, variance_value, created_at, posted_at, notes
+                FROM stocktakes {where}
+                ORDER BY id DESC
+            """, params)
+            stocktakes = [cls(id=row[0], stocktake_number=row[1], status=row[2], counted_lines=row[3],
+                              unmatched_lines=row[4], variance_lines=row[5], variance_units=row[6],
+                              variance_value=float(row[7] or 0), created_at=row[8], posted_at=row[9],
+                              notes=row[10])
+                          for row in cursor.fetchall()]
+            cursor.close()
+            return stocktakes
+
+        except Exception as e:
+            logging.error(f"Error getting stocktakes: {e}")
+            return []
+
+    # -----------------------------------------------------------------
+    # Loading counts
+    # -----------------------------------------------------------------
+
+    @staticmethod
+    def read_counts(file_path):
+        """Yield (code, quantity) from a scanner dump or a CSV export.
+
+        Scanner files have one scan per line ("code" counts as 1, or "code,qty");
+        CSV files need a header with a barcode/product_code column and an
+        optional quantity column. Tab and semicolon delimiters are accepted.
+        """
+        with open(file_path, 'r', newline='', encoding='utf-8-sig') as file:
+            first_line = file.readline()
+            delimiter = next((d for d in ('\t', ';', ',') if d in first_line), ',')
+            header = [cell.strip().lower() for cell in first_line.split(delimiter)]
+            code_index = next((header.index(c) for c in CODE_COLUMNS if c in header), None)
+            quantity_index = next((header.index(c) for c in QUANTITY_COLUMNS if c in header), None)
+
+            rows = csv.reader(file, delimiter=delimiter)
+            if code_index is None:
+                # No header - the first line is a scan too
+                code_index, quantity_index = 0, 1
+                rows = chain(csv.reader([first_line], delimiter=delimiter), rows)
+
+            for row in rows:
+                if len(row) <= code_index or not row[code_index].strip():
+                    continue
+                quantity = 1
+                if quantity_index is not None and len(row) > quantity_index and row[quantity_index].strip():
+                    quantity = int(float(row[quantity_index]))
+                yield row[code_index].strip(), quantity
+
+    @classmethod
+    def load_counts(cls, stocktake_id, counts):
+        """Stream (code, quantity) pairs into the staging table in batches.
+
+        Repeated codes - several scans, or several files for different aisles -
+        add up. Returns the number of count lines read.
+        """
+        conn = None
+        cursor = None
+        lines = 0
+
+        try:
+            conn, cursor = get_db()
+            cursor.execute("SELECT status FROM stocktakes WHERE id = %s", (stocktake_id,))
+            row = cursor.fetchone()
+            if not row:
+                raise ValueError("Stocktake not found")
+            if row[0] != 'counting':
+                raise ValueError(f"Stocktake is already {row[0]}")
+
+            conn.start_transaction()
+            batch = Counter()
+            for code, quantity in counts:
+                batch[code] += quantity
+                lines += 1
+                if len(batch) >= LOAD_BATCH:
+                    cls._stage(cursor, stocktake_id, batch)
+                    batch = Counter()
+            if batch:
+                cls._stage(cursor, stocktake_id, batch)
+
+            cls._resolve_products(cursor, stocktake_id, unresolved_only=True)
+            conn.commit()
+            print(f"✅ DEBUG: Loaded {lines} count lines into stocktake {stocktake_id}")
+            logging.info(f"Stocktake {stocktake_id}: {lines} count lines loaded")
+            return lines
+
+        except Exception as e:
+            if conn:
+                conn.rollback()
+            print(f"❌ DEBUG: Error loading stocktake counts: {e}")
+            logging.error(f"Error loading stocktake counts: {e}")
+            raise
+
+        finally:
+            if cursor:
+                cursor.close()
+
+    @classmethod
+    def load_file(cls, stocktake_id, file_path):
+        return cls.load_counts(stocktake_id, cls.read_counts(file_path))
+
+    @staticmethod
+    def _stage(cursor, stocktake_id, batch):
+        cursor.executemany("""
+            INSERT INTO stocktake_counts (stocktake_id, scanned_code, counted_quantity)
+            VALUES (%s, %s, %s)
+            ON DUPLICATE KEY UPDATE counted_quantity = counted_quantity + VALUES(counted_quantity)
+        """, [(stocktake_id, code, quantity) for code, quantity in batch.items()])
+
+    @staticmethod
+    def _resolve_products(cursor, stocktake_id, unresolved_only=False):
+        """Match scanned codes to products by barcode, then by product code"""
+        cursor.execute(f"""
+            UPDATE stocktake_counts
+            SET product_id = COALESCE(
+                (SELECT p.id FROM products p WHERE p.barcode = stocktake_counts.scanned_code),
+                (SELECT p.id FROM products p WHERE p.product_code = stocktake_counts.scanned_code))
+            WHERE stocktake_id = %s {"AND product_id IS NULL" if unresolved_only else ""}
+        """, (stocktake_id,))
+
+    # -----------------------------------------------------------------
+    # Posting
+    # -----------------------------------------------------------------
+
+    @classmethod
+    def post(cls, stocktake_id, employee_id, full_count=False):
+        """Apply every variance in one transaction and return the posted stocktake.
+
+        With full_count, active products that were not counted at all are
+        taken as zero. Each changed SKU gets one signed 'adjustment' movement
+        (counted - system) and its stock set to the counted quantity.
+        """
+        conn = None
+        cursor = None
+
+        try:
+            conn, cursor = get_db()
+            conn.start_transaction()
+
+            cursor.execute("SELECT stocktake_number, status FROM stocktakes WHERE id = %s FOR UPDATE",
+                           (stocktake_id,))
+            row = cursor.fetchone()
+            if not row:
+                raise ValueError("Stocktake not found")
+            number, status = row
+            if status != 'counting':
+                raise ValueError(f"Stocktake {number} is already {status}")
+
+            cls._resolve_products(cursor, stocktake_id)
+            if full_count:
+                cursor.execute("""
+                    INSERT INTO stocktake_counts (stocktake_id, scanned_code, counted_quantity, product_id)
+                    SELECT %s, p.product_code, 0, p.id FROM products p
+                    WHERE p.is_active = TRUE AND NOT EXISTS (
+                        SELECT 1 FROM stocktake_counts c WHERE c.stocktake_id = %s AND c.product_id = p.id)
+                """, (stocktake_id, stocktake_id))
+
+            # Lock the counted products so sales cannot move stock between snapshot and update
+            cursor.execute("""
+                SELECT p.id FROM products p
+                JOIN stocktake_counts c ON c.product_id = p.id
+                WHERE c.stocktake_id = %s
+                FOR UPDATE
+            """, (stocktake_id,))
+            cursor.fetchall()
+            cursor.execute("""
+                UPDATE stocktake_counts
+                SET system_quantity = (SELECT p.quantity_in_stock FROM products p
+                                       WHERE p.id = stocktake_counts.product_id),
+                    unit_cost = (SELECT COALESCE(p.cost_price, p.unit_price, 0) FROM products p
+                                 WHERE p.id = stocktake_counts.product_id)
+                WHERE stocktake_id = %s AND product_id IS NOT NULL
+            """, (stocktake_id,))
+
+            # The variance pass
+            cursor.execute(f"""
+                SELECT product_id, counted - system_quantity, unit_cost
+                FROM ({COUNTED_PER_PRODUCT}) c
+                WHERE counted <> system_quantity
+            """, (stocktake_id,))
+            variances = cursor.fetchall()
+
+            cursor.execute(f"""
+                INSERT INTO inventory_movements (product_id, movement_type, quantity, reference_type,
+                                                 reference_id, reason, employee_id, movement_date,
+                                                 cost_per_unit, notes)
+                SELECT product_id, 'adjustment', counted - system_quantity, 'adjustment', %s, %s, %s, NOW(),
+                       unit_cost, CONCAT('Counted ', counted, ', system ', system_quantity)
+                FROM ({COUNTED_PER_PRODUCT}) c
+                WHERE counted <> system_quantity
+            """, (stocktake_id, f"Stocktake {number}", employee_id, stocktake_id))
+            cursor.execute("""
+                UPDATE products
+                SET quantity_in_stock = (SELECT SUM(c.counted_quantity) FROM stocktake_counts c
+                                         WHERE c.stocktake_id = %s AND c.product_id = products.id),
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE id IN (SELECT product_id FROM stocktake_counts WHERE stocktake_id = %s)
+                  AND quantity_in_stock <> (SELECT SUM(c.counted_quantity) FROM stocktake_counts c
+                                            WHERE c.stocktake_id = %s AND c.product_id = products.id)
+            """, (stocktake_id, stocktake_id, stocktake_id))
+
+            cursor.execute("""
+                SELECT COUNT(*), COUNT(*) - COUNT(product_id) FROM stocktake_counts WHERE stocktake_id = %s
+            """, (stocktake_id,))
+            counted_lines, unmatched_lines = cursor.fetchone()
+            variance_units = sum(abs(variance) for _, variance, _ in variances)
+            variance_value = sum(variance * float(unit_cost or 0) for _, variance, unit_cost in variances)
+            cursor.execute("""
+                UPDATE stocktakes
+                SET status = 'posted', posted_by = %s, posted_at = NOW(), counted_lines = %s,
+                    unmatched_lines = %s, variance_lines = %s, variance_units = %s, variance_value = %s
+                WHERE id = %s
+            """, (employee_id, counted_lines, unmatched_lines, len(variances), variance_units,
+                  round(variance_value, 4), stocktake_id))
+            conn.commit()
+
+            changed = [product_id for product_id, _, _ in variances]
+            if len(changed) > ALERT_REBUILD_THRESHOLD:
+                get_alert_engine().start()
+            else:
+                notify_stock_change(changed)
+
+            print(f"✅ DEBUG: Stocktake {number} posted - {len(variances)} variances, "
+                  f"{variance_units} units, value {variance_value:.2f}")
+            logging.info(f"Stocktake posted: {number} ({len(variances)} variances)")
+            return cls.get_stocktake(stocktake_id)
+
+        except Exception as e:
+            if conn:
+                conn.rollback()
+            print(f"❌ DEBUG: Error posting stocktake: {e}")
+            logging.error(f"Error posting stocktake {stocktake_id}: {e}")
+            raise
+
+        finally:
+            if cursor:
+                cursor.close()
+
+    @classmethod
+    def cancel(cls, stocktake_id):
+        try:
+            conn, cursor = get_db()
+            cursor.execute("UPDATE stocktakes SET status = 'cancelled' WHERE id = %s AND status = 'counting'",
+                           (stocktake_id,))
+            if cursor.rowcount == 0:
+                cursor.close()
+                raise ValueError("Stocktake is not open")
+            conn.commit()
+            cursor.close()
+            logging.info(f"Stocktake {stocktake_id} cancelled")
+
+        except Exception as e:
+            logging.error(f"Error cancelling stocktake: {e}")
+            raise
+
+    # -----------------------------------------------------------------
+    # Reporting
+    # -----------------------------------------------------------------
+
+    @classmethod
+    def variance_report(cls, stocktake_id, variances_only=True):
+        """Per-product variance, largest value first.
+
+        Before posting the system quantity is the live stock; afterwards it is
+        the snapshot taken when the stocktake was posted.
+        """
+        try:
+            conn, cursor = get_db()
+            cursor.execute(f"""
+                SELECT c.product_id, p.product_code, p.name,
+                       COALESCE(c.system_quantity, p.quantity_in_stock),
+                       c.counted,
+                       COALESCE(c.unit_cost, p.cost_price, p.unit_price, 0)
+                FROM ({COUNTED_PER_PRODUCT}) c
+                JOIN products p ON p.id = c.product_id
+            """, (stocktake_id,))
+            report = []
+            for product_id, code, name, system_quantity, counted, unit_cost in cursor.fetchall():
+                variance = counted - system_quantity
+                if variances_only and variance == 0:
+                    continue
+                report.append({
+                    'product_id': product_id, 'product_code': code, 'name': name,
+                    'system_quantity': system_quantity, 'counted_quantity': counted,
+                    'variance': variance, 'unit_cost': float(unit_cost or 0),
+                    'variance_value': round(variance * float(unit_cost or 0), 2)
+                })
+            cursor.close()
+            report.sort(key=lambda line: abs(line['variance_value']), reverse=True)
+            return report
+
+        except Exception as e:
+            logging.error(f"Error building stocktake variance report: {e}")
+            return []
+
+    @classmethod
+    def get_unmatched(cls, stocktake_id):
+        """Scanned codes that match no product"""
+        try:
+            conn, cursor = get_db()
+            cursor.execute("""
+                SELECT scanned_code, counted_quantity FROM stocktake_counts
+                WHERE stocktake_id = %s AND product_id IS NULL
+                ORDER BY scanned_code
+            """, (stocktake_id,))
+            unmatched = cursor.fetchall()
+            cursor.close()
+            return unmatched
+
+        except Exception as e:
+            logging.error(f"Error getting unmatched stocktake codes: {e}")
+            return []
@@ -383,7 +383,8 @@ class Supplier:
             
             valid_fields = [
                 'supplier_code', 'name', 'contact_person', 'phone', 'email', 'address',
-                'city', 'state', 'pincode', 'gst_number', 'tax_id', 'payment_terms', 'credit_limit'
+                'city', 'state', 'pincode', 'gst_number', 'tax_id', 'payment_terms', 'credit_limit',
+                'lead_time_days'
             ]
             
             for field, value in kwargs.items():
@@ -2,12 +2,17 @@
 Transaction and billing management system
 """
 from database import get_db
-from datetime import datetime
+from datetime import datetime, timedelta
 import logging
 import uuid
 from config import TAX_RATE, DISCOUNT_THRESHOLD, DISCOUNT_RATE
 from decimal import Decimal, ROUND_HALF_UP
 import mysql.connector
+from services.pricing import PricingEngine
+from services.archival import needs_archive
+from services.stock_alerts import notify_stock_change
+from services.notifications import notify_outbox, queue_sale_notifications
+from models.customer import Customer
 
 
 class Transaction:
@@ -365,7 +370,10 @@ class Transaction:
             conn.start_transaction()
             print("✅ DEBUG: Database transaction started")
             
-            amounts = cls.calculate_amounts(cart_items)
+            # Price every line and the basket once - the inserts below reuse these lines
+            priced_basket = PricingEngine.price_basket(cart_items)
+            amounts = PricingEngine.basket_amounts(priced_basket)
+            cls.validate_transaction_amounts(amounts)
             print(f"✅ DEBUG: Amounts calculated: {amounts}")
             
             transaction_number = cls.generate_transaction_number()
@@ -391,16 +399,9 @@ class Transaction:
             print(f"✅ DEBUG: Transaction inserted with ID: {transaction_id}")
             
             items_inserted = 0
-            for i, item in enumerate(cart_items):
+            for i, (item, item_amounts) in enumerate(zip(cart_items, priced_basket['lines'])):
                 try:
                     product_id = int(item['product_id'])
-                    product_discount = item.get('discount_rate', 0.0)
-                    
-                    item_amounts = cls.calculate_item_amounts(
-                        item['quantity'], 
-                        item['unit_price'], 
-                        product_discount
-                    )
                     
                     print(f"🔍 DEBUG: Processing item {i+1}/{len(cart_items)}")
                     print(f"   - Product ID: {product_id}")
@@ -500,18 +501,21 @@ class Transaction:
             # Update customer if provided
             if customer_id:
                 try:
-                    cursor.execute("""
-                        UPDATE customers SET 
-                            total_purchases = total_purchases + %s,
-                            loyalty_points = loyalty_points + %s
-                        WHERE id = %s
-                    """, (amounts['total_amount'], int(amounts['total_amount']), customer_id))
+                    Customer.record_purchases(
+                        cursor, [(customer_id, amounts['total_amount'], int(amounts['total_amount']))])
                     print(f"✅ DEBUG: Customer {customer_id} updated")
                 except Exception as customer_error:
                     print(f"⚠️ WARNING: Customer update failed: {customer_error}")
             
+            # Receipt and low-stock SMS commit (or roll back) with the sale; sent after it
+            queue_sale_notifications(cursor, [{
+                'transaction_number': transaction_number, 'customer_id': customer_id,
+                'total_amount': amounts['total_amount'], 'items': cart_items}])
+            
             conn.commit()
             print("✅ DEBUG: Database transaction committed successfully")
+            notify_stock_change(item['product_id'] for item in cart_items)
+            notify_outbox()
             
             logging.info(f"Transaction created successfully: {transaction_number} with {items_inserted} items")
             return transaction_id, transaction_number
@@ -525,13 +529,13 @@ class Transaction:
             if "data truncated" in error_msg or "1265" in str(db_error):
                 raise Exception("Data truncation error still occurring. Please verify your database column sizes have been properly updated.")
             else:
-                raise Exception(f"Database error: {str(db_error)}")
+                raise Exception(f"Database error: {str(db_error)}") from db_error
                 
         except Exception as e:
             if conn:
                 conn.rollback()
             print(f"❌ DEBUG: Transaction failed: {e}")
-            raise Exception(f"Transaction failed: {str(e)}")
+            raise Exception(f"Transaction failed: {str(e)}") from e
             
         finally:
             if cursor:
@@ -608,10 +612,15 @@ class Transaction:
         """Get daily sales summary"""
         if not date:
             date = datetime.now().date()
+        elif isinstance(date, str):
+            date = datetime.strptime(date[:10], '%Y-%m-%d').date()
+        elif isinstance(date, datetime):
+            date = date.date()
         
         try:
             conn, cursor = get_db()
             
+            # Half-open range on the raw column so idx_status_date is used
             cursor.execute("""
                 SELECT COUNT(*) as transaction_count,
                        COALESCE(SUM(subtotal), 0) as total_subtotal,
@@ -619,8 +628,9 @@ class Transaction:
                        COALESCE(SUM(tax_amount), 0) as total_tax,
                        COALESCE(SUM(total_amount), 0) as total_sales
                 FROM transactions
-                WHERE DATE(transaction_date) = %s AND payment_status = 'completed'
-            """, (date,))
+                WHERE payment_status = 'completed'
+                  AND transaction_date >= %s AND transaction_date < %s
+            """, (date, date + timedelta(days=1)))
             
             sales_data = cursor.fetchone()
             cursor.close()
@@ -648,27 +658,42 @@ class Transaction:
         }
 
     @classmethod
-    def get_sales_by_date_range(cls, from_date, to_date):
-        """Get sales data for date range"""
+    def get_sales_by_date_range(cls, from_date, to_date, include_archived=False):
+        """Get sales data for date range (include_archived also reads months moved to transactions_archive)"""
         try:
             conn, cursor = get_db()
             
-            from_date_db = datetime.strptime(from_date, '%d-%m-%Y').strftime('%Y-%m-%d')
-            to_date_db = datetime.strptime(to_date, '%d-%m-%Y').strftime('%Y-%m-%d')
-            
-            cursor.execute("""
+            from_date_db = datetime.strptime(from_date, '%d-%m-%Y').date()
+            to_date_db = datetime.strptime(to_date, '%d-%m-%Y').date() + timedelta(days=1)
+            params = (from_date_db, to_date_db)
+            
+            source = "transactions"
+            if include_archived and needs_archive(from_date_db):
+                # The date range prunes transactions_archive to the partitions it covers
+                source = """(
+                    SELECT transaction_date, payment_status, total_amount, tax_amount, discount_amount
+                    FROM transactions
+                    WHERE transaction_date >= %s AND transaction_date < %s
+                    UNION ALL
+                    SELECT transaction_date, payment_status, total_amount, tax_amount, discount_amount
+                    FROM transactions_archive
+                    WHERE transaction_date >= %s AND transaction_date < %s
+                ) AS all_transactions"""
+                params = params * 3
+            
+            cursor.execute(f"""
                 SELECT DATE(transaction_date) as sale_date,
                        SUM(total_amount) as total_sales,
                        COUNT(*) as transaction_count,
                        SUM(tax_amount) as total_tax,
                        SUM(discount_amount) as total_discount,
                        AVG(total_amount) as avg_transaction
-                FROM transactions 
-                WHERE DATE(transaction_date) BETWEEN %s AND %s 
-                  AND payment_status = 'completed'
+                FROM {source}
+                WHERE payment_status = 'completed'
+                  AND transaction_date >= %s AND transaction_date < %s
                 GROUP BY DATE(transaction_date)
                 ORDER BY sale_date
-            """, (from_date_db, to_date_db))
+            """, params)
             
             results = cursor.fetchall()
             cursor.close()
@@ -715,6 +740,7 @@ class Transaction:
             
             conn.commit()
             cursor.close()
+            notify_stock_change(product_id for product_id, _ in items_data)
             
             logging.info(f"Transaction refunded successfully: ID {transaction_id}")
             
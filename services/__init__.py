@@ -8,10 +8,16 @@ from .sms_service import SMSService
 from .call_service import CallService
 from .billing import BillingService
 from .backup import BackupService
+from .pricing import PricingEngine
+from .promotions import PromotionEngine
+from .cart import CartModel
 
 __all__ = [
     'SMSService',
     'CallService', 
     'BillingService',
-    'BackupService'
+    'BackupService',
+    'PricingEngine',
+    'PromotionEngine',
+    'CartModel'
 ]
@@ -0,0 +1,225 @@
+"""
+Archival of closed months into partitioned, compressed archive tables
+Copyright (c) 2024 [Your Name]. All rights reserved.
+
+    python -m services.archival                  # keep ARCHIVE_RETAIN_MONTHS full months live
+    python -m services.archival --retain-months 6
+"""
+import argparse
+import logging
+from datetime import date, datetime, timedelta
+from config import ARCHIVE_RETAIN_MONTHS, DB_BACKEND
+from database import get_new_connection, get_system_setting
+
+WATERMARK_KEY = 'archive_watermark'
+
+# live table -> (archive table, date column)
+ARCHIVED_TABLES = {
+    'transactions': ('transactions_archive', 'transaction_date'),
+    'transaction_items': ('transaction_items_archive', 'transaction_date'),
+    'inventory_movements': ('inventory_movements_archive', 'movement_date'),
+    'audit_logs': ('audit_logs_archive', 'created_at'),
+}
+
+TRANSACTION_COLUMNS = """id, transaction_number, customer_id, employee_id, transaction_date, transaction_type,
+    subtotal, discount_amount, tax_amount, total_amount, payment_method, payment_status,
+    cash_received, change_given, loyalty_points_earned, loyalty_points_redeemed, notes,
+    shift_id, pos_terminal, receipt_printed, created_at, updated_at"""
+
+ITEM_COLUMNS = """id, transaction_id, product_id, quantity, unit_price, original_price, discount_rate,
+    discount_amount, tax_rate, tax_amount, line_total, batch_number, expiry_date, serial_numbers, created_at"""
+ITEM_SELECT = ', '.join('ti.' + column.strip() for column in ITEM_COLUMNS.split(','))
+
+MOVEMENT_COLUMNS = """id, product_id, movement_type, quantity, reference_type, reference_id, reason,
+    employee_id, movement_date, batch_number, expiry_date, cost_per_unit, notes"""
+
+AUDIT_COLUMNS = """id, user_id, action, table_name, record_id, old_values, new_values,
+    ip_address, user_agent, created_at"""
+
+
+def get_archive_watermark():
+    """First day still held in the live tables, or None if nothing was archived yet"""
+    value = get_system_setting(WATERMARK_KEY, '')
+    if not value:
+        return None
+    return datetime.strptime(str(value)[:10], '%Y-%m-%d').date()
+
+
+def needs_archive(from_date):
+    """True if a report starting at from_date must also read the archive tables"""
+    watermark = get_archive_watermark()
+    if isinstance(from_date, datetime):
+        from_date = from_date.date()
+    return watermark is not None and from_date < watermark
+
+
+def month_start(day, months_back=0):
+    month_index = day.year * 12 + day.month - 1 - months_back
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def next_month(day):
+    return month_start(day, -1)
+
+
+class ArchiveService:
+    """Moves closed months out of the hot tables, one day per transaction.
+
+    Rows are copied into the *_archive tables and deleted from the live ones in
+    the same transaction, and the watermark advances with them, so an
+    interrupted run simply resumes from the last committed day. On MySQL each
+    month gets its own archive partition before its first day is moved.
+    """
+
+    def __init__(self, retain_months=ARCHIVE_RETAIN_MONTHS):
+        self.retain_months = retain_months
+        self.conn = None
+        self.cursor = None
+
+    def cutoff(self, today=None):
+        """First day that must stay live: the start of the oldest retained full month"""
+        return month_start(today or date.today(), self.retain_months)
+
+    def run(self, today=None):
+        """Archive every day before the cutoff; returns rows moved per live table"""
+        moved = {table: 0 for table in ARCHIVED_TABLES}
+        cutoff = self.cutoff(today)
+        self.conn = get_new_connection()
+        self.cursor = self.conn.cursor(buffered=True)
+        try:
+            day = self._first_live_day()
+            if day is None or day >= cutoff:
+                print(f"✅ Nothing to archive before {cutoff}")
+                return moved
+
+            print(f"📦 Archiving {day} .. {cutoff - timedelta(days=1)}")
+            current_month = None
+            while day < cutoff:
+                if month_start(day) != current_month:
+                    current_month = month_start(day)
+                    self._ensure_partitions(current_month)
+                for table, count in self._archive_day(day).items():
+                    moved[table] += count
+                day += timedelta(days=1)
+                if day.day == 1:
+                    print(f"   ... {current_month:%Y-%m} archived")
+
+            print(f"✅ Archived: {moved}")
+            return moved
+
+        except Exception as e:
+            print(f"❌ DEBUG: Archival stopped: {e}")
+            logging.error(f"Archival stopped: {e}")
+            raise
+        finally:
+            self.cursor.close()
+            self.conn.close()
+
+    def _first_live_day(self):
+        watermark = get_archive_watermark()
+        if watermark:
+            return watermark
+        oldest = []
+        for table, (_, date_column) in ARCHIVED_TABLES.items():
+            if table == 'transaction_items':
+                continue
+            self.cursor.execute(f"SELECT MIN({date_column}) FROM {table}")
+            value = self.cursor.fetchone()[0]
+            if value:
+                oldest.append(datetime.strptime(str(value)[:10], '%Y-%m-%d').date())
+        return min(oldest) if oldest else None
+
+    def _ensure_partitions(self, month):
+        """Split p_future so `month` gets its own partition (MySQL only; DDL commits implicitly)"""
+        if DB_BACKEND == 'sqlite':
+            return
+        name = f"p{month:%Y%m}"
+        for archive_table, _ in ARCHIVED_TABLES.values():
+            self.cursor.execute("""
+                SELECT PARTITION_NAME FROM information_schema.PARTITIONS
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+            """, (archive_table,))
+            partitions = {row[0] for row in self.cursor.fetchall() if row[0]}
+            # Not partitioned or already split; months older than the newest partition stay where they fall
+            if 'p_future' not in partitions or name in partitions:
+                continue
+            if any(p[1:].isdigit() and p > name for p in partitions):
+                continue
+            self.cursor.execute(f"""
+                ALTER TABLE {archive_table} REORGANIZE PARTITION p_future INTO (
+                    PARTITION {name} VALUES LESS THAN ('{next_month(month):%Y-%m-%d}'),
+                    PARTITION p_future VALUES LESS THAN (MAXVALUE)
+                )
+            """)
+            logging.info(f"Partition {name} added to {archive_table}")
+
+    def _archive_day(self, day):
+        start, end = day, day + timedelta(days=1)
+        window = (start, end)
+        moved = {}
+        self.conn.start_transaction()
+        try:
+            self.cursor.execute(f"""
+                INSERT INTO transaction_items_archive ({ITEM_COLUMNS}, transaction_date)
+                SELECT {ITEM_SELECT}, t.transaction_date
+                FROM transaction_items ti
+                JOIN transactions t ON t.id = ti.transaction_id
+                WHERE t.transaction_date >= %s AND t.transaction_date < %s
+            """, window)
+            moved['transaction_items'] = self.cursor.rowcount
+            self.cursor.execute(f"""
+                INSERT INTO transactions_archive ({TRANSACTION_COLUMNS})
+                SELECT {TRANSACTION_COLUMNS} FROM transactions
+                WHERE transaction_date >= %s AND transaction_date < %s
+            """, window)
+            moved['transactions'] = self.cursor.rowcount
+            self.cursor.execute(f"""
+                INSERT INTO inventory_movements_archive ({MOVEMENT_COLUMNS})
+                SELECT {MOVEMENT_COLUMNS} FROM inventory_movements
+                WHERE movement_date >= %s AND movement_date < %s
+            """, window)
+            moved['inventory_movements'] = self.cursor.rowcount
+            self.cursor.execute(f"""
+                INSERT INTO audit_logs_archive ({AUDIT_COLUMNS})
+                SELECT {AUDIT_COLUMNS} FROM audit_logs
+                WHERE created_at >= %s AND created_at < %s
+            """, window)
+            moved['audit_logs'] = self.cursor.rowcount
+
+            self.cursor.execute("""
+                DELETE FROM transaction_items WHERE transaction_id IN (
+                    SELECT id FROM transactions WHERE transaction_date >= %s AND transaction_date < %s
+                )
+            """, window)
+            self.cursor.execute("DELETE FROM transactions WHERE transaction_date >= %s AND transaction_date < %s", window)
+            self.cursor.execute("DELETE FROM inventory_movements WHERE movement_date >= %s AND movement_date < %s", window)
+            self.cursor.execute("DELETE FROM audit_logs WHERE created_at >= %s AND created_at < %s", window)
+
+            self.cursor.execute("""
+                INSERT INTO system_settings (setting_key, setting_value, data_type, description, category)
+                VALUES (%s, %s, 'string', 'Rows dated before this day are in the *_archive tables', 'maintenance')
+                ON DUPLICATE KEY UPDATE setting_value = VALUES(setting_value)
+            """, (WATERMARK_KEY, end.isoformat()))
+            self.conn.commit()
+            return moved
+
+        except Exception:
+            self.conn.rollback()
+            raise
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Move closed months into the archive tables")
+    parser.add_argument('--retain-months', type=int, default=ARCHIVE_RETAIN_MONTHS,
+                        help="full months to keep in the live tables")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    from database import DatabaseManager
+    DatabaseManager()  # make sure the archive tables exist
+    ArchiveService(args.retain_months).run()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,238 @@
+"""
+Vectorized batch repricing for open baskets and what-if scenarios
+Copyright (c) 2024 [Your Name]. All rights reserved.
+"""
+import logging
+import numpy as np
+from database import get_db
+from config import DISCOUNT_THRESHOLD, DISCOUNT_RATE
+from services.pricing import (SCALE, PERCENT_SCALE, RATE_DIVISOR, DEFAULT_TAX_RATE,
+                              PricingEngine, to_units)
+
+
+def units_array(values, scale=SCALE):
+    """Convert a column of amounts/rates to int64 units.
+
+    Float inputs must lie on the DB grid (4 decimals for money, 2 for rates) to
+    match the scalar engine exactly - the same values transaction_items holds.
+    Integer columns are treated as whole rupees / whole percents.
+    """
+    array = np.asarray(values)
+    if np.issubdtype(array.dtype, np.integer):
+        return array.astype(np.int64) * scale
+    array = np.asarray(array, dtype=np.float64)
+    array = np.where(np.isfinite(array), array, 0.0)
+    return np.rint(array * scale).astype(np.int64)
+
+
+def _mul_div_half_up(a, b, divisor):
+    """round_half_up(a * b / divisor) for non-negative int64 arrays without overflowing a * b"""
+    quotient, remainder = np.divmod(a, divisor)
+    return quotient * b + (2 * remainder * b + divisor) // (2 * divisor)
+
+
+class BatchPricer:
+    """Columnar counterpart of PricingEngine - identical rounding, one NumPy pass per column"""
+
+    @staticmethod
+    def price_units(quantity, price_units, discount_rate_units, tax_rate_units):
+        """Price int64 unit columns; returns gross, unit_price, discount_amount, tax_amount, line_total"""
+        quantity = np.asarray(quantity, dtype=np.int64)
+        price_units = np.asarray(price_units, dtype=np.int64)
+        discount_rate_units = np.broadcast_to(np.asarray(discount_rate_units, dtype=np.int64), quantity.shape)
+        tax_rate_units = np.broadcast_to(np.asarray(tax_rate_units, dtype=np.int64), quantity.shape)
+
+        valid = (quantity > 0) & (price_units > 0)
+        quantity = np.where(valid, quantity, 0)
+        price_units = np.where(valid, price_units, 0)
+
+        discount_amount = _mul_div_half_up(price_units * discount_rate_units, quantity, RATE_DIVISOR)
+        unit_price = _mul_div_half_up(price_units, RATE_DIVISOR - discount_rate_units, RATE_DIVISOR)
+        taxable = unit_price * quantity
+        tax_amount = _mul_div_half_up(taxable, tax_rate_units, RATE_DIVISOR)
+
+        return {
+            'gross': price_units * quantity,
+            'unit_price': unit_price,
+            'discount_amount': discount_amount,
+            'tax_amount': tax_amount,
+            'line_total': taxable + tax_amount
+        }
+
+    @classmethod
+    def price_columns(cls, quantity, unit_price, discount_rate=0.0, tax_rate=DEFAULT_TAX_RATE, as_units=False):
+        """Price columnar lines (quantity, unit_price, discount_rate %, tax_rate %).
+
+        Scalars broadcast across all lines. Returns a dict of arrays keyed like the
+        scalar engine; values are rupees as float64 unless as_units=True.
+        """
+        quantity = np.asarray(quantity)
+        if not np.issubdtype(quantity.dtype, np.integer):
+            quantity = np.trunc(np.asarray(quantity, dtype=np.float64))
+        quantity = quantity.astype(np.int64)
+
+        priced = cls.price_units(
+            quantity,
+            units_array(unit_price),
+            units_array(np.broadcast_to(discount_rate, quantity.shape), PERCENT_SCALE),
+            units_array(np.broadcast_to(tax_rate, quantity.shape), PERCENT_SCALE)
+        )
+        if as_units:
+            return priced
+        return {key: column / SCALE for key, column in priced.items()}
+
+    @staticmethod
+    def basket_totals(basket_ids, priced_units, apply_transaction_discount=True):
+        """Per-basket header totals from unit columns returned by price_units()/price_columns(as_units=True)"""
+        basket_ids = np.asarray(basket_ids)
+        order = np.argsort(basket_ids, kind='stable')
+        sorted_ids = basket_ids[order]
+        starts = np.flatnonzero(np.r_[True, sorted_ids[1:] != sorted_ids[:-1]]) if len(sorted_ids) else np.array([], dtype=np.int64)
+
+        def per_basket(column):
+            if not len(starts):
+                return np.zeros(0, dtype=np.int64)
+            return np.add.reduceat(np.asarray(column, dtype=np.int64)[order], starts)
+
+        subtotal = per_basket(priced_units['gross'])
+        item_discount = per_basket(priced_units['discount_amount'])
+        tax_amount = per_basket(priced_units['tax_amount'])
+
+        transaction_discount = np.zeros_like(subtotal)
+        if apply_transaction_discount:
+            effective = subtotal - item_discount
+            eligible = effective >= to_units(DISCOUNT_THRESHOLD)
+            rate = to_units(DISCOUNT_RATE, RATE_DIVISOR)
+            transaction_discount = np.where(eligible, _mul_div_half_up(effective, rate, RATE_DIVISOR), 0)
+
+        discount_amount = item_discount + transaction_discount
+        return {
+            'basket_id': sorted_ids[starts] if len(starts) else sorted_ids,
+            'subtotal': subtotal / SCALE,
+            'item_discount': item_discount / SCALE,
+            'transaction_discount': transaction_discount / SCALE,
+            'discount_amount': discount_amount / SCALE,
+            'tax_amount': tax_amount / SCALE,
+            'total_amount': (subtotal - discount_amount + tax_amount) / SCALE
+        }
+
+    @classmethod
+    def what_if(cls, columns, discount_rate=None, tax_rate=None, mask=None, as_units=False):
+        """Reprice columns with a discount and/or GST-slab override applied where mask is True.
+
+        columns needs 'quantity', 'unit_price', 'discount_rate' and 'tax_rate'
+        (e.g. from load_transaction_item_columns); mask defaults to every line.
+        """
+        quantity = np.asarray(columns['quantity'])
+        selected = np.ones(quantity.shape, dtype=bool) if mask is None else np.asarray(mask, dtype=bool)
+
+        discounts = np.asarray(columns['discount_rate'], dtype=np.float64)
+        taxes = np.asarray(columns['tax_rate'], dtype=np.float64)
+        if discount_rate is not None:
+            discounts = np.where(selected, discount_rate, discounts)
+        if tax_rate is not None:
+            taxes = np.where(selected, tax_rate, taxes)
+
+        return cls.price_columns(quantity, columns['unit_price'], discounts, taxes, as_units=as_units)
+
+    @staticmethod
+    def load_transaction_item_columns(from_date=None, to_date=None, chunk_size=50000):
+        """Load historical transaction_items as NumPy columns (dates are YYYY-MM-DD, to_date exclusive)"""
+        conditions = ["t.payment_status = 'completed'"]
+        params = []
+        if from_date:
+            conditions.append("t.transaction_date >= %s")
+            params.append(from_date)
+        if to_date:
+            conditions.append("t.transaction_date < %s")
+            params.append(to_date)
+
+        conn, cursor = get_db()
+        try:
+            cursor.execute(f"""
+                SELECT ti.transaction_id, ti.product_id, COALESCE(p.category_id, 0),
+                       ti.quantity, COALESCE(ti.original_price, ti.unit_price),
+                       ti.discount_rate, ti.tax_rate
+                FROM transaction_items ti
+                JOIN transactions t ON t.id = ti.transaction_id
+                LEFT JOIN products p ON p.id = ti.product_id
+                WHERE {' AND '.join(conditions)}
+            """, params)
+
+            chunks = []
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                chunks.append(np.array(rows, dtype=object))
+        finally:
+            cursor.close()
+
+        data = np.concatenate(chunks) if chunks else np.empty((0, 7), dtype=object)
+        columns = {
+            'transaction_id': data[:, 0].astype(np.int64),
+            'product_id': data[:, 1].astype(np.int64),
+            'category_id': data[:, 2].astype(np.int64),
+            'quantity': data[:, 3].astype(np.int64),
+            'unit_price': data[:, 4].astype(np.float64),
+            'discount_rate': data[:, 5].astype(np.float64),
+            'tax_rate': data[:, 6].astype(np.float64)
+        }
+        logging.info(f"Loaded {len(data)} transaction items for batch repricing")
+        return columns
+
+
+# =====================================================================
+# BENCHMARK UTILITIES
+# =====================================================================
+
+def benchmark_batch_pricing(lines=1_000_000, seed=42, repeat=3, verify_sample=20000):
+    """Time columnar pricing and verify it against the scalar engine on a sample"""
+    import time
+
+    rng = np.random.default_rng(seed)
+    quantity = rng.choice([1, 1, 1, 2, 2, 3, 4, 5, 6, 10, 12, 24, 48], size=lines)
+    unit_price = np.round(rng.uniform(0.5, 50000, size=lines), 4)
+    discount_rate = rng.choice([0, 0, 0, 2.5, 5, 7.5, 10, 12.5, 15, 20, 33.33], size=lines)
+    basket_ids = rng.integers(0, max(1, lines // 40), size=lines)
+
+    print(f"🔍 Benchmarking batch pricing on {lines:,} lines (seed={seed})...")
+
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        priced = BatchPricer.price_columns(quantity, unit_price, discount_rate, as_units=True)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    start = time.perf_counter()
+    baskets = BatchPricer.basket_totals(basket_ids, priced)
+    basket_time = time.perf_counter() - start
+
+    sample = rng.choice(lines, size=min(verify_sample, lines), replace=False)
+    mismatches = 0
+    keys = ('unit_price', 'discount_amount', 'tax_amount', 'line_total')
+    for i in sample:
+        expected = PricingEngine.price_line_units(
+            int(quantity[i]), to_units(float(unit_price[i])),
+            to_units(float(discount_rate[i]), PERCENT_SCALE), to_units(DEFAULT_TAX_RATE, PERCENT_SCALE))
+        if tuple(int(priced[k][i]) for k in keys) != expected:
+            mismatches += 1
+
+    results = {
+        'lines': lines,
+        'price_seconds': best,
+        'lines_per_second': lines / best if best else 0.0,
+        'baskets': len(baskets['basket_id']),
+        'basket_totals_seconds': basket_time,
+        'verified_lines': len(sample),
+        'mismatches': mismatches
+    }
+    print(f"   - price_columns: {best * 1000:.1f} ms ({results['lines_per_second']:,.0f} lines/s)")
+    print(f"   - basket_totals: {basket_time * 1000:.1f} ms for {results['baskets']:,} baskets")
+    print(f"   - scalar cross-check: {mismatches} mismatches in {len(sample):,} sampled lines")
+    return results
+
+
+if __name__ == "__main__":
+    benchmark_batch_pricing()
@@ -0,0 +1,147 @@
+"""
+Voice call campaigns - customer segment -> call queue -> line-limited dialling
+Copyright (c) 2024 [Your Name]. All rights reserved.
+
+    python -m services.call_campaigns WINBACK-0424 --segment "At Risk" --message "Hello {name}, ..."
+    python -m services.call_campaigns WINBACK-0424 --wait     # keep dialling queued calls through retries
+    python -m services.call_campaigns WINBACK-0424 --summary
+"""
+import argparse
+import logging
+from datetime import datetime
+from config import CALL_MAX_ATTEMPTS, CALL_RATE_PER_SECOND, CALL_RETRY_MINUTES, CALL_WINDOW
+from database import get_db, get_new_connection
+from services.call_service import VoiceGateway
+from services.messaging import OutboxDispatcher, enqueue_messages
+
+TARGET_CHUNK = 2000               # customers read and queued per round trip
+
+ALL_CUSTOMERS = "SELECT c.id, c.name, c.phone FROM customers c WHERE c.is_active = TRUE"
+RFM_SEGMENT = """
+    SELECT c.id, c.name, c.phone FROM customers c
+    JOIN customer_segments cs ON cs.customer_id = c.id
+    WHERE c.is_active = TRUE AND cs.segment = %s
+"""
+
+
+def parse_window(spec=CALL_WINDOW):
+    """'10:00-20:00' -> (time(10, 0), time(20, 0)); empty means any time"""
+    if not spec:
+        return None
+    start, end = (datetime.strptime(part.strip(), '%H:%M').time() for part in spec.split('-'))
+    return start, end
+
+
+def segment_query(segment=None):
+    """(sql, params) for an RFM segment from customer_segments, or every active customer"""
+    return (RFM_SEGMENT, (segment,)) if segment else (ALL_CUSTOMERS, ())
+
+
+def call_dispatcher(gateway=None, rate=CALL_RATE_PER_SECOND, window=CALL_WINDOW,
+                    backoff_base=CALL_RETRY_MINUTES * 60):
+    """OutboxDispatcher for the 'call' channel: one worker per line slot, inside the window"""
+    gateway = gateway or VoiceGateway()
+    return OutboxDispatcher(gateway, concurrency=gateway.lines.capacity, rate=rate, batch_size=1,
+                            max_attempts=CALL_MAX_ATTEMPTS, channel='call', backoff_base=backoff_base,
+                            window=parse_window(window))
+
+
+class CallCampaign:
+    """One recorded message called out to every customer a segment query returns.
+
+    segment_sql selects id, name and phone from customers (see segment_query);
+    targets are streamed from it by id in TARGET_CHUNK keyset pages and queued
+    in message_outbox with one executemany per page. Each customer is keyed
+    to the campaign, so queueing again after a crash or for a refreshed
+    segment only adds customers not already called. Dialling goes through
+    call_dispatcher(), which persists outcomes in bulk.
+    """
+
+    def __init__(self, campaign, message, segment_sql=ALL_CUSTOMERS, params=(), chunk_size=TARGET_CHUNK):
+        self.campaign = campaign
+        self.message = message
+        self.segment_sql = segment_sql
+        self.params = tuple(params)
+        self.chunk_size = chunk_size
+
+    def queue(self):
+        """Queue calls for the segment; returns (queued, skipped without a phone)"""
+        conn = get_new_connection()
+        cursor = conn.cursor(buffered=True)
+        queued = skipped = 0
+        last_id = 0
+        try:
+            while True:
+                cursor.execute(f"""
+                    SELECT seg.id, seg.name, seg.phone FROM ({self.segment_sql}) seg
+                    WHERE seg.id > %s ORDER BY seg.id LIMIT {int(self.chunk_size)}
+                """, self.params + (last_id,))
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+                calls = [(customer_id, phone, self.message.format(name=name))
+                         for customer_id, name, phone in rows if phone]
+                skipped += len(rows) - len(calls)
+                if calls:
+                    queued += enqueue_messages(calls, campaign=self.campaign, channel='call', conn=conn,
+                                               dedupe_prefix=f"call:{self.campaign}")
+        finally:
+            cursor.close()
+            conn.close()
+        print(f"✅ DEBUG: Campaign {self.campaign} - {queued} calls queued, {skipped} customers without a phone")
+        logging.info(f"Call campaign {self.campaign}: {queued} queued, {skipped} skipped")
+        return queued, skipped
+
+    def run(self, dispatcher=None, progress=None, wait=False, stop_event=None):
+        """Dial this campaign's queued calls; with wait, also through retries and closed hours"""
+        return (dispatcher or call_dispatcher()).run(campaign=self.campaign, progress=progress,
+                                                     wait_for_retries=wait, stop_event=stop_event)
+
+
+def get_call_campaign_summary(campaign):
+    """{'completed': n, 'pending': n, 'busy': n, ...}: final outcome, or status while still queued"""
+    try:
+        conn, cursor = get_db()
+        cursor.execute("""
+            SELECT status, last_error, COUNT(*) FROM message_outbox
+            WHERE channel = 'call' AND campaign = %s
+            GROUP BY status, last_error
+        """, (campaign,))
+        summary = {}
+        for status, error, count in cursor.fetchall():
+            key = 'completed' if status == 'sent' else (error if status == 'failed' and error else status)
+            summary[key] = summary.get(key, 0) + count
+        cursor.close()
+        return summary
+    except Exception as e:
+        logging.error(f"Error reading call campaign {campaign}: {e}")
+        return {}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Queue and dial a voice call campaign")
+    parser.add_argument('campaign')
+    parser.add_argument('--message', help="text read out to each customer; {name} is filled in")
+    parser.add_argument('--segment', help="RFM segment (customer_segments); default every active customer")
+    parser.add_argument('--wait', action='store_true', help="keep going through retries and outside CALL_WINDOW")
+    parser.add_argument('--summary', action='store_true', help="only print the campaign's outcomes")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if not args.summary:
+        if args.message:
+            sql, params = segment_query(args.segment)
+            CallCampaign(args.campaign, args.message, sql, params).queue()
+
+        def progress(summary):
+            print(f"   ... {summary['sent']} completed, {summary['failed']} failed, "
+                  f"{summary['retrying']} to call again")
+
+        CallCampaign(args.campaign, args.message or '').run(progress=progress, wait=args.wait)
+    print(f"📞 {args.campaign}: {get_call_campaign_summary(args.campaign)}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
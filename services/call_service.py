@@ -3,21 +3,160 @@ Voice call service for customer communication
 Copyright (c) 2024 [Your Name]. All rights reserved.
 """
 import logging
-from config import CALL_API_KEY, CALL_API_URL
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from config import CALL_API_KEY, CALL_API_URL, CALL_LINES
+from services.messaging import GatewayError
+
+PLACEHOLDER_API_KEY = 'your_call_api_key_here'
+RETRY_STATUSES = ('busy', 'no_answer')   # worth calling again later; anything else is final
+
+
+def parse_lines(spec=CALL_LINES):
+    """'SUPERMART:4,SUPERMART2:2' -> {caller_id: max concurrent calls}"""
+    lines = {}
+    for part in spec.split(','):
+        caller_id, _, limit = part.strip().partition(':')
+        if caller_id:
+            lines[caller_id] = max(int(limit or 1), 1)
+    return lines or {'SUPERMART': 1}
+
+
+class LinePool:
+    """Outbound caller lines, each with its own limit on calls in progress.
+
+    acquire() blocks until some line has room and picks the least busy one,
+    so a pool wider than the lines' total capacity still never over-dials.
+    """
+
+    def __init__(self, lines):
+        self.limits = dict(lines)
+        self._busy = {caller_id: 0 for caller_id in self.limits}
+        self._free = threading.Condition()
+
+    @property
+    def capacity(self):
+        return sum(self.limits.values())
+
+    def acquire(self):
+        with self._free:
+            while True:
+                spare = {caller_id: self.limits[caller_id] - busy for caller_id, busy in self._busy.items()}
+                caller_id = max(spare, key=spare.get)
+                if spare[caller_id] > 0:
+                    self._busy[caller_id] += 1
+                    return caller_id
+                self._free.wait()
+
+    def release(self, caller_id):
+        with self._free:
+            self._busy[caller_id] -= 1
+            self._free.notify()
+
+
+class VoiceAPI:
+    """JSON client for the voice provider; one POST places one call and returns when it ends.
+
+    Request:  {"api_key", "caller_id", "to", "message", "voice"}
+    Response: {"call_id", "status": "completed" | "busy" | "no_answer" | "failed", "error"}
+    """
+
+    def __init__(self, url=CALL_API_URL, api_key=CALL_API_KEY, pool_size=4, timeout=300):
+        self.url = url
+        self.api_key = api_key
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(pool_size, 1))
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def call(self, to, message, caller_id, voice_type="female"):
+        """(status, call_id, error)"""
+        payload = {'api_key': self.api_key, 'caller_id': caller_id, 'to': to,
+                   'message': message, 'voice': voice_type}
+        try:
+            response = self.session.post(self.url, json=payload, timeout=self.timeout)
+        except requests.RequestException as e:
+            raise GatewayError(f"{type(e).__name__}: {e}")
+        if response.status_code == 429 or response.status_code >= 500:
+            raise GatewayError(f"HTTP {response.status_code}")
+        if response.status_code >= 400:
+            raise GatewayError(f"HTTP {response.status_code}: {response.text[:200]}", retryable=False)
+        result = response.json()
+        return result.get('status', 'failed'), result.get('call_id'), result.get('error')
+
+
+class LogOnlyVoiceAPI:
+    """Stand-in used until a call API key is configured: logs every call as completed"""
+
+    def call(self, to, message, caller_id, voice_type="female"):
+        logging.info(f"Voice call made to {to} from {caller_id}: {message}")
+        return 'completed', None, None
+
+
+def default_voice_api(pool_size=4):
+    """The configured voice provider, or LogOnlyVoiceAPI while CALL_API_KEY is unset"""
+    if not CALL_API_KEY or CALL_API_KEY == PLACEHOLDER_API_KEY:
+        return LogOnlyVoiceAPI()
+    return VoiceAPI(pool_size=pool_size)
+
+
+class VoiceGateway:
+    """Outbox gateway for the 'call' channel: one call per message, on a free caller line.
+
+    Busy and unanswered calls come back as retryable, so the dispatcher
+    tries them again after its backoff.
+    """
+
+    def __init__(self, api=None, lines=None):
+        self.lines = LinePool(lines or parse_lines())
+        self.api = api or default_voice_api(self.lines.capacity)
+
+    def send(self, messages):
+        """messages: [(ref, to, text)] -> {ref: (completed, call_id, error, retryable)}"""
+        results = {}
+        for ref, to, text in messages:
+            caller_id = self.lines.acquire()
+            try:
+                status, call_id, error = self.api.call(to, text, caller_id)
+            finally:
+                self.lines.release(caller_id)
+            if status == 'completed':
+                results[ref] = (True, call_id, None, False)
+            else:
+                results[ref] = (False, call_id, status if status in RETRY_STATUSES else (error or status),
+                                status in RETRY_STATUSES)
+        return results
+
 
 class CallService:
     @staticmethod
     def make_call(phone_number, message_text, voice_type="female"):
-        """Make automated voice call to customer"""
+        """Make one automated voice call now; campaigns go through services.call_campaigns"""
         try:
-            logging.info(f"Voice call made to {phone_number}: {message_text}")
-            return True  # Mock success
+            caller_id = next(iter(parse_lines()))
+            status, _, error = default_voice_api().call(phone_number, message_text, caller_id, voice_type)
+            if status != 'completed':
+                logging.warning(f"Call to {phone_number} not completed: {error or status}")
+            return status == 'completed'
         except Exception as e:
             logging.error(f"Error making call: {e}")
             return False
-    
+
     @staticmethod
     def call_customer_for_payment_reminder(phone_number, customer_name, amount_due):
         """Call customer for payment reminder"""
         message = f"Hello {customer_name}, this is a friendly reminder about your outstanding payment of ${amount_due:.2f}."
         return CallService.make_call(phone_number, message)
+
+    @staticmethod
+    def call_customer_for_promotion(phone_number, customer_name, promotion_details):
+        """Call customer with promotional offer"""
+        message = f"Hello {customer_name}, we have a special offer for you: {promotion_details}. Visit us today!"
+        return CallService.make_call(phone_number, message)
+
+    @staticmethod
+    def emergency_call_notification(phone_number, emergency_message):
+        """Make emergency notification call"""
+        return CallService.make_call(phone_number, emergency_message, voice_type="urgent")
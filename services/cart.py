@@ -0,0 +1,128 @@
+"""
+Incremental cart model for the billing till
+Copyright (c) 2024 [Your Name]. All rights reserved.
+"""
+from services.pricing import PERCENT_SCALE, RATE_DIVISOR, from_units, to_units, div_half_up
+
+
+class CartModel:
+    """Cart lines keyed by product with running totals.
+
+    Each line is a dict with the keys the billing panel already uses (product_id,
+    category_id, name, unit_price, quantity, disc, gst) plus the cached stock level
+    and its own computed amounts. A change reprices only the touched line and
+    moves the basket totals by that line's delta, so the cost of an edit does not
+    grow with the size of the basket. Totals are held in integer pricing units to
+    avoid drift from repeated add/subtract.
+    """
+
+    def __init__(self):
+        self._lines = {}
+        self._subtotal = 0
+        self._discount = 0
+        self._tax = 0
+
+    # ─────────────────────────────────────────────── line access ─
+    def __len__(self):
+        return len(self._lines)
+
+    def __bool__(self):
+        return bool(self._lines)
+
+    def __iter__(self):
+        return iter(list(self._lines.values()))
+
+    def __contains__(self, product_id):
+        return product_id in self._lines
+
+    def get(self, product_id):
+        return self._lines.get(product_id)
+
+    def items(self):
+        """Lines in the order they were scanned"""
+        return list(self._lines.values())
+
+    # ─────────────────────────────────────────────── mutations ─
+    def add_product(self, prod, qty=1):
+        """Add a Product (or bump its quantity); returns the line"""
+        line = self._lines.get(prod.id)
+        if line:
+            line['stock'] = prod.quantity_in_stock
+            return self.set_quantity(prod.id, line['quantity'] + qty)
+        return self.add_line({
+            'product_id': prod.id,
+            'category_id': prod.category_id,
+            'name':       prod.name,
+            'unit_price': float(prod.unit_price),
+            'quantity':   qty,
+            'disc':       float(prod.discount_rate or 0),
+            'gst':        float(prod.tax_rate       or 18),
+            'stock':      prod.quantity_in_stock
+        })
+
+    def add_line(self, line):
+        """Insert a prepared line dict (also used to restore held carts)"""
+        line = dict(line)
+        line.setdefault('stock', None)
+        self._price(line)
+        self._lines[line['product_id']] = line
+        self._apply(line, 1)
+        return line
+
+    def set_quantity(self, product_id, quantity):
+        return self._update(product_id, quantity=quantity)
+
+    def set_discount(self, product_id, discount):
+        return self._update(product_id, disc=discount)
+
+    def remove(self, product_id):
+        line = self._lines.pop(product_id, None)
+        if line:
+            self._apply(line, -1)
+        return line
+
+    def clear(self):
+        self._lines.clear()
+        self._subtotal = self._discount = self._tax = 0
+
+    def _update(self, product_id, **changes):
+        line = self._lines[product_id]
+        self._apply(line, -1)
+        line.update(changes)
+        self._price(line)
+        self._apply(line, 1)
+        return line
+
+    # ─────────────────────────────────────────────── pricing ─
+    @staticmethod
+    def _price(line):
+        """Cache the line's subtotal, discount, GST and total (in pricing units)"""
+        sub = int(line['quantity']) * to_units(line['unit_price'])
+        less = div_half_up(sub * to_units(line['disc'], PERCENT_SCALE), RATE_DIVISOR)
+        gst = div_half_up((sub - less) * to_units(line['gst'], PERCENT_SCALE), RATE_DIVISOR)
+        line['_amounts'] = (sub, less, gst)
+        line['line_total'] = from_units(sub - less + gst)
+
+    def _apply(self, line, sign):
+        sub, less, gst = line['_amounts']
+        self._subtotal += sign * sub
+        self._discount += sign * less
+        self._tax += sign * gst
+
+    # ─────────────────────────────────────────────── totals ─
+    @property
+    def subtotal(self):
+        return from_units(self._subtotal)
+
+    @property
+    def item_discount(self):
+        return from_units(self._discount)
+
+    @property
+    def tax(self):
+        return from_units(self._tax)
+
+    @property
+    def total(self):
+        """Total before order-level (promotion) discounts"""
+        return from_units(self._subtotal - self._discount + self._tax)
@@ -0,0 +1,169 @@
+"""
+Phone normalization and the in-process phone -> customer map used at the till
+Copyright (c) 2024 [Your Name]. All rights reserved.
+"""
+import logging
+import re
+import threading
+from config import DEFAULT_COUNTRY_CODE
+from database import get_db
+
+SUFFIX_DIGITS = 6
+MIN_SUFFIX_DIGITS = 4
+
+
+def normalize_phone(raw, country_code=DEFAULT_COUNTRY_CODE):
+    """E.164 form of a phone number ('+919876543210'), or None if it cannot be one.
+
+    Spaces, dashes and brackets are ignored; numbers without a country code
+    get country_code, and a national trunk '0' or an international '00'
+    prefix is dropped.
+    """
+    if raw is None:
+        return None
+    text = str(raw).strip()
+    digits = re.sub(r'\D', '', text)
+    if not digits:
+        return None
+    if not text.startswith('+'):
+        if digits.startswith('00'):
+            digits = digits[2:]
+        elif digits.startswith('0'):
+            digits = country_code + digits.lstrip('0')
+        elif not (len(digits) > 10 and digits.startswith(country_code)):
+            digits = country_code + digits
+    if not 8 <= len(digits) <= 15:
+        return None
+    return '+' + digits
+
+
+class CustomerPhoneIndex:
+    """Active customers keyed by E.164 number and by the last six digits.
+
+    Loaded with one query on first use and kept current by refresh() from the
+    Customer model, so attaching a customer at checkout is a dictionary lookup.
+    A full number matches exactly; 4-6 digits match as a suffix (at most 100
+    probes of the suffix map). Loading also backfills phone_e164 for rows
+    created before the column existed.
+    """
+
+    def __init__(self):
+        self._by_number = {}     # e164 -> customer_id
+        self._by_suffix = {}     # last SUFFIX_DIGITS digits -> [customer_id, ...]
+        self._customers = {}     # customer_id -> (name, phone, e164)
+        self._lock = threading.Lock()
+        self.loaded = False
+
+    def load(self):
+        conn, cursor = get_db()
+        try:
+            cursor.execute("SELECT id, name, phone, phone_e164, is_active FROM customers")
+            rows = cursor.fetchall()
+
+            taken = {row[3] for row in rows if row[3]}
+            backfill = []
+            for i, (customer_id, name, phone, e164, is_active) in enumerate(rows):
+                if e164 or not phone:
+                    continue
+                e164 = normalize_phone(phone)
+                if e164 is None or e164 in taken:
+                    logging.warning(f"Customer {customer_id}: phone '{phone}' not indexed (invalid or duplicate)")
+                    continue
+                taken.add(e164)
+                backfill.append((e164, customer_id))
+                rows[i] = (customer_id, name, phone, e164, is_active)
+            if backfill:
+                cursor.executemany("UPDATE customers SET phone_e164 = %s WHERE id = %s", backfill)
+                conn.commit()
+                print(f"✅ DEBUG: Normalized {len(backfill)} customer phone numbers")
+        finally:
+            cursor.close()
+
+        with self._lock:
+            self._by_number, self._by_suffix, self._customers = {}, {}, {}
+            for customer_id, name, phone, e164, is_active in rows:
+                if is_active and e164:
+                    self._add(customer_id, name, phone, e164)
+            self.loaded = True
+        logging.info(f"Customer phone index loaded: {len(self._customers)} customers")
+
+    def _add(self, customer_id, name, phone, e164):
+        self._customers[customer_id] = (name, phone, e164)
+        self._by_number[e164] = customer_id
+        self._by_suffix.setdefault(e164[-SUFFIX_DIGITS:], []).append(customer_id)
+
+    def _discard(self, customer_id):
+        entry = self._customers.pop(customer_id, None)
+        if entry is None:
+            return
+        e164 = entry[2]
+        if self._by_number.get(e164) == customer_id:
+            del self._by_number[e164]
+        ids = self._by_suffix.get(e164[-SUFFIX_DIGITS:], [])
+        if customer_id in ids:
+            ids.remove(customer_id)
+            if not ids:
+                del self._by_suffix[e164[-SUFFIX_DIGITS:]]
+
+    def refresh(self, customer_ids):
+        """Re-read the given customers after a create, update or delete"""
+        customer_ids = sorted({int(cid) for cid in customer_ids if cid})
+        if not customer_ids or not self.loaded:
+            return
+        conn, cursor = get_db()
+        try:
+            cursor.execute(f"""
+                SELECT id, name, phone, phone_e164, is_active FROM customers
+                WHERE id IN ({', '.join(['%s'] * len(customer_ids))})
+            """, customer_ids)
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+
+        with self._lock:
+            for customer_id in customer_ids:
+                self._discard(customer_id)
+            for customer_id, name, phone, e164, is_active in rows:
+                if is_active and e164:
+                    self._add(customer_id, name, phone, e164)
+
+    def lookup(self, text):
+        """(customer_id, name, phone) matches for a full number or a 4-6 digit suffix"""
+        if not self.loaded:
+            self.load()
+        text = str(text).strip()
+        digits = re.sub(r'\D', '', text)
+        with self._lock:
+            if MIN_SUFFIX_DIGITS <= len(digits) <= SUFFIX_DIGITS and not text.startswith('+'):
+                width = SUFFIX_DIGITS - len(digits)
+                ids = []
+                for prefix in range(10 ** width):
+                    key = f"{prefix:0{width}d}{digits}" if width else digits
+                    ids.extend(self._by_suffix.get(key, ()))
+            else:
+                customer_id = self._by_number.get(normalize_phone(text))
+                ids = [customer_id] if customer_id else []
+            matches = [(customer_id,) + self._customers[customer_id][:2] for customer_id in ids]
+        return sorted(matches, key=lambda match: match[1] or '')
+
+    def __len__(self):
+        return len(self._customers)
+
+
+_index = None
+
+
+def get_phone_index():
+    """Process-wide index shared by the Customer model and the till"""
+    global _index
+    if _index is None:
+        _index = CustomerPhoneIndex()
+    return _index
+
+
+def notify_customer_change(customer_ids):
+    """Called after customer rows are committed; never raises"""
+    try:
+        get_phone_index().refresh(customer_ids)
+    except Exception as e:
+        logging.error(f"Customer phone index update failed: {e}")
@@ -0,0 +1,277 @@
+"""
+Vectorized demand forecasting and reorder-point calculation
+Copyright (c) 2024 [Your Name]. All rights reserved.
+
+    python -m services.forecasting              # recompute reorder_level/min_stock_level for every SKU
+    python -m services.forecasting --dry-run    # show the changes only
+    python -m services.forecasting --benchmark  # synthetic 100k-SKU fit, no database
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from statistics import NormalDist
+import numpy as np
+from config import FORECAST_HISTORY_DAYS, FORECAST_SERVICE_LEVEL, DEFAULT_LEAD_TIME_DAYS
+from database import get_new_connection
+
+SEASON = 7                                  # weekly seasonality
+INIT_DAYS = 2 * SEASON                      # history used to seed level and seasonal indices
+SMOOTHING_ALPHAS = (0.05, 0.1, 0.2, 0.3, 0.5)
+SEASONAL_GAMMA = 0.1
+CHUNK_SKUS = 20000                          # rows per worker task
+UPDATE_BATCH = 1000                         # products per bulk UPDATE statement
+
+
+def fit_seasonal_smoothing(sales, alphas=SMOOTHING_ALPHAS, gamma=SEASONAL_GAMMA, horizon=28):
+    """Additive exponential smoothing with weekly seasonality, fitted for every SKU at once.
+
+    sales is an (n_sku, n_days) array of units sold per day. Each alpha is run in
+    parallel along a leading axis and every SKU keeps the alpha with the lowest
+    one-step-ahead squared error. Returns (forecast (n_sku, horizon), sigma (n_sku,)),
+    sigma being the standard deviation of those one-step errors.
+    """
+    sales = np.asarray(sales, dtype=np.float64)
+    n_sku, n_days = sales.shape
+    if n_days < INIT_DAYS + SEASON:
+        raise ValueError(f"Need at least {INIT_DAYS + SEASON} days of history, got {n_days}")
+
+    alpha = np.asarray(alphas, dtype=np.float64)[:, None]
+    seed = sales[:, :INIT_DAYS]
+    level0 = seed.mean(axis=1)
+    season0 = seed.reshape(n_sku, INIT_DAYS // SEASON, SEASON).mean(axis=1) - level0[:, None]
+
+    level = np.repeat(level0[None, :], len(alphas), axis=0)
+    season = np.repeat(season0[None, :, :], len(alphas), axis=0)
+    sse = np.zeros_like(level)
+
+    for t in range(INIT_DAYS, n_days):
+        slot = t % SEASON
+        observed = sales[:, t]
+        seasonal = season[:, :, slot]
+        error = observed - (level + seasonal)
+        sse += error * error
+        level_next = alpha * (observed - seasonal) + (1.0 - alpha) * level
+        season[:, :, slot] = gamma * (observed - level_next) + (1.0 - gamma) * seasonal
+        level = level_next
+
+    best = sse.argmin(axis=0)
+    rows = np.arange(n_sku)
+    level = level[best, rows]
+    season = season[best, rows, :]
+    sigma = np.sqrt(sse[best, rows] / (n_days - INIT_DAYS))
+
+    slots = (n_days + np.arange(horizon)) % SEASON
+    forecast = np.clip(level[:, None] + season[:, slots], 0.0, None)
+    return forecast, sigma
+
+
+def reorder_points(forecast, sigma, lead_time_days, service_level=FORECAST_SERVICE_LEVEL):
+    """Reorder point = forecast demand over the lead time + safety stock.
+
+    Safety stock is z * sigma * sqrt(lead time) for the service level's z.
+    Returns integer (reorder_level, safety_stock) arrays.
+    """
+    lead = np.clip(np.asarray(lead_time_days, dtype=np.int64), 1, forecast.shape[1])
+    lead_demand = np.cumsum(forecast, axis=1)[np.arange(len(lead)), lead - 1]
+    z = NormalDist().inv_cdf(service_level)
+    safety = z * sigma * np.sqrt(lead)
+    return np.ceil(lead_demand + safety).astype(np.int64), np.ceil(safety).astype(np.int64)
+
+
+def _fit_chunk(args):
+    """Worker entry point: fit one block of SKUs and return its reorder points"""
+    sales, lead_time_days, service_level, horizon = args
+    forecast, sigma = fit_seasonal_smoothing(sales, horizon=horizon)
+    return reorder_points(forecast, sigma, lead_time_days, service_level)
+
+
+def compute_reorder_points(sales, lead_time_days, service_level=FORECAST_SERVICE_LEVEL, workers=None):
+    """Fit all SKUs, in a spawn process pool when the catalog is large enough to pay for it"""
+    horizon = int(max(np.max(lead_time_days, initial=1), 1))
+    chunks = [(sales[i:i + CHUNK_SKUS], lead_time_days[i:i + CHUNK_SKUS], service_level, horizon)
+              for i in range(0, len(sales), CHUNK_SKUS)]
+    if workers is None:
+        workers = min(len(chunks), os.cpu_count() or 1)
+    if workers <= 1 or len(chunks) <= 1:
+        results = [_fit_chunk(chunk) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            results = list(pool.map(_fit_chunk, chunks))
+    if not results:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    return (np.concatenate([reorder for reorder, _ in results]),
+            np.concatenate([safety for _, safety in results]))
+
+
+class DemandForecaster:
+    """Batch job: daily sales -> per-SKU forecast -> reorder_level/min_stock_level"""
+
+    def __init__(self, history_days=FORECAST_HISTORY_DAYS, service_level=FORECAST_SERVICE_LEVEL,
+                 default_lead_time=DEFAULT_LEAD_TIME_DAYS, min_history_days=INIT_DAYS, workers=None):
+        self.history_days = max(history_days, INIT_DAYS + SEASON)
+        self.service_level = service_level
+        self.default_lead_time = default_lead_time
+        self.min_history_days = min_history_days
+        self.workers = workers
+
+    def load(self, cursor, end_date=None):
+        """Returns (product_ids, lead_times, current levels, sales matrix) for active products"""
+        end_date = end_date or date.today()
+        start_date = end_date - timedelta(days=self.history_days)
+
+        cursor.execute("""
+            SELECT p.id, COALESCE(s.lead_time_days, %s), p.reorder_level, p.min_stock_level
+            FROM products p
+            LEFT JOIN suppliers s ON s.id = p.supplier_id
+            WHERE p.is_active = TRUE
+            ORDER BY p.id
+        """, (self.default_lead_time,))
+        catalog = cursor.fetchall()
+        product_ids = np.array([row[0] for row in catalog], dtype=np.int64)
+        lead_times = np.array([row[1] or self.default_lead_time for row in catalog], dtype=np.int64)
+        current = np.array([(row[2] or 0, row[3] or 0) for row in catalog], dtype=np.int64).reshape(-1, 2)
+
+        # Completed sales only; the date range uses idx_status_date
+        cursor.execute("""
+            SELECT ti.product_id, DATE(t.transaction_date), SUM(ti.quantity)
+            FROM transactions t
+            JOIN transaction_items ti ON ti.transaction_id = t.id
+            WHERE t.payment_status = 'completed' AND t.transaction_type = 'sale'
+              AND t.transaction_date >= %s AND t.transaction_date < %s
+            GROUP BY ti.product_id, DATE(t.transaction_date)
+        """, (start_date, end_date))
+        daily = cursor.fetchall()
+
+        sales = np.zeros((len(product_ids), self.history_days), dtype=np.float64)
+        if daily and len(product_ids):
+            sold_ids = np.array([row[0] for row in daily], dtype=np.int64)
+            days = (np.array([str(row[1])[:10] for row in daily], dtype='datetime64[D]')
+                    - np.datetime64(start_date, 'D')).astype(np.int64)
+            quantity = np.array([float(row[2]) for row in daily])
+            rows = np.searchsorted(product_ids, sold_ids)
+            known = (rows < len(product_ids)) & (product_ids[np.minimum(rows, len(product_ids) - 1)] == sold_ids)
+            np.add.at(sales, (rows[known], days[known]), quantity[known])
+        return product_ids, lead_times, current, sales
+
+    def run(self, dry_run=False, end_date=None):
+        """Recompute and (unless dry_run) bulk-update reorder levels; returns a summary dict"""
+        timings = {}
+        conn = get_new_connection()
+        cursor = conn.cursor(buffered=True)
+        try:
+            started = time.perf_counter()
+            product_ids, lead_times, current, sales = self.load(cursor, end_date)
+            timings['load_s'] = time.perf_counter() - started
+
+            # SKUs that started selling recently have too little history to fit
+            has_sales = sales.any(axis=1)
+            first_sale = np.where(has_sales, sales.argmax(axis=1), sales.shape[1])
+            eligible = has_sales & (sales.shape[1] - first_sale >= self.min_history_days)
+
+            started = time.perf_counter()
+            reorder, safety = compute_reorder_points(sales[eligible], lead_times[eligible],
+                                                     self.service_level, self.workers)
+            timings['fit_s'] = time.perf_counter() - started
+
+            ids = product_ids[eligible]
+            changed = (reorder != current[eligible, 0]) | (safety != current[eligible, 1])
+            updates = list(zip(ids[changed].tolist(), reorder[changed].tolist(), safety[changed].tolist()))
+
+            started = time.perf_counter()
+            if updates and not dry_run:
+                self.apply(conn, cursor, updates)
+            timings['update_s'] = time.perf_counter() - started
+
+            summary = {
+                'skus': len(product_ids),
+                'eligible': int(eligible.sum()),
+                'changed': len(updates),
+                'applied': not dry_run,
+                'timings': timings,
+                'sample': updates[:10]
+            }
+            logging.info(f"Demand forecast: {summary['eligible']}/{summary['skus']} SKUs fitted, "
+                         f"{summary['changed']} reorder levels changed")
+            return summary
+
+        except Exception as e:
+            print(f"❌ DEBUG: Demand forecast failed: {e}")
+            logging.error(f"Demand forecast failed: {e}")
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+
+    @staticmethod
+    def apply(conn, cursor, updates):
+        """Write all (product_id, reorder_level, min_stock_level) in one transaction"""
+        conn.start_transaction()
+        try:
+            for i in range(0, len(updates), UPDATE_BATCH):
+                batch = updates[i:i + UPDATE_BATCH]
+                reorder_cases = ' '.join('WHEN %s THEN %s' for _ in batch)
+                safety_cases = ' '.join('WHEN %s THEN %s' for _ in batch)
+                params = [value for product_id, reorder, _ in batch for value in (product_id, reorder)]
+                params += [value for product_id, _, safety in batch for value in (product_id, safety)]
+                params += [product_id for product_id, _, _ in batch]
+                cursor.execute(f"""
+                    UPDATE products
+                    SET reorder_level = CASE id {reorder_cases} END,
+                        min_stock_level = CASE id {safety_cases} END
+                    WHERE id IN ({', '.join(['%s'] * len(batch))})
+                """, params)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        # Thresholds moved across the whole catalog, so rebuild the alerts once
+        from services.stock_alerts import get_alert_engine
+        get_alert_engine().start(conn=conn)
+
+
+def benchmark_forecast(skus=100000, days=FORECAST_HISTORY_DAYS, workers=None, seed=42):
+    """Time the fit on synthetic Poisson demand with a weekly pattern (no database)"""
+    rng = np.random.default_rng(seed)
+    weekly = np.array([0.8, 0.9, 0.9, 1.0, 1.1, 1.4, 1.3])
+    base = rng.gamma(1.5, 2.0, size=(skus, 1))
+    sales = rng.poisson(base * weekly[np.arange(days) % SEASON]).astype(np.float64)
+    lead_times = rng.integers(2, 15, size=skus)
+
+    started = time.perf_counter()
+    reorder, safety = compute_reorder_points(sales, lead_times, workers=workers)
+    elapsed = time.perf_counter() - started
+    print(f"📈 Forecast {skus:,} SKUs x {days} days: {elapsed:.2f}s "
+          f"(median reorder level {int(np.median(reorder))}, safety stock {int(np.median(safety))})")
+    return {'skus': skus, 'days': days, 'seconds': elapsed}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recompute reorder levels from demand forecasts")
+    parser.add_argument('--dry-run', action='store_true', help="compute and report without updating products")
+    parser.add_argument('--workers', type=int, help="process pool size (default: CPU count)")
+    parser.add_argument('--history-days', type=int, default=FORECAST_HISTORY_DAYS)
+    parser.add_argument('--benchmark', action='store_true', help="time a synthetic 100k-SKU fit instead")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if args.benchmark:
+        benchmark_forecast(workers=args.workers)
+        return 0
+
+    summary = DemandForecaster(history_days=args.history_days, workers=args.workers).run(dry_run=args.dry_run)
+    print(f"✅ {summary['eligible']}/{summary['skus']} SKUs fitted, {summary['changed']} reorder levels "
+          f"{'would change' if args.dry_run else 'updated'} "
+          f"(load {summary['timings']['load_s']:.2f}s, fit {summary['timings']['fit_s']:.2f}s, "
+          f"update {summary['timings']['update_s']:.2f}s)")
+    for product_id, reorder, safety in summary['sample']:
+        print(f"   product {product_id}: reorder level {reorder}, min stock {safety}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
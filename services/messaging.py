@@ -0,0 +1,480 @@
+"""
+Outbound message queue - persisted outbox, rate-limited concurrent dispatch
+Copyright (c) 2024 [Your Name]. All rights reserved.
+
+    python -m services.messaging                  # send everything due in message_outbox
+    python -m services.messaging --wait-retries   # ...and keep going until retries are exhausted
+"""
+import argparse
+import logging
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+import requests
+from requests.adapters import HTTPAdapter
+from config import (SMS_API_KEY, SMS_API_URL, SMS_BATCH_SIZE, SMS_CONCURRENCY, SMS_MAX_ATTEMPTS,
+                    SMS_RATE_PER_SECOND)
+from database import get_db, get_new_connection
+
+PLACEHOLDER_API_KEY = 'your_sms_api_key_here'
+ENQUEUE_BATCH = 5000              # rows per executemany into message_outbox
+CLAIM_BATCHES = 2                 # rows claimed at a time, in gateway requests per sender thread
+BACKOFF_BASE_SECONDS = 30         # first retry after 15-30s, doubling per attempt
+BACKOFF_MAX_SECONDS = 3600
+STALE_SENDING_MINUTES = 15        # 'sending' rows this old were orphaned by a crashed dispatcher
+CHANNELS = ('sms', 'call')
+SALE_CAMPAIGNS = ('receipt', 'low_stock')   # what a sale queues; tills drain only these
+
+
+def _campaign_filter(campaign):
+    """SQL condition and params for one campaign name or a tuple of them (None: all)"""
+    if not campaign:
+        return "", []
+    if isinstance(campaign, str):
+        return "AND campaign = %s", [campaign]
+    return f"AND campaign IN ({', '.join(['%s'] * len(campaign))})", list(campaign)
+
+
+class GatewayError(Exception):
+    """A whole request failed; retryable for timeouts, 429 and 5xx"""
+
+    def __init__(self, message, retryable=True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled at `rate` per second, holding at most `burst`.
+
+    acquire() reserves tokens immediately and sleeps off any deficit, so
+    callers are served in order and a batch larger than the bucket just
+    waits longer instead of being refused.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst if burst is not None else max(self.rate, 1.0))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+
+
+class SMSGateway:
+    """JSON client for the SMS provider; one POST carries one or more messages.
+
+    Request:  {"api_key", "sender_id", "messages": [{"ref", "to", "text"}, ...]}
+    Response: {"results": [{"ref", "status": "accepted" | "rejected", "message_id", "error"}, ...]}
+    Connections are pooled per dispatcher thread count.
+    """
+
+    def __init__(self, url=SMS_API_URL, api_key=SMS_API_KEY, sender_id="SUPERMART",
+                 pool_size=SMS_CONCURRENCY, timeout=10):
+        self.url = url
+        self.api_key = api_key
+        self.sender_id = sender_id
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(pool_size, 1))
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def send(self, messages):
+        """messages: [(ref, to, text)] -> {ref: (accepted, message_id, error)}"""
+        payload = {
+            'api_key': self.api_key,
+            'sender_id': self.sender_id,
+            'messages': [{'ref': ref, 'to': to, 'text': text} for ref, to, text in messages]
+        }
+        try:
+            response = self.session.post(self.url, json=payload, timeout=self.timeout)
+        except requests.RequestException as e:
+            raise GatewayError(f"{type(e).__name__}: {e}")
+        if response.status_code == 429 or response.status_code >= 500:
+            raise GatewayError(f"HTTP {response.status_code}")
+        if response.status_code >= 400:
+            raise GatewayError(f"HTTP {response.status_code}: {response.text[:200]}", retryable=False)
+
+        results = {}
+        for result in response.json().get('results', []):
+            accepted = result.get('status') == 'accepted'
+            results[result.get('ref')] = (accepted, result.get('message_id'),
+                                          None if accepted else result.get('error', 'rejected'))
+        return results
+
+
+class LogOnlyGateway:
+    """Stand-in used until an SMS API key is configured: logs and accepts every message"""
+
+    def send(self, messages):
+        for ref, to, text in messages:
+            logging.info(f"SMS sent to {to}: {text}")
+        return {ref: (True, None, None) for ref, _, _ in messages}
+
+
+def default_gateway(sender_id="SUPERMART"):
+    """The configured SMS provider, or LogOnlyGateway while SMS_API_KEY is unset"""
+    if not SMS_API_KEY or SMS_API_KEY == PLACEHOLDER_API_KEY:
+        return LogOnlyGateway()
+    return SMSGateway(sender_id=sender_id)
+
+
+def gateway_for(channel):
+    """Default gateway for an outbox channel"""
+    if channel == 'call':
+        from services.call_service import VoiceGateway
+        return VoiceGateway()
+    return default_gateway()
+
+
+def enqueue_messages(messages, campaign=None, channel='sms', conn=None, dedupe_prefix=None):
+    """Queue (customer_id, recipient, text) rows in message_outbox; returns the number queued.
+
+    With dedupe_prefix, rows are keyed '<prefix>:<customer_id>' and customers
+    already queued under that key are skipped, so a re-run queues only the rest.
+    """
+    if conn is None:
+        conn, cursor = get_db()
+    else:
+        cursor = conn.cursor(buffered=True)
+    now = datetime.now()
+    queued = 0
+    try:
+        conn.start_transaction()
+        batch = []
+        for customer_id, recipient, text in messages:
+            dedupe_key = f"{dedupe_prefix}:{customer_id}" if dedupe_prefix else None
+            batch.append((channel, campaign, customer_id, recipient, text, now, dedupe_key))
+            if len(batch) >= ENQUEUE_BATCH:
+                queued += _insert_outbox(cursor, batch, ignore=bool(dedupe_prefix))
+                batch = []
+        if batch:
+            queued += _insert_outbox(cursor, batch, ignore=bool(dedupe_prefix))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    logging.info(f"Queued {queued} {channel} messages" + (f" for campaign {campaign}" if campaign else ""))
+    return queued
+
+
+def _insert_outbox(cursor, rows, ignore=False):
+    cursor.executemany(f"""
+        INSERT {'IGNORE ' if ignore else ''}INTO message_outbox (channel, campaign, customer_id, recipient,
+                                                               message, next_attempt_at, dedupe_key)
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
+    """, rows)
+    return cursor.rowcount if ignore else len(rows)
+
+
+def get_outbox_summary(campaign=None):
+    """{status: count} for one campaign or the whole outbox"""
+    try:
+        conn, cursor = get_db()
+        where, params = ("WHERE campaign = %s", (campaign,)) if campaign else ("", ())
+        cursor.execute(f"SELECT status, COUNT(*) FROM message_outbox {where} GROUP BY status", params)
+        summary = {status: count for status, count in cursor.fetchall()}
+        cursor.close()
+        return summary
+    except Exception as e:
+        logging.error(f"Error reading message outbox: {e}")
+        return {}
+
+
+class OutboxDispatcher:
+    """Drains message_outbox through a thread pool, within the gateway's rate limit.
+
+    Due rows are claimed (status -> 'sending') a few batches ahead of the
+    `concurrency` sender threads, which share one token bucket (a second of
+    quota may go out as a burst). Outcomes are recorded with a few executemany
+    statements per claim's worth of rows. Only the dispatcher thread touches
+    the database, on its own connection.
+    Failures retry with jittered exponential backoff until max_attempts;
+    rejected numbers and non-retryable HTTP errors fail at once. Delivery is
+    at least once: rows orphaned in 'sending' by a crash are sent again.
+    With a window (start, end) of datetime.time, nothing is claimed outside
+    those local hours.
+    """
+
+    def __init__(self, gateway=None, concurrency=SMS_CONCURRENCY, rate=SMS_RATE_PER_SECOND,
+                 batch_size=SMS_BATCH_SIZE, max_attempts=SMS_MAX_ATTEMPTS, channel='sms',
+                 backoff_base=BACKOFF_BASE_SECONDS, window=None):
+        self.gateway = gateway or gateway_for(channel)
+        self.concurrency = max(int(concurrency), 1)
+        self.bucket = TokenBucket(rate, burst=max(rate, batch_size))
+        self.batch_size = max(int(batch_size), 1)
+        self.max_attempts = max(int(max_attempts), 1)
+        self.channel = channel
+        self.backoff_base = backoff_base
+        self.window = window
+
+    def run(self, campaign=None, progress=None, wait_for_retries=False, stop_event=None):
+        """Send until nothing is due; returns counts and throughput.
+
+        campaign is one campaign name or a tuple of them; None sends the whole channel.
+        progress(summary) is called from this thread each time outcomes are recorded.
+        With wait_for_retries, rows waiting out a backoff are waited for too.
+        """
+        conn = get_new_connection()
+        cursor = conn.cursor(buffered=True)
+        started = time.perf_counter()
+        totals = {'sent': 0, 'failed': 0, 'retrying': 0, 'requests': 0}
+
+        def summary():
+            elapsed = time.perf_counter() - started
+            return dict(totals, seconds=elapsed, per_second=totals['sent'] / elapsed if elapsed else 0.0)
+
+        in_flight, finished, attempts = set(), [], {}
+        drained = False
+        try:
+            self._release_stale(conn, cursor)
+            with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+                while True:
+                    stopping = stop_event is not None and stop_event.is_set()
+                    # Keep the pool fed: claim more before the requests in flight run out
+                    if not (drained or stopping) and len(in_flight) < self.concurrency * 2:
+                        rows = self._claim(conn, cursor, campaign) if not self._window_delay() else []
+                        attempts.update((row[0], row[3]) for row in rows)
+                        for i in range(0, len(rows), self.batch_size):
+                            in_flight.add(pool.submit(self._send, rows[i:i + self.batch_size]))
+                        drained = not rows
+
+                    if not in_flight:
+                        delay = self._next_retry_delay(cursor, campaign) if wait_for_retries else None
+                        if delay is not None:
+                            delay = max(delay, self._window_delay())
+                        if stopping or delay is None:
+                            break
+                        time.sleep(min(delay, 5.0))
+                        drained = False
+                        continue
+
+                    if drained or len(in_flight) >= self.concurrency * 2:
+                        done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                        totals['requests'] += len(done)
+                        for future in done:
+                            finished.extend(future.result())
+                    # Outcomes are written a claim's worth at a time, not per request
+                    if finished and (len(finished) >= self._claim_size() or not in_flight):
+                        self._record(conn, cursor, finished, attempts, totals)
+                        for outcome in finished:
+                            attempts.pop(outcome[0], None)
+                        finished = []
+                        if progress:
+                            progress(summary())
+        finally:
+            cursor.close()
+            conn.close()
+
+        result = summary()
+        print(f"✅ DEBUG: Outbox dispatch - {result['sent']} sent, {result['failed']} failed, "
+              f"{result['retrying']} retries in {result['seconds']:.1f}s ({result['per_second']:.0f} msg/s)")
+        logging.info(f"Message outbox dispatch: {result}")
+        return result
+
+    def _claim_size(self):
+        return self.concurrency * self.batch_size * CLAIM_BATCHES
+
+    def _window_delay(self):
+        """Seconds until the send window opens; 0 inside it or without one"""
+        if not self.window:
+            return 0.0
+        start, end = self.window
+        now = datetime.now()
+        moment = now.time()
+        inside = start <= moment < end if start < end else (moment >= start or moment < end)
+        if inside:
+            return 0.0
+        opens = datetime.combine(now.date(), start)
+        if opens <= now:
+            opens += timedelta(days=1)
+        return (opens - now).total_seconds()
+
+    def _release_stale(self, conn, cursor):
+        cursor.execute("""
+            UPDATE message_outbox SET status = 'pending'
+            WHERE status = 'sending' AND channel = %s AND next_attempt_at < %s
+        """, (self.channel, datetime.now() - timedelta(minutes=STALE_SENDING_MINUTES)))
+        conn.commit()
+
+    def _claim(self, conn, cursor, campaign):
+        now = datetime.now()
+        where, campaign_params = _campaign_filter(campaign)
+        params = [self.channel, now] + campaign_params
+        conn.start_transaction()
+        try:
+            cursor.execute(f"""
+                SELECT id, recipient, message, attempts FROM message_outbox
+                WHERE status = 'pending' AND channel = %s AND next_attempt_at <= %s {where}
+                ORDER BY next_attempt_at, id
+                LIMIT {self._claim_size()}
+                FOR UPDATE SKIP LOCKED
+            """, params)
+            rows = cursor.fetchall()
+            if rows:
+                # next_attempt_at doubles as the claim time for _release_stale
+                cursor.execute(f"""
+                    UPDATE message_outbox SET status = 'sending', next_attempt_at = %s
+                    WHERE id IN ({', '.join(['%s'] * len(rows))})
+                """, [now] + [row[0] for row in rows])
+            conn.commit()
+            return rows
+        except Exception:
+            conn.rollback()
+            raise
+
+    def _next_retry_delay(self, cursor, campaign):
+        where, campaign_params = _campaign_filter(campaign)
+        params = [self.channel] + campaign_params
+        cursor.execute(f"""
+            SELECT MIN(next_attempt_at) FROM message_outbox
+            WHERE status = 'pending' AND channel = %s {where}
+        """, params)
+        due = cursor.fetchone()[0]
+        if due is None:
+            return None
+        if isinstance(due, str):
+            due = datetime.strptime(due[:19], '%Y-%m-%d %H:%M:%S')
+        return max((due - datetime.now()).total_seconds(), 0.0)
+
+    def _send(self, batch):
+        """Runs on a pool thread: [(id, sent, message_id, error, retryable)] for one gateway request"""
+        self.bucket.acquire(len(batch))
+        try:
+            results = self.gateway.send([(row_id, recipient, text) for row_id, recipient, text, _ in batch])
+        except GatewayError as e:
+            return [(row[0], False, None, str(e), e.retryable) for row in batch]
+        except Exception as e:
+            return [(row[0], False, None, f"{type(e).__name__}: {e}", True) for row in batch]
+
+        outcomes = []
+        for row_id, _, _, _ in batch:
+            if row_id not in results:
+                outcomes.append((row_id, False, None, "no result from gateway", True))
+            else:
+                # A rejected number will not become valid by retrying, but a gateway can
+                # flag a message worth another go (a busy or unanswered call)
+                accepted, message_id, error, *retryable = results[row_id]
+                outcomes.append((row_id, accepted, message_id, error, bool(retryable and retryable[0])))
+        return outcomes
+
+    def _record(self, conn, cursor, outcomes, attempts, totals):
+        now = datetime.now()
+        sent, retry, failed = [], [], []
+        for row_id, ok, message_id, error, retryable in outcomes:
+            tries = attempts.get(row_id, 0) + 1
+            if ok:
+                sent.append((now, message_id, row_id))
+            elif retryable and tries < self.max_attempts:
+                backoff = min(self.backoff_base * 2 ** (tries - 1), BACKOFF_MAX_SECONDS)
+                retry.append((now + timedelta(seconds=backoff * random.uniform(0.5, 1.0)),
+                              (error or '')[:255], row_id))
+            else:
+                failed.append(((error or 'failed')[:255], row_id))
+
+        conn.start_transaction()
+        try:
+            if sent:
+                cursor.executemany("""
+                    UPDATE message_outbox
+                    SET status = 'sent', attempts = attempts + 1, sent_at = %s,
+                        gateway_message_id = %s, last_error = NULL
+                    WHERE id = %s
+                """, sent)
+            if retry:
+                cursor.executemany("""
+                    UPDATE message_outbox
+                    SET status = 'pending', attempts = attempts + 1, next_attempt_at = %s, last_error = %s
+                    WHERE id = %s
+                """, retry)
+            if failed:
+                cursor.executemany("""
+                    UPDATE message_outbox
+                    SET status = 'failed', attempts = attempts + 1, last_error = %s
+                    WHERE id = %s
+                """, failed)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        totals['sent'] += len(sent)
+        totals['retrying'] += len(retry)
+        totals['failed'] += len(failed)
+
+
+def _dispatcher_for(channel):
+    if channel == 'call':
+        # Line limits and calling hours live with the campaign runner
+        from services.call_campaigns import call_dispatcher
+        return call_dispatcher()
+    return OutboxDispatcher(channel=channel)
+
+
+_background = {}                  # (channel, campaign) -> {'thread', 'again'}
+_background_lock = threading.Lock()
+
+
+def dispatch_in_background(progress=None, channel='sms', campaign=None):
+    """Drain one channel (optionally only some campaigns) on a daemon thread.
+
+    A call while the same drain runs makes it go round again. Tills pass
+    campaign=SALE_CAMPAIGNS so a sale never starts a bulk campaign; those are
+    sent by their own runner under its rate and line limits.
+    """
+    key = (channel, campaign)
+
+    def worker():
+        while True:
+            try:
+                _dispatcher_for(channel).run(campaign=campaign, progress=progress)
+            except Exception as e:
+                logging.error(f"Message outbox dispatch ({channel}) failed: {e}")
+            with _background_lock:
+                if not _background[key]['again']:
+                    del _background[key]
+                    return
+                _background[key]['again'] = False
+
+    with _background_lock:
+        if key in _background:
+            _background[key]['again'] = True
+            return _background[key]['thread']
+        thread = threading.Thread(target=worker, daemon=True)
+        _background[key] = {'thread': thread, 'again': False}
+        thread.start()
+        return thread
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Send queued messages from message_outbox")
+    parser.add_argument('--campaign', help="only this campaign")
+    parser.add_argument('--channel', choices=CHANNELS, default='sms')
+    parser.add_argument('--wait-retries', action='store_true', help="wait out backoffs until nothing is pending")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    def progress(summary):
+        print(f"   ... {summary['sent']} sent, {summary['failed']} failed, {summary['retrying']} retries, "
+              f"{summary['per_second']:.0f} msg/s")
+
+    _dispatcher_for(args.channel).run(campaign=args.campaign, progress=progress, wait_for_retries=args.wait_retries)
+    print(f"📬 Outbox: {get_outbox_summary(args.campaign)}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,70 @@
+"""
+Post-sale notifications - receipts and low-stock alerts queued with the sale
+Copyright (c) 2024 [Your Name]. All rights reserved.
+"""
+import logging
+from datetime import datetime
+from config import ALERT_PHONE, SMS_RECEIPTS
+from services.messaging import SALE_CAMPAIGNS, dispatch_in_background
+
+RECEIPT_TEXT = "Receipt: Transaction {number} completed. Total: Rs.{total:.2f}. Thank you!"
+LOW_STOCK_TEXT = "LOW STOCK ALERT: {name} has only {stock} units remaining. Please reorder."
+
+
+def receipt_text(transaction_number, total_amount):
+    return RECEIPT_TEXT.format(number=transaction_number, total=float(total_amount))
+
+
+def low_stock_text(product_name, current_stock):
+    return LOW_STOCK_TEXT.format(name=product_name, stock=current_stock)
+
+
+def queue_sale_notifications(cursor, sales, stock_deducted=True):
+    """Queue receipts and low-stock alerts for sales on the sale's own cursor.
+
+    Call inside the transaction that writes the sales, before it commits, so
+    the messages are saved (or rolled back) with the sale and the till never
+    waits on the SMS provider. sales: [{'transaction_number', 'customer_id',
+    'total_amount', 'items': [{'product_id', 'quantity'}]}]. Pass
+    stock_deducted=False when products.quantity_in_stock has not been reduced
+    yet. dedupe_key makes a replayed sale or a second crossing on the same
+    day a no-op.
+    """
+    now = datetime.now()
+    if SMS_RECEIPTS:
+        receipts = [(sale['customer_id'], receipt_text(sale['transaction_number'], sale['total_amount']), now,
+                     f"receipt:{sale['transaction_number']}", sale['customer_id'])
+                    for sale in sales if sale.get('customer_id')]
+        if receipts:
+            cursor.executemany("""
+                INSERT IGNORE INTO message_outbox (channel, campaign, customer_id, recipient, message,
+                                                   next_attempt_at, dedupe_key)
+                SELECT 'sms', 'receipt', %s, phone, %s, %s, %s
+                FROM customers WHERE id = %s AND phone IS NOT NULL AND phone <> ''
+            """, receipts)
+
+    if ALERT_PHONE:
+        undeducted = {}    # product_id -> units sold but not yet taken off quantity_in_stock
+        for sale in sales:
+            for item in sale['items']:
+                product_id = int(item['product_id'])
+                undeducted[product_id] = undeducted.get(product_id, 0) + (0 if stock_deducted else int(item['quantity']))
+        # Products now at or below their reorder point (LOW_STOCK_TEXT wording); one alert per product per day
+        cursor.executemany("""
+            INSERT IGNORE INTO message_outbox (channel, campaign, recipient, message, next_attempt_at, dedupe_key)
+            SELECT 'sms', 'low_stock', %s,
+                   CONCAT('LOW STOCK ALERT: ', name, ' has only ', quantity_in_stock - %s,
+                          ' units remaining. Please reorder.'),
+                   %s, CONCAT('low_stock:', id, ':', %s)
+            FROM products
+            WHERE id = %s AND quantity_in_stock - %s <= GREATEST(min_stock_level, reorder_level)
+        """, [(ALERT_PHONE, quantity, now, now.strftime('%Y%m%d'), product_id, quantity)
+              for product_id, quantity in sorted(undeducted.items())])
+
+
+def notify_outbox():
+    """Called after a sale commits: send receipts and alerts in the background; never raises"""
+    try:
+        dispatch_in_background(campaign=SALE_CAMPAIGNS)
+    except Exception as e:
+        logging.error(f"Could not start message dispatch: {e}")
@@ -0,0 +1,270 @@
+"""
+Fixed-point pricing engine for cart and basket totals
+Copyright (c) 2024 [Your Name]. All rights reserved.
+"""
+import math
+from decimal import Decimal, ROUND_HALF_UP, InvalidOperation
+from config import DISCOUNT_THRESHOLD, DISCOUNT_RATE
+
+# Money is held as integer ten-thousandths of a rupee, the same precision as the
+# DECIMAL(x,4) amount columns. Percentages are held as hundredths of a percent
+# (DECIMAL(5,2)), so 18.00% is 1800 and applying it divides by RATE_DIVISOR.
+SCALE = 10000
+PERCENT_SCALE = 100
+RATE_DIVISOR = 100 * PERCENT_SCALE
+DEFAULT_TAX_RATE = 18.0
+
+
+def to_units(value, scale=SCALE):
+    """Convert a price/amount/rate to an integer count of 1/scale units (ROUND_HALF_UP)"""
+    if value is None or value == '' or value == 'None':
+        return 0
+    if isinstance(value, int):
+        return value * scale
+    try:
+        if isinstance(value, float):
+            if math.isnan(value) or math.isinf(value):
+                return 0
+            # Fast path: values already on the unit grid (the normal case for
+            # prices and rates) scale to within float noise of an integer
+            scaled = value * scale
+            nearest = round(scaled)
+            if abs(scaled - nearest) < 1e-6 and abs(scaled) < 1e15:
+                return int(nearest)
+            value = repr(value)
+        decimal_value = Decimal(str(value).strip()) * scale
+        if not decimal_value.is_finite():
+            return 0
+        return int(decimal_value.quantize(Decimal(1), rounding=ROUND_HALF_UP))
+    except (InvalidOperation, ValueError, TypeError):
+        return 0
+
+
+def from_units(units, scale=SCALE):
+    """Convert integer units back to a float for display and DB parameters"""
+    return units / scale
+
+
+def div_half_up(numerator, denominator):
+    """Integer division rounding halves up, for non-negative operands"""
+    return (2 * numerator + denominator) // (2 * denominator)
+
+
+class PricingEngine:
+    """Prices cart lines and baskets in integer units - each line is computed exactly once"""
+
+    @staticmethod
+    def price_line_units(quantity, price_units, discount_rate_units=0, tax_rate_units=1800):
+        """Core line pricing in integer units.
+
+        Returns (unit_price, discount_amount, tax_amount, line_total) where unit_price
+        is the discounted unit price. Follows the same rounding steps as
+        Transaction.calculate_item_amounts, but exactly.
+        """
+        if quantity <= 0 or price_units <= 0:
+            return 0, 0, 0, 0
+
+        discount_amount = div_half_up(price_units * discount_rate_units * quantity, RATE_DIVISOR)
+        unit_price = div_half_up(price_units * (RATE_DIVISOR - discount_rate_units), RATE_DIVISOR)
+        taxable = unit_price * quantity
+        tax_amount = div_half_up(taxable * tax_rate_units, RATE_DIVISOR)
+        return unit_price, discount_amount, tax_amount, taxable + tax_amount
+
+    @classmethod
+    def price_line(cls, quantity, unit_price, discount_rate=0.0, tax_rate=DEFAULT_TAX_RATE):
+        """Price a single line - same keys as Transaction.calculate_item_amounts"""
+        try:
+            qty = int(float(quantity)) if quantity else 0
+        except (ValueError, TypeError):
+            qty = 0
+        price_units = to_units(unit_price)
+        discount_units = to_units(discount_rate, PERCENT_SCALE)
+        tax_units = to_units(tax_rate if tax_rate is not None else DEFAULT_TAX_RATE, PERCENT_SCALE)
+
+        if qty <= 0 or price_units <= 0:
+            return {
+                'quantity': 0,
+                'unit_price': 0.0,
+                'original_price': 0.0,
+                'discount_rate': 0.0,
+                'discount_amount': 0.0,
+                'tax_rate': from_units(tax_units, PERCENT_SCALE),
+                'tax_amount': 0.0,
+                'line_total': 0.0,
+                '_units': (0, 0, 0, 0, 0)
+            }
+
+        unit_price_u, discount_u, tax_u, line_total_u = cls.price_line_units(
+            qty, price_units, discount_units, tax_units)
+
+        return {
+            'quantity': qty,
+            'unit_price': from_units(unit_price_u),
+            'original_price': from_units(price_units),
+            'discount_rate': from_units(discount_units, PERCENT_SCALE),
+            'discount_amount': from_units(discount_u),
+            'tax_rate': from_units(tax_units, PERCENT_SCALE),
+            'tax_amount': from_units(tax_u),
+            'line_total': from_units(line_total_u),
+            '_units': (price_units * qty, unit_price_u, discount_u, tax_u, line_total_u)
+        }
+
+    @classmethod
+    def price_basket(cls, cart_items, apply_transaction_discount=True):
+        """Price every line and the basket totals in a single pass.
+
+        Returns {'lines': [...], 'subtotal', 'item_discount', 'transaction_discount',
+        'discount_amount', 'tax_amount', 'total_amount'} with the lines in cart order.
+        """
+        lines = []
+        subtotal = item_discount = tax_total = 0
+
+        for item in cart_items:
+            line = cls.price_line(
+                item.get('quantity', 0),
+                item.get('unit_price', 0),
+                item.get('discount_rate', 0.0),
+                item.get('tax_rate', DEFAULT_TAX_RATE)
+            )
+            gross_u, _, discount_u, tax_u, _ = line['_units']
+            subtotal += gross_u
+            item_discount += discount_u
+            tax_total += tax_u
+            lines.append(line)
+
+        transaction_discount = 0
+        if apply_transaction_discount:
+            effective_subtotal = subtotal - item_discount
+            if effective_subtotal >= to_units(DISCOUNT_THRESHOLD):
+                transaction_discount = div_half_up(
+                    effective_subtotal * to_units(DISCOUNT_RATE, RATE_DIVISOR), RATE_DIVISOR)
+
+        total_discount = item_discount + transaction_discount
+        return {
+            'lines': lines,
+            'subtotal': from_units(subtotal),
+            'item_discount': from_units(item_discount),
+            'transaction_discount': from_units(transaction_discount),
+            'discount_amount': from_units(total_discount),
+            'tax_amount': from_units(tax_total),
+            'total_amount': from_units(subtotal - total_discount + tax_total)
+        }
+
+    @staticmethod
+    def basket_amounts(priced_basket):
+        """Header amounts of a priced basket in the calculate_amounts() shape"""
+        return {
+            'subtotal': priced_basket['subtotal'],
+            'discount_amount': priced_basket['discount_amount'],
+            'tax_amount': priced_basket['tax_amount'],
+            'total_amount': priced_basket['total_amount']
+        }
+
+
+# =====================================================================
+# BENCHMARK UTILITIES
+# =====================================================================
+
+def generate_synthetic_basket(lines=10000, seed=42):
+    """Build a reproducible basket with realistic prices, quantities and discounts"""
+    import random
+    rng = random.Random(seed)
+    discount_choices = [0, 0, 0, 2.5, 5, 7.5, 10, 12.5, 15, 20, 33.33]
+    basket = []
+    for i in range(lines):
+        if rng.random() < 0.7:
+            price = round(rng.uniform(5, 2500), 2)
+        else:
+            price = round(rng.uniform(0.5, 50000), 4)
+        basket.append({
+            'product_id': i + 1,
+            'quantity': rng.choice([1, 1, 1, 2, 2, 3, 4, 5, 6, 10, 12, 24, 48]),
+            'unit_price': price,
+            'discount_rate': rng.choice(discount_choices)
+        })
+    return basket
+
+
+def _decimal_reference_line(quantity, unit_price, discount_rate, tax_rate=DEFAULT_TAX_RATE):
+    """Exact Decimal arithmetic for one line, used as the ground truth in benchmarks"""
+    places = Decimal('0.0001')
+    price = Decimal(repr(float(unit_price)))
+    rate = Decimal(repr(float(discount_rate))) / 100
+    tax = Decimal(repr(float(tax_rate))) / 100
+    discount_amount = (price * rate * quantity).quantize(places, rounding=ROUND_HALF_UP)
+    unit = (price - price * rate).quantize(places, rounding=ROUND_HALF_UP)
+    tax_amount = (unit * quantity * tax).quantize(places, rounding=ROUND_HALF_UP)
+    return unit, discount_amount, tax_amount, unit * quantity + tax_amount
+
+
+def benchmark_pricing_engine(lines=10000, seed=42, repeat=3):
+    """Compare throughput and exactness of the engine with the legacy float path"""
+    import contextlib
+    import io
+    import time
+    from models.transaction import Transaction
+
+    basket = generate_synthetic_basket(lines, seed)
+    print(f"🔍 Benchmarking pricing on a {lines}-line synthetic basket (seed={seed})...")
+
+    def legacy_create_path():
+        # calculate_amounts() followed by the per-line recompute done in create_transaction
+        amounts = Transaction.calculate_amounts(basket)
+        priced = [Transaction.calculate_item_amounts(i['quantity'], i['unit_price'], i['discount_rate'])
+                  for i in basket]
+        return amounts, priced
+
+    def best_of(func):
+        best, result = None, None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best, result
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        legacy_time, (legacy_amounts, legacy_lines) = best_of(legacy_create_path)
+    engine_time, priced = best_of(lambda: PricingEngine.price_basket(basket))
+
+    legacy_exact = engine_exact = 0
+    max_legacy_error = Decimal(0)
+    fields = ('unit_price', 'discount_amount', 'tax_amount', 'line_total')
+    for item, legacy, engine in zip(basket, legacy_lines, priced['lines']):
+        reference = _decimal_reference_line(item['quantity'], item['unit_price'], item['discount_rate'])
+        legacy_values = tuple(Decimal(repr(legacy[f])) for f in fields)
+        engine_values = tuple(Decimal(repr(engine[f])) for f in fields)
+        if engine_values == reference:
+            engine_exact += 1
+        if legacy_values == reference:
+            legacy_exact += 1
+        for got, want in zip(legacy_values, reference):
+            max_legacy_error = max(max_legacy_error, abs(got - want))
+
+    results = {
+        'lines': lines,
+        'legacy_seconds': legacy_time,
+        'engine_seconds': engine_time,
+        'legacy_lines_per_second': lines / legacy_time if legacy_time else 0.0,
+        'engine_lines_per_second': lines / engine_time if engine_time else 0.0,
+        'speedup': legacy_time / engine_time if engine_time else 0.0,
+        'engine_exact_lines': engine_exact,
+        'legacy_exact_lines': legacy_exact,
+        'legacy_max_line_error': float(max_legacy_error),
+        'legacy_total_amount': legacy_amounts['total_amount'],
+        'engine_total_amount': priced['total_amount']
+    }
+
+    print(f"   - legacy: {results['legacy_seconds'] * 1000:.1f} ms "
+          f"({results['legacy_lines_per_second']:,.0f} lines/s)")
+    print(f"   - engine: {results['engine_seconds'] * 1000:.1f} ms "
+          f"({results['engine_lines_per_second']:,.0f} lines/s, {results['speedup']:.1f}x)")
+    print(f"   - exact lines: engine {engine_exact}/{lines}, legacy {legacy_exact}/{lines} "
+          f"(max legacy error ₹{results['legacy_max_line_error']:.4f})")
+    print(f"   - basket total: engine ₹{results['engine_total_amount']:.4f}, "
+          f"legacy ₹{results['legacy_total_amount']:.4f}")
+    return results
+
+
+if __name__ == "__main__":
+    benchmark_pricing_engine()
@@ -0,0 +1,326 @@
+"""
+Rule-indexed promotion engine for basket evaluation
+Copyright (c) 2024 [Your Name]. All rights reserved.
+"""
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from config import PROMOTION_CACHE_SECONDS
+from services.pricing import PERCENT_SCALE, RATE_DIVISOR, from_units, to_units, div_half_up
+
+
+def _minute_of_day(value):
+    """MySQL TIME columns arrive as timedelta; also accept datetime.time"""
+    if value is None:
+        return None
+    if isinstance(value, timedelta):
+        return int(value.total_seconds() // 60) % (24 * 60)
+    return value.hour * 60 + value.minute
+
+
+class CompiledRule:
+    """A promotion row reduced to integer units and pre-parsed time windows"""
+    __slots__ = ('id', 'name', 'promo_type', 'product_id', 'category_id', 'buy_quantity',
+                 'get_quantity', 'discount_units', 'bundle_units', 'starts_at', 'ends_at',
+                 'start_minute', 'end_minute', 'days', 'priority', 'components')
+
+    def __init__(self, row, components=None):
+        (self.id, self.name, self.promo_type, self.product_id, self.category_id, buy_quantity,
+         get_quantity, discount_percentage, bundle_price, self.starts_at, self.ends_at,
+         daily_start_time, daily_end_time, days_of_week, priority) = row
+
+        self.buy_quantity = max(int(buy_quantity or 1), 1)
+        self.get_quantity = max(int(get_quantity or 0), 0)
+        self.discount_units = to_units(discount_percentage, PERCENT_SCALE)
+        self.bundle_units = to_units(bundle_price) if bundle_price is not None else None
+        self.start_minute = _minute_of_day(daily_start_time)
+        self.end_minute = _minute_of_day(daily_end_time)
+        self.days = frozenset(int(d) for d in str(days_of_week).split(',') if d.strip()) if days_of_week else None
+        self.priority = int(priority or 0)
+        self.components = tuple(components or ())
+
+    def is_live(self, now, minute, weekday):
+        """Date range, day-of-week and daily time-window check (windows may cross midnight)"""
+        if self.starts_at and now < self.starts_at:
+            return False
+        if self.ends_at and now >= self.ends_at:
+            return False
+        if self.days is not None and weekday not in self.days:
+            return False
+        if self.start_minute is not None and self.end_minute is not None:
+            if self.start_minute <= self.end_minute:
+                return self.start_minute <= minute < self.end_minute
+            return minute >= self.start_minute or minute < self.end_minute
+        return True
+
+
+class PromotionIndex:
+    """Compiled rules keyed by product and by category"""
+
+    def __init__(self, rules):
+        self.by_product = {}
+        self.by_category = {}
+        self.rule_count = len(rules)
+        for rule in rules:
+            if rule.promo_type == 'combo':
+                for product_id, _ in rule.components:
+                    self.by_product.setdefault(product_id, []).append(rule)
+            elif rule.promo_type == 'category_percent':
+                self.by_category.setdefault(rule.category_id, []).append(rule)
+            else:
+                self.by_product.setdefault(rule.product_id, []).append(rule)
+
+
+class PromotionEngine:
+    """Evaluates baskets against the cached promotion index.
+
+    The index is compiled once from the promotions tables and reused until a
+    Promotion write invalidates it, or until PROMOTION_CACHE_SECONDS pass and the
+    table signature shows a change made from another till. Each line takes part
+    in at most one promotion: rules are applied by priority, then largest saving.
+    """
+    _lock = threading.Lock()
+    _index = None
+    _loaded_at = 0.0
+    _signature = None
+
+    @staticmethod
+    def compile(rule_rows, item_rows=()):
+        """Build a PromotionIndex from Promotion.get_active_rule_rows() output"""
+        components = {}
+        for promotion_id, product_id, quantity in item_rows:
+            components.setdefault(promotion_id, []).append((int(product_id), max(int(quantity or 1), 1)))
+        rules = []
+        for row in rule_rows:
+            try:
+                rules.append(CompiledRule(row, components.get(row[0])))
+            except Exception as e:
+                logging.error(f"Skipping invalid promotion rule {row[0] if row else '?'}: {e}")
+        return PromotionIndex(rules)
+
+    @classmethod
+    def invalidate(cls):
+        """Drop the compiled index; the next evaluation reloads it"""
+        with cls._lock:
+            cls._index = None
+            cls._signature = None
+
+    @classmethod
+    def load_index(cls, index, signature=None):
+        """Install a compiled index directly (used by benchmarks and warm-up)"""
+        with cls._lock:
+            cls._index = index
+            cls._signature = signature
+            cls._loaded_at = time.monotonic()
+
+    @classmethod
+    def get_index(cls):
+        """Return the cached index, reloading it when invalidated or changed elsewhere"""
+        from models.promotion import Promotion
+
+        index = cls._index
+        if index is not None and time.monotonic() - cls._loaded_at < PROMOTION_CACHE_SECONDS:
+            return index
+
+        signature = Promotion.get_rules_signature()
+        if index is not None and signature == cls._signature:
+            cls._loaded_at = time.monotonic()
+            return index
+
+        rule_rows, item_rows = Promotion.get_active_rule_rows()
+        index = cls.compile(rule_rows, item_rows)
+        cls.load_index(index, signature)
+        logging.info(f"Promotion index compiled: {index.rule_count} active rules")
+        return index
+
+    @classmethod
+    def evaluate(cls, basket_lines, now=None, index=None):
+        """Find the promotions a basket qualifies for.
+
+        basket_lines: dicts with product_id, category_id, quantity and unit_price
+        (the price after any manual item discount). Returns
+        {'total_discount': float, 'applied': [...]} where each applied entry has
+        promotion_id, name, promo_type, discount and product_ids.
+        """
+        empty = {'total_discount': 0.0, 'applied': []}
+        if not basket_lines:
+            return empty
+        if index is None:
+            try:
+                index = cls.get_index()
+            except Exception as e:
+                logging.error(f"Promotion index unavailable: {e}")
+                return empty
+
+        quantities = {}
+        prices = {}
+        by_category = {}
+        for line in basket_lines:
+            product_id = line.get('product_id')
+            quantity = int(line.get('quantity') or 0)
+            if product_id is None or quantity <= 0:
+                continue
+            quantities[product_id] = quantities.get(product_id, 0) + quantity
+            prices[product_id] = to_units(line.get('unit_price'))
+            category_id = line.get('category_id')
+            if category_id is not None:
+                by_category.setdefault(category_id, set()).add(product_id)
+
+        candidates = {}
+        for product_id in quantities:
+            for rule in index.by_product.get(product_id, ()):
+                candidates[rule.id] = rule
+        for category_id in by_category:
+            for rule in index.by_category.get(category_id, ()):
+                candidates[rule.id] = rule
+        if not candidates:
+            return empty
+
+        now = now or datetime.now()
+        minute = now.hour * 60 + now.minute
+        weekday = now.weekday()
+
+        category_gross = {}
+        offers = []
+        for rule in candidates.values():
+            if not rule.is_live(now, minute, weekday):
+                continue
+            discount, product_ids = cls._rule_discount(rule, quantities, prices, by_category, category_gross)
+            if discount > 0:
+                offers.append((rule.priority, discount, rule, product_ids))
+
+        offers.sort(key=lambda offer: (-offer[0], -offer[1], offer[2].id))
+        claimed = set()
+        applied = []
+        total = 0
+        for _, discount, rule, product_ids in offers:
+            if claimed.intersection(product_ids):
+                continue
+            claimed.update(product_ids)
+            total += discount
+            applied.append({
+                'promotion_id': rule.id,
+                'name': rule.name,
+                'promo_type': rule.promo_type,
+                'discount': from_units(discount),
+                'product_ids': sorted(product_ids)
+            })
+
+        return {'total_discount': from_units(total), 'applied': applied}
+
+    @staticmethod
+    def _rule_discount(rule, quantities, prices, by_category, category_gross):
+        """Saving in units for one rule, plus the products it uses"""
+        promo_type = rule.promo_type
+
+        if promo_type == 'combo':
+            sets = None
+            set_price = 0
+            for product_id, required in rule.components:
+                have = quantities.get(product_id, 0) // required
+                sets = have if sets is None else min(sets, have)
+                if not sets:
+                    return 0, ()
+                set_price += prices[product_id] * required
+            if rule.bundle_units is not None:
+                saving = sets * (set_price - rule.bundle_units)
+            else:
+                saving = div_half_up(sets * set_price * rule.discount_units, RATE_DIVISOR)
+            return saving, {product_id for product_id, _ in rule.components}
+
+        if promo_type == 'category_percent':
+            product_ids = by_category.get(rule.category_id, ())
+            gross = category_gross.get(rule.category_id)
+            if gross is None:
+                gross = category_gross[rule.category_id] = sum(prices[p] * quantities[p] for p in product_ids)
+            return div_half_up(gross * rule.discount_units, RATE_DIVISOR), set(product_ids)
+
+        product_id = rule.product_id
+        quantity = quantities.get(product_id, 0)
+        price = prices.get(product_id, 0)
+        if not quantity or not price:
+            return 0, ()
+
+        if promo_type == 'percent_off':
+            saving = div_half_up(quantity * price * rule.discount_units, RATE_DIVISOR)
+        elif promo_type == 'bogo':
+            groups = quantity // (rule.buy_quantity + rule.get_quantity)
+            saving = div_half_up(groups * rule.get_quantity * price * rule.discount_units, RATE_DIVISOR)
+        elif promo_type == 'multi_buy':
+            groups = quantity // rule.buy_quantity
+            saving = groups * (rule.buy_quantity * price - rule.bundle_units) if rule.bundle_units is not None else 0
+        else:
+            saving = 0
+        return saving, {product_id}
+
+
+# =====================================================================
+# BENCHMARK UTILITIES
+# =====================================================================
+
+def benchmark_promotion_engine(rules=10000, lines=100, products=20000, categories=200,
+                               runs=500, seed=42):
+    """Time basket evaluation against a synthetic set of active rules"""
+    import random
+
+    rng = random.Random(seed)
+    category_of = {p: rng.randint(1, categories) for p in range(1, products + 1)}
+    rule_rows = []
+    item_rows = []
+    for rule_id in range(1, rules + 1):
+        promo_type = rng.choice(['bogo', 'multi_buy', 'combo', 'category_percent', 'percent_off'])
+        product_id = rng.randint(1, products)
+        row = [rule_id, f"Promo {rule_id}", promo_type, product_id, None, 1, 0, 10.0, None,
+               None, None, None, None, None, rng.randint(0, 3)]
+        if promo_type == 'bogo':
+            row[5], row[6], row[7] = 2, 1, 100.0
+        elif promo_type == 'multi_buy':
+            row[5], row[8] = 3, 99.0
+        elif promo_type == 'combo':
+            row[3], row[8] = None, 150.0
+            for component in rng.sample(range(1, products + 1), 2):
+                item_rows.append((rule_id, component, 1))
+        elif promo_type == 'category_percent':
+            row[3], row[4] = None, rng.randint(1, categories)
+        rule_rows.append(tuple(row))
+
+    start = time.perf_counter()
+    index = PromotionEngine.compile(rule_rows, item_rows)
+    compile_time = time.perf_counter() - start
+
+    basket = []
+    for product_id in rng.sample(range(1, products + 1), lines):
+        basket.append({
+            'product_id': product_id,
+            'category_id': category_of[product_id],
+            'quantity': rng.randint(1, 6),
+            'unit_price': round(rng.uniform(10, 500), 2)
+        })
+
+    timings = []
+    now = datetime.now()
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = PromotionEngine.evaluate(basket, now=now, index=index)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+
+    results = {
+        'rules': rules,
+        'lines': lines,
+        'compile_seconds': compile_time,
+        'mean_ms': sum(timings) / len(timings) * 1000,
+        'p99_ms': timings[int(len(timings) * 0.99) - 1] * 1000,
+        'applied': len(result['applied']),
+        'total_discount': result['total_discount']
+    }
+    print(f"🔍 Promotion engine: {lines}-line basket against {rules:,} rules")
+    print(f"   - compile: {compile_time * 1000:.1f} ms")
+    print(f"   - evaluate: mean {results['mean_ms']:.3f} ms, p99 {results['p99_ms']:.3f} ms")
+    print(f"   - applied {results['applied']} promotions, saving ₹{results['total_discount']:.2f}")
+    return results
+
+
+if __name__ == "__main__":
+    benchmark_promotion_engine()
@@ -0,0 +1,352 @@
+"""
+Crash-safe local sales journal with background upload (offline till mode)
+Copyright (c) 2024 [Your Name]. All rights reserved.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from mysql.connector import errors as mysql_errors
+from config import JOURNAL_PATH, JOURNAL_SYNC, JOURNAL_UPLOAD_BATCH, JOURNAL_UPLOAD_INTERVAL
+from database import get_new_connection
+from services.stock_alerts import notify_stock_change
+from services.notifications import notify_outbox, queue_sale_notifications
+from models.customer import Customer
+
+MAX_UPLOAD_ATTEMPTS = 5
+MAX_BACKOFF_SECONDS = 60.0
+
+
+class SalesJournal:
+    """Append-only SQLite journal of completed sales.
+
+    A sale is durable once append() returns: the journal runs in WAL mode, so a
+    commit is a single sequential write and survives the till process being
+    killed (JOURNAL_SYNC=FULL also fsyncs each commit for power loss). Each row
+    holds the whole sale as JSON and is keyed by transaction_number, so appending
+    or replaying the same sale twice is harmless.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS sales (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            transaction_number TEXT NOT NULL UNIQUE,
+            payload TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT,
+            server_id INTEGER,
+            recorded_at TEXT NOT NULL,
+            uploaded_at TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_sales_status ON sales (status, id);
+    """
+
+    def __init__(self, path=JOURNAL_PATH, synchronous=JOURNAL_SYNC):
+        self.path = path
+        self.synchronous = synchronous if synchronous in ('NORMAL', 'FULL', 'EXTRA') else 'NORMAL'
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection().executescript(self.SCHEMA)
+
+    def _connection(self):
+        """One SQLite connection per thread (the till and the uploader)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(f"PRAGMA synchronous={self.synchronous}")
+            self._local.conn = conn
+        return conn
+
+    def append(self, sale):
+        """Durably record a sale; returns False if it was already journalled"""
+        cursor = self._connection().execute("""
+            INSERT INTO sales (transaction_number, payload, recorded_at)
+            VALUES (?, ?, ?)
+            ON CONFLICT (transaction_number) DO NOTHING
+        """, (sale['transaction_number'], json.dumps(sale, default=str),
+              datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+        return cursor.rowcount == 1
+
+    def pending(self, limit=JOURNAL_UPLOAD_BATCH):
+        """Oldest sales not yet uploaded, as (journal_id, sale dict)"""
+        rows = self._connection().execute("""
+            SELECT id, payload FROM sales
+            WHERE status = 'pending'
+            ORDER BY id
+            LIMIT ?
+        """, (limit,)).fetchall()
+        return [(journal_id, json.loads(payload)) for journal_id, payload in rows]
+
+    def mark_uploaded(self, server_ids):
+        """server_ids: {journal_id: transactions.id}"""
+        if not server_ids:
+            return
+        uploaded_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        conn = self._connection()
+        conn.execute("BEGIN")
+        conn.executemany("""
+            UPDATE sales SET status = 'uploaded', server_id = ?, uploaded_at = ?, last_error = NULL
+            WHERE id = ?
+        """, [(server_id, uploaded_at, journal_id) for journal_id, server_id in server_ids.items()])
+        conn.execute("COMMIT")
+
+    def mark_attempt_failed(self, journal_id, error):
+        """Count a failed upload; after MAX_UPLOAD_ATTEMPTS the sale is parked as 'failed'"""
+        self._connection().execute("""
+            UPDATE sales
+            SET attempts = attempts + 1,
+                last_error = ?,
+                status = CASE WHEN attempts + 1 >= ? THEN 'failed' ELSE status END
+            WHERE id = ?
+        """, (str(error)[:500], MAX_UPLOAD_ATTEMPTS, journal_id))
+
+    def retry_failed(self):
+        """Put parked sales back in the queue (after the data problem is fixed)"""
+        cursor = self._connection().execute(
+            "UPDATE sales SET status = 'pending', attempts = 0 WHERE status = 'failed'")
+        return cursor.rowcount
+
+    def get_status_counts(self):
+        rows = self._connection().execute("SELECT status, COUNT(*) FROM sales GROUP BY status").fetchall()
+        return dict(rows)
+
+    def purge_uploaded(self, days=30):
+        """Drop uploaded sales older than the given number of days"""
+        cursor = self._connection().execute("""
+            DELETE FROM sales
+            WHERE status = 'uploaded' AND uploaded_at < datetime('now', 'localtime', ?)
+        """, (f'-{int(days)} days',))
+        return cursor.rowcount
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def replay_sales(conn, sales):
+    """Write journalled sales to MySQL in one transaction.
+
+    Sales whose transaction_number already exists are skipped, so a batch that
+    was committed but not marked uploaded (crash in between) is simply matched
+    up again. Returns {transaction_number: transactions.id} for every sale.
+    """
+    cursor = conn.cursor()
+    try:
+        conn.start_transaction()
+        numbers = [sale['transaction_number'] for sale in sales]
+        placeholders = ', '.join(['%s'] * len(numbers))
+        cursor.execute(f"SELECT transaction_number, id FROM transactions WHERE transaction_number IN ({placeholders})",
+                       numbers)
+        existing = dict(cursor.fetchall())
+        new_sales = [sale for sale in sales if sale['transaction_number'] not in existing]
+
+        if new_sales:
+            cursor.executemany("""
+                INSERT INTO transactions (transaction_number, customer_id, employee_id,
+                                          subtotal, discount_amount, tax_amount, total_amount,
+                                          payment_method, payment_status, loyalty_points_earned,
+                                          pos_terminal, transaction_date)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, 'completed', %s, %s, %s)
+            """, [(sale['transaction_number'], sale.get('customer_id'), sale['employee_id'],
+                   sale['subtotal'], sale['discount_amount'], sale['tax_amount'], sale['total_amount'],
+                   sale['payment_method'], sale.get('loyalty_points', 0), sale.get('pos_terminal'),
+                   sale['transaction_date']) for sale in new_sales])
+
+            new_numbers = [sale['transaction_number'] for sale in new_sales]
+            placeholders = ', '.join(['%s'] * len(new_numbers))
+            cursor.execute(f"SELECT transaction_number, id FROM transactions WHERE transaction_number IN ({placeholders})",
+                           new_numbers)
+            inserted = dict(cursor.fetchall())
+
+            item_rows = []
+            movement_rows = []
+            stock_out = {}
+            customer_totals = {}
+            for sale in new_sales:
+                transaction_id = inserted[sale['transaction_number']]
+                for item in sale['items']:
+                    item_rows.append((transaction_id, item['product_id'], item['quantity'],
+                                      item['unit_price'], item.get('discount_rate', 0), item['line_total']))
+                    movement_rows.append((item['product_id'], item['quantity'], transaction_id,
+                                          f"Sale {sale['transaction_number']}", sale['employee_id'],
+                                          sale['transaction_date']))
+                    stock_out[item['product_id']] = stock_out.get(item['product_id'], 0) + item['quantity']
+                if sale.get('customer_id'):
+                    spent, points = customer_totals.get(sale['customer_id'], (0.0, 0))
+                    customer_totals[sale['customer_id']] = (spent + float(sale['total_amount']),
+                                                            points + int(sale.get('loyalty_points', 0)))
+
+            cursor.executemany("""
+                INSERT INTO transaction_items (transaction_id, product_id, quantity,
+                                               unit_price, discount_rate, line_total)
+                VALUES (%s, %s, %s, %s, %s, %s)
+            """, item_rows)
+            # The goods have already left the store, so stock is clamped rather than refused
+            cursor.executemany("""
+                UPDATE products SET quantity_in_stock = GREATEST(quantity_in_stock - %s, 0)
+                WHERE id = %s
+            """, [(quantity, product_id) for product_id, quantity in sorted(stock_out.items())])
+            cursor.executemany("""
+                INSERT INTO inventory_movements (product_id, movement_type, quantity, reference_type,
+                                                 reference_id, reason, employee_id, movement_date)
+                VALUES (%s, 'out', %s, 'sale', %s, %s, %s, %s)
+            """, movement_rows)
+            if customer_totals:
+                Customer.record_purchases(cursor, [(customer_id, spent, points)
+                                                   for customer_id, (spent, points) in sorted(customer_totals.items())])
+            queue_sale_notifications(cursor, new_sales)
+            existing.update(inserted)
+
+        conn.commit()
+        if new_sales:
+            notify_stock_change(stock_out, conn)
+            notify_outbox()
+        return existing
+
+    except Exception:
+        conn.rollback()
+        raise
+
+    finally:
+        cursor.close()
+
+
+class JournalUploader(threading.Thread):
+    """Daemon thread that drains the journal into MySQL in batches.
+
+    Uses its own MySQL connection, never the UI's shared one. While the server is
+    unreachable it backs off exponentially and keeps the sales in the journal; a
+    sale the server rejects is retried on its own so it cannot hold up the rest.
+    """
+
+    def __init__(self, journal, batch_size=JOURNAL_UPLOAD_BATCH, interval=JOURNAL_UPLOAD_INTERVAL,
+                 connect=get_new_connection):
+        super().__init__(name="sales-journal-uploader", daemon=True)
+        self.journal = journal
+        self.batch_size = batch_size
+        self.interval = interval
+        self._connect = connect
+        self._conn = None
+        self._stop_event = threading.Event()
+        self.uploaded_count = 0
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        failures = 0
+        while not self._stop_event.is_set():
+            try:
+                uploaded = self.drain_once()
+                failures = 0
+                if uploaded < self.batch_size:
+                    self._stop_event.wait(self.interval)
+            except Exception as e:
+                failures += 1
+                delay = min(self.interval * (2 ** failures), MAX_BACKOFF_SECONDS)
+                logging.warning(f"Journal upload failed ({e}); retrying in {delay:.0f}s")
+                self._drop_connection()
+                self._stop_event.wait(delay)
+        self._drop_connection()
+
+    def _connection(self):
+        if self._conn is None or not self._conn.is_connected():
+            self._conn = self._connect()
+        return self._conn
+
+    def _drop_connection(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+            self._conn = None
+
+    def drain_once(self):
+        """Upload one batch; returns the number of sales moved to MySQL"""
+        batch = self.journal.pending(self.batch_size)
+        if not batch:
+            return 0
+        conn = self._connection()
+
+        try:
+            server_ids = replay_sales(conn, [sale for _, sale in batch])
+            self.journal.mark_uploaded({journal_id: server_ids[sale['transaction_number']]
+                                        for journal_id, sale in batch})
+            uploaded = len(batch)
+        except (mysql_errors.InterfaceError, mysql_errors.OperationalError):
+            raise  # server or network trouble - back off and keep everything journalled
+        except Exception as e:
+            if len(batch) == 1:
+                self.journal.mark_attempt_failed(batch[0][0], e)
+                logging.error(f"Journalled sale {batch[0][1]['transaction_number']} rejected: {e}")
+                return 0
+            # Isolate the bad sale(s) so the good ones still go through
+            uploaded = 0
+            for journal_id, sale in batch:
+                try:
+                    server_ids = replay_sales(conn, [sale])
+                    self.journal.mark_uploaded({journal_id: server_ids[sale['transaction_number']]})
+                    uploaded += 1
+                except (mysql_errors.InterfaceError, mysql_errors.OperationalError):
+                    raise
+                except Exception as item_error:
+                    self.journal.mark_attempt_failed(journal_id, item_error)
+                    logging.error(f"Journalled sale {sale['transaction_number']} rejected: {item_error}")
+
+        self.uploaded_count += uploaded
+        logging.info(f"Uploaded {uploaded} journalled sales")
+        return uploaded
+
+
+# =====================================================================
+# BENCHMARK UTILITIES
+# =====================================================================
+
+def benchmark_journal_append(sales=2000, items_per_sale=8, path=None):
+    """Measure till-side commit latency of SalesJournal.append"""
+    import tempfile
+
+    path = path or os.path.join(tempfile.mkdtemp(), 'bench_journal.db')
+    journal = SalesJournal(path)
+    timings = []
+    for n in range(sales):
+        sale = {
+            'transaction_number': f"TXN-BENCH-{n:08d}",
+            'customer_id': None,
+            'employee_id': 1,
+            'payment_method': 'cash',
+            'subtotal': 500.0, 'discount_amount': 0.0, 'tax_amount': 90.0, 'total_amount': 590.0,
+            'transaction_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'items': [{'product_id': i + 1, 'quantity': 1, 'unit_price': 62.5,
+                       'discount_rate': 0.0, 'line_total': 73.75} for i in range(items_per_sale)]
+        }
+        start = time.perf_counter()
+        journal.append(sale)
+        timings.append(time.perf_counter() - start)
+    journal.close()
+    timings.sort()
+
+    results = {
+        'sales': sales,
+        'synchronous': journal.synchronous,
+        'p50_ms': timings[len(timings) // 2] * 1000,
+        'p99_ms': timings[int(len(timings) * 0.99) - 1] * 1000,
+        'max_ms': timings[-1] * 1000
+    }
+    print(f"🧾 Journal append ({journal.synchronous}): p50 {results['p50_ms']:.3f} ms, "
+          f"p99 {results['p99_ms']:.3f} ms, max {results['max_ms']:.3f} ms")
+    return results
+
+
+if __name__ == "__main__":
+    benchmark_journal_append()
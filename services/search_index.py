@@ -0,0 +1,356 @@
+"""
+Typo-tolerant name search over an in-process trigram index
+Copyright (c) 2024 [Your Name]. All rights reserved.
+
+    python -m services.search_index --benchmark   # synthetic 1M-customer index, no database
+"""
+import argparse
+import logging
+import math
+import re
+import threading
+import time
+import unicodedata
+import numpy as np
+from database import get_db, get_new_connection
+
+# Each index is built from one projected query; refresh() re-reads changed ids with it
+SOURCES = {
+    'customers': "SELECT id, name FROM customers WHERE is_active = TRUE",
+    'products': "SELECT id, name, brand FROM products WHERE is_active = TRUE",
+}
+
+MIN_OVERLAP = 0.5           # share of the query's trigrams a match must contain
+SHORT_QUERY_TRIGRAMS = 3    # up to this many, every trigram must match (typing a prefix)
+OVERLAY_LIMIT = 50000       # changed rows kept beside the base arrays before a rebuild
+MAX_CANDIDATES = 10000      # seed postings scanned per query before the match bar is raised
+SCAN_FACTOR = 8             # posting lists up to this many times the candidates are tallied, not searched
+
+# ' ' -> 0, a-z -> 1..26, 0-9 -> 27..36, document separator -> 37
+ALPHABET = 38
+SEPARATOR = '|'
+_CODES = np.full(256, 0, dtype=np.int32)
+_CODES[ord('a'):ord('z') + 1] = np.arange(1, 27)
+_CODES[ord('0'):ord('9') + 1] = np.arange(27, 37)
+_CODES[ord(SEPARATOR)] = 37
+
+
+def padded(text, prefix=False):
+    """Lower-case ASCII words, each padded as '  word ' (the last left open for a prefix query)"""
+    text = unicodedata.normalize('NFKD', str(text or '')).encode('ascii', 'ignore').decode().lower()
+    words = re.sub(r'[^a-z0-9]+', ' ', text).split()
+    result = ''.join(f"  {word} " for word in words)
+    return result[:-1] if prefix and result else result
+
+
+def _windows(chars):
+    """Trigram codes at every position of an encoded string, and which ones to keep"""
+    codes = chars[:-2] * ALPHABET * ALPHABET + chars[1:-1] * ALPHABET + chars[2:]
+    # Windows ending in two spaces only span the gap between words
+    keep = (chars[1:-1] != 0) | (chars[2:] != 0)
+    return codes, keep
+
+
+def trigrams(text, prefix=False):
+    """Sorted unique trigram codes of a text"""
+    text = padded(text, prefix)
+    if len(text) < 3:
+        return np.empty(0, dtype=np.int32)
+    codes, keep = _windows(_CODES[np.frombuffer(text.encode(), dtype=np.uint8)])
+    return np.unique(codes[keep])
+
+
+class TrigramIndex:
+    """Ranked fuzzy name search held in NumPy arrays.
+
+    Every text is split into padded trigrams ('amul' -> '  a', ' am', 'amu',
+    'mul', 'ul '). Rows sharing a text (many customers are called 'Rahul
+    Sharma') share one entry, so the postings grow with distinct names rather
+    than rows. _offsets[code] slices _postings, the sorted text numbers holding
+    that trigram. A query's rarest trigrams nominate candidates (a text sharing
+    enough trigrams must contain one of them), searchsorted over each posting
+    list counts the overlap, and matches rank by Jaccard similarity, so
+    "amul budder" still finds "Amul Butter".
+
+    Rows changed after the build are masked out of the base (_live) and kept
+    in a small dict overlay until the next rebuild. Memory is about 4 bytes per
+    trigram of each distinct text, 20 per distinct text and 17 per row: ~30 MB
+    for 1M customers with 190k distinct names (--benchmark). The build needs
+    a few times that transiently.
+    """
+
+    def __init__(self, name, query):
+        self.name = name
+        self.query = query
+        self._ids = np.empty(0, dtype=np.int64)            # row position -> id, ascending
+        self._row_text = np.empty(0, dtype=np.int32)       # row position -> text number
+        self._live = np.empty(0, dtype=bool)               # row not changed since the build
+        self._text_rows = np.empty(0, dtype=np.int32)      # row positions grouped by text
+        self._text_offsets = np.zeros(1, dtype=np.int64)
+        self._text_live = np.empty(0, dtype=np.int32)      # live rows per text
+        self._sizes = np.empty(0, dtype=np.int16)          # trigrams per text
+        self._offsets = np.zeros(ALPHABET ** 3 + 1, dtype=np.int64)
+        self._postings = np.empty(0, dtype=np.int32)
+        self._scratch = np.empty(0, dtype=np.int16)        # per-text tally, zero between searches
+        self._overlay = {}           # id -> trigram codes of rows changed since the build
+        self._overlay_postings = {}  # code -> {id, ...}
+        self._lock = threading.Lock()
+        self.loaded = False
+
+    @staticmethod
+    def _text(row):
+        return ' '.join(str(value) for value in row[1:] if value)
+
+    def load(self, conn=None):
+        """Rebuild from one pass over the source query"""
+        if conn is None:
+            conn, cursor = get_db()
+        else:
+            cursor = conn.cursor(buffered=True)
+        try:
+            cursor.execute(f"{self.query} ORDER BY id")
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+
+        started = time.perf_counter()
+        self.build([row[0] for row in rows], [self._text(row) for row in rows])
+        logging.info(f"Search index '{self.name}' built: {len(rows)} rows, {self.memory_bytes() // 1024} KB "
+                     f"in {time.perf_counter() - started:.2f}s")
+
+    def build(self, ids, texts):
+        """Replace the base arrays; ids must be ascending"""
+        numbers = {}
+        row_text = np.fromiter((numbers.setdefault(padded(text), len(numbers)) for text in texts),
+                               dtype=np.int32, count=len(texts))
+        distinct = [text + SEPARATOR for text in numbers]
+
+        chars = _CODES[np.frombuffer(''.join(distinct).encode(), dtype=np.uint8)]
+        owners = np.repeat(np.arange(len(distinct), dtype=np.int32),
+                           np.fromiter(map(len, distinct), dtype=np.int64, count=len(distinct)))
+        codes, keep = _windows(chars)
+        keep &= (chars[:-2] != 37) & (chars[1:-1] != 37) & (chars[2:] != 37)
+        codes, owners = codes[keep], owners[:-2][keep]
+
+        # Texts are numbered in order, so a stable sort by code leaves each posting list sorted
+        order = np.argsort(codes, kind='stable')
+        codes, owners = codes[order], owners[order]
+        first = np.ones(len(codes), dtype=bool)
+        first[1:] = (codes[1:] != codes[:-1]) | (owners[1:] != owners[:-1])
+        codes, owners = codes[first], owners[first]
+
+        text_rows = np.argsort(row_text, kind='stable').astype(np.int32)
+        text_live = np.bincount(row_text, minlength=len(distinct)).astype(np.int32)
+        with self._lock:
+            self._ids = np.asarray(ids, dtype=np.int64)
+            self._row_text = row_text
+            self._live = np.ones(len(texts), dtype=bool)
+            self._text_rows = text_rows
+            self._text_offsets = np.concatenate(([0], np.cumsum(text_live))).astype(np.int64)
+            self._text_live = text_live
+            self._sizes = np.bincount(owners, minlength=len(distinct)).astype(np.int16)
+            self._offsets = np.searchsorted(codes, np.arange(ALPHABET ** 3 + 1)).astype(np.int64)
+            self._postings = owners
+            self._scratch = np.zeros(len(distinct), dtype=np.int16)
+            self._overlay, self._overlay_postings = {}, {}
+            self.loaded = True
+
+    def refresh(self, ids):
+        """Re-read the given rows after a create, update or delete"""
+        ids = sorted({int(row_id) for row_id in ids if row_id})
+        if not ids or not self.loaded:
+            return
+        conn, cursor = get_db()
+        try:
+            cursor.execute(f"{self.query} AND id IN ({', '.join(['%s'] * len(ids))})", ids)
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+
+        with self._lock:
+            positions = np.searchsorted(self._ids, ids)
+            for row_id, position in zip(ids, positions):
+                if position < len(self._ids) and self._ids[position] == row_id and self._live[position]:
+                    self._live[position] = False
+                    self._text_live[self._row_text[position]] -= 1
+                for code in self._overlay.pop(row_id, ()):
+                    self._overlay_postings[code].discard(row_id)
+            for row in rows:
+                codes = trigrams(self._text(row)).tolist()
+                self._overlay[row[0]] = codes
+                for code in codes:
+                    self._overlay_postings.setdefault(code, set()).add(row[0])
+            rebuild = len(self._overlay) > OVERLAY_LIMIT
+        if rebuild:
+            self.load()
+
+    def search(self, term, limit=20):
+        """[(id, similarity), ...] best first, at most limit"""
+        if not self.loaded:
+            self.load()
+        query = trigrams(term, prefix=True)
+        if not len(query):
+            return []
+        needed = len(query) if len(query) <= SHORT_QUERY_TRIGRAMS else math.ceil(len(query) * MIN_OVERLAP)
+
+        with self._lock:
+            matches = self._search_base(query, needed, limit) + self._search_overlay(query, needed)
+        matches.sort(key=lambda match: (-match[1], match[0]))
+        return matches[:limit]
+
+    def _search_base(self, query, needed, limit):
+        lists = sorted((self._postings[self._offsets[code]:self._offsets[code + 1]] for code in query), key=len)
+        # A text with `needed` of the query's trigrams holds one of the rarest len - needed + 1.
+        # Very common trigrams raise the bar rather than flood the candidates.
+        while needed < len(lists) and sum(map(len, lists[:len(lists) - needed + 1])) > MAX_CANDIDATES:
+            needed += 1
+        seeds = lists[:len(lists) - needed + 1]
+        candidates = seeds[0] if len(seeds) == 1 else np.unique(np.concatenate(seeds))
+        candidates = candidates[self._text_live[candidates] > 0]
+        if not len(candidates):
+            return []
+
+        # Short lists are tallied into a scratch counter, long ones binary-searched
+        shared = np.zeros(len(candidates), dtype=np.int16)
+        tallied = [postings for postings in lists if len(postings) <= SCAN_FACTOR * len(candidates)]
+        for postings in tallied:
+            self._scratch[postings] += 1
+        if tallied:
+            shared += self._scratch[candidates]
+            for postings in tallied:
+                self._scratch[postings] = 0
+        for postings in lists[len(tallied):]:
+            found = np.searchsorted(postings, candidates)
+            np.minimum(found, len(postings) - 1, out=found)
+            shared += postings[found] == candidates
+        hit = shared >= needed
+        candidates, shared = candidates[hit], shared[hit]
+        similarity = shared / (len(query) + self._sizes[candidates] - shared)
+        if len(candidates) > limit:
+            best = np.argpartition(-similarity, limit)[:limit]
+            candidates, similarity = candidates[best], similarity[best]
+
+        matches = []
+        for text, score in zip(candidates.tolist(), similarity.tolist()):
+            rows = self._text_rows[self._text_offsets[text]:self._text_offsets[text + 1]]
+            rows = rows[self._live[rows]][:limit]
+            matches.extend((row_id, score) for row_id in self._ids[rows].tolist())
+        return matches
+
+    def _search_overlay(self, query, needed):
+        shared = {}
+        for code in query.tolist():
+            for row_id in self._overlay_postings.get(code, ()):
+                shared[row_id] = shared.get(row_id, 0) + 1
+        return [(row_id, count / (len(query) + len(self._overlay[row_id]) - count))
+                for row_id, count in shared.items() if count >= needed]
+
+    def memory_bytes(self):
+        return sum(array.nbytes for array in (self._ids, self._row_text, self._live, self._text_rows,
+                                              self._text_offsets, self._text_live, self._sizes,
+                                              self._offsets, self._postings, self._scratch))
+
+    def __len__(self):
+        return int(self._live.sum()) + len(self._overlay)
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_search_index(name):
+    """Process-wide index for one of SOURCES"""
+    with _indexes_lock:
+        if name not in _indexes:
+            _indexes[name] = TrigramIndex(name, SOURCES[name])
+        return _indexes[name]
+
+
+def notify_search_change(name, ids):
+    """Called after rows are committed; never raises"""
+    try:
+        get_search_index(name).refresh(ids)
+    except Exception as e:
+        logging.error(f"Search index '{name}' update failed: {e}")
+
+
+def warm_search_indexes():
+    """Build every index in the background so the first search does not wait"""
+    def worker():
+        conn = None
+        try:
+            conn = get_new_connection()
+            for name in SOURCES:
+                index = get_search_index(name)
+                if not index.loaded:
+                    index.load(conn)
+        except Exception as e:
+            logging.error(f"Search index build failed: {e}")
+        finally:
+            if conn:
+                conn.close()
+
+    threading.Thread(target=worker, daemon=True).start()
+
+
+def _synthetic_names(count, vocabulary, rng):
+    """Zipf-distributed made-up names (2-3 syllables), so a few are very common"""
+    syllables = ['ra', 'ma', 'an', 'ja', 'vi', 'sh', 'ka', 'ni', 'ta', 'ya', 'de', 'pa', 'su', 'ri', 'la',
+                 'mo', 'ha', 'ga', 'ne', 'ch', 'bh', 'dh', 'th', 'ku', 'ar', 'in', 'ee', 'es', 'ol', 'av']
+    words = {''.join(rng.choice(syllables, size=int(rng.integers(2, 4)))).title() for _ in range(vocabulary * 2)}
+    words = list(rng.permutation(sorted(words)))[:vocabulary]
+    ranks = np.minimum(rng.zipf(1.2, size=count), len(words)) - 1
+    return [words[rank] for rank in ranks]
+
+
+def benchmark_search(customers=1_000_000, queries=300, seed=42):
+    """Build a synthetic customer-name index and time lookups (no database)"""
+    rng = np.random.default_rng(seed)
+    firsts = _synthetic_names(customers, 5000, rng)
+    lasts = _synthetic_names(customers, 20000, rng)
+    texts = [f"{first} {last}" for first, last in zip(firsts, lasts)]
+
+    index = TrigramIndex('benchmark', None)
+    started = time.perf_counter()
+    index.build(list(range(1, customers + 1)), texts)
+    build_seconds = time.perf_counter() - started
+
+    # Misspell one letter of a real name, keep a prefix, or type a full name
+    terms = []
+    for n in range(queries):
+        name = texts[int(rng.integers(customers))].lower()
+        if n % 3 == 0:
+            spot = int(rng.integers(1, len(name)))
+            name = name[:spot] + 'x' + name[spot + 1:]
+        elif n % 3 == 1:
+            name = name[:int(rng.integers(3, len(name)))]
+        terms.append(name)
+
+    timings = []
+    for term in terms:
+        started = time.perf_counter()
+        index.search(term)
+        timings.append(time.perf_counter() - started)
+    timings = np.array(timings) * 1000
+    result = {'customers': customers, 'build_s': build_seconds, 'memory_mb': index.memory_bytes() / 2 ** 20,
+              'p50_ms': float(np.percentile(timings, 50)), 'p99_ms': float(np.percentile(timings, 99))}
+    result['distinct_names'] = len(index._sizes)
+    print(f"🔎 {customers:,} names ({result['distinct_names']:,} distinct) indexed in {build_seconds:.1f}s, {result['memory_mb']:.0f} MB; "
+          f"lookup p50 {result['p50_ms']:.2f} ms, p99 {result['p99_ms']:.2f} ms")
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Trigram name search index")
+    parser.add_argument('--benchmark', action='store_true', help="time a synthetic 1M-customer index")
+    parser.add_argument('--customers', type=int, default=1_000_000)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if args.benchmark:
+        benchmark_search(args.customers)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
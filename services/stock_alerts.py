@@ -0,0 +1,270 @@
+"""
+Incremental low-stock and near-expiry alerts
+Copyright (c) 2024 [Your Name]. All rights reserved.
+"""
+import heapq
+import logging
+import threading
+from datetime import date, datetime, timedelta
+from config import EXPIRY_ALERT_DAYS
+from database import get_db
+
+
+def _as_date(value):
+    if value is None or isinstance(value, date) and not isinstance(value, datetime):
+        return value
+    if isinstance(value, datetime):
+        return value.date()
+    return datetime.strptime(str(value)[:10], '%Y-%m-%d').date()
+
+
+class StockAlertEngine:
+    """Keeps stock_alerts in step with product changes instead of rescanning the catalog.
+
+    Low stock (quantity_in_stock <= GREATEST(min_stock_level, reorder_level)) is a
+    column-to-column predicate no index can serve, so every stock mutation calls
+    reconcile() for just the products it touched. Expiry depends on the calendar
+    rather than on a mutation, so upcoming expiry dates sit in a min-heap and
+    tick() pops the ones that have entered the alert window. Views and counts read
+    the stock_alerts table and cost O(alerts). Subscribers get a list of
+    'raised'/'cleared' events whenever a product crosses a threshold.
+    """
+
+    def __init__(self, expiry_days=EXPIRY_ALERT_DAYS):
+        self.expiry_days = expiry_days
+        self._expiry_heap = []
+        self._heap_day = None
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback):
+        """callback(events) - may be called from a background thread"""
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _emit(self, events):
+        if not events:
+            return
+        for callback in list(self._listeners):
+            try:
+                callback(events)
+            except Exception as e:
+                logging.error(f"Stock alert listener failed: {e}")
+
+    # -----------------------------------------------------------------
+    # Full rebuild (startup) and the expiry queue
+    # -----------------------------------------------------------------
+
+    def start(self, today=None, conn=None):
+        """Recompute every alert once, then load the expiry queue"""
+        today = today or date.today()
+        if conn is None:
+            conn, cursor = get_db()
+        else:
+            cursor = conn.cursor(buffered=True)
+        try:
+            conn.start_transaction()
+            cursor.execute("DELETE FROM stock_alerts")
+            cursor.execute("""
+                INSERT INTO stock_alerts (product_id, alert_type, quantity_in_stock, threshold, expiry_date)
+                SELECT id, 'low_stock', quantity_in_stock, GREATEST(min_stock_level, reorder_level), expiry_date
+                FROM products
+                WHERE is_active = TRUE AND quantity_in_stock <= GREATEST(min_stock_level, reorder_level)
+            """)
+            cursor.execute("""
+                INSERT INTO stock_alerts (product_id, alert_type, quantity_in_stock, threshold, expiry_date)
+                SELECT id, 'expiring', quantity_in_stock, GREATEST(min_stock_level, reorder_level), expiry_date
+                FROM products
+                WHERE is_active = TRUE AND expiry_date >= %s AND expiry_date <= %s
+            """, (today, today + timedelta(days=self.expiry_days)))
+            conn.commit()
+            self._load_expiry_heap(cursor, today)
+            logging.info("Stock alerts rebuilt")
+        except Exception as e:
+            conn.rollback()
+            print(f"❌ DEBUG: Error rebuilding stock alerts: {e}")
+            logging.error(f"Error rebuilding stock alerts: {e}")
+        finally:
+            cursor.close()
+
+    def _load_expiry_heap(self, cursor, today):
+        cursor.execute("""
+            SELECT expiry_date, id FROM products
+            WHERE is_active = TRUE AND expiry_date >= %s
+        """, (today,))
+        heap = [(_as_date(expiry), product_id) for expiry, product_id in cursor.fetchall()]
+        heapq.heapify(heap)
+        with self._lock:
+            self._expiry_heap = heap
+            self._heap_day = today
+
+    def tick(self, today=None):
+        """Raise alerts for expiries that entered the window and drop expired ones"""
+        today = today or date.today()
+        conn, cursor = get_db()
+        try:
+            if self._heap_day != today:
+                self._load_expiry_heap(cursor, today)
+                cursor.execute("""
+                    SELECT product_id FROM stock_alerts
+                    WHERE alert_type = 'expiring' AND expiry_date < %s
+                """, (today,))
+                expired = [row[0] for row in cursor.fetchall()]
+            else:
+                expired = []
+
+            window_end = today + timedelta(days=self.expiry_days)
+            due = set(expired)
+            with self._lock:
+                while self._expiry_heap and self._expiry_heap[0][0] <= window_end:
+                    due.add(heapq.heappop(self._expiry_heap)[1])
+        finally:
+            cursor.close()
+
+        if due:
+            self.reconcile(due, today=today)
+
+    # -----------------------------------------------------------------
+    # Incremental maintenance
+    # -----------------------------------------------------------------
+
+    def reconcile(self, product_ids, conn=None, today=None):
+        """Bring the alerts of the given products up to date; returns the events raised"""
+        product_ids = sorted({int(pid) for pid in product_ids if pid})
+        if not product_ids:
+            return []
+        today = today or date.today()
+        window_end = today + timedelta(days=self.expiry_days)
+        placeholders = ', '.join(['%s'] * len(product_ids))
+
+        if conn is None:
+            conn, cursor = get_db()
+        else:
+            cursor = conn.cursor(buffered=True)
+        try:
+            cursor.execute(f"""
+                SELECT id, name, quantity_in_stock, GREATEST(min_stock_level, reorder_level),
+                       expiry_date, is_active
+                FROM products WHERE id IN ({placeholders})
+            """, product_ids)
+            products = cursor.fetchall()
+            cursor.execute(f"""
+                SELECT product_id, alert_type FROM stock_alerts WHERE product_id IN ({placeholders})
+            """, product_ids)
+            current = {(product_id, alert_type) for product_id, alert_type in cursor.fetchall()}
+
+            desired, names, later = {}, {}, []
+            for product_id, name, quantity, threshold, expiry_date, is_active in products:
+                expiry_date = _as_date(expiry_date)
+                names[product_id] = name
+                if not is_active:
+                    continue
+                row = (quantity, threshold, expiry_date)
+                if quantity <= threshold:
+                    desired[(product_id, 'low_stock')] = row
+                if expiry_date and today <= expiry_date <= window_end:
+                    desired[(product_id, 'expiring')] = row
+                elif expiry_date and expiry_date > window_end:
+                    later.append((expiry_date, product_id))
+
+            if desired:
+                cursor.executemany("""
+                    INSERT INTO stock_alerts (product_id, alert_type, quantity_in_stock, threshold, expiry_date)
+                    VALUES (%s, %s, %s, %s, %s)
+                    ON DUPLICATE KEY UPDATE quantity_in_stock = VALUES(quantity_in_stock),
+                                            threshold = VALUES(threshold),
+                                            expiry_date = VALUES(expiry_date)
+                """, [key + row for key, row in desired.items()])
+            cleared = current - desired.keys()
+            if cleared:
+                cursor.executemany("DELETE FROM stock_alerts WHERE product_id = %s AND alert_type = %s",
+                                   sorted(cleared))
+            conn.commit()
+        except Exception as e:
+            print(f"❌ DEBUG: Error updating stock alerts: {e}")
+            logging.error(f"Error updating stock alerts for {product_ids}: {e}")
+            return []
+        finally:
+            cursor.close()
+
+        with self._lock:
+            for entry in later:
+                heapq.heappush(self._expiry_heap, entry)
+
+        events = []
+        for key in sorted(desired.keys() - current):
+            quantity, threshold, expiry_date = desired[key]
+            events.append({'event': 'raised', 'product_id': key[0], 'alert_type': key[1], 'name': names.get(key[0]),
+                           'quantity': quantity, 'threshold': threshold, 'expiry_date': expiry_date})
+        for key in sorted(cleared):
+            events.append({'event': 'cleared', 'product_id': key[0], 'alert_type': key[1],
+                           'name': names.get(key[0])})
+        self._emit(events)
+        return events
+
+    # -----------------------------------------------------------------
+    # Views - O(alerts)
+    # -----------------------------------------------------------------
+
+    def get_alerts(self, alert_type=None):
+        """Current alerts joined with product names"""
+        try:
+            conn, cursor = get_db()
+            query = """
+                SELECT sa.product_id, sa.alert_type, p.product_code, p.name,
+                       sa.quantity_in_stock, sa.threshold, sa.expiry_date, sa.raised_at
+                FROM stock_alerts sa
+                JOIN products p ON p.id = sa.product_id
+            """
+            params = ()
+            if alert_type:
+                query += " WHERE sa.alert_type = %s"
+                params = (alert_type,)
+            query += " ORDER BY sa.alert_type, sa.quantity_in_stock, sa.expiry_date"
+            cursor.execute(query, params)
+            columns = ('product_id', 'alert_type', 'product_code', 'name',
+                       'quantity_in_stock', 'threshold', 'expiry_date', 'raised_at')
+            alerts = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            cursor.close()
+            return alerts
+
+        except Exception as e:
+            logging.error(f"Error getting stock alerts: {e}")
+            return []
+
+    def get_alert_counts(self):
+        try:
+            conn, cursor = get_db()
+            cursor.execute("SELECT alert_type, COUNT(*) FROM stock_alerts GROUP BY alert_type")
+            counts = {'low_stock': 0, 'expiring': 0}
+            counts.update({alert_type: count for alert_type, count in cursor.fetchall()})
+            cursor.close()
+            return counts
+
+        except Exception as e:
+            logging.error(f"Error counting stock alerts: {e}")
+            return {'low_stock': 0, 'expiring': 0}
+
+
+_engine = None
+
+
+def get_alert_engine():
+    """Process-wide engine shared by the models and the UI"""
+    global _engine
+    if _engine is None:
+        _engine = StockAlertEngine()
+    return _engine
+
+
+def notify_stock_change(product_ids, conn=None):
+    """Called after stock, threshold or expiry changes are committed; never raises"""
+    try:
+        return get_alert_engine().reconcile(product_ids, conn)
+    except Exception as e:
+        logging.error(f"Stock alert update failed: {e}")
+        return []
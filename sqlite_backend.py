@@ -0,0 +1,527 @@
+"""
+Embedded SQLite storage backend - MySQL dialect translation for single-till and test deployments
+"""
+import logging
+import os
+import re
+import sqlite3
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+from mysql.connector import errors as mysql_errors
+
+
+# =====================================================================
+# TYPE ADAPTERS / CONVERTERS - values round-trip as mysql.connector returns them
+# =====================================================================
+
+def _adapt_datetime(value):
+    return value.strftime('%Y-%m-%d %H:%M:%S.%f' if value.microsecond else '%Y-%m-%d %H:%M:%S')
+
+
+def _adapt_timedelta(value):
+    seconds = int(value.total_seconds())
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def _convert_datetime(raw):
+    text = raw.decode()
+    try:
+        return datetime.fromisoformat(text)
+    except ValueError:
+        return text
+
+
+def _convert_date(raw):
+    text = raw.decode()
+    try:
+        return date.fromisoformat(text[:10])
+    except ValueError:
+        return text
+
+
+def _convert_time(raw):
+    text = raw.decode()
+    try:
+        hours, minutes, seconds = text.split(':')
+        return timedelta(hours=int(hours), minutes=int(minutes), seconds=float(seconds))
+    except ValueError:
+        return text
+
+
+def _convert_decimal(raw):
+    try:
+        return Decimal(raw.decode())
+    except InvalidOperation:
+        return raw.decode()
+
+
+sqlite3.register_adapter(Decimal, float)
+sqlite3.register_adapter(datetime, _adapt_datetime)
+sqlite3.register_adapter(date, date.isoformat)
+sqlite3.register_adapter(time, time.isoformat)
+sqlite3.register_adapter(timedelta, _adapt_timedelta)
+for _name in ('TIMESTAMP', 'DATETIME'):
+    sqlite3.register_converter(_name, _convert_datetime)
+sqlite3.register_converter('DATE', _convert_date)
+sqlite3.register_converter('TIME', _convert_time)
+sqlite3.register_converter('DECIMAL', _convert_decimal)
+
+
+# =====================================================================
+# DIALECT TRANSLATION
+# =====================================================================
+
+_LITERAL = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\"|`[^`]*`")
+_PLACEHOLDER = re.compile(r"\x00(\d+)\x00")
+_INTERVAL = re.compile(r"^INTERVAL\s+(.+?)\s+(SECOND|MINUTE|HOUR|DAY|WEEK|MONTH|YEAR)S?$", re.I | re.S)
+_STRFTIME_PARTS = {'YEAR': '%Y', 'MONTH': '%m', 'DAY': '%d', 'DAYOFMONTH': '%d', 'HOUR': '%H',
+                   'MINUTE': '%M', 'SECOND': '%S'}
+_MYSQL_FORMATS = {'%i': '%M', '%s': '%S', '%e': '%d', '%c': '%m', '%k': '%H', '%T': '%H:%M:%S'}
+_DIFF_FACTORS = {'DAY': 1, 'HOUR': 24, 'MINUTE': 1440, 'SECOND': 86400}
+
+
+def _protect_literals(sql):
+    """Swap quoted literals for placeholders so rewrites never touch their contents"""
+    literals = []
+
+    def keep(match):
+        text = match.group(0)
+        if text.startswith('`'):
+            text = '"' + text[1:-1] + '"'
+        literals.append(text)
+        return f"\x00{len(literals) - 1}\x00"
+
+    return _LITERAL.sub(keep, sql), literals
+
+
+def _restore_literals(sql, literals):
+    return _PLACEHOLDER.sub(lambda m: literals[int(m.group(1))], sql)
+
+
+def _split_args(text):
+    """Split a call's argument text at top-level commas"""
+    args, depth, current = [], 0, []
+    for char in text:
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            args.append(''.join(current).strip())
+            current = []
+            continue
+        current.append(char)
+    tail = ''.join(current).strip()
+    if tail or args:
+        args.append(tail)
+    return args
+
+
+def _interval_modifier(base, interval, sign):
+    match = _INTERVAL.match(interval.strip())
+    if not match:
+        raise ValueError(f"Unsupported interval: {interval}")
+    amount, unit = match.group(1), match.group(2).upper()
+    if unit == 'WEEK':
+        amount, unit = f"({amount}) * 7", 'DAY'
+    amount = f"({amount})" if sign > 0 else f"(-({amount}))"
+    func = 'date' if base.lower().startswith('date(') and unit in ('DAY', 'MONTH', 'YEAR') else 'datetime'
+    return f"{func}({base}, {amount} || ' {unit.lower()}s')"
+
+
+def _rewrite_call(name, args, literals):
+    """SQLite equivalent of one MySQL function call (args already translated)"""
+    upper = name.upper()
+    if upper in ('NOW', 'SYSDATE'):
+        return "datetime('now', 'localtime')"
+    if upper == 'CURDATE':
+        return "date('now', 'localtime')"
+    if upper == 'CURTIME':
+        return "time('now', 'localtime')"
+    if upper in ('DATE_SUB', 'DATE_ADD'):
+        return _interval_modifier(args[0], args[1], -1 if upper == 'DATE_SUB' else 1)
+    if upper == 'GREATEST':
+        return f"MAX({', '.join(args)})"
+    if upper == 'LEAST':
+        return f"MIN({', '.join(args)})"
+    if upper == 'IF':
+        return f"(CASE WHEN {args[0]} THEN {args[1]} ELSE {args[2]} END)"
+    if upper == 'CONCAT':
+        # || binds tighter than arithmetic, so each argument keeps its own parentheses
+        return '(' + ' || '.join(f'({arg})' for arg in args) + ')'
+    if upper == 'DATEDIFF':
+        return f"CAST(julianday(date({args[0]})) - julianday(date({args[1]})) AS INTEGER)"
+    if upper == 'TIMESTAMPDIFF':
+        factor = _DIFF_FACTORS[args[0].upper()]
+        return f"CAST((julianday({args[2]}) - julianday({args[1]})) * {factor} AS INTEGER)"
+    if upper in _STRFTIME_PARTS:
+        return f"CAST(strftime('{_STRFTIME_PARTS[upper]}', {args[0]}) AS INTEGER)"
+    if upper == 'DAYOFWEEK':
+        return f"(CAST(strftime('%w', {args[0]}) AS INTEGER) + 1)"
+    if upper == 'WEEKDAY':
+        return f"((CAST(strftime('%w', {args[0]}) AS INTEGER) + 6) % 7)"
+    if upper == 'UNIX_TIMESTAMP':
+        return f"CAST(strftime('%s', {args[0]}) AS INTEGER)" if args else "CAST(strftime('%s', 'now') AS INTEGER)"
+    if upper == 'DATE_FORMAT':
+        fmt = args[1]
+        match = _PLACEHOLDER.fullmatch(fmt)
+        if match:
+            literal = literals[int(match.group(1))]
+            for mysql_code, sqlite_code in _MYSQL_FORMATS.items():
+                literal = literal.replace(mysql_code, sqlite_code)
+            literals.append(literal)
+            fmt = f"\x00{len(literals) - 1}\x00"
+        return f"strftime({fmt}, {args[0]})"
+    raise KeyError(name)
+
+
+_FUNCTIONS = ('NOW', 'SYSDATE', 'CURDATE', 'CURTIME', 'DATE_SUB', 'DATE_ADD', 'GREATEST', 'LEAST',
+              'IF', 'CONCAT', 'DATEDIFF', 'TIMESTAMPDIFF', 'DAYOFWEEK', 'WEEKDAY', 'UNIX_TIMESTAMP',
+              'DATE_FORMAT') + tuple(_STRFTIME_PARTS)
+_CALL = re.compile(r"(?<![\w.])(" + '|'.join(_FUNCTIONS) + r")\s*\(", re.I)
+
+
+def _rewrite_functions(sql, literals):
+    """Rewrite MySQL-only function calls, innermost arguments first"""
+    out = []
+    pos = 0
+    while True:
+        match = _CALL.search(sql, pos)
+        if not match:
+            out.append(sql[pos:])
+            return ''.join(out)
+        depth, end = 1, match.end()
+        while end < len(sql) and depth:
+            if sql[end] == '(':
+                depth += 1
+            elif sql[end] == ')':
+                depth -= 1
+            end += 1
+        inner = _rewrite_functions(sql[match.end():end - 1], literals)
+        out.append(sql[pos:match.start()])
+        out.append(_rewrite_call(match.group(1), _split_args(inner), literals))
+        pos = end
+
+
+def _index_name(table, name):
+    """SQLite index names are database-wide; MySQL's are per table"""
+    return name if name.startswith(f"{table}_") else f"{table}_{name}"
+
+
+def _index_columns(columns):
+    return re.sub(r"(\w+)\s*\(\d+\)", r"\1", columns)
+
+
+def _translate_column(definition, table, touch_columns):
+    sql = definition
+    sql = re.sub(r"^(\w+)\s+(?:BIG|SMALL|TINY|MEDIUM)?INT(?:\(\d+\))?\s+(?:UNSIGNED\s+)?"
+                 r"(?:NOT NULL\s+)?(?:AUTO_INCREMENT\s+PRIMARY KEY|PRIMARY KEY\s+AUTO_INCREMENT)",
+                 r"\1 INTEGER PRIMARY KEY AUTOINCREMENT", sql, flags=re.I)
+    sql = re.sub(r"^(\w+)\s+ENUM\s*\(([^)]*)\)", r"\1 TEXT CHECK (\1 IN (\2))", sql, flags=re.I)
+    if re.search(r"\bON UPDATE CURRENT_TIMESTAMP\b", sql, re.I):
+        touch_columns.append(sql.split()[0])
+        sql = re.sub(r"\s*\bON UPDATE CURRENT_TIMESTAMP\b", '', sql, flags=re.I)
+    sql = re.sub(r"\bDEFAULT CURRENT_TIMESTAMP\b", "DEFAULT (datetime('now', 'localtime'))", sql, flags=re.I)
+    sql = re.sub(r"\s+UNSIGNED\b|\s+(?:CHARACTER SET|COLLATE)\s+\w+|\s+COMMENT\s+\x00\d+\x00", '', sql, flags=re.I)
+    return sql
+
+
+def _translate_create_table(sql):
+    """CREATE TABLE with inline indexes -> CREATE TABLE + CREATE INDEX (+ updated_at trigger)"""
+    head = re.match(r"\s*CREATE\s+TABLE\s+(IF NOT EXISTS\s+)?([\w\"]+)\s*\(", sql, re.I)
+    table = head.group(2).strip('"')
+    depth, end = 1, head.end()
+    while depth:
+        if sql[end] == '(':
+            depth += 1
+        elif sql[end] == ')':
+            depth -= 1
+        end += 1
+    items = _split_args(sql[head.end():end - 1])
+
+    columns, indexes, touch_columns = [], [], []
+    for item in items:
+        if not item:
+            continue
+        index = re.match(r"(UNIQUE\s+)?(?:INDEX|KEY)\s+(\w+)\s*\((.*)\)$", item, re.I | re.S)
+        unique_key = re.match(r"UNIQUE\s+(?:KEY|INDEX)?\s*(\w+)?\s*\((.*)\)$", item, re.I | re.S)
+        if re.match(r"(FULLTEXT|SPATIAL)\b", item, re.I):
+            continue
+        if index and not index.group(1):
+            indexes.append(f"CREATE INDEX IF NOT EXISTS {_index_name(table, index.group(2))} "
+                           f"ON {table} ({_index_columns(index.group(3))})")
+        elif unique_key:
+            columns.append(f"UNIQUE ({_index_columns(unique_key.group(2))})")
+        else:
+            columns.append(_translate_column(item, table, touch_columns))
+
+    statements = [f"CREATE TABLE {head.group(1) or ''}{table} (\n    " + ",\n    ".join(columns) + "\n)"]
+    statements.extend(indexes)
+    for column in touch_columns:
+        statements.append(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_touch_{column}
+            AFTER UPDATE ON {table} FOR EACH ROW WHEN NEW.{column} IS OLD.{column}
+            BEGIN
+                UPDATE {table} SET {column} = datetime('now', 'localtime') WHERE rowid = NEW.rowid;
+            END
+        """)
+    return statements
+
+
+def _translate_alter_table(sql):
+    match = re.match(r"\s*ALTER\s+TABLE\s+(\w+)\s+(.*)$", sql, re.I | re.S)
+    table, actions = match.group(1), match.group(2)
+    statements = []
+    for action in _split_args(actions):
+        index = re.match(r"ADD\s+(UNIQUE\s+)?(?:INDEX|KEY)\s+(\w+)\s*\((.*)\)$", action, re.I | re.S)
+        if index:
+            statements.append(f"CREATE {'UNIQUE ' if index.group(1) else ''}INDEX "
+                              f"{_index_name(table, index.group(2))} ON {table} ({_index_columns(index.group(3))})")
+            continue
+        drop = re.match(r"DROP\s+(?:INDEX|KEY)\s+(\w+)$", action, re.I)
+        if drop:
+            statements.append(f"DROP INDEX IF EXISTS {_index_name(table, drop.group(1))}")
+            continue
+        if re.match(r"MODIFY\s+(?:COLUMN\s+)?\w+", action, re.I):
+            continue  # SQLite cannot redefine a column; CREATE TABLE carries the new definition
+        column = re.match(r"ADD\s+(?:COLUMN\s+)?(.*?)(?:\s+(?:AFTER\s+\w+|FIRST))?$", action, re.I | re.S)
+        if column:
+            statements.append(f"ALTER TABLE {table} ADD COLUMN {_translate_column(column.group(1), table, [])}")
+            continue
+        statements.append(f"ALTER TABLE {table} {action}")
+    return statements
+
+
+@lru_cache(maxsize=1024)
+def translate(query):
+    """Translate one MySQL statement into a tuple of SQLite statements"""
+    sql = query.strip().rstrip(';')
+    sql = re.sub(r"%\((\w+)\)s", r":\1", sql)
+    sql, literals = _protect_literals(sql)
+    sql = sql.replace('%s', '?').replace('%%', '%')
+
+    keyword = sql.split(None, 1)[0].upper() if sql else ''
+    if keyword in ('DESCRIBE', 'DESC') or re.match(r"SHOW\s+COLUMNS\s+FROM\s", sql, re.I):
+        table = sql.split()[-1].strip('"')
+        return (f"""SELECT name, type, CASE WHEN "notnull" THEN 'NO' ELSE 'YES' END,
+                           CASE WHEN pk THEN 'PRI' ELSE '' END, dflt_value, ''
+                    FROM pragma_table_info('{table}')""",)
+    if re.match(r"SHOW\s+TABLES$", sql, re.I):
+        return ("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name",)
+    fk_checks = re.match(r"SET\s+FOREIGN_KEY_CHECKS\s*=\s*(\d)$", sql, re.I)
+    if fk_checks:
+        return (f"PRAGMA foreign_keys = {'ON' if fk_checks.group(1) == '1' else 'OFF'}",)
+    if keyword == 'SET':
+        return ()  # session variables have no SQLite equivalent
+    if re.match(r"START\s+TRANSACTION$", sql, re.I):
+        return ("BEGIN IMMEDIATE",)
+
+    sql = _rewrite_functions(sql, literals)
+    sql = re.sub(r"\bINSERT\s+IGNORE\b", "INSERT OR IGNORE", sql, flags=re.I)
+    sql = re.sub(r"\s+FOR\s+UPDATE(\s+SKIP\s+LOCKED|\s+NOWAIT)?\b|\s+LOCK\s+IN\s+SHARE\s+MODE\b", '', sql, flags=re.I)
+    sql = re.sub(r"\bAS\s+DECIMAL\s*\([^)]*\)", "AS REAL", sql, flags=re.I)
+    sql = re.sub(r"\bAS\s+(?:UNSIGNED|SIGNED)(?:\s+INTEGER)?\b", "AS INTEGER", sql, flags=re.I)
+    duplicate = re.search(r"\bON\s+DUPLICATE\s+KEY\s+UPDATE\b", sql, re.I)
+    if duplicate:
+        tail = re.sub(r"\bVALUES\s*\(\s*(\w+)\s*\)", r"excluded.\1", sql[duplicate.end():], flags=re.I)
+        sql = sql[:duplicate.start()] + " ON CONFLICT DO UPDATE SET" + tail
+
+    if re.match(r"CREATE\s+TABLE\b", sql, re.I):
+        statements = _translate_create_table(sql)
+    elif re.match(r"ALTER\s+TABLE\b", sql, re.I):
+        statements = _translate_alter_table(sql)
+    else:
+        index = re.match(r"CREATE\s+(UNIQUE\s+)?INDEX\s+(\w+)\s+ON\s+(\w+)\s*\((.*)\)$", sql, re.I | re.S)
+        if index:
+            sql = (f"CREATE {index.group(1) or ''}INDEX {_index_name(index.group(3), index.group(2))} "
+                   f"ON {index.group(3)} ({_index_columns(index.group(4))})")
+        sql = re.sub(r"\)\s*(ENGINE|DEFAULT CHARSET|ROW_FORMAT|PARTITION BY)\b.*$", ')', sql, flags=re.I | re.S)
+        statements = [sql]
+    return tuple(_restore_literals(statement, literals) for statement in statements)
+
+
+# =====================================================================
+# ERRORS - surface SQLite failures as the mysql.connector errors callers handle
+# =====================================================================
+
+def _mysql_error(error):
+    message = str(error)
+    lowered = message.lower()
+    if isinstance(error, sqlite3.IntegrityError):
+        if 'unique' in lowered:
+            errno = 1062
+        elif 'foreign key' in lowered:
+            errno = 1452
+        elif 'not null' in lowered:
+            errno = 1048
+        else:
+            errno = 3819
+        return mysql_errors.IntegrityError(msg=message, errno=errno)
+    if 'locked' in lowered or 'busy' in lowered:
+        return mysql_errors.OperationalError(msg=message, errno=1205)
+    if 'no such table' in lowered:
+        return mysql_errors.ProgrammingError(msg=message, errno=1146)
+    if 'no such column' in lowered:
+        return mysql_errors.ProgrammingError(msg=message, errno=1054)
+    if 'duplicate column' in lowered:
+        return mysql_errors.ProgrammingError(msg=message, errno=1060)
+    if 'index' in lowered and 'already exists' in lowered:
+        return mysql_errors.ProgrammingError(msg=message, errno=1061)
+    if 'already exists' in lowered:
+        return mysql_errors.ProgrammingError(msg=message, errno=1050)
+    if 'syntax error' in lowered:
+        return mysql_errors.ProgrammingError(msg=message, errno=1064)
+    return mysql_errors.DatabaseError(msg=message)
+
+
+# =====================================================================
+# CONNECTION / CURSOR - the subset of mysql.connector the models use
+# =====================================================================
+
+class SQLiteCursor:
+    """Buffered cursor over a SQLite connection that accepts MySQL-dialect SQL"""
+
+    def __init__(self, connection, dictionary=False):
+        self._connection = connection
+        self._cursor = connection._conn.cursor()
+        self._dictionary = dictionary
+        self._rows = []
+        self._position = 0
+        self.rowcount = -1
+        self.lastrowid = None
+        self.description = None
+
+    @property
+    def column_names(self):
+        return tuple(column[0] for column in self.description or ())
+
+    @property
+    def with_rows(self):
+        return self.description is not None
+
+    def _run(self, statements, run):
+        try:
+            for statement in statements:
+                run(statement)
+        except sqlite3.Error as e:
+            raise _mysql_error(e) from e
+        self.description = self._cursor.description
+        self.lastrowid = self._cursor.lastrowid
+        if self.description is not None:
+            rows = self._cursor.fetchall()
+            if self._dictionary:
+                names = self.column_names
+                rows = [dict(zip(names, row)) for row in rows]
+            self._rows = rows
+            self.rowcount = len(rows)
+        else:
+            self._rows = []
+            self.rowcount = self._cursor.rowcount
+        self._position = 0
+
+    def execute(self, query, params=None):
+        statements = translate(query)
+        params = tuple(params) if isinstance(params, (list, tuple)) else (params or ())
+        self._run(statements, lambda statement: self._cursor.execute(
+            statement, params if statement is statements[0] else ()))
+
+    def executemany(self, query, seq_params):
+        statements = translate(query)
+        self._run(statements[:1], lambda statement: self._cursor.executemany(
+            statement, [tuple(params) for params in seq_params]))
+
+    def fetchone(self):
+        if self._position >= len(self._rows):
+            return None
+        row = self._rows[self._position]
+        self._position += 1
+        return row
+
+    def fetchmany(self, size=1):
+        rows = self._rows[self._position:self._position + size]
+        self._position += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._rows[self._position:]
+        self._position = len(self._rows)
+        return rows
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def close(self):
+        self._cursor.close()
+        self._rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SQLiteConnection:
+    """mysql.connector-style connection over an embedded SQLite database.
+
+    Runs in WAL mode with foreign keys on. Like the MySQL connection (autocommit
+    on), every statement commits by itself unless start_transaction() opened an
+    explicit transaction; that takes the write lock up front (BEGIN IMMEDIATE) so
+    two tills cannot deadlock upgrading read locks.
+    """
+
+    def __init__(self, path, timeout=10.0):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._conn = sqlite3.connect(path, timeout=timeout, isolation_level=None,
+                                     detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._open = True
+
+    @property
+    def in_transaction(self):
+        return self._conn.in_transaction
+
+    @property
+    def autocommit(self):
+        return not self._conn.in_transaction
+
+    def cursor(self, buffered=True, dictionary=False, **kwargs):
+        return SQLiteCursor(self, dictionary=dictionary)
+
+    def start_transaction(self, **kwargs):
+        try:
+            self._conn.execute("BEGIN IMMEDIATE")
+        except sqlite3.Error as e:
+            raise _mysql_error(e) from e
+
+    def commit(self):
+        if self._conn.in_transaction:
+            self._conn.execute("COMMIT")
+
+    def rollback(self):
+        if self._conn.in_transaction:
+            self._conn.execute("ROLLBACK")
+
+    def is_connected(self):
+        return self._open
+
+    def ping(self, reconnect=False, attempts=1, delay=0):
+        return None
+
+    def close(self):
+        if self._open:
+            self._conn.close()
+            self._open = False
+
+
+def connect(path):
+    """Open the embedded database (created on first use)"""
+    connection = SQLiteConnection(path)
+    logging.info(f"SQLite backend opened: {path}")
+    return connection
@@ -9,7 +9,13 @@ import logging
 from models.product import Product
 from models.customer import Customer
 from models.transaction import Transaction
+from services.promotions import PromotionEngine
+from services.cart import CartModel
+from services.sales_journal import SalesJournal, JournalUploader
+from services.notifications import notify_outbox, queue_sale_notifications
 from database import get_db
+from config import OFFLINE_TILL_MODE
+import platform
 
 RUPEE = "₹"
 
@@ -19,8 +25,15 @@ class BillingPanel:
     def __init__(self, notebook, main_app):
         self.notebook = notebook
         self.main_app = main_app
-        self.cart_items = []    # list of dicts
+        self.cart = CartModel()  # lines + running totals
         self.current_customer = None
+        self.promotion_result = {'total_discount': 0.0, 'applied': []}
+        self.journal = None
+        if OFFLINE_TILL_MODE:
+            # Sales commit to the local journal; the uploader feeds MySQL behind the till
+            self.journal = SalesJournal()
+            self.uploader = JournalUploader(self.journal)
+            self.uploader.start()
         self._build_ui()
 
     # ────────────────────────────────────────── helper: categories ─
@@ -242,45 +255,45 @@ class BillingPanel:
             messagebox.showerror("Error", f"Failed to add product: {e}")
 
     # ─────────────────────────────────────────────── cart logic ────
+    @property
+    def cart_items(self):
+        """Cart lines as a list of dicts (read-only view of the cart model)"""
+        return self.cart.items()
+
     def add_product_to_cart(self, prod, qty=1):
         if prod.quantity_in_stock < qty:
             messagebox.showwarning("Low Stock", f"Only {prod.quantity_in_stock} units available!")
             return
-        for itm in self.cart_items:
-            if itm['product_id'] == prod.id:
-                new_q = itm['quantity'] + qty
-                if new_q > prod.quantity_in_stock:
-                    messagebox.showwarning("Stock Limit", f"Cannot add more than {prod.quantity_in_stock}")
-                    return
-                itm['quantity'] = new_q
-                break
-        else:
-            self.cart_items.append({
-                'product_id': prod.id,
-                'name':       prod.name,
-                'unit_price': float(prod.unit_price),
-                'quantity':   qty,
-                'disc':       float(prod.discount_rate or 0),
-                'gst':        float(prod.tax_rate       or 18)
-            })
-        self._refresh_cart_tree()
+        itm = self.cart.get(prod.id)
+        if itm and itm['quantity'] + qty > prod.quantity_in_stock:
+            messagebox.showwarning("Stock Limit", f"Cannot add more than {prod.quantity_in_stock}")
+            return
+        itm = self.cart.add_product(prod, qty)
+        self._update_cart_row(itm)
         self.calculate_totals()
 
+    def _cart_row_values(self, itm):
+        return (
+            itm['name'][:18],  # Shortened for better fit
+            itm['quantity'],
+            f"{RUPEE}{itm['unit_price']:.2f}",
+            f"{itm['disc']:.1f}",
+            f"{itm['gst']:.1f}",
+            f"{RUPEE}{itm['line_total']:.2f}"
+        )
+
+    def _update_cart_row(self, itm):
+        """Insert or refresh the single Treeview row for a cart line"""
+        iid = str(itm['product_id'])
+        if self.cart_tree.exists(iid):
+            self.cart_tree.item(iid, values=self._cart_row_values(itm))
+        else:
+            self.cart_tree.insert('', tk.END, iid=iid, values=self._cart_row_values(itm))
+
     def _refresh_cart_tree(self):
         self.cart_tree.delete(*self.cart_tree.get_children())
-        for itm in self.cart_items:
-            sub   = itm['quantity'] * itm['unit_price']
-            less  = sub * itm['disc']/100
-            gst   = (sub-less) * itm['gst']/100
-            total = sub - less + gst
-            self.cart_tree.insert('', tk.END, iid=str(itm['product_id']), values=(
-                itm['name'][:18],  # Shortened for better fit
-                itm['quantity'],
-                f"{RUPEE}{itm['unit_price']:.2f}",
-                f"{itm['disc']:.1f}",
-                f"{itm['gst']:.1f}",
-                f"{RUPEE}{total:.2f}"
-            ))
+        for itm in self.cart:
+            self.cart_tree.insert('', tk.END, iid=str(itm['product_id']), values=self._cart_row_values(itm))
 
     def update_quantity(self):
         sel = self.cart_tree.selection()
@@ -288,7 +301,7 @@ class BillingPanel:
             messagebox.showwarning("Selection", "Please select an item to update")
             return
         pid = int(sel[0])
-        itm = next((i for i in self.cart_items if i['product_id']==pid), None)
+        itm = self.cart.get(pid)
         if not itm:
             return
         new_q = simpledialog.askinteger(
@@ -297,15 +310,12 @@ class BillingPanel:
             minvalue=1, maxvalue=999
         )
         if new_q and new_q != itm['quantity']:
-            try:
-                prod = Product.get_product_by_id(pid)
-                if prod and new_q > prod.quantity_in_stock:
-                    messagebox.showwarning("Stock Limit", f"Only {prod.quantity_in_stock} units available!")
-                    return
-            except:
-                pass
-            itm['quantity'] = new_q
-            self._refresh_cart_tree()
+            # Stock level was cached on the line when the product was scanned
+            stock = itm.get('stock')
+            if stock is not None and new_q > stock:
+                messagebox.showwarning("Stock Limit", f"Only {stock} units available!")
+                return
+            self._update_cart_row(self.cart.set_quantity(pid, new_q))
             self.calculate_totals()
 
     def apply_item_discount(self):
@@ -314,7 +324,7 @@ class BillingPanel:
             messagebox.showwarning("Selection", "Please select an item to apply discount")
             return
         pid = int(sel[0])
-        itm = next((i for i in self.cart_items if i['product_id']==pid), None)
+        itm = self.cart.get(pid)
         if not itm:
             return
         nd = simpledialog.askfloat(
@@ -323,8 +333,7 @@ class BillingPanel:
             minvalue=0, maxvalue=100
         )
         if nd is not None:
-            itm['disc'] = nd
-            self._refresh_cart_tree()
+            self._update_cart_row(self.cart.set_discount(pid, nd))
             self.calculate_totals()
 
     def remove_cart_item(self):
@@ -333,32 +342,36 @@ class BillingPanel:
             messagebox.showwarning("Selection", "Please select an item to remove")
             return
         pid = int(sel[0])
-        itm = next((i for i in self.cart_items if i['product_id']==pid), None)
+        itm = self.cart.get(pid)
         if itm and messagebox.askyesno("Confirm", f"Remove '{itm['name']}' from cart?"):
-            self.cart_items = [i for i in self.cart_items if i['product_id']!=pid]
-            self._refresh_cart_tree()
+            self.cart.remove(pid)
+            self.cart_tree.delete(sel[0])
             self.calculate_totals()
 
     def clear_cart(self):
         if messagebox.askyesno("Confirm", "Clear entire cart?"):
-            self.cart_items.clear()
+            self.cart.clear()
             self._refresh_cart_tree()
             self.calculate_totals()
 
     # ─────────────────────────────────────── totals / change etc. ─
     def calculate_totals(self):
-        if not self.cart_items:
+        if not self.cart:
+            self.promotion_result = {'total_discount': 0.0, 'applied': []}
             for lb in (self.lb_sub, self.lb_itdis, self.lb_ovdis, self.lb_tax, self.lb_tot):
                 lb.config(text=lb.cget('text').split(':')[0] + f": {RUPEE}0.00")
             self.calculate_change(); return
-        sub = disc = gst = 0
-        for i in self.cart_items:
-            s = i['quantity'] * i['unit_price']; sub += s
-            d = s * i['disc']/100;               disc += d
-            gst += (s-d)* i['gst']/100
+        # Running totals are maintained by the cart model on every change
+        sub, disc, gst = self.cart.subtotal, self.cart.item_discount, self.cart.tax
         
-        # Order discount (can be enhanced later)
-        odisc = 0
+        # Order discount from active promotions (prices after manual item discounts)
+        self.promotion_result = PromotionEngine.evaluate([{
+            'product_id':  i['product_id'],
+            'category_id': i.get('category_id'),
+            'quantity':    i['quantity'],
+            'unit_price':  i['unit_price'] * (1 - i['disc']/100)
+        } for i in self.cart])
+        odisc = self.promotion_result['total_discount']
         
         tot = sub - disc - odisc + gst
         self.lb_sub  .config(text=f"Subtotal: {RUPEE}{sub:.2f}")
@@ -388,7 +401,13 @@ class BillingPanel:
             messagebox.showwarning("Input Required", "Please enter phone number")
             return
         try:
-            res = Customer.search_customers(ph)
+            # Phone numbers (full or last 4-6 digits) and names both resolve from in-process indexes
+            if any(ch.isdigit() for ch in ph):
+                res = Customer.find_by_phone(ph)
+            else:
+                res = Customer.search_customers(ph)
+            if len(res) > 1:
+                res = [c for c in [self._choose_customer(res)] if c]
             if res:
                 self.current_customer = res[0]
                 self.cust_lb.config(text=f"{res[0].name} ({res[0].phone})")
@@ -401,6 +420,36 @@ class BillingPanel:
             logging.error(f"Error finding customer: {e}")
             messagebox.showerror("Error", f"Error searching customer: {e}")
 
+    def _choose_customer(self, matches):
+        """Let the cashier pick one of several customers matching a partial number"""
+        win = tk.Toplevel(self.frame)
+        win.title("Select Customer")
+        win.geometry("360x260")
+        win.transient(self.frame)
+        win.grab_set()
+        chosen = []
+
+        ttk.Label(win, text=f"{len(matches)} customers match:").pack(pady=5)
+        lb = tk.Listbox(win, height=10)
+        lb.pack(fill=tk.BOTH, expand=True, padx=10)
+        for c in matches[:100]:
+            lb.insert(tk.END, f"{c.name}  ({c.phone})")
+        lb.selection_set(0)
+
+        def pick(event=None):
+            sel = lb.curselection()
+            if sel:
+                chosen.append(matches[sel[0]])
+            win.destroy()
+
+        ttk.Button(win, text="Select", command=pick).pack(pady=8)
+        lb.bind('<Double-Button-1>', pick)
+        win.bind('<Return>', pick)
+        win.bind('<Escape>', lambda e: win.destroy())
+        lb.focus_set()
+        win.wait_window()
+        return chosen[0] if chosen else None
+
     def create_quick_customer(self):
         """Enhanced New Customer dialog with Save/Cancel buttons"""
         win = tk.Toplevel(self.frame)
@@ -497,21 +546,23 @@ class BillingPanel:
                 return
 
         try:
-            # Generate transaction number
-            txn_number = f"TXN-{datetime.now().strftime('%Y%m%d%H%M%S')}"
+            # Generate transaction number (unique across tills - it keys journal replay)
+            txn_number = Transaction.generate_transaction_number()
             
-            # Calculate totals from cart
-            subtotal = sum(item['quantity'] * item['unit_price'] for item in self.cart_items)
-            total_discount = sum(item['quantity'] * item['unit_price'] * item.get('disc', 0) / 100 for item in self.cart_items)
-            total_tax = sum((item['quantity'] * item['unit_price'] - 
-                            item['quantity'] * item['unit_price'] * item.get('disc', 0) / 100) * 
-                           item.get('gst', 18) / 100 for item in self.cart_items)
+            # Totals from the cart model's running totals
+            subtotal = self.cart.subtotal
+            total_tax = self.cart.tax
+            total_discount = self.cart.item_discount + self.promotion_result['total_discount']
             final_total = subtotal - total_discount + total_tax
             
             # Get customer and employee IDs
             customer_id = self.current_customer.id if self.current_customer else None
             employee_id = 1  # Replace with actual logged-in employee ID
             payment_method = self.pay_var.get()
+
+            if self.journal:
+                return self._journal_sale(txn_number, customer_id, employee_id, payment_method,
+                                          subtotal, total_discount, total_tax, final_total)
             
             # **CRITICAL: Save to database**
             conn, cursor = get_db()
@@ -519,6 +570,8 @@ class BillingPanel:
             print(f"DEBUG: Starting transaction save - {txn_number}")
             print(f"DEBUG: Totals - Subtotal: ₹{subtotal}, Tax: ₹{total_tax}, Final: ₹{final_total}")
             
+            conn.start_transaction()
+            
             # Insert transaction record
             cursor.execute("""
                 INSERT INTO transactions (transaction_number, customer_id, employee_id, 
@@ -533,8 +586,7 @@ class BillingPanel:
             
             # Insert transaction items
             for item in self.cart_items:
-                line_total = (item['quantity'] * item['unit_price'] * 
-                            (1 - item['disc'] / 100) * (1 + item['gst'] / 100))
+                line_total = item['line_total']
                 
                 cursor.execute("""
                     INSERT INTO transaction_items (transaction_id, product_id, quantity, 
@@ -544,6 +596,11 @@ class BillingPanel:
                       item['unit_price'], item['disc'], line_total))
                 print(f"DEBUG: Added item - Product ID: {item['product_id']}, Qty: {item['quantity']}, Line Total: ₹{line_total:.2f}")
             
+            # Receipt/low-stock SMS are saved with the sale and sent in the background
+            queue_sale_notifications(cursor, [{
+                'transaction_number': txn_number, 'customer_id': customer_id,
+                'total_amount': final_total, 'items': self.cart_items}], stock_deducted=False)
+            
             # Commit the transaction
             conn.commit()
             cursor.close()
@@ -567,18 +624,16 @@ class BillingPanel:
                 try:
                     conn, cursor = get_db()
                     loyalty_points = int(final_total / 10)  # 1 point per ₹10
-                    cursor.execute("""
-                        UPDATE customers 
-                        SET total_purchases = total_purchases + %s,
-                            loyalty_points = loyalty_points + %s
-                        WHERE id = %s
-                    """, (final_total, loyalty_points, customer_id))
+                    conn.start_transaction()
+                    Customer.record_purchases(cursor, [(customer_id, final_total, loyalty_points)])
                     conn.commit()
                     cursor.close()
                     print(f"DEBUG: Updated customer {customer_id}: +₹{final_total}, +{loyalty_points} points")
                 except Exception as e:
                     logging.error(f"Customer update failed: {e}")
             
+            notify_outbox()
+            
             # Success message with database confirmation
             messagebox.showinfo("✅ TRANSACTION SUCCESSFUL", 
                               f"🎉 Sale completed and saved to database!\n\n"
@@ -597,18 +652,7 @@ class BillingPanel:
                                       f"🏆 You earned {loyalty_points} loyalty points!\n"
                                       f"💳 Thank you for your continued patronage!")
 
-            # Clear the cart and reset form
-            self.cart_items.clear()
-            self._refresh_cart_tree()
-            self.calculate_totals()
-            self.current_customer = None
-            self.cust_lb.config(text="Walk-in Customer")
-            self.phone_ent.delete(0, tk.END)
-            self.tender_ent.delete(0, tk.END)
-            
-            # Refresh displays
-            self.refresh_product_list()
-            self.barcode_ent.focus()
+            self._reset_after_sale()
 
         except Exception as e:
             logging.error(f"Transaction failed: {e}")
@@ -624,6 +668,59 @@ class BillingPanel:
             except:
                 pass
 
+    def _journal_sale(self, txn_number, customer_id, employee_id, payment_method,
+                      subtotal, total_discount, total_tax, final_total):
+        """Offline till mode: record the sale locally, MySQL is updated by the uploader"""
+        loyalty_points = int(final_total / 10) if customer_id else 0  # 1 point per ₹10
+        sale = {
+            'transaction_number': txn_number,
+            'customer_id': customer_id,
+            'employee_id': employee_id,
+            'payment_method': payment_method,
+            'subtotal': subtotal,
+            'discount_amount': total_discount,
+            'tax_amount': total_tax,
+            'total_amount': final_total,
+            'loyalty_points': loyalty_points,
+            'pos_terminal': platform.node()[:50],
+            'transaction_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'items': [{
+                'product_id': item['product_id'],
+                'quantity': item['quantity'],
+                'unit_price': item['unit_price'],
+                'discount_rate': item['disc'],
+                'line_total': item['line_total']
+            } for item in self.cart_items]
+        }
+        self.journal.append(sale)
+        print(f"DEBUG: Sale {txn_number} journalled for upload")
+
+        messagebox.showinfo("✅ TRANSACTION SUCCESSFUL",
+                          f"🎉 Sale completed!\n\n"
+                          f"📋 Transaction: {txn_number}\n"
+                          f"💰 Total: {RUPEE}{final_total:.2f}\n"
+                          f"💳 Payment: {payment_method.title()}\n"
+                          f"👤 Customer: {self.current_customer.name if self.current_customer else 'Walk-in'}")
+        if loyalty_points > 0:
+            messagebox.showinfo("🎁 LOYALTY REWARDS",
+                              f"Congratulations {self.current_customer.name}!\n\n"
+                              f"🏆 You earned {loyalty_points} loyalty points!")
+        self._reset_after_sale()
+
+    def _reset_after_sale(self):
+        """Clear the cart and reset the form"""
+        self.cart.clear()
+        self._refresh_cart_tree()
+        self.calculate_totals()
+        self.current_customer = None
+        self.cust_lb.config(text="Walk-in Customer")
+        self.phone_ent.delete(0, tk.END)
+        self.tender_ent.delete(0, tk.END)
+
+        # Refresh displays
+        self.refresh_product_list()
+        self.barcode_ent.focus()
+
     def print_receipt(self):
         if not self.cart_items: 
             messagebox.showwarning("Warning", "No items to print")
@@ -715,7 +812,7 @@ class BillingPanel:
         messagebox.showinfo("Transaction Held", f"Transaction held at {held_data['timestamp']}\nItems: {len(self.cart_items)}")
         
         # Clear current transaction
-        self.cart_items.clear()
+        self.cart.clear()
         self._refresh_cart_tree()
         self.calculate_totals()
 
@@ -112,6 +112,9 @@ class CustomerPanel:
         ttk.Button(search_controls, text="Refresh", command=self.refresh_customer_list).pack(side=tk.LEFT, padx=2)
         
 
+        self.summary_label = ttk.Label(parent, text="")
+        self.summary_label.pack(anchor='w', pady=(0, 5))
+        
         list_frame = ttk.LabelFrame(parent, text="Customer Database", padding=5)
         list_frame.pack(fill=tk.BOTH, expand=True)
         
@@ -307,10 +310,21 @@ class CustomerPanel:
                     member_since,
                     status
                 ))
+            self.refresh_summary()
         except Exception as e:
             logging.error(f"Error refreshing customer list: {e}")
             messagebox.showerror("Error", f"Failed to refresh customer list: {str(e)}")
 
+    def refresh_summary(self):
+        """Dashboard line from the cached customer statistics"""
+        stats = Customer.get_customer_statistics()
+        if stats:
+            self.summary_label.config(text=(
+                f"Customers: {stats['total_customers']}   New this month: {stats['new_this_month']}   "
+                f"Avg purchases: {stats['avg_purchase_amount']}   Revenue: {stats['total_revenue']}   "
+                f"Loyalty points: {stats['total_loyalty_points']}"
+            ))
+
     def on_search_change(self, event=None):
         """Handle search entry changes - real-time search"""
         search_term = self.search_entry.get().strip()
@@ -542,7 +556,7 @@ class CustomerPanel:
         customer_name = values[1]
         
         try:
-            history = Customer.get_customer_purchase_history(customer_id)
+            customer = Customer.get_customer_by_id(customer_id)
             
             # Create history window
             history_window = tk.Toplevel(self.frame)
@@ -557,51 +571,77 @@ class CustomerPanel:
             ttk.Label(header_frame, text=f"Purchase History for: {customer_name}", 
                      font=('Segoe UI', 12, 'bold')).pack(anchor='w')
             
-            # Create treeview for history
+            # Transactions with their line items as expandable children
             tree_frame = ttk.Frame(history_window)
             tree_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
             
-            columns = ('Transaction ID', 'Date', 'Amount', 'Payment Method')
-            history_tree = ttk.Treeview(tree_frame, columns=columns, show='headings')
+            columns = ('Date', 'Amount', 'Payment Method', 'Status')
+            history_tree = ttk.Treeview(tree_frame, columns=columns, show='tree headings')
+            history_tree.heading('#0', text='Transaction / Item')
+            history_tree.column('#0', width=300)
             
             for col in columns:
                 history_tree.heading(col, text=col)
-                if col == 'Transaction ID':
-                    history_tree.column(col, width=150)
-                elif col == 'Date':
-                    history_tree.column(col, width=100)
-                elif col == 'Amount':
-                    history_tree.column(col, width=100, anchor='e')
+                if col == 'Amount':
+                    history_tree.column(col, width=140, anchor='e')
                 else:
                     history_tree.column(col, width=120)
             
             # Add scrollbar
             hist_scrollbar = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=history_tree.yview)
-            history_tree.configure(yscrollcommand=hist_scrollbar.set)
             
             history_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
             hist_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-            total_spent = 0
-            for record in history:
-                # Format amount in rupees
-                amount = f"₹{record[3]:.2f}"
-                # Format date
-                date_str = record[2] if isinstance(record[2], str) else record[2].strftime('%d-%m-%Y')
-                
-                history_tree.insert('', tk.END, values=(record[1], date_str, amount, record[4]))
-                total_spent += record[3]
             
-            if not history:
-                history_tree.insert('', tk.END, values=('No transactions found', '', '', ''))
             summary_frame = ttk.Frame(history_window)
             summary_frame.pack(fill=tk.X, padx=10, pady=10)
+            summary_label = ttk.Label(summary_frame, font=('Segoe UI', 10, 'bold'))
+            summary_label.pack(side=tk.LEFT)
+            
+            # Keyset cursor of the next page; None once the oldest purchase is shown
+            state = {'cursor': None, 'loaded': 0, 'done': False, 'pending': False}
+            
+            def load_page():
+                state['pending'] = False
+                if state['done']:
+                    return
+                transactions, next_cursor = Customer.get_purchase_history_page(customer_id, state['cursor'])
+                for txn in transactions:
+                    txn_date = txn['transaction_date']
+                    date_str = txn_date if isinstance(txn_date, str) else txn_date.strftime('%d-%m-%Y %H:%M')
+                    parent = history_tree.insert('', tk.END, text=txn['transaction_number'], values=(
+                        date_str, f"₹{txn['total_amount']:.2f}", txn['payment_method'], txn['payment_status']))
+                    for line in txn['items']:
+                        history_tree.insert(parent, tk.END, text=line['name'], values=(
+                            f"{line['quantity']} × ₹{line['unit_price']:.2f}",
+                            f"₹{line['line_total']:.2f}", '', ''))
+                
+                state['cursor'] = next_cursor
+                state['loaded'] += len(transactions)
+                state['done'] = next_cursor is None
+                if state['loaded'] == 0:
+                    history_tree.insert('', tk.END, text='No transactions found', values=('', '', '', ''))
+                
+                summary_text = f"Showing {state['loaded']} transactions"
+                if not state['done']:
+                    summary_text += " (scroll for more)"
+                if customer:
+                    summary_text += f" | Lifetime Spend: ₹{customer.total_purchases:.2f}"
+                summary_label.config(text=summary_text)
+                load_more_btn.config(state='disabled' if state['done'] else 'normal')
+            
+            def on_scroll(first, last):
+                hist_scrollbar.set(first, last)
+                # Fetch the next page when the user reaches the bottom
+                if float(last) >= 1.0 and state['loaded'] and not (state['done'] or state['pending']):
+                    state['pending'] = True
+                    history_window.after_idle(load_page)
             
-            summary_text = f"Total Transactions: {len(history)} | Total Spent: ₹{total_spent:.2f}"
-            if history:
-                avg_purchase = total_spent / len(history)
-                summary_text += f" | Average Purchase: ₹{avg_purchase:.2f}"
+            history_tree.configure(yscrollcommand=on_scroll)
             
-            ttk.Label(summary_frame, text=summary_text, font=('Segoe UI', 10, 'bold')).pack(anchor='w')
+            load_more_btn = ttk.Button(summary_frame, text="Load More", command=load_page)
+            load_more_btn.pack(side=tk.RIGHT)
+            load_page()
             
             # Close button
             ttk.Button(history_window, text="Close", command=history_window.destroy).pack(pady=10)
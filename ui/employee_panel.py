@@ -4,6 +4,7 @@ Employee management interface
 import tkinter as tk
 from tkinter import ttk, messagebox
 from models.employee import Employee
+from models.attendance import Attendance, month_bounds
 from datetime import datetime
 import logging
 
@@ -500,10 +501,15 @@ class EmployeePanel:
             return
         
         item = self.employee_tree.item(selection[0])
-        employee_name = item['values'][2]
-        current_time = datetime.now().strftime('%H:%M:%S')
+        employee_db_id, employee_name = item['values'][0], item['values'][2]
         
-        messagebox.showinfo("Clock In", f"{employee_name} clocked in at {current_time}")
+        try:
+            Attendance.clock_in(employee_db_id)
+            messagebox.showinfo("Clock In", f"{employee_name} clocked in at {datetime.now().strftime('%H:%M:%S')}")
+        except ValueError as e:
+            messagebox.showwarning("Clock In", f"{employee_name}: {e}")
+        except Exception as e:
+            messagebox.showerror("Error", f"Clock in failed: {str(e)}")
 
     def clock_out(self):
         """Clock out employee"""
@@ -513,10 +519,16 @@ class EmployeePanel:
             return
         
         item = self.employee_tree.item(selection[0])
-        employee_name = item['values'][2]
-        current_time = datetime.now().strftime('%H:%M:%S')
+        employee_db_id, employee_name = item['values'][0], item['values'][2]
         
-        messagebox.showinfo("Clock Out", f"{employee_name} clocked out at {current_time}")
+        try:
+            minutes = Attendance.clock_out(employee_db_id)
+            messagebox.showinfo("Clock Out", f"{employee_name} clocked out at {datetime.now().strftime('%H:%M:%S')}\n"
+                                             f"Shift: {minutes // 60}h {minutes % 60:02d}m")
+        except ValueError as e:
+            messagebox.showwarning("Clock Out", f"{employee_name}: {e}")
+        except Exception as e:
+            messagebox.showerror("Error", f"Clock out failed: {str(e)}")
 
     def view_timesheet(self):
 
@@ -572,10 +584,12 @@ class EmployeePanel:
         timesheet_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         
-        # Sample timesheet data (replace with actual data from database)
+        # One grouped query for the month; days without a row are weekends, absences or still to come
         import calendar
         today = datetime.now()
         current_month_days = calendar.monthrange(today.year, today.month)[1]
+        worked = {day['work_date']: day for day in
+                  Attendance.get_timesheet(item['values'][0], today.year, today.month)}
         
         total_hours = 0
         total_overtime = 0
@@ -585,36 +599,27 @@ class EmployeePanel:
         for day in range(1, min(current_month_days + 1, today.day + 1)):
             date = datetime(today.year, today.month, day)
             day_name = date.strftime('%a')
-            
-            if day_name in ['Sat', 'Sun']:
-                status = 'Weekend'
-                clock_in = '--'
-                clock_out = '--'
-                hours = '0.0'
-                overtime = '0.0'
-            elif day <= today.day - 3:  # Past days
-                if day % 7 == 0:  # Some random absence
+            record = worked.get(date.date())
+            
+            if record:
+                status = 'Clocked In' if record['open'] else 'Present'
+                clock_in = record['clock_in'].strftime('%H:%M')
+                clock_out = record['clock_out'].strftime('%H:%M') if record['clock_out'] else '--'
+                hours = f"{record['minutes'] / 60:.1f}"
+                overtime = f"{record['overtime_minutes'] / 60:.1f}"
+                total_hours += record['minutes'] / 60
+                total_overtime += record['overtime_minutes'] / 60
+                days_present += 1
+            else:
+                clock_in = clock_out = '--'
+                hours = overtime = '0.0'
+                if day_name in ['Sat', 'Sun']:
+                    status = 'Weekend'
+                elif day < today.day:
                     status = 'Absent'
-                    clock_in = '--'
-                    clock_out = '--'
-                    hours = '0.0'
-                    overtime = '0.0'
                     days_absent += 1
                 else:
-                    status = 'Present'
-                    clock_in = '09:00'
-                    clock_out = '17:30'
-                    hours = '8.5'
-                    overtime = '0.5' if day % 5 == 0 else '0.0'
-                    total_hours += 8.5
-                    total_overtime += float(overtime)
-                    days_present += 1
-            else:
-                status = 'Future'
-                clock_in = '--'
-                clock_out = '--'
-                hours = '0.0'
-                overtime = '0.0'
+                    status = 'Today'
             
             timesheet_tree.insert('', tk.END, values=(
                 date.strftime('%d-%m-%Y'),
@@ -667,7 +672,9 @@ class EmployeePanel:
     def generate_employee_report(self):
         """Generate comprehensive employee report"""
         try:
-            employees = Employee.get_all()
+            # Two round trips: grouped counts and payroll, then the detailed list
+            summary = Employee.get_workforce_summary()
+            employees = Employee.get_all(include_inactive=True)
             
             # Create report window
             report_window = tk.Toplevel(self.frame)
@@ -686,46 +693,30 @@ class EmployeePanel:
             report_content = f"EMPLOYEE REPORT - {datetime.now().strftime('%d-%m-%Y %H:%M')}\n"
             report_content += "=" * 80 + "\n\n"
             
-            active_employees = [emp for emp in employees if emp.is_active]
-            report_content += f"Total Employees: {len(employees)}\n"
-            report_content += f"Active Employees: {len(active_employees)}\n"
-            report_content += f"Inactive Employees: {len(employees) - len(active_employees)}\n\n"
+            report_content += f"Total Employees: {summary['total']}\n"
+            report_content += f"Active Employees: {summary['active']}\n"
+            report_content += f"Inactive Employees: {summary['inactive']}\n\n"
             
             # Department breakdown
-            departments = {}
-            for emp in active_employees:
-                dept = emp.department or 'Unassigned'
-                departments[dept] = departments.get(dept, 0) + 1
-            
             report_content += "DEPARTMENT BREAKDOWN:\n"
             report_content += "-" * 40 + "\n"
-            for dept, count in sorted(departments.items()):
-                report_content += f"{dept:.<30} {count:>3} employees\n"
+            for dept, data in sorted(summary['departments'].items()):
+                report_content += f"{dept:.<30} {data['count']:>3} employees\n"
             
             # Position breakdown
-            positions = {}
-            for emp in active_employees:
-                pos = emp.position or 'Unassigned'
-                positions[pos] = positions.get(pos, 0) + 1
-            
             report_content += "\nPOSITION BREAKDOWN:\n"
             report_content += "-" * 40 + "\n"
-            for pos, count in sorted(positions.items()):
+            for pos, count in sorted(summary['positions'].items()):
                 report_content += f"{pos:.<30} {count:>3} employees\n"
             
             # Salary statistics
-            salaries = [emp.salary for emp in active_employees if emp.salary]
-            if salaries:
-                avg_salary = sum(salaries) / len(salaries)
-                min_salary = min(salaries)
-                max_salary = max(salaries)
-                
+            if summary['salaried']:
                 report_content += "\nSALARY STATISTICS:\n"
                 report_content += "-" * 40 + "\n"
-                report_content += f"Average Salary: ₹{avg_salary:,.2f}\n"
-                report_content += f"Minimum Salary: ₹{min_salary:,.2f}\n"
-                report_content += f"Maximum Salary: ₹{max_salary:,.2f}\n"
-                report_content += f"Total Payroll: ₹{sum(salaries):,.2f}\n"
+                report_content += f"Average Salary: ₹{summary['payroll'] / summary['salaried']:,.2f}\n"
+                report_content += f"Minimum Salary: ₹{summary['min_salary']:,.2f}\n"
+                report_content += f"Maximum Salary: ₹{summary['max_salary']:,.2f}\n"
+                report_content += f"Total Payroll: ₹{summary['payroll']:,.2f}\n"
             
             report_content += "\nDETAILED EMPLOYEE LIST:\n"
             report_content += "=" * 80 + "\n"
@@ -753,11 +744,11 @@ class EmployeePanel:
     def payroll_summary(self):
        
         try:
-            employees = Employee.get_all()
-            active_employees = [emp for emp in employees if emp.is_active]
+            summary = Employee.get_workforce_summary()
+            active_count = summary['active']
             
-            total_payroll = sum(emp.salary or 0 for emp in active_employees)
-            average_salary = total_payroll / len(active_employees) if active_employees else 0
+            total_payroll = summary['payroll']
+            average_salary = total_payroll / active_count if active_count else 0
             
             # Create payroll window - increased size
             payroll_window = tk.Toplevel(self.frame)
@@ -773,7 +764,7 @@ class EmployeePanel:
             stats_frame = ttk.LabelFrame(payroll_window, text="Overview", padding=20)
             stats_frame.pack(fill=tk.X, padx=20, pady=10)
             
-            ttk.Label(stats_frame, text=f"Active Employees: {len(active_employees)}", 
+            ttk.Label(stats_frame, text=f"Active Employees: {active_count}", 
                      font=('Segoe UI', 12)).pack(anchor='w', pady=5)
             ttk.Label(stats_frame, text=f"Total Monthly Payroll: ₹{total_payroll:,.2f}", 
                      font=('Segoe UI', 12, 'bold'), foreground='green').pack(anchor='w', pady=5)
@@ -782,6 +773,15 @@ class EmployeePanel:
             ttk.Label(stats_frame, text=f"Annual Payroll: ₹{total_payroll * 12:,.2f}", 
                      font=('Segoe UI', 12)).pack(anchor='w', pady=5)
             
+            # Clocked hours for the current month, from one grouped attendance query
+            today = datetime.now()
+            month_hours = Attendance.get_hours(*month_bounds(today.year, today.month)).values()
+            worked_hours = sum(hours['minutes'] for hours in month_hours) / 60
+            overtime_hours = sum(hours['overtime_minutes'] for hours in month_hours) / 60
+            ttk.Label(stats_frame, text=f"Hours Worked ({today.strftime('%B')}): {worked_hours:,.1f} "
+                                        f"(overtime {overtime_hours:,.1f})",
+                     font=('Segoe UI', 12)).pack(anchor='w', pady=5)
+            
 
             dept_frame = ttk.LabelFrame(payroll_window, text="Department-wise Payroll", padding=15)
             dept_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=10)
@@ -814,22 +814,13 @@ class EmployeePanel:
             dept_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
             dept_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
             
-            # Calculate department-wise data
-            dept_data = {}
-            for emp in active_employees:
-                dept = emp.department or 'Unassigned'
-                if dept not in dept_data:
-                    dept_data[dept] = {'count': 0, 'total': 0}
-                dept_data[dept]['count'] += 1
-                dept_data[dept]['total'] += emp.salary or 0
-            
             # Populate treeview with department data
-            for dept, data in sorted(dept_data.items()):
-                avg = data['total'] / data['count'] if data['count'] > 0 else 0
+            for dept, data in sorted(summary['departments'].items()):
+                avg = data['payroll'] / data['count'] if data['count'] > 0 else 0
                 dept_tree.insert('', tk.END, values=(
                     dept,
                     f"{data['count']}",
-                    f"₹{data['total']:,.0f}",
+                    f"₹{data['payroll']:,.0f}",
                     f"₹{avg:,.0f}"
                 ))
             
@@ -5,14 +5,21 @@ import tkinter as tk
 from tkinter import ttk, messagebox, filedialog, simpledialog
 from models.product import Product
 from models.supplier import Supplier
+from models.purchase_order import PurchaseOrder
+from models.stocktake import Stocktake
+from services.stock_alerts import get_alert_engine
 from datetime import datetime, timedelta
 import csv
 import logging
+import threading
 
 class InventoryPanel:
     def __init__(self, notebook, main_app):
         self.notebook = notebook
         self.main_app = main_app
+        self.alert_engine = get_alert_engine()
+        self.alert_engine.start()
+        self.alert_engine.subscribe(self.on_alert_events)
         self.create_inventory_interface()
 
     def create_inventory_interface(self):
@@ -553,6 +560,9 @@ class InventoryPanel:
         ttk.Button(util_buttons, text="Clear Form", command=self.clear_form).pack(side=tk.LEFT, padx=2)
         ttk.Button(util_buttons, text="Import CSV", command=self.import_csv).pack(side=tk.LEFT, padx=2)
         ttk.Button(util_buttons, text="Export CSV", command=self.export_csv).pack(side=tk.LEFT, padx=2)
+        ttk.Button(util_buttons, text="Auto Reorder Levels", command=self.recalculate_reorder_levels).pack(side=tk.LEFT, padx=2)
+        ttk.Button(util_buttons, text="Purchase Orders", command=self.open_purchase_orders).pack(side=tk.LEFT, padx=2)
+        ttk.Button(util_buttons, text="Stocktake", command=self.open_stocktake).pack(side=tk.LEFT, padx=2)
 
     def create_alerts_section(self, parent):
         """Create alerts and notifications section"""
@@ -946,29 +956,40 @@ class InventoryPanel:
             logging.error(f"Error refreshing product list: {e}")
 
     def check_alerts(self):
-        """Check for low stock and expiring products"""
+        """Show current low stock and expiring products from the alert table"""
         self.alerts_listbox.delete(0, tk.END)
         
         try:
-            # Low stock alerts
-            low_stock = Product.get_low_stock_products()
-            for product in low_stock:
-                alert_msg = f"🔸 LOW STOCK: {product[2]} - Only {product[3]} units left (Reorder: {product[4]})"
+            self.alert_engine.tick()
+            alerts = self.alert_engine.get_alerts()
+            for alert in alerts:
+                if alert['alert_type'] == 'low_stock':
+                    alert_msg = (f"🔸 LOW STOCK: {alert['name']} - Only {alert['quantity_in_stock']} units left "
+                                 f"(Reorder: {alert['threshold']})")
+                else:
+                    alert_msg = (f"⏰ EXPIRING: {alert['name']} - Expires on {alert['expiry_date']} "
+                                 f"({alert['quantity_in_stock']} units)")
                 self.alerts_listbox.insert(tk.END, alert_msg)
             
-            # Expiring products
-            expiring = Product.get_expiring_products(7)
-            for product in expiring:
-                alert_msg = f"⏰ EXPIRING: {product[2]} - Expires on {product[3]} ({product[4]} units)"
-                self.alerts_listbox.insert(tk.END, alert_msg)
-            
-            if not low_stock and not expiring:
+            if not alerts:
                 self.alerts_listbox.insert(tk.END, "✅ No alerts at this time - All products are well stocked!")
                 
         except Exception as e:
             self.alerts_listbox.insert(tk.END, f"❌ Error loading alerts: {str(e)}")
             logging.error(f"Error checking alerts: {e}")
 
+    def on_alert_events(self, events):
+        """Alert engine callback - may run on the journal upload thread, so hop to the Tk loop"""
+        self.frame.after(0, self._show_alert_events, events)
+
+    def _show_alert_events(self, events):
+        self.check_alerts()
+        raised = [event for event in events if event['event'] == 'raised']
+        if raised and hasattr(self.main_app, 'update_status'):
+            names = ', '.join(str(event['name']) for event in raised[:3])
+            more = f" (+{len(raised) - 3} more)" if len(raised) > 3 else ""
+            self.main_app.update_status(f"⚠️ New stock alert: {names}{more}")
+
     def on_search_change(self, event=None):
         """Handle real-time search as user types"""
         search_term = self.search_entry.get().strip()
@@ -1247,8 +1268,296 @@ Status: {values[7]}
             )
             
             if new_level is not None:
-                messagebox.showinfo("Success", f"Reorder level set to {new_level}")
+                try:
+                    Product.update_product_by_barcode(values[0], reorder_level=new_level)
+                    messagebox.showinfo("Success", f"Reorder level set to {new_level}")
+                    self.refresh_product_list()
+                    self.check_alerts()
+                except Exception as e:
+                    messagebox.showerror("Error", f"Failed to set reorder level: {str(e)}")
+
+    def recalculate_reorder_levels(self):
+        """Forecast demand for every SKU and update reorder/min stock levels in the background"""
+        if not messagebox.askyesno("Auto Reorder Levels",
+                                   "Recalculate reorder and minimum stock levels for all products "
+                                   "from recent sales? Manually set levels will be replaced."):
+            return
+        
+        def worker():
+            try:
+                from services.forecasting import DemandForecaster
+                summary = DemandForecaster().run()
+                self.frame.after(0, self._reorder_levels_done, summary, None)
+            except Exception as e:
+                self.frame.after(0, self._reorder_levels_done, None, e)
+        
+        if hasattr(self.main_app, 'update_status'):
+            self.main_app.update_status("📈 Forecasting demand...")
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _reorder_levels_done(self, summary, error):
+        if error:
+            messagebox.showerror("Error", f"Forecast failed: {str(error)}")
+            return
+        messagebox.showinfo("Auto Reorder Levels",
+                            f"{summary['eligible']} of {summary['skus']} products had enough sales history.\n"
+                            f"{summary['changed']} reorder levels updated.")
+        self.refresh_product_list()
+        self.check_alerts()
+
+    def open_purchase_orders(self):
+        """Purchase order window - generate from low stock, send, receive deliveries"""
+        window = tk.Toplevel(self.frame)
+        window.title("Purchase Orders")
+        window.geometry("900x600")
+        
+        orders_frame = ttk.LabelFrame(window, text="Purchase Orders", padding=5)
+        orders_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+        order_columns = ('PO Number', 'Supplier', 'Status', 'Lines', 'Total Cost', 'Created')
+        orders_tree = ttk.Treeview(orders_frame, columns=order_columns, show='headings', height=10)
+        for column in order_columns:
+            orders_tree.heading(column, text=column)
+            orders_tree.column(column, width=130)
+        orders_tree.pack(fill=tk.BOTH, expand=True)
+        
+        items_frame = ttk.LabelFrame(window, text="Order Lines", padding=5)
+        items_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+        item_columns = ('Code', 'Product', 'Ordered', 'Received', 'Unit Cost', 'In Stock')
+        items_tree = ttk.Treeview(items_frame, columns=item_columns, show='headings', height=8)
+        for column in item_columns:
+            items_tree.heading(column, text=column)
+            items_tree.column(column, width=130)
+        items_tree.pack(fill=tk.BOTH, expand=True)
+        
+        def load_orders():
+            orders_tree.delete(*orders_tree.get_children())
+            items_tree.delete(*items_tree.get_children())
+            for order in PurchaseOrder.get_purchase_orders():
+                orders_tree.insert('', tk.END, iid=str(order.id), values=(
+                    order.po_number, order.supplier_name, order.status.title(), order.line_count,
+                    f"₹{order.total_cost:,.2f}", str(order.created_at or '')[:16]
+                ))
+        
+        def load_items(event=None):
+            items_tree.delete(*items_tree.get_children())
+            selection = orders_tree.selection()
+            if not selection:
+                return
+            for product_id, code, name, ordered, received, unit_cost, in_stock in PurchaseOrder.get_items(int(selection[0])):
+                items_tree.insert('', tk.END, values=(code, name, ordered, received,
+                                                      f"₹{float(unit_cost or 0):.2f}", in_stock))
+        
+        def selected_order():
+            selection = orders_tree.selection()
+            if not selection:
+                messagebox.showwarning("Warning", "Please select a purchase order", parent=window)
+                return None
+            return int(selection[0])
+        
+        def generate():
+            try:
+                orders = PurchaseOrder.generate_for_low_stock()
+                if orders:
+                    messagebox.showinfo("Purchase Orders",
+                                        f"Created {len(orders)} purchase orders with "
+                                        f"{sum(order.line_count for order in orders)} lines", parent=window)
+                else:
+                    messagebox.showinfo("Purchase Orders", "No low-stock products need ordering", parent=window)
+                load_orders()
+            except Exception as e:
+                messagebox.showerror("Error", f"Failed to generate purchase orders: {str(e)}", parent=window)
+        
+        def set_status(status):
+            po_id = selected_order()
+            if po_id is None:
+                return
+            try:
+                PurchaseOrder.set_status(po_id, status)
+                load_orders()
+            except Exception as e:
+                messagebox.showerror("Error", str(e), parent=window)
+        
+        def receive():
+            po_id = selected_order()
+            if po_id is None:
+                return
+            if not messagebox.askyesno("Receive Delivery",
+                                       "Receive all ordered quantities into stock?", parent=window):
+                return
+            try:
+                employee_id = 1  # Replace with actual logged-in employee ID
+                units = PurchaseOrder.receive(po_id, employee_id)
+                messagebox.showinfo("Success", f"{units} units received into stock", parent=window)
+                load_orders()
                 self.refresh_product_list()
+                self.check_alerts()
+            except Exception as e:
+                messagebox.showerror("Error", f"Failed to receive purchase order: {str(e)}", parent=window)
+        
+        orders_tree.bind('<<TreeviewSelect>>', load_items)
+        
+        button_frame = ttk.Frame(window)
+        button_frame.pack(fill=tk.X, padx=10, pady=10)
+        ttk.Button(button_frame, text="Generate from Low Stock", command=generate).pack(side=tk.LEFT, padx=2)
+        ttk.Button(button_frame, text="Mark Sent", command=lambda: set_status('sent')).pack(side=tk.LEFT, padx=2)
+        ttk.Button(button_frame, text="Receive Delivery", command=receive).pack(side=tk.LEFT, padx=2)
+        ttk.Button(button_frame, text="Cancel PO", command=lambda: set_status('cancelled')).pack(side=tk.LEFT, padx=2)
+        ttk.Button(button_frame, text="Close", command=window.destroy).pack(side=tk.RIGHT, padx=2)
+        
+        load_orders()
+
+    def open_stocktake(self):
+        """Stocktake window - load scanner/CSV counts, review variances, post in one go"""
+        window = tk.Toplevel(self.frame)
+        window.title("Stocktake")
+        window.geometry("950x650")
+        
+        stocktakes_frame = ttk.LabelFrame(window, text="Stocktakes", padding=5)
+        stocktakes_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+        stocktake_columns = ('Number', 'Status', 'Counted', 'Unmatched', 'Variances', 'Units', 'Value')
+        stocktakes_tree = ttk.Treeview(stocktakes_frame, columns=stocktake_columns, show='headings', height=6)
+        for column in stocktake_columns:
+            stocktakes_tree.heading(column, text=column)
+            stocktakes_tree.column(column, width=120)
+        stocktakes_tree.pack(fill=tk.BOTH, expand=True)
+        
+        variance_frame = ttk.LabelFrame(window, text="Variances (largest value first)", padding=5)
+        variance_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+        variance_columns = ('Code', 'Product', 'System', 'Counted', 'Variance', 'Value')
+        variance_tree = ttk.Treeview(variance_frame, columns=variance_columns, show='headings', height=12)
+        for column in variance_columns:
+            variance_tree.heading(column, text=column)
+            variance_tree.column(column, width=130)
+        variance_tree.pack(fill=tk.BOTH, expand=True)
+        
+        full_count_var = tk.BooleanVar(value=False)
+        
+        def load_stocktakes():
+            stocktakes_tree.delete(*stocktakes_tree.get_children())
+            variance_tree.delete(*variance_tree.get_children())
+            for stocktake in Stocktake.get_stocktakes():
+                stocktakes_tree.insert('', tk.END, iid=str(stocktake.id), values=(
+                    stocktake.stocktake_number, stocktake.status.title(), stocktake.counted_lines,
+                    stocktake.unmatched_lines, stocktake.variance_lines, stocktake.variance_units,
+                    f"₹{stocktake.variance_value:,.2f}"
+                ))
+        
+        def selected_stocktake():
+            selection = stocktakes_tree.selection()
+            if not selection:
+                messagebox.showwarning("Warning", "Please select a stocktake", parent=window)
+                return None
+            return int(selection[0])
+        
+        def load_variances(event=None):
+            variance_tree.delete(*variance_tree.get_children())
+            selection = stocktakes_tree.selection()
+            if not selection:
+                return
+            stocktake_id = int(selection[0])
+            for line in Stocktake.variance_report(stocktake_id)[:1000]:
+                variance_tree.insert('', tk.END, values=(
+                    line['product_code'], line['name'], line['system_quantity'], line['counted_quantity'],
+                    f"{line['variance']:+d}", f"₹{line['variance_value']:,.2f}"
+                ))
+            for code, quantity in Stocktake.get_unmatched(stocktake_id):
+                variance_tree.insert('', tk.END, values=(code, "(unknown code - not posted)", '', quantity, '', ''))
+        
+        def new_stocktake():
+            try:
+                Stocktake.create(created_by=1)  # Replace with actual logged-in employee ID
+                load_stocktakes()
+            except Exception as e:
+                messagebox.showerror("Error", f"Failed to start stocktake: {str(e)}", parent=window)
+        
+        def load_counts():
+            stocktake_id = selected_stocktake()
+            if stocktake_id is None:
+                return
+            file_path = filedialog.askopenfilename(
+                parent=window, title="Select scanner or count file",
+                filetypes=[("Count files", "*.csv *.txt"), ("All files", "*.*")]
+            )
+            if not file_path:
+                return
+            try:
+                lines = Stocktake.load_file(stocktake_id, file_path)
+                messagebox.showinfo("Stocktake", f"{lines} count lines loaded", parent=window)
+                load_stocktakes()
+                stocktakes_tree.selection_set(str(stocktake_id))
+            except Exception as e:
+                messagebox.showerror("Error", f"Failed to load counts: {str(e)}", parent=window)
+        
+        def post():
+            stocktake_id = selected_stocktake()
+            if stocktake_id is None:
+                return
+            message = "Set stock to the counted quantities for every variance?"
+            if full_count_var.get():
+                message += "\n\nFull count: products that were not counted will be set to zero."
+            if not messagebox.askyesno("Post Stocktake", message, parent=window):
+                return
+            try:
+                employee_id = 1  # Replace with actual logged-in employee ID
+                stocktake = Stocktake.post(stocktake_id, employee_id, full_count=full_count_var.get())
+                messagebox.showinfo("Success",
+                                    f"{stocktake.variance_lines} variances posted "
+                                    f"({stocktake.variance_units} units, ₹{stocktake.variance_value:,.2f})",
+                                    parent=window)
+                load_stocktakes()
+                stocktakes_tree.selection_set(str(stocktake_id))
+                self.refresh_product_list()
+                self.check_alerts()
+            except Exception as e:
+                messagebox.showerror("Error", f"Failed to post stocktake: {str(e)}", parent=window)
+        
+        def cancel():
+            stocktake_id = selected_stocktake()
+            if stocktake_id is None:
+                return
+            try:
+                Stocktake.cancel(stocktake_id)
+                load_stocktakes()
+            except Exception as e:
+                messagebox.showerror("Error", str(e), parent=window)
+        
+        def export_report():
+            stocktake_id = selected_stocktake()
+            if stocktake_id is None:
+                return
+            file_path = filedialog.asksaveasfilename(
+                parent=window, defaultextension=".csv",
+                filetypes=[("CSV files", "*.csv"), ("All files", "*.*")]
+            )
+            if not file_path:
+                return
+            try:
+                with open(file_path, 'w', newline='', encoding='utf-8') as file:
+                    writer = csv.writer(file)
+                    writer.writerow(['Product Code', 'Name', 'System', 'Counted', 'Variance', 'Unit Cost', 'Value'])
+                    for line in Stocktake.variance_report(stocktake_id):
+                        writer.writerow([line['product_code'], line['name'], line['system_quantity'],
+                                         line['counted_quantity'], line['variance'], line['unit_cost'],
+                                         line['variance_value']])
+                    for code, quantity in Stocktake.get_unmatched(stocktake_id):
+                        writer.writerow([code, 'UNKNOWN CODE', '', quantity, '', '', ''])
+                messagebox.showinfo("Success", f"Variance report exported to {file_path}", parent=window)
+            except Exception as e:
+                messagebox.showerror("Error", f"Failed to export report: {str(e)}", parent=window)
+        
+        stocktakes_tree.bind('<<TreeviewSelect>>', load_variances)
+        
+        button_frame = ttk.Frame(window)
+        button_frame.pack(fill=tk.X, padx=10, pady=10)
+        ttk.Button(button_frame, text="New Stocktake", command=new_stocktake).pack(side=tk.LEFT, padx=2)
+        ttk.Button(button_frame, text="Load Counts", command=load_counts).pack(side=tk.LEFT, padx=2)
+        ttk.Checkbutton(button_frame, text="Full count", variable=full_count_var).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Post", command=post).pack(side=tk.LEFT, padx=2)
+        ttk.Button(button_frame, text="Export Report", command=export_report).pack(side=tk.LEFT, padx=2)
+        ttk.Button(button_frame, text="Cancel Stocktake", command=cancel).pack(side=tk.LEFT, padx=2)
+        ttk.Button(button_frame, text="Close", command=window.destroy).pack(side=tk.RIGHT, padx=2)
+        
+        load_stocktakes()
 
     def delete_selected_product(self):
         """Delete selected product via context menu"""
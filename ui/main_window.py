@@ -14,6 +14,8 @@ from ui.customer_panel import CustomerPanel
 from ui.employee_panel import EmployeePanel
 from ui.report_panel import ReportPanel
 from ui.utils import UIUtils
+from services.search_index import warm_search_indexes
+from services.notifications import notify_outbox
 
 class MainWindow:
     def __init__(self, root):
@@ -126,6 +128,11 @@ class MainWindow:
             self.panels['report'] = ReportPanel(self.notebook, self)
             self.panels['admin'] = AdminPanel(self.notebook, self)
             
+            # Build the name search indexes while the user logs in
+            warm_search_indexes()
+            # Send receipts and alerts queued before the last shutdown or crash
+            notify_outbox()
+            
             # Add login tab only initially
             self.notebook.add(self.panels['login'].frame, text="Login")
             
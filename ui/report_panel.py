@@ -7,6 +7,7 @@ from models.transaction import Transaction
 from models.product import Product
 from models.customer import Customer
 from models.employee import Employee
+from services.segmentation import SegmentationEngine, get_segment_summary, get_top_customers
 import csv
 from datetime import datetime, timedelta
 import logging
@@ -19,6 +20,7 @@ class ReportPanel:
         # Initialize date entries as None first
         self.from_date_entry = None
         self.to_date_entry = None
+        self.include_archived_var = tk.BooleanVar(value=False)
         self.create_report_interface()
 
     def create_report_interface(self):
@@ -71,6 +73,8 @@ class ReportPanel:
         ttk.Button(quick_dates_frame, text="This Week", command=self.set_this_week).pack(side=tk.LEFT, padx=2)
         ttk.Button(quick_dates_frame, text="This Month", command=self.set_this_month).pack(side=tk.LEFT, padx=2)
         ttk.Button(quick_dates_frame, text="Last 30 Days", command=self.set_last_30_days).pack(side=tk.LEFT, padx=2)
+        ttk.Checkbutton(quick_dates_frame, text="Include archived months",
+                        variable=self.include_archived_var).pack(side=tk.LEFT, padx=10)
         
         # Sales report buttons - WORKING COMMANDS
         sales_buttons_frame = ttk.LabelFrame(sales_frame, text="Sales Reports", padding=10)
@@ -277,10 +281,31 @@ class ReportPanel:
             
             # Try to get real data from database
             try:
-                # This would connect to your actual transaction data
-                transactions = []  # Transaction.get_transactions_by_date_range(from_date, to_date)
+                transactions = Transaction.get_sales_by_date_range(
+                    from_date, to_date, include_archived=self.include_archived_var.get())
                 
-                if not transactions:
+                if transactions:
+                    report_content += f"{'Date':<12} {'Day':<10} {'Sales Amount':<15} {'Transactions':<12} {'Avg Sale':<12} {'Tax Collected':<12}\n"
+                    report_content += f"─────────────────────────────────────────────────────────────────────────────────────────\n"
+                    
+                    total_sales = 0
+                    total_transactions = 0
+                    total_tax = 0
+                    
+                    for sale_date, sales, txns, tax, discount, avg in transactions:
+                        if isinstance(sale_date, str):
+                            sale_date = datetime.strptime(sale_date[:10], '%Y-%m-%d')
+                        sales, tax, avg = float(sales or 0), float(tax or 0), float(avg or 0)
+                        report_content += (f"{sale_date.strftime('%d-%m-%Y'):<12} {sale_date.strftime('%A'):<10} "
+                                           f"₹{sales:<14,.2f} {txns:<12} ₹{avg:<11.2f} ₹{tax:<11.2f}\n")
+                        total_sales += sales
+                        total_transactions += txns
+                        total_tax += tax
+                    
+                    report_content += f"─────────────────────────────────────────────────────────────────────────────────────────\n"
+                    report_content += f"{'TOTALS':<12} {'':<10} ₹{total_sales:<14,.2f} {total_transactions:<12} ₹{total_sales/total_transactions:<11.2f} ₹{total_tax:<11.2f}\n\n"
+                
+                else:
                     # Generate sample data for demonstration
                     dates_data = [
                         ('21-07-2025', 'Monday', 15750.50, 125, 126.00, 2362.50),
@@ -411,21 +436,28 @@ class ReportPanel:
             report_content += f"Generated: {datetime.now().strftime('%d-%m-%Y %H:%M:%S')}\n"
             report_content += f"═══════════════════════════════════════════════════════════════\n\n"
             
-            # Sample customer data
-            customer_data = [
-                ("Rajesh Kumar", "9876543210", 15, 18750.50, 1250.03),
-                ("Priya Sharma", "9876543211", 12, 15420.75, 1285.06),
-                ("Amit Singh", "9876543212", 18, 22150.25, 1230.57),
-                ("Sunita Devi", "9876543213", 8, 9875.00, 1234.38),
-                ("Ravi Gupta", "9876543214", 22, 28540.75, 1297.31),
-            ]
+            # RFM segments from the nightly job; score now if it has never run
+            summary = get_segment_summary()
+            if not summary:
+                SegmentationEngine().run()
+                summary = get_segment_summary()
+            
+            report_content += f"CUSTOMER SEGMENTS (RFM):\n"
+            report_content += f"{'Segment':<16} {'Customers':<10} {'Days Since':<11} {'Avg Visits':<11} {'Total Sales':<15}\n"
+            report_content += f"────────────────────────────────────────────────────────────────────────────────────\n"
+            for segment, customers, days, visits, total in summary:
+                report_content += (f"{segment:<16} {customers:<10} {float(days or 0):<11.0f} "
+                                   f"{float(visits or 0):<11.1f} ₹{float(total or 0):<14.2f}\n")
+            report_content += "\n"
             
             report_content += f"TOP CUSTOMERS BY SALES:\n"
-            report_content += f"{'Customer Name':<20} {'Phone':<15} {'Visits':<8} {'Total Sales':<15} {'Avg/Visit':<12}\n"
+            report_content += f"{'Customer Name':<20} {'Phone':<15} {'Visits':<8} {'Total Sales':<15} {'Avg/Visit':<12} {'Segment':<15}\n"
             report_content += f"────────────────────────────────────────────────────────────────────────────────────\n"
             
-            for name, phone, visits, total, avg in customer_data:
-                report_content += f"{name:<20} {phone:<15} {visits:<8} ₹{total:<14.2f} ₹{avg:<11.2f}\n"
+            for name, phone, visits, total, segment in get_top_customers(20):
+                total = float(total)
+                avg = total / visits if visits else 0.0
+                report_content += f"{name:<20} {phone or '':<15} {visits:<8} ₹{total:<14.2f} ₹{avg:<11.2f} {segment:<15}\n"
             
             if hasattr(self, 'sales_report_text'):
                 self.sales_report_text.delete('1.0', tk.END)